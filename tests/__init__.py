@@ -2,8 +2,29 @@
 # -*- coding: UTF-8 -*-
 
 from .test_absolute_truth import *
+from .test_async_serial import *
+from .test_breaker import *
+from .test_cache import *
+from .test_calibration import *
+from .test_codec import *
 from .test_const import *
+from .test_crc import *
 from .test_functions import *
+from .test_hedge import *
+from .test_monitor import *
+from .test_planner import *
+from .test_poller import *
+from .test_pool import *
+from .test_range import *
+from .test_retry import *
+from .test_rtutcp import *
+from .test_scheduler import *
+from .test_tags import *
+from .test_transaction import *
+from .test_tty import *
+from .test_udp import *
+from .test_unix import *
+from .test_writequeue import *
 
 # TestTcpExample is a non static test and requires a running TCP client
 # from .test_tcp_example import *
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the asynchronous RTU implementation of umodbus"""
+
+import _thread
+import os
+import time
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus import crc
+
+try:
+    import asyncio
+    import pty
+    from umodbus.asynchronous.serial import AsyncModbusRTU, AsyncSerial
+    HAS_PTY = True
+except ImportError:
+    # neither pty nor termios is available on MicroPython
+    HAS_PTY = False
+
+
+class TestAsyncSerial(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+        # the library uses the pseudo-terminal like a serial device, the
+        # test acts as the other device on the bus on the controlling side
+        if HAS_PTY:
+            self._bus_fd, self._tty_fd = pty.openpty()
+            self._tty_path = os.ttyname(self._tty_fd)
+
+    def _read_frame(self, length: int) -> bytes:
+        """Read a frame of given length from the bus side"""
+        frame = b''
+        while len(frame) < length:
+            frame += os.read(self._bus_fd, length - len(frame))
+        return frame
+
+    @unittest.skipUnless(HAS_PTY, 'Pseudo-terminals not available')
+    def test_client(self) -> None:
+        """Test serving registers as asynchronous RTU client"""
+        client = AsyncModbusRTU(addr=10,
+                                uart_id=self._tty_path,
+                                baudrate=115200)
+        client.add_coil(address=123, value=[True, False, True])
+
+        async def serve() -> None:
+            # nothing received within the timeout
+            self.assertFalse(await client.process(timeout=5000))
+
+            request = b'\x0A\x01\x00\x7B\x00\x03'
+            os.write(self._bus_fd, request + crc.calculate(request))
+            self.assertTrue(await client.process())
+
+            # request for another device on the bus
+            request = b'\x0B\x01\x00\x7B\x00\x03'
+            os.write(self._bus_fd, request + crc.calculate(request))
+            self.assertFalse(await client.process())
+
+        asyncio.run(serve())
+
+        response = self._read_frame(6)
+        self.assertTrue(crc.is_valid(response))
+        self.assertEqual(response[:4], b'\x0A\x01\x01\x05')
+
+        client._itf._uart.deinit()
+
+    @unittest.skipUnless(HAS_PTY, 'Pseudo-terminals not available')
+    def test_host(self) -> None:
+        """Test requesting registers as asynchronous RTU host"""
+        host = AsyncSerial(uart_id=self._tty_path, baudrate=115200)
+
+        def respond() -> None:
+            for value in [b'\x00\x2A', b'\xFF\xFE']:
+                request = self._read_frame(8)
+                response = b'\x0B\x03\x02' + value
+                if request[:2] != b'\x0B\x03':
+                    response = b'\x0B\x83\x01'
+                os.write(self._bus_fd, response + crc.calculate(response))
+
+        _thread.start_new_thread(respond, ())
+
+        async def request() -> list:
+            # concurrent requests are serialized on the bus
+            return await asyncio.gather(
+                host.read_holding_registers(slave_addr=11,
+                                            starting_addr=93,
+                                            register_qty=1),
+                host.read_holding_registers(slave_addr=11,
+                                            starting_addr=94,
+                                            register_qty=1))
+
+        result = asyncio.run(request())
+        self.assertEqual(result, [(42,), (-2,)])
+
+        host._uart.deinit()
+
+    @unittest.skipUnless(HAS_PTY, 'Pseudo-terminals not available')
+    def test_host_timing(self) -> None:
+        """Test the transmission and the response timeout of the host"""
+        host = AsyncSerial(uart_id=self._tty_path, baudrate=1200)
+        ticks = []
+
+        async def tick() -> None:
+            while True:
+                ticks.append(time.time())
+                await asyncio.sleep(0.01)
+
+        async def request() -> None:
+            ticker = asyncio.create_task(tick())
+
+            # other tasks keep running while a frame is on the wire
+            host._send(modbus_pdu=b'\x03\x00\x5D\x00\x01', slave_addr=11)
+            await host._flush()
+            self.assertGreater(len(ticks), 3)
+            self.assertEqual(len(self._read_frame(8)), 8)
+
+            # the nominal timeout is several seconds at this baudrate
+            host.set_response_timeout(timeout_ms=100)
+            start = time.time()
+            with self.assertRaises(OSError):
+                await host.read_holding_registers(slave_addr=11,
+                                                  starting_addr=93,
+                                                  register_qty=1)
+            self.assertLess(time.time() - start, 1.0)
+
+            ticker.cancel()
+
+        asyncio.run(request())
+
+        host._uart.deinit()
+
+    def tearDown(self) -> None:
+        """Run after every test method"""
+        if HAS_PTY:
+            os.close(self._bus_fd)
+            os.close(self._tty_fd)
+
+
+if __name__ == '__main__':
+    unittest.main()
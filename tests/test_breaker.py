@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the circuit breaker of umodbus"""
+
+import struct
+import time
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus.breaker import CircuitBreaker, CircuitOpenError
+from umodbus.breaker import STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+from umodbus.common import CommonModbusFunctions
+
+
+class FakeHost(CommonModbusFunctions):
+    """Host without responses of dead slaves"""
+    def __init__(self) -> None:
+        self.requests = []
+        self.dead = set()
+        self.exception = set()
+        self.error = None
+
+    def _send_receive(self, slave_addr, modbus_pdu, count):
+        self.requests.append(slave_addr)
+
+        if self.error is not None:
+            raise self.error
+
+        if slave_addr in self.dead:
+            raise OSError('no data received from slave')
+        if slave_addr in self.exception:
+            raise ValueError('slave returned exception code: 2')
+
+        return struct.pack('>H', slave_addr)
+
+
+class TestBreaker(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+        self._host = FakeHost()
+        self._changes = []
+        self._breaker = CircuitBreaker(
+            itf=self._host,
+            failure_threshold=3,
+            reset_timeout_ms=20,
+            on_state_change=lambda *change: self._changes.append(change))
+
+    def _read(self, slave_addr: int) -> tuple:
+        """Read a single holding register through the circuit breaker"""
+        return self._breaker.read_holding_registers(slave_addr=slave_addr,
+                                                    starting_addr=0,
+                                                    register_qty=1)
+
+    def test_open(self) -> None:
+        """Test consecutive failures open the circuit of a device only"""
+        self._host.dead.add(10)
+
+        for _ in range(3):
+            with self.assertRaises(OSError):
+                self._read(slave_addr=10)
+        self.assertEqual(self._breaker.state(slave_addr=10), STATE_OPEN)
+        self.assertEqual(self._changes, [(10, STATE_CLOSED, STATE_OPEN)])
+
+        # rejected without a request
+        with self.assertRaises(CircuitOpenError):
+            self._read(slave_addr=10)
+        self.assertEqual(self._host.requests, [10, 10, 10])
+
+        self.assertEqual(self._read(slave_addr=11), (11, ))
+        self.assertEqual(self._breaker.state(slave_addr=11), STATE_CLOSED)
+
+        statistics = self._breaker.statistics
+        self.assertEqual(statistics[10], {'state': STATE_OPEN,
+                                          'failures': 3,
+                                          'requests': 3,
+                                          'rejected': 1,
+                                          'trips': 1})
+        self.assertEqual(statistics[11]['requests'], 1)
+
+        self._breaker.reset(slave_addr=10)
+        self.assertEqual(self._breaker.state(slave_addr=10), STATE_CLOSED)
+
+    def test_success_resets_failures(self) -> None:
+        """Test responses and exception responses reset the failures"""
+        self._host.dead.add(10)
+        for _ in range(2):
+            with self.assertRaises(OSError):
+                self._read(slave_addr=10)
+
+        self._host.dead.clear()
+        self._host.exception.add(10)
+        with self.assertRaises(ValueError):
+            self._read(slave_addr=10)
+
+        self._host.exception.clear()
+        self._host.dead.add(10)
+        for _ in range(2):
+            with self.assertRaises(OSError):
+                self._read(slave_addr=10)
+        self.assertEqual(self._breaker.state(slave_addr=10), STATE_CLOSED)
+
+    def test_half_open(self) -> None:
+        """Test probes close the circuit or open it again"""
+        self._host.dead.add(10)
+        for _ in range(3):
+            with self.assertRaises(OSError):
+                self._read(slave_addr=10)
+
+        self.assertEqual(self._breaker.probe(), 0)
+        time.sleep(0.03)
+        self.assertEqual(self._breaker.state(slave_addr=10), STATE_HALF_OPEN)
+
+        # failed probe
+        with self.assertRaises(OSError):
+            self._read(slave_addr=10)
+        self.assertEqual(self._breaker.state(slave_addr=10), STATE_OPEN)
+
+        self._host.dead.clear()
+        time.sleep(0.03)
+        self.assertEqual(self._breaker.probe(), 1)
+        self.assertEqual(self._breaker.state(slave_addr=10), STATE_CLOSED)
+
+        self.assertEqual(self._changes,
+                         [(10, STATE_CLOSED, STATE_OPEN),
+                          (10, STATE_OPEN, STATE_HALF_OPEN),
+                          (10, STATE_HALF_OPEN, STATE_OPEN),
+                          (10, STATE_OPEN, STATE_HALF_OPEN),
+                          (10, STATE_HALF_OPEN, STATE_CLOSED)])
+        self.assertEqual(self._breaker.statistics[10]['trips'], 2)
+
+    def test_interrupted_probe(self) -> None:
+        """Test a probe without a result allows the next request to probe"""
+        self._host.dead.add(10)
+        for _ in range(3):
+            with self.assertRaises(OSError):
+                self._read(slave_addr=10)
+        self._host.dead.clear()
+        time.sleep(0.03)
+
+        self._host.error = RuntimeError('interrupted')
+        with self.assertRaises(RuntimeError):
+            self._read(slave_addr=10)
+        self.assertEqual(self._breaker.state(slave_addr=10), STATE_HALF_OPEN)
+
+        self._host.error = None
+        self.assertEqual(self._read(slave_addr=10), (10, ))
+        self.assertEqual(self._breaker.state(slave_addr=10), STATE_CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the read cache of umodbus"""
+
+import struct
+import time
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus import const as Const
+from umodbus import functions
+from umodbus.cache import CachingClient
+from umodbus.common import CommonModbusFunctions
+
+try:
+    import _thread
+    HAS_THREAD = True
+except ImportError:
+    HAS_THREAD = False
+
+
+class FakeHost(CommonModbusFunctions):
+    """Host answering with the address plus an offset as register value"""
+    def __init__(self) -> None:
+        self.requests = []
+        self.offset = 0
+        self.gate = None
+
+    def _send_receive(self, slave_addr, modbus_pdu, count):
+        function_code, address, quantity = struct.unpack_from('>BHH',
+                                                              modbus_pdu)
+        self.requests.append((slave_addr, function_code, address, quantity))
+
+        if function_code in [Const.WRITE_SINGLE_COIL,
+                             Const.WRITE_SINGLE_REGISTER,
+                             Const.WRITE_MULTIPLE_COILS,
+                             Const.WRITE_MULTIPLE_REGISTERS]:
+            return modbus_pdu[1:5]
+
+        # reads wait for the gate
+        if self.gate is not None:
+            self.gate.acquire()
+            self.gate.release()
+
+        values = [(address + idx + self.offset) % 3 == 0
+                  for idx in range(quantity)]
+        if function_code in [Const.READ_HOLDING_REGISTERS,
+                             Const.READ_INPUT_REGISTER]:
+            values = [address + idx + self.offset for idx in range(quantity)]
+
+        return functions.response(function_code=function_code,
+                                  request_register_addr=address,
+                                  request_register_qty=quantity,
+                                  request_data=[],
+                                  value_list=values)[2:]
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+        self._host = FakeHost()
+        self._cache = CachingClient(itf=self._host,
+                                    ttl_ms=1000,
+                                    max_entries=3)
+
+    def test_sub_range(self) -> None:
+        """Test reads inside a cached block are served from the cache"""
+        self.assertEqual(self._cache.read_holding_registers(slave_addr=10,
+                                                            starting_addr=0,
+                                                            register_qty=50),
+                         tuple(range(50)))
+        self.assertEqual(self._cache.read_holding_registers(slave_addr=10,
+                                                            starting_addr=10,
+                                                            register_qty=11),
+                         tuple(range(10, 21)))
+
+        coils = self._cache.read_coils(slave_addr=10,
+                                       starting_addr=0,
+                                       coil_qty=20)
+        self.assertEqual(self._cache.read_coils(slave_addr=10,
+                                                starting_addr=5,
+                                                coil_qty=11),
+                         coils[5:16])
+
+        # other slaves, register types and ranges are not cached
+        self._cache.read_holding_registers(slave_addr=11,
+                                           starting_addr=10,
+                                           register_qty=11)
+        self._cache.read_input_registers(slave_addr=10,
+                                         starting_addr=10,
+                                         register_qty=11)
+        self._cache.read_holding_registers(slave_addr=10,
+                                           starting_addr=45,
+                                           register_qty=10)
+
+        self.assertEqual(self._host.requests,
+                         [(10, 3, 0, 50), (10, 1, 0, 20), (11, 3, 10, 11),
+                          (10, 4, 10, 11), (10, 3, 45, 10)])
+        self.assertEqual(self._cache.statistics['hits'], 2)
+        self.assertEqual(self._cache.statistics['misses'], 5)
+
+    def test_ttl(self) -> None:
+        """Test expired blocks and ranges without caching are read again"""
+        self._cache.add_ttl_rule(reg_type='HREGS',
+                                 address=100,
+                                 quantity=1,
+                                 ttl_ms=0)
+        self._cache.add_ttl_rule(reg_type='IREGS',
+                                 address=0,
+                                 quantity=10,
+                                 ttl_ms=20)
+
+        for _ in range(2):
+            self._cache.read_holding_registers(slave_addr=10,
+                                               starting_addr=95,
+                                               register_qty=10)
+            self._cache.read_input_registers(slave_addr=10,
+                                             starting_addr=5,
+                                             register_qty=10)
+        self.assertEqual(len(self._host.requests), 3)
+
+        time.sleep(0.03)
+        self._host.offset = 1
+        self.assertEqual(self._cache.read_input_registers(slave_addr=10,
+                                                          starting_addr=5,
+                                                          register_qty=2),
+                         (6, 7))
+
+        with self.assertRaises(KeyError):
+            self._cache.add_ttl_rule(reg_type='REGS',
+                                     address=0,
+                                     quantity=1,
+                                     ttl_ms=0)
+
+    def test_lru(self) -> None:
+        """Test the least recently used block is evicted"""
+        for address in [0, 100, 200]:
+            self._cache.read_holding_registers(slave_addr=10,
+                                               starting_addr=address,
+                                               register_qty=10)
+        self._cache.read_holding_registers(slave_addr=10,
+                                           starting_addr=0,
+                                           register_qty=1)
+        self._cache.read_holding_registers(slave_addr=10,
+                                           starting_addr=300,
+                                           register_qty=10)
+
+        self._host.requests = []
+        self._cache.read_holding_registers(slave_addr=10,
+                                           starting_addr=0,
+                                           register_qty=10)
+        self._cache.read_holding_registers(slave_addr=10,
+                                           starting_addr=100,
+                                           register_qty=10)
+        self.assertEqual(self._host.requests, [(10, 3, 100, 10)])
+        self.assertEqual(self._cache.statistics['evictions'], 2)
+
+    def test_write_invalidates(self) -> None:
+        """Test writes invalidate the cached blocks they affect"""
+        self._cache.read_holding_registers(slave_addr=10,
+                                           starting_addr=0,
+                                           register_qty=50)
+        self._cache.read_coils(slave_addr=10, starting_addr=0, coil_qty=8)
+
+        self.assertTrue(self._cache.write_single_register(
+            slave_addr=10,
+            register_address=60,
+            register_value=1))
+        self.assertTrue(self._cache.write_multiple_coils(
+            slave_addr=10,
+            starting_address=7,
+            output_values=[1, 0]))
+
+        self._host.requests = []
+        self._cache.read_holding_registers(slave_addr=10,
+                                           starting_addr=0,
+                                           register_qty=50)
+        self._cache.read_coils(slave_addr=10, starting_addr=0, coil_qty=8)
+        self.assertEqual(self._host.requests, [(10, 1, 0, 8)])
+
+        self._cache.write_single_register(slave_addr=10,
+                                          register_address=49,
+                                          register_value=1)
+        self._cache.read_holding_registers(slave_addr=10,
+                                           starting_addr=0,
+                                           register_qty=50)
+        self.assertEqual(self._host.requests[-1], (10, 3, 0, 50))
+
+        self._cache.invalidate()
+        self.assertEqual(self._cache.statistics['entries'], 0)
+
+    @unittest.skipUnless(HAS_THREAD, 'Threads not available')
+    def test_single_flight(self) -> None:
+        """Test concurrent identical reads share one transaction"""
+        self._host.gate = _thread.allocate_lock()
+        self._host.gate.acquire()
+        results = []
+
+        def read() -> None:
+            results.append(self._cache.read_holding_registers(
+                slave_addr=10,
+                starting_addr=0,
+                register_qty=5))
+
+        _thread.start_new_thread(read, ())
+        _thread.start_new_thread(read, ())
+
+        for _ in range(200):
+            if self._cache.statistics['coalesced'] == 1:
+                break
+            time.sleep(0.01)
+
+        self._host.gate.release()
+
+        for _ in range(200):
+            if len(results) == 2:
+                break
+            time.sleep(0.01)
+
+        self.assertEqual(results, [(0, 1, 2, 3, 4)] * 2)
+        self.assertEqual(self._host.requests, [(10, 3, 0, 5)])
+
+    @unittest.skipUnless(HAS_THREAD, 'Threads not available')
+    def test_write_during_read(self) -> None:
+        """Test reads in flight during a write are not cached"""
+        self._host.gate = _thread.allocate_lock()
+        self._host.gate.acquire()
+        results = []
+
+        def read(cache: CachingClient) -> None:
+            results.append(cache.read_holding_registers(slave_addr=10,
+                                                        starting_addr=0,
+                                                        register_qty=5))
+
+        _thread.start_new_thread(read, (self._cache, ))
+
+        for _ in range(200):
+            if len(self._host.requests):
+                break
+            time.sleep(0.01)
+
+        # the write finishes while the read is in flight
+        self.assertTrue(self._cache.write_single_register(
+            slave_addr=10,
+            register_address=2,
+            register_value=42))
+        self._host.gate.release()
+
+        for _ in range(200):
+            if len(results):
+                break
+            time.sleep(0.01)
+
+        self.assertEqual(results, [(0, 1, 2, 3, 4)])
+        self._host.offset = 100
+        self.assertEqual(self._cache.statistics['entries'], 0)
+        self.assertEqual(self._cache.read_holding_registers(slave_addr=10,
+                                                            starting_addr=0,
+                                                            register_qty=5),
+                         (100, 101, 102, 103, 104))
+
+
+if __name__ == '__main__':
+    unittest.main()
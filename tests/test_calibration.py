@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the serial link timing calibration of umodbus"""
+
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus.calibration import LinkCalibration
+
+
+class TestCalibration(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+        # 9600 baud, 8N1
+        self._calibration = LinkCalibration(t1char=1145,
+                                            inter_frame_delay=4007,
+                                            response_timeout=476833,
+                                            min_samples=4,
+                                            max_errors=2)
+
+    def test_nominal(self) -> None:
+        """Test nominal values are used until enough samples are measured"""
+        self.assertEqual(self._calibration.tx_time(slave_addr=10, nbytes=8),
+                         8 * 1145)
+        self.assertEqual(self._calibration.response_timeout(slave_addr=10),
+                         476833)
+
+        for _ in range(3):
+            self._calibration.record_tx(slave_addr=10, nbytes=8, duration=8333)
+            self._calibration.record_response(slave_addr=10, latency=5000)
+
+        self.assertFalse(self._calibration.is_calibrated(slave_addr=10))
+        self.assertEqual(self._calibration.tx_time(slave_addr=10, nbytes=8),
+                         8 * 1145)
+        self.assertEqual(self._calibration.response_timeout(slave_addr=10),
+                         476833)
+
+    def test_calibrated(self) -> None:
+        """Test the measured peaks are used and decay slowly"""
+        for latency in [3000, 5000, 4000, 4000]:
+            self._calibration.record_tx(slave_addr=10, nbytes=8, duration=8333)
+            self._calibration.record_response(slave_addr=10, latency=latency)
+
+        self.assertTrue(self._calibration.is_calibrated(slave_addr=10))
+        self.assertEqual(self._calibration.tx_time(slave_addr=10, nbytes=8),
+                         8333)
+
+        # peak of 5000 us decayed by 1/16 twice
+        timeout = self._calibration.response_timeout(slave_addr=10)
+        self.assertEqual(timeout, 2 * (4688 - (4688 >> 4)) + 4007)
+
+        # other links are not affected
+        self.assertFalse(self._calibration.is_calibrated(slave_addr=11))
+
+        statistics = self._calibration.statistics[10]
+        self.assertTrue(statistics['calibrated'])
+        self.assertEqual(statistics['timeout'], timeout)
+        self.assertEqual(statistics['fallbacks'], 0)
+
+    def test_fallback(self) -> None:
+        """Test links fall back to the nominal values on repeated failures"""
+        for _ in range(4):
+            self._calibration.record_tx(slave_addr=10, nbytes=8, duration=8333)
+            self._calibration.record_response(slave_addr=10, latency=2000)
+
+        # single failures are tolerated
+        self._calibration.record_failure(slave_addr=10)
+        self._calibration.record_response(slave_addr=10, latency=2000)
+        self._calibration.record_failure(slave_addr=10)
+        self.assertTrue(self._calibration.is_calibrated(slave_addr=10))
+
+        self._calibration.record_failure(slave_addr=10)
+        self.assertFalse(self._calibration.is_calibrated(slave_addr=10))
+        self.assertEqual(self._calibration.tx_time(slave_addr=10, nbytes=8),
+                         8 * 1145)
+        self.assertEqual(self._calibration.response_timeout(slave_addr=10),
+                         476833)
+        self.assertEqual(self._calibration.statistics[10]['fallbacks'], 1)
+
+    def test_ctrl_pin_delay(self) -> None:
+        """Test the control pin delay follows the measured switching time"""
+        self.assertEqual(self._calibration.ctrl_pin_delay(), 200)
+
+        for duration in [12, 20, 15, 15]:
+            self._calibration.record_ctrl_pin(duration=duration)
+
+        # peak of 20 us decayed by 1/16 twice
+        self.assertEqual(self._calibration.ctrl_pin_delay(), 2 * 18)
+
+        # a link falling back measures the control pin again
+        for _ in range(2):
+            self._calibration.record_failure(slave_addr=10)
+        self.assertEqual(self._calibration.ctrl_pin_delay(), 200)
+        self.assertEqual(self._calibration.statistics[10]['ctrl_pin_delay'],
+                         200)
+
+
+if __name__ == '__main__':
+    unittest.main()
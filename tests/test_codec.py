@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the multi register codec of umodbus"""
+
+import struct
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus import codec
+from umodbus.common import CommonModbusFunctions
+
+
+class FakeClient(CommonModbusFunctions):
+    """Client answering with fixed register data"""
+    def __init__(self, data: bytes) -> None:
+        self._data = data
+
+    def _send_receive(self, slave_addr, modbus_pdu, count):
+        _, quantity = struct.unpack_from('>HH', modbus_pdu, 1)
+        return self._data[:2 * quantity]
+
+
+class TestCodec(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+    def test_orders(self) -> None:
+        """Test the four byte and word orders of a 32 bit value"""
+        possibilities = [
+            # order, register data of 0x01020304
+            ('ABCD', b'\x01\x02\x03\x04'),
+            ('CDAB', b'\x03\x04\x01\x02'),
+            ('BADC', b'\x02\x01\x04\x03'),
+            ('DCBA', b'\x04\x03\x02\x01'),
+        ]
+        for order, data in possibilities:
+            with self.subTest(order=order):
+                self.assertEqual(codec.encode(values=[0x01020304],
+                                              dtype='uint32',
+                                              order=order), data)
+                self.assertEqual(codec.decode(data=data,
+                                              dtype='uint32',
+                                              order=order), (0x01020304, ))
+
+        # the word order does not affect single registers
+        self.assertEqual(codec.decode(data=b'\x01\x02',
+                                      dtype='int16',
+                                      order='CDAB'), (0x0102, ))
+        self.assertEqual(codec.decode(data=b'\x02\x01',
+                                      dtype='uint16',
+                                      order='DCBA'), (0x0102, ))
+
+        # the words of 64 bit values are reversed
+        self.assertEqual(codec.encode(values=[0x0102030405060708],
+                                      dtype='uint64',
+                                      order='CDAB'),
+                         b'\x07\x08\x05\x06\x03\x04\x01\x02')
+
+    def test_round_trip(self) -> None:
+        """Test blocks of values are decoded and encoded"""
+        possibilities = [
+            ('int32', [-2, 2147483647, 0]),
+            ('uint32', [4294967295, 1]),
+            ('float32', [1.5, -2.25, 0.0]),
+            ('int64', [-9223372036854775808, 42]),
+            ('uint64', [18446744073709551615]),
+            ('float64', [3.141592653589793, -1e100]),
+        ]
+        for dtype, values in possibilities:
+            for order in codec.ORDERS:
+                with self.subTest(dtype=dtype, order=order):
+                    registers = codec.encode_registers(values=values,
+                                                       dtype=dtype,
+                                                       order=order)
+                    self.assertEqual(
+                        len(registers),
+                        codec.register_count(dtype=dtype, count=len(values)))
+                    self.assertEqual(
+                        codec.decode_registers(registers=registers,
+                                               dtype=dtype,
+                                               order=order),
+                        tuple(values))
+
+        # signed registers as returned by the read functions
+        self.assertEqual(codec.decode_registers(registers=[-1, -2],
+                                                dtype='int32'),
+                         (-2, ))
+
+    def test_string(self) -> None:
+        """Test ASCII strings in registers"""
+        data = codec.encode_string(text='Hello', register_qty=4)
+        self.assertEqual(data, b'Hello\x00\x00\x00')
+        self.assertEqual(codec.decode_string(data=data), 'Hello')
+
+        data = codec.encode_string(text='Hello', register_qty=3, order='BADC')
+        self.assertEqual(data, b'eHll\x00o')
+        self.assertEqual(codec.decode_string(data=data, order='BADC'),
+                         'Hello')
+
+        self.assertEqual(codec.decode_string(data=b'AB  '), 'AB')
+
+        with self.assertRaises(ValueError):
+            codec.encode_string(text='Hello', register_qty=2)
+
+    def test_invalid(self) -> None:
+        """Test invalid data types, orders and data lengths"""
+        with self.assertRaises(ValueError):
+            codec.decode(data=b'\x00\x00\x00\x00', dtype='int24')
+
+        with self.assertRaises(ValueError):
+            codec.decode(data=b'\x00\x00\x00\x00', dtype='int32', order='AB')
+
+        with self.assertRaises(ValueError):
+            codec.decode(data=b'\x00\x00\x00\x00\x00\x00', dtype='float32')
+
+    def test_client_dtype(self) -> None:
+        """Test decoding of read registers by the client"""
+        data = codec.encode(values=[1.5, -2.25], dtype='float32', order='CDAB')
+        client = FakeClient(data=data)
+
+        self.assertEqual(client.read_holding_registers(slave_addr=10,
+                                                       starting_addr=0,
+                                                       register_qty=4,
+                                                       dtype='float32',
+                                                       order='CDAB'),
+                         (1.5, -2.25))
+        self.assertEqual(client.read_input_registers(slave_addr=10,
+                                                     starting_addr=0,
+                                                     register_qty=2,
+                                                     signed=False),
+                         struct.unpack('>HH', data[:4]))
+
+        client = FakeClient(data=b'umodbus\x00')
+        self.assertEqual(client.read_input_registers(slave_addr=10,
+                                                     starting_addr=0,
+                                                     register_qty=4,
+                                                     dtype=codec.STRING),
+                         'umodbus')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -72,6 +72,20 @@ class TestConst(unittest.TestCase):
         self.assertEqual(Const.FIXED_RESP_LEN, 0x08)
         self.assertEqual(Const.MBAP_HDR_LENGTH, 0x07)
 
+    def test_protocol_limits(self) -> None:
+        """Test Modbus protocol limits"""
+        self.assertEqual(Const.MAX_READ_BITS, 2000)
+        self.assertEqual(Const.MAX_READ_REGISTERS, 125)
+        self.assertEqual(Const.MAX_WRITE_BITS, 1968)
+        self.assertEqual(Const.MAX_WRITE_REGISTERS, 123)
+
+    def test_serial_line_constants(self) -> None:
+        """Test Modbus serial line constants"""
+        self.assertEqual(Const.BROADCAST_ADDR, 0x00)
+        self.assertEqual(Const.BROADCAST_TURNAROUND_DELAY, 100)
+        self.assertEqual(Const.BROADCAST_FUNCTION_CODES,
+                         (0x05, 0x06, 0x0F, 0x10))
+
     def test_crc16_table(self):
         """Test CRC16-Modbus table"""
         def generate_crc16_table() -> List[int, ...]:
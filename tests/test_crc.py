@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the CRC16 calculation of umodbus"""
+
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus import crc
+
+
+class TestCrc(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+    def _crc16_bitwise(self, data: bytes) -> int:
+        """Reference CRC16 calculation without any lookup table"""
+        value = 0xFFFF
+        for byte in data:
+            value ^= byte
+            for _ in range(8):
+                if value & 0x0001:
+                    value = (value >> 1) ^ 0xA001
+                else:
+                    value >>= 1
+        return value
+
+    def test_calculate(self) -> None:
+        """Test CRC16 of known Modbus frames"""
+        possibilities = [
+            # frame without CRC, expectation
+            (b'\x0A\x01\x00\x7B\x00\x01', b'\x8C\xA8'),
+            (b'\x01\x03\x00\x00\x00\x0A', b'\xC5\xCD'),
+            (b'\x11\x03\x00\x6B\x00\x03', b'\x76\x87'),
+        ]
+        for pair in possibilities:
+            with self.subTest(pair=pair):
+                result = crc.calculate(pair[0])
+                self.assertIsInstance(result, bytes)
+                self.assertEqual(result, pair[1])
+
+    def test_crc16(self) -> None:
+        """Test CRC16 of odd and even data lengths and ranges"""
+        data = bytes(range(256)) + bytes(range(255, -1, -1))
+
+        for length in [0, 1, 2, 3, 8, 255, 256, 511]:
+            with self.subTest(length=length):
+                self.assertEqual(crc.crc16(data, 0, length),
+                                 self._crc16_bitwise(data[:length]))
+
+        self.assertEqual(crc.crc16(data, 3, 10),
+                         self._crc16_bitwise(data[3:10]))
+        self.assertEqual(crc.crc16(data), self._crc16_bitwise(data))
+
+    def test_is_valid(self) -> None:
+        """Test validation of frames including their CRC16"""
+        frame = b'\x11\x03\x00\x6B\x00\x03\x76\x87'
+
+        self.assertTrue(crc.is_valid(frame))
+        self.assertTrue(crc.is_valid(frame + b'\x00\x00', len(frame)))
+        self.assertFalse(crc.is_valid(b'\x11\x03\x00\x6B\x00\x03\x87\x76'))
+        self.assertFalse(crc.is_valid(b'\x11'))
+
+    def test_incremental(self) -> None:
+        """Test feeding the CRC16 in several chunks"""
+        frame = bytes(range(1, 200))
+        checksum = crc.CRC16()
+
+        self.assertEqual(checksum.value, crc.CRC16_INIT)
+
+        for start in range(0, len(frame), 7):
+            checksum.update(frame[start:start + 7])
+
+        self.assertEqual(checksum.value, self._crc16_bitwise(frame))
+        self.assertEqual(checksum.digest(), crc.calculate(frame))
+        self.assertFalse(checksum.is_valid)
+
+        checksum.update(checksum.digest())
+        self.assertTrue(checksum.is_valid)
+
+        checksum.reset()
+        checksum.update(b'\xFF\x11\x03\x00\x6B', start=1)
+        checksum.update(b'\x00\x03\x76\x87\xFF', end=4)
+        self.assertTrue(checksum.is_valid)
+
+
+if __name__ == '__main__':
+    unittest.main()
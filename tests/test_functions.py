@@ -2,6 +2,7 @@
 # -*- coding: UTF-8 -*-
 """Unittest for testing functions of umodbus"""
 
+from array import array
 import ulogging as logging
 import mpy_unittest as unittest
 from umodbus import functions
@@ -390,6 +391,57 @@ class TestFunctions(unittest.TestCase):
         self.assertEqual(len(result), 2)
         self.assertEqual(result, b'\x81\x02')
 
+    def test_get_request_pdu_length(self) -> None:
+        """Test prediction of the request PDU length"""
+        possibilities = [
+            # data, offset, expectation
+            (b'', 0, 1),
+            (b'\x0A', 1, 1),
+            (functions.read_coils(starting_address=19, quantity=11), 0, 5),
+            (b'\x0A' + functions.read_holding_registers(
+                starting_address=107, quantity=3), 1, 5),
+            (b'\x0A\x06\x00', 1, 5),
+            (b'\x0A\x10\x00\x00', 1, 6),
+            (b'\x0A' + functions.write_multiple_registers(
+                starting_address=1, register_values=[2, 3, 4]), 1, 12),
+            (functions.write_multiple_coils(
+                starting_address=19, value_list=[1, 0, 1] * 4), 0, 8),
+            (b'\x0A\x2B\x0E\x01\x00', 1, None),
+        ]
+        for pair in possibilities:
+            with self.subTest(pair=pair):
+                data = pair[0]
+                offset = pair[1]
+                expectation = pair[2]
+
+                result = functions.get_request_pdu_length(data=data,
+                                                          offset=offset)
+                self.assertEqual(result, expectation)
+
+    def test_get_response_pdu_length(self) -> None:
+        """Test prediction of the response PDU length"""
+        possibilities = [
+            # data, offset, expectation
+            (b'', 0, 1),
+            (b'\x0A', 1, 1),
+            (b'\x01', 0, 2),
+            (b'\x0A\x01\x02\xCD\x6B', 1, 4),
+            (b'\x03\x06\x00\x13\x04\xD2\x00\x00', 0, 8),
+            (b'\x0A\x05\x00\x7B\xFF\x00', 1, 5),
+            (b'\x10\x00\x01\x00\x03', 0, 5),
+            (b'\x0A\x83\x02', 1, 2),
+            (b'\x0A\x2B\x0E\x01\x00', 1, None),
+        ]
+        for pair in possibilities:
+            with self.subTest(pair=pair):
+                data = pair[0]
+                offset = pair[1]
+                expectation = pair[2]
+
+                result = functions.get_response_pdu_length(data=data,
+                                                           offset=offset)
+                self.assertEqual(result, expectation)
+
     def test_bytes_to_bool(self) -> None:
         """Convert bytes list to boolean list"""
         possibilities = [
@@ -464,6 +516,58 @@ class TestFunctions(unittest.TestCase):
                 self.assertTrue(all(isinstance(x, int) for x in result))
                 self.assertEqual(result, expectation)
 
+    def test_bytes_to_bool_into(self) -> None:
+        """Test conversion of bytes into a buffer of bits"""
+        possibilities = [
+            # response, bit quantity
+            (b'\x01', 1),
+            (b'\x05', 3),
+            (b'\xcd\x01', 9),
+            (b'\xcd\x6b\x05', 19),
+            (b'\xac\xdb\xfb\x0d', 28),
+        ]
+        for byte_list, bit_qty in possibilities:
+            with self.subTest(byte_list=byte_list):
+                out = bytearray(bit_qty + 1)
+                result = functions.bytes_to_bool_into(byte_list=byte_list,
+                                                      bit_qty=bit_qty,
+                                                      out=out,
+                                                      offset=1)
+                self.assertEqual(result, bit_qty)
+                self.assertEqual(out[0], 0)
+                self.assertEqual(
+                    [bool(x) for x in out[1:]],
+                    functions.bytes_to_bool(byte_list=byte_list,
+                                            bit_qty=bit_qty))
+
+    def test_to_short_into(self) -> None:
+        """Test conversion of bytes into buffers of integer values"""
+        byte_array = b'\x09\x29\xff\xfe\x80\x00'
+
+        for signed in [True, False]:
+            with self.subTest(signed=signed):
+                out = array('h' if signed else 'H', [0] * 4)
+                result = functions.to_short_into(byte_array=byte_array,
+                                                 out=out,
+                                                 offset=1,
+                                                 signed=signed)
+                self.assertEqual(result, 3)
+                self.assertEqual(tuple(out[1:]),
+                                 functions.to_short(byte_array=byte_array,
+                                                    signed=signed))
+
+                out = array('h' if signed else 'H', [0] * 3)
+                functions.to_short_into(byte_array=byte_array,
+                                        out=out,
+                                        byteswap=True)
+                self.assertEqual(tuple(out),
+                                 functions.to_short(byte_array=byte_array,
+                                                    signed=signed))
+
+        out = bytearray(8)
+        functions.to_short_into(byte_array=byte_array, out=out, offset=1)
+        self.assertEqual(out, b'\x00\x00' + byte_array)
+
     def test_float_to_bin(self) -> None:
         """Test conversion of float to bin according to IEEE 754"""
         float_val = 10.27
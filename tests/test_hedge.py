@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the hedged reads of umodbus"""
+
+import socket
+import struct
+import time
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus.hedge import HedgedClient
+from umodbus.tcp import TCP
+
+try:
+    import _thread
+    HAS_THREAD = True
+except ImportError:
+    HAS_THREAD = False
+
+
+class FakeServer(object):
+    """Server answering reads with its value after a delay per request"""
+    def __init__(self, value: int) -> None:
+        self.value = value
+        self.delays = []
+        self.requests = []
+
+        self._server = socket.socket()
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen(1)
+        self.port = self._server.getsockname()[1]
+
+        _thread.start_new_thread(self._serve, ())
+
+    def _serve(self) -> None:
+        conn, _ = self._server.accept()
+
+        while True:
+            header = conn.recv(7)
+            if len(header) < 7:
+                break
+            pdu = conn.recv(struct.unpack_from('>H', header, 4)[0] - 1)
+            self.requests.append(pdu[0])
+
+            if len(self.delays):
+                time.sleep(self.delays.pop(0))
+
+            if pdu[0] == 3:
+                data = struct.pack('>BBH', 3, 2, self.value)
+            else:
+                data = pdu
+            conn.send(header[:4] + struct.pack('>HB', len(data) + 1,
+                                               header[6]) + data)
+
+        conn.close()
+        self._server.close()
+
+
+class TestHedge(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+    def _connect(self, timeout: float = 2.0) -> None:
+        """Start a primary and a secondary server and connect to them"""
+        self._servers = [FakeServer(value=1), FakeServer(value=2)]
+        self._endpoints = [TCP(slave_ip='127.0.0.1',
+                               slave_port=server.port,
+                               timeout=timeout) for server in self._servers]
+        self._client = HedgedClient(endpoints=self._endpoints, delay_ms=30)
+
+    def _close(self) -> None:
+        """Close the connections to the servers"""
+        for endpoint in self._endpoints:
+            endpoint._sock.close()
+
+    def _read(self) -> tuple:
+        """Read a single holding register from the first server"""
+        return self._client.read_holding_registers(slave_addr=10,
+                                                   starting_addr=0,
+                                                   register_qty=1)
+
+    def test_delay(self) -> None:
+        """Test the delay is the percentile of the latest response times"""
+        with self.assertRaises(ValueError):
+            HedgedClient(endpoints=[None])
+
+        client = HedgedClient(endpoints=[None, None],
+                              delay_ms=50,
+                              min_delay_ms=2,
+                              max_delay_ms=100,
+                              samples=20)
+        self.assertEqual(client.delay, 50)
+
+        for rtt in range(1, 21):
+            client._record_rtt(rtt=rtt * 1000)
+        self.assertEqual(client.delay, 20)
+
+        for _ in range(19):
+            client._record_rtt(rtt=500)
+        self.assertEqual(client.delay, 20)
+        client._record_rtt(rtt=500)
+        self.assertEqual(client.delay, 2)
+
+        for _ in range(20):
+            client._record_rtt(rtt=500000)
+        self.assertEqual(client.delay, 100)
+
+    @unittest.skipUnless(HAS_THREAD, 'Threads not available')
+    def test_fast_primary(self) -> None:
+        """Test reads are not hedged if the primary answers in time"""
+        self._connect()
+
+        for _ in range(3):
+            self.assertEqual(self._read(), (1, ))
+        self.assertEqual(self._servers[1].requests, [])
+        self.assertEqual(self._client.statistics['hedged'], 0)
+
+        # writes are sent to the primary only
+        self.assertTrue(self._client.write_single_register(
+            slave_addr=10,
+            register_address=0,
+            register_value=5))
+        self.assertEqual(self._servers[0].requests, [3, 3, 3, 6])
+        self.assertEqual(self._servers[1].requests, [])
+        self._close()
+
+    @unittest.skipUnless(HAS_THREAD, 'Threads not available')
+    def test_hedged_read(self) -> None:
+        """Test slow reads are answered by the secondary"""
+        self._connect()
+        self._servers[0].delays = [0.2]
+
+        self.assertEqual(self._read(), (2, ))
+        self.assertEqual(self._client.statistics,
+                         {'requests': 1,
+                          'hedged': 1,
+                          'secondary_wins': 1,
+                          'delay': 30})
+
+        # the late response of the primary is discarded
+        time.sleep(0.3)
+        self.assertEqual(self._read(), (1, ))
+        self.assertEqual(self._client.statistics['hedged'], 1)
+        self.assertEqual(self._servers[0].requests, [3, 3])
+        self.assertEqual(self._servers[1].requests, [3])
+        self._close()
+
+    @unittest.skipUnless(HAS_THREAD, 'Threads not available')
+    def test_blocking_primary(self) -> None:
+        """Test reads of blocking hosts are hedged without a deadline"""
+        self._connect(timeout=None)
+        self._servers[0].delays = [0.2]
+        self._servers[1].delays = [0.1]
+
+        self.assertEqual(self._read(), (2, ))
+        self.assertEqual(self._client.statistics['hedged'], 1)
+
+        time.sleep(0.2)
+        self.assertEqual(self._read(), (1, ))
+        self._close()
+
+    @unittest.skipUnless(HAS_THREAD, 'Threads not available')
+    def test_primary_down(self) -> None:
+        """Test reads are sent to the secondary at once if the primary
+        connection failed"""
+        self._connect()
+        self._endpoints[0]._sock.close()
+
+        start = time.time()
+        self.assertEqual(self._read(), (2, ))
+        self.assertTrue(time.time() - start < 0.03)
+        self._endpoints[1]._sock.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the RTU bus monitor of umodbus with a pseudo-terminal"""
+
+import os
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus import crc
+
+try:
+    import pty
+    from umodbus.monitor import SerialMonitor
+    HAS_PTY = True
+except ImportError:
+    # neither pty nor termios is available on MicroPython
+    HAS_PTY = False
+
+
+class TestMonitor(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+        # the monitor listens on the pseudo-terminal, the test writes the
+        # traffic of the bus to the controlling side
+        if HAS_PTY:
+            self._bus_fd, self._tty_fd = pty.openpty()
+            self._monitor = SerialMonitor(uart_id=os.ttyname(self._tty_fd),
+                                          baudrate=115200,
+                                          buffer_size=512)
+
+    def _write(self, *frames: bytes) -> None:
+        """Write frames with CRC to the bus without a gap between them"""
+        os.write(self._bus_fd, b''.join(f + crc.calculate(f) for f in frames))
+
+    @unittest.skipUnless(HAS_PTY, 'Pseudo-terminals not available')
+    def test_request_response(self) -> None:
+        """Test splitting and pairing of frames without gap"""
+        self._write(b'\x0A\x03\x00\x5D\x00\x02',
+                    b'\x0A\x03\x04\x00\x13\xFF\xFE',
+                    b'\x0B\x0F\x00\x40\x00\x0A\x02\x05\x01',
+                    b'\x0B\x0F\x00\x40\x00\x0A')
+
+        request = self._monitor.read_record(timeout=100000)
+        self.assertEqual(request['type'], 'REQUEST')
+        self.assertEqual(request['slave_addr'], 10)
+        self.assertEqual(request['function'], 3)
+        self.assertEqual(request['address'], 93)
+        self.assertEqual(request['quantity'], 2)
+        self.assertEqual(len(request['frame']), 8)
+
+        response = self._monitor.read_record(timeout=100000)
+        self.assertEqual(response['type'], 'RESPONSE')
+        self.assertEqual(response['values'], (19, 65534))
+        self.assertEqual(response['address'], 93)
+        self.assertIs(response['request'], request)
+        self.assertTrue(response['timestamp'] > request['timestamp'])
+
+        request = self._monitor.read_record(timeout=100000)
+        self.assertEqual(request['type'], 'REQUEST')
+        self.assertEqual(request['quantity'], 10)
+        self.assertEqual(len(request['values']), 10)
+
+        response = self._monitor.read_record(timeout=100000)
+        self.assertEqual(response['type'], 'RESPONSE')
+        self.assertEqual(response['address'], 64)
+        self.assertEqual(response['quantity'], 10)
+        self.assertIs(response['request'], request)
+
+        self.assertIsNone(self._monitor.read_record(timeout=10000))
+        self.assertEqual(self._monitor.statistics['frames'], 4)
+
+    @unittest.skipUnless(HAS_PTY, 'Pseudo-terminals not available')
+    def test_exception_and_broadcast(self) -> None:
+        """Test exception responses and unanswered broadcasts"""
+        self._write(b'\x05\x01\x00\x00\x09\x00',
+                    b'\x05\x81\x03',
+                    b'\x00\x06\x00\x01\x00\x2A')
+
+        request = self._monitor.read_record(timeout=100000)
+        self.assertEqual(request['type'], 'REQUEST')
+        self.assertEqual(request['error'], 3)
+
+        response = self._monitor.read_record(timeout=100000)
+        self.assertEqual(response['type'], 'EXCEPTION')
+        self.assertEqual(response['error'], 3)
+        self.assertIs(response['request'], request)
+
+        broadcast = self._monitor.read_record(timeout=100000)
+        self.assertEqual(broadcast['type'], 'REQUEST')
+        self.assertEqual(broadcast['slave_addr'], 0)
+        self.assertEqual(broadcast['values'], (42, ))
+        self.assertIsNone(self._monitor._pending_request)
+
+    @unittest.skipUnless(HAS_PTY, 'Pseudo-terminals not available')
+    def test_invalid(self) -> None:
+        """Test frames with invalid CRC are ended by the inter-frame delay"""
+        os.write(self._bus_fd, b'\x0A\x03\x00\x5D\x00\x02\x00\x00')
+
+        records = []
+        self._monitor.run(callback=records.append, duration_ms=50)
+
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['type'], 'INVALID')
+        self.assertEqual(records[0]['frame'],
+                         b'\x0A\x03\x00\x5D\x00\x02\x00\x00')
+        self.assertEqual(self._monitor.statistics['invalid'], 1)
+
+        # the monitor never transmits
+        with self.assertRaises(OSError):
+            self._monitor.write_single_coil(slave_addr=10,
+                                            output_address=1,
+                                            output_value=1)
+
+    @unittest.skipUnless(HAS_PTY, 'Pseudo-terminals not available')
+    def test_ring_buffer(self) -> None:
+        """Test frames wrapping around the end of the ring buffer"""
+        request = b'\x0A\x04\x00\x0A\x00\x01'
+        response = b'\x0A\x04\x02\xEA\x61'
+
+        for _ in range(40):
+            self._write(request, response)
+
+            self.assertEqual(self._monitor.read_record(timeout=100000)['type'],
+                             'REQUEST')
+            record = self._monitor.read_record(timeout=100000)
+            self.assertEqual(record['type'], 'RESPONSE')
+            self.assertEqual(record['values'], (60001, ))
+
+        self.assertEqual(self._monitor.statistics['invalid'], 0)
+
+    def tearDown(self) -> None:
+        """Run after every test method"""
+        if HAS_PTY:
+            self._monitor._uart.deinit()
+            os.close(self._bus_fd)
+            os.close(self._tty_fd)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the read planner of umodbus"""
+
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus.planner import ReadPlanner
+
+
+class FakeHost(object):
+    """Serial host returning the address as register value"""
+    def __init__(self) -> None:
+        self._t1char = 1145
+        self._inter_frame_delay = 4007
+        self.requests = []
+
+    def read_coils(self, slave_addr, starting_addr, coil_qty):
+        self.requests.append(('COILS', starting_addr, coil_qty))
+        return [(starting_addr + idx) % 3 == 0 for idx in range(coil_qty)]
+
+    def read_holding_registers(self, slave_addr, starting_addr, register_qty,
+                               signed=True):
+        self.requests.append(('HREGS', starting_addr, register_qty))
+        return tuple(range(starting_addr, starting_addr + register_qty))
+
+    def read_input_registers(self, slave_addr, starting_addr, register_qty,
+                             signed=True):
+        self.requests.append(('IREGS', starting_addr, register_qty))
+        return tuple(range(starting_addr, starting_addr + register_qty))
+
+
+class TestPlanner(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+        self._host = FakeHost()
+
+    def test_gap_cost(self) -> None:
+        """Test gaps are read if cheaper than another request"""
+        planner = ReadPlanner(host=self._host)
+
+        # 13 characters and two inter-frame delays, gaps up to 9 registers
+        self.assertEqual(planner.rtt, 13 * 1145 + 2 * 4007)
+
+        requests = planner.plan(items=[('HREGS', 100, 2),
+                                       ('HREGS', 112, 1),
+                                       ('HREGS', 124, 2),
+                                       ('HREGS', 90, 4)])
+        self.assertEqual([(r['address'], r['quantity']) for r in requests],
+                         [(90, 12), (112, 1), (124, 2)])
+
+        # without serial link all gaps are cheaper than a request
+        self._host._t1char = 0
+        planner = ReadPlanner(host=self._host)
+        requests = planner.plan(items=[('HREGS', 100, 2),
+                                       ('HREGS', 112, 1),
+                                       ('HREGS', 124, 2),
+                                       ('HREGS', 90, 4)])
+        self.assertEqual([(r['address'], r['quantity']) for r in requests],
+                         [(90, 36)])
+
+        # a byte time limits the gaps read via a network link
+        planner = ReadPlanner(host=self._host, byte_time=240)
+        self.assertEqual(planner.rtt, 5000)
+        requests = planner.plan(items=[('HREGS', 100, 2),
+                                       ('HREGS', 112, 1),
+                                       ('HREGS', 124, 2),
+                                       ('HREGS', 90, 4)])
+        self.assertEqual([(r['address'], r['quantity']) for r in requests],
+                         [(90, 23), (124, 2)])
+
+        planner = ReadPlanner(host=self._host, max_gap=5)
+        requests = planner.plan(items=[('HREGS', 100, 2),
+                                       ('HREGS', 106, 1),
+                                       ('HREGS', 113, 1)])
+        self.assertEqual([(r['address'], r['quantity']) for r in requests],
+                         [(100, 7), (113, 1)])
+
+    def test_limits(self) -> None:
+        """Test requests do not exceed the maximum quantity"""
+        self._host._t1char = 0
+        planner = ReadPlanner(host=self._host)
+
+        requests = planner.plan(items=[('HREGS', 0, 100),
+                                       ('HREGS', 120, 10),
+                                       ('IREGS', 0, 300),
+                                       ('COILS', 0, 1500),
+                                       ('COILS', 1990, 20)])
+        self.assertEqual([(r['reg_type'], r['address'], r['quantity'])
+                          for r in requests],
+                         [('COILS', 0, 1500),
+                          ('COILS', 1990, 20),
+                          ('HREGS', 0, 100),
+                          ('HREGS', 120, 10),
+                          ('IREGS', 0, 125),
+                          ('IREGS', 125, 125),
+                          ('IREGS', 250, 50)])
+
+        with self.assertRaises(KeyError):
+            planner.plan(items=[('FOO', 0, 1)])
+
+    def test_read(self) -> None:
+        """Test the read values are scattered to the items"""
+        planner = ReadPlanner(host=self._host)
+
+        items = [('HREGS', 110, 2),
+                 ('COILS', 4, 3),
+                 ('HREGS', 100, 1),
+                 ('HREGS', 101, 3),
+                 ('IREGS', 10, 200),
+                 ('COILS', 0, 2),
+                 ('HREGS', 400, 1)]
+        results = planner.read(slave_addr=10, items=items)
+
+        self.assertEqual(self._host.requests,
+                         [('COILS', 0, 7),
+                          ('HREGS', 100, 12),
+                          ('HREGS', 400, 1),
+                          ('IREGS', 10, 125),
+                          ('IREGS', 135, 75)])
+
+        self.assertEqual(results[0], (110, 111))
+        self.assertEqual(results[1], [False, False, True])
+        self.assertEqual(results[2], (100, ))
+        self.assertEqual(results[3], (101, 102, 103))
+        self.assertEqual(results[4], tuple(range(10, 210)))
+        self.assertEqual(results[5], [True, False])
+        self.assertEqual(results[6], (400, ))
+
+
+if __name__ == '__main__':
+    unittest.main()
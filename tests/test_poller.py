@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the polling engine of umodbus"""
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus.asynchronous.poller import AsyncPoller
+from umodbus.poller import Poller
+from umodbus.ticks import ticks_add
+
+
+class FakeHost(object):
+    """Host returning the address as register value"""
+    def __init__(self, offline: list = []) -> None:
+        self.offline = offline
+        self.requests = []
+
+    def read_holding_registers(self, slave_addr, starting_addr, register_qty,
+                               signed=True):
+        self.requests.append((slave_addr, starting_addr, register_qty))
+        if slave_addr in self.offline:
+            raise OSError('no response')
+        return tuple(range(starting_addr, starting_addr + register_qty))
+
+    def read_coils(self, slave_addr, starting_addr, coil_qty):
+        self.requests.append((slave_addr, starting_addr, coil_qty))
+        return [True] * coil_qty
+
+
+class AsyncFakeHost(FakeHost):
+    """Asynchronous host returning the address as register value"""
+    async def read_holding_registers(self, slave_addr, starting_addr,
+                                     register_qty, signed=True):
+        return super().read_holding_registers(slave_addr,
+                                              starting_addr,
+                                              register_qty,
+                                              signed)
+
+
+class TestPoller(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+        self._host = FakeHost(offline=[11])
+        self._values = []
+
+    def _callback(self, slave_addr: int, values: list) -> None:
+        """Store the polled values"""
+        self._values.append((slave_addr, values))
+
+    def test_combined_groups(self) -> None:
+        """Test groups due together are read with shared requests"""
+        poller = Poller(host=self._host)
+        fast = poller.add_group(slave_addr=10,
+                                items=[('HREGS', 0, 2)],
+                                period_ms=100,
+                                callback=self._callback)
+        poller.add_group(slave_addr=10,
+                         items=[('HREGS', 4, 2), ('COILS', 8, 3)],
+                         period_ms=1000,
+                         callback=self._callback)
+        start = poller._last_ticks
+
+        self.assertEqual(poller.poll(now=start), 2)
+        self.assertEqual(self._host.requests, [(10, 8, 3), (10, 0, 6)])
+        self.assertEqual(self._values,
+                         [(10, [[0, 1]]), (10, [[4, 5], [True] * 3])])
+
+        self._host.requests = []
+        self.assertEqual(poller.poll(now=ticks_add(start, 99)), 0)
+        self.assertEqual(poller.time_to_next_poll(), 1)
+        self.assertEqual(poller.poll(now=ticks_add(start, 100)), 1)
+        self.assertEqual(self._host.requests, [(10, 0, 2)])
+        self.assertEqual(fast['values'], [[0, 1]])
+
+        # the combination of both groups is planned only once
+        self._host.requests = []
+        for period in range(2, 11):
+            poller.poll(now=ticks_add(start, 100 * period))
+        self.assertEqual(self._host.requests[-2:], [(10, 8, 3), (10, 0, 6)])
+        self.assertEqual(len(poller._plans), 2)
+
+        statistics = poller.statistics
+        self.assertEqual(statistics['groups'][0]['polls'], 11)
+        self.assertEqual(statistics['groups'][1]['polls'], 2)
+        self.assertEqual(statistics['groups'][0]['overruns'], 0)
+        self.assertEqual(statistics['requests'], 13)
+
+    def test_overruns(self) -> None:
+        """Test late polls are recorded as lateness and overruns"""
+        poller = Poller(host=self._host)
+        group = poller.add_group(slave_addr=10,
+                                 items=[('HREGS', 0, 1)],
+                                 period_ms=100)
+        start = poller._last_ticks
+
+        poller.poll(now=start)
+        poller.poll(now=ticks_add(start, 350))
+
+        # deadlines 200 and 300 are missed, the phase is kept
+        self.assertEqual(group['overruns'], 2)
+        self.assertEqual(group['deadline'], ticks_add(start, 400))
+        self.assertEqual(poller.statistics['groups'][0]['max_lateness'], 250)
+        self.assertEqual(poller.time_to_next_poll(), 50)
+
+    def test_merge_window(self) -> None:
+        """Test groups due soon are polled together with due groups"""
+        poller = Poller(host=self._host, merge_window_ms=20)
+        poller.add_group(slave_addr=10, items=[('HREGS', 0, 2)],
+                         period_ms=100)
+        poller.add_group(slave_addr=10, items=[('HREGS', 2, 2)],
+                         period_ms=110)
+        poller.add_group(slave_addr=12, items=[('HREGS', 0, 2)],
+                         period_ms=110)
+        start = poller._last_ticks
+
+        poller.poll(now=start)
+        self._host.requests = []
+
+        # the group of slave 10 due at 110 is read with the one due at 100
+        self.assertEqual(poller.poll(now=ticks_add(start, 100)), 2)
+        self.assertEqual(self._host.requests, [(10, 0, 4)])
+        self.assertEqual(poller.time_to_next_poll(), 10)
+
+    def test_error(self) -> None:
+        """Test failed polls are recorded without calling the callback"""
+        poller = Poller(host=self._host)
+        group = poller.add_group(slave_addr=11,
+                                 items=[('HREGS', 0, 2)],
+                                 period_ms=100,
+                                 callback=self._callback)
+        poller.poll(now=poller._last_ticks)
+
+        self.assertIsInstance(group['error'], OSError)
+        self.assertEqual(group['errors'], 1)
+        self.assertEqual(self._values, [])
+
+        with self.assertRaises(KeyError):
+            poller.add_group(slave_addr=11,
+                             items=[('REGS', 0, 2)],
+                             period_ms=100)
+
+    def test_backoff(self) -> None:
+        """Test offline devices are only probed after the backoff time"""
+        poller = Poller(host=self._host, backoff_ms=100, max_failures=2)
+        poller.add_group(slave_addr=10, items=[('HREGS', 0, 1)],
+                         period_ms=10)
+        group = poller.add_group(slave_addr=11, items=[('HREGS', 0, 1)],
+                                 period_ms=10)
+        start = poller._last_ticks
+
+        for period in range(0, 12):
+            poller.poll(now=ticks_add(start, 10 * period))
+
+        # offline after the second failure, probed 100 ms later
+        self.assertEqual(poller.slave_state(slave_addr=11), 'OFFLINE')
+        self.assertEqual(poller.slave_state(slave_addr=10), 'ONLINE')
+        self.assertEqual(self._host.requests.count((11, 0, 1)), 3)
+        self.assertEqual(self._host.requests.count((10, 0, 1)), 12)
+        self.assertEqual(group['errors'], 3)
+
+        device = poller.statistics['groups'][1]['device']
+        self.assertEqual(device['backoff'], 200)
+        self.assertEqual(device['timeouts'], 3)
+
+    def test_scan(self) -> None:
+        """Test scans of the bus scheduler interface"""
+        values = []
+
+        def callback(slave_addr, reg_type, address, new_values):
+            values.append((slave_addr, reg_type, address, new_values))
+
+        poller = Poller(host=self._host)
+        poller.add_scan(10, 'HREGS', 4, 2, interval_ms=100,
+                        callback=callback)
+        poller.poll(now=poller._last_ticks)
+
+        self.assertEqual(values, [(10, 'HREGS', 4, [4, 5])])
+
+    def test_async(self) -> None:
+        """Test polling with asynchronous hosts"""
+        host = AsyncFakeHost(offline=[11])
+        poller = AsyncPoller(host=host)
+        poller.add_group(slave_addr=10,
+                         items=[('HREGS', 0, 2)],
+                         period_ms=100,
+                         callback=self._callback)
+        group = poller.add_group(slave_addr=11,
+                                 items=[('HREGS', 0, 2)],
+                                 period_ms=100,
+                                 callback=self._callback)
+
+        polled = asyncio.run(poller.poll(now=poller._last_ticks))
+
+        self.assertEqual(polled, 2)
+        self.assertEqual(host.requests, [(10, 0, 2), (11, 0, 2)])
+        self.assertEqual(self._values, [(10, [[0, 1]])])
+        self.assertEqual(group['errors'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
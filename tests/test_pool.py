@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the TCP connection pool of umodbus"""
+
+import socket
+import struct
+import time
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus.pool import ConnectionPool
+
+try:
+    import _thread
+    HAS_THREAD = True
+except ImportError:
+    HAS_THREAD = False
+
+
+class FakeServer(object):
+    """Server answering reads on any number of connections"""
+    def __init__(self, close_after: int = 0, delay: float = 0) -> None:
+        self.connections = 0
+        self.close_after = close_after
+        self.delay = delay
+
+        self._server = socket.socket()
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen(4)
+        self.port = self._server.getsockname()[1]
+
+        _thread.start_new_thread(self._accept, ())
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                break
+            self.connections += 1
+            _thread.start_new_thread(self._serve, (conn, ))
+
+    def _serve(self, conn: socket.socket) -> None:
+        requests = 0
+
+        while True:
+            header = conn.recv(7)
+            if len(header) < 7:
+                break
+            conn.recv(struct.unpack_from('>H', header, 4)[0] - 1)
+            time.sleep(self.delay)
+
+            data = struct.pack('>BBH', 3, 2, self.connections)
+            conn.send(header[:4] + struct.pack('>HB', len(data) + 1,
+                                               header[6]) + data)
+
+            requests += 1
+            if requests == self.close_after:
+                break
+
+        conn.close()
+
+    def close(self) -> None:
+        self._server.close()
+
+
+class TestPool(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+    def _read(self, client) -> tuple:
+        """Read a single holding register"""
+        return client.read_holding_registers(slave_addr=10,
+                                             starting_addr=0,
+                                             register_qty=1)
+
+    @unittest.skipUnless(HAS_THREAD, 'Threads not available')
+    def test_lazy_reuse(self) -> None:
+        """Test clients connect on their first request and share it"""
+        server = FakeServer()
+        pool = ConnectionPool(max_connections=1, timeout=2.0)
+        first = pool.client(slave_ip='127.0.0.1', slave_port=server.port)
+        second = pool.client(slave_ip='127.0.0.1', slave_port=server.port)
+
+        time.sleep(0.05)
+        self.assertEqual(server.connections, 0)
+
+        self.assertEqual(self._read(first), (1, ))
+        self.assertEqual(self._read(second), (1, ))
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(pool.statistics[('127.0.0.1', server.port)],
+                         {'open': 1,
+                          'idle': 1,
+                          'waiting': 0,
+                          'connects': 1,
+                          'failures': 0,
+                          'closed': 0,
+                          'evicted': 0})
+
+        pool.close()
+        server.close()
+
+    @unittest.skipUnless(HAS_THREAD, 'Threads not available')
+    def test_limit(self) -> None:
+        """Test concurrent requests wait for the connection in use"""
+        server = FakeServer(delay=0.05)
+        pool = ConnectionPool(max_connections=1, timeout=2.0)
+        client = pool.client(slave_ip='127.0.0.1', slave_port=server.port)
+        results = []
+
+        def read() -> None:
+            results.append(self._read(client))
+
+        for _ in range(3):
+            _thread.start_new_thread(read, ())
+
+        for _ in range(200):
+            if len(results) == 3:
+                break
+            time.sleep(0.01)
+
+        self.assertEqual(results, [(1, )] * 3)
+        self.assertEqual(server.connections, 1)
+
+        pool.close()
+        server.close()
+
+    @unittest.skipUnless(HAS_THREAD, 'Threads not available')
+    def test_health_check(self) -> None:
+        """Test connections closed by the server are replaced"""
+        server = FakeServer(close_after=1)
+        pool = ConnectionPool(timeout=2.0)
+        client = pool.client(slave_ip='127.0.0.1', slave_port=server.port)
+
+        self.assertEqual(self._read(client), (1, ))
+        time.sleep(0.05)
+        self.assertEqual(self._read(client), (2, ))
+
+        statistics = pool.statistics[('127.0.0.1', server.port)]
+        self.assertEqual(statistics['connects'], 2)
+        self.assertEqual(statistics['closed'], 1)
+        self.assertEqual(statistics['open'], 1)
+
+        pool.close()
+        server.close()
+
+    @unittest.skipUnless(HAS_THREAD, 'Threads not available')
+    def test_idle_eviction(self) -> None:
+        """Test connections idle for too long are closed"""
+        server = FakeServer()
+        pool = ConnectionPool(timeout=2.0, idle_timeout_ms=20)
+        client = pool.client(slave_ip='127.0.0.1', slave_port=server.port)
+
+        self._read(client)
+        self.assertEqual(pool.evict_idle(), 0)
+        time.sleep(0.03)
+        self.assertEqual(pool.evict_idle(), 1)
+
+        self.assertEqual(self._read(client), (2, ))
+        statistics = pool.statistics[('127.0.0.1', server.port)]
+        self.assertEqual(statistics['evicted'], 1)
+        self.assertEqual(statistics['open'], 1)
+
+        pool.close()
+        server.close()
+
+    def test_backoff(self) -> None:
+        """Test reconnects to a failed server are delayed"""
+        # find a port without a server
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+
+        pool = ConnectionPool(backoff_ms=30, max_backoff_ms=50)
+        client = pool.client(slave_ip='127.0.0.1', slave_port=port)
+
+        with self.assertRaises(OSError):
+            self._read(client)
+        with self.assertRaises(OSError):
+            self._read(client)
+        self.assertEqual(pool.statistics[('127.0.0.1', port)]['failures'], 1)
+
+        time.sleep(0.04)
+        with self.assertRaises(OSError):
+            self._read(client)
+        statistics = pool.statistics[('127.0.0.1', port)]
+        self.assertEqual(statistics['failures'], 2)
+        self.assertEqual(statistics['open'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
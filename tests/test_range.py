@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the range functions of umodbus"""
+
+from array import array
+import socket
+import struct
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus import const as Const
+from umodbus import functions
+from umodbus.common import CommonModbusFunctions
+from umodbus.tcp import TCP
+
+try:
+    import _thread
+    HAS_THREAD = True
+except ImportError:
+    HAS_THREAD = False
+
+
+class FakeClient(CommonModbusFunctions):
+    """Client answering with the address as register value"""
+    def __init__(self) -> None:
+        self.requests = []
+
+    def _send_receive(self, slave_addr, modbus_pdu, count):
+        function_code, address, quantity = struct.unpack_from('>BHH',
+                                                              modbus_pdu)
+        self.requests.append((function_code, address, quantity))
+
+        if slave_addr == Const.BROADCAST_ADDR:
+            # broadcasts are not answered
+            return None
+        elif function_code in [Const.READ_COILS, Const.READ_DISCRETE_INPUTS]:
+            values = [int((address + idx) % 3 == 0)
+                      for idx in range(quantity)]
+            return functions.response(function_code=function_code,
+                                      request_register_addr=address,
+                                      request_register_qty=quantity,
+                                      request_data=[],
+                                      value_list=values)[2:]
+        elif function_code in [Const.READ_HOLDING_REGISTERS,
+                               Const.READ_INPUT_REGISTER]:
+            return struct.pack('>' + 'H' * quantity,
+                               *range(address, address + quantity))
+
+        return modbus_pdu[1:5]
+
+
+class TestRange(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+        self._client = FakeClient()
+
+    def test_split_range(self) -> None:
+        """Test splitting ranges into protocol sized chunks"""
+        self.assertEqual(functions.split_range(starting_address=10,
+                                               quantity=300,
+                                               max_quantity=125),
+                         [(10, 125), (135, 125), (260, 50)])
+        self.assertEqual(functions.split_range(starting_address=0,
+                                               quantity=125,
+                                               max_quantity=125),
+                         [(0, 125)])
+        self.assertEqual(functions.split_range(starting_address=0,
+                                               quantity=0,
+                                               max_quantity=125),
+                         [])
+
+    def test_read_registers_range(self) -> None:
+        """Test reading more registers than fit into one request"""
+        values = self._client.read_holding_registers_range(slave_addr=10,
+                                                           starting_addr=100,
+                                                           register_qty=300,
+                                                           signed=False)
+
+        self.assertEqual(self._client.requests,
+                         [(3, 100, 125), (3, 225, 125), (3, 350, 50)])
+        self.assertEqual(len(values), 300)
+        self.assertEqual(list(values), list(range(100, 400)))
+
+        self._client.requests = []
+        values = self._client.read_input_registers_range(slave_addr=10,
+                                                         starting_addr=32767,
+                                                         register_qty=2)
+        self.assertEqual(self._client.requests, [(4, 32767, 2)])
+        self.assertEqual(list(values), [32767, -32768])
+
+    def test_read_bits_range(self) -> None:
+        """Test reading more coils than fit into one request"""
+        values = self._client.read_coils_range(slave_addr=10,
+                                               starting_addr=5,
+                                               coil_qty=4001)
+
+        self.assertEqual(self._client.requests,
+                         [(1, 5, 2000), (1, 2005, 2000), (1, 4005, 1)])
+        self.assertEqual(list(values),
+                         [int((5 + idx) % 3 == 0) for idx in range(4001)])
+
+    def test_write_range(self) -> None:
+        """Test writing more registers and coils than fit into one request"""
+        self.assertTrue(self._client.write_multiple_registers_range(
+            slave_addr=10,
+            starting_address=0,
+            register_values=list(range(250))))
+        self.assertEqual(self._client.requests,
+                         [(16, 0, 123), (16, 123, 123), (16, 246, 4)])
+
+        self._client.requests = []
+        self.assertTrue(self._client.write_multiple_coils_range(
+            slave_addr=10,
+            starting_address=1,
+            output_values=[1, 0] * 1000))
+        self.assertEqual(self._client.requests,
+                         [(15, 1, 1968), (15, 1969, 32)])
+
+    def test_write_range_broadcast(self) -> None:
+        """Test broadcast writes of ranges succeed without responses"""
+        self.assertTrue(self._client.write_multiple_registers_range(
+            slave_addr=Const.BROADCAST_ADDR,
+            starting_address=0,
+            register_values=list(range(130))))
+        self.assertEqual(self._client.requests, [(16, 0, 123), (16, 123, 7)])
+
+        self._client.requests = []
+        self.assertTrue(self._client.write_multiple_coils_range(
+            slave_addr=Const.BROADCAST_ADDR,
+            starting_address=0,
+            output_values=[1] * 2000))
+        self.assertEqual(self._client.requests,
+                         [(15, 0, 1968), (15, 1968, 32)])
+
+    def test_read_into(self) -> None:
+        """Test reading into caller provided buffers"""
+        out = array('h', [0] * 6)
+        self.assertEqual(self._client.read_holding_registers_into(
+            slave_addr=10,
+            starting_addr=65534,
+            register_qty=2,
+            out=out,
+            offset=1), 2)
+        self.assertEqual(list(out), [0, -2, -1, 0, 0, 0])
+
+        self._client.read_input_registers_into(slave_addr=10,
+                                               starting_addr=258,
+                                               register_qty=2,
+                                               out=out,
+                                               offset=3,
+                                               byteswap=True)
+        self.assertEqual(list(out), [0, -2, -1, 258, 259, 0])
+
+        raw = bytearray(4)
+        self._client.read_holding_registers_into(slave_addr=10,
+                                                 starting_addr=258,
+                                                 register_qty=2,
+                                                 out=raw)
+        self.assertEqual(raw, b'\x01\x02\x01\x03')
+
+        bits = bytearray(12)
+        self.assertEqual(self._client.read_coils_into(slave_addr=10,
+                                                      starting_addr=0,
+                                                      coil_qty=11,
+                                                      out=bits,
+                                                      offset=1), 11)
+        self.assertEqual(list(bits),
+                         [0, 1, 0, 0, 1, 0, 0, 1, 0, 0, 1, 0])
+
+    def _serve(self, server: socket.socket, requests: int) -> None:
+        """Answer a number of read requests in reverse order"""
+        conn, _ = server.accept()
+        received = []
+
+        for _ in range(requests):
+            header = conn.recv(7)
+            pdu = conn.recv(struct.unpack_from('>H', header, 4)[0] - 1)
+            received.append((header, pdu))
+
+        for header, pdu in reversed(received):
+            self._respond(conn, header, pdu)
+
+        conn.close()
+        server.close()
+
+    def _receive(self, conn: socket.socket) -> tuple:
+        """Receive the header and the PDU of a request"""
+        header = conn.recv(7)
+        pdu = conn.recv(struct.unpack_from('>H', header, 4)[0] - 1)
+        return header, pdu
+
+    def _respond(self, conn: socket.socket, header: bytes, pdu: bytes) -> None:
+        """Answer a read request with the addresses as register values"""
+        _, address, quantity = struct.unpack_from('>BHH', pdu)
+        data = struct.pack('>BB', pdu[0], 2 * quantity) + \
+            struct.pack('>' + 'H' * quantity,
+                        *range(address, address + quantity))
+        conn.send(struct.pack('>HHHB',
+                              struct.unpack_from('>H', header)[0],
+                              0,
+                              len(data) + 1,
+                              header[6]) + data)
+
+    def _serve_late(self, server: socket.socket) -> None:
+        """Answer requests after the host timed out"""
+        conn, _ = server.accept()
+
+        # answered after the next pipeline has been sent
+        late = self._receive(conn)
+        received = [self._receive(conn) for _ in range(3)]
+        self._respond(conn, *received[2])
+        self._respond(conn, *late)
+        self._respond(conn, *received[1])
+        self._respond(conn, *received[0])
+
+        # only the first response is sent before the host times out
+        received = [self._receive(conn) for _ in range(3)]
+        self._respond(conn, *received[0])
+        request = self._receive(conn)
+        self._respond(conn, *received[2])
+        self._respond(conn, *received[1])
+        self._respond(conn, *request)
+
+        conn.recv(1)
+        conn.close()
+        server.close()
+
+    @unittest.skipUnless(HAS_THREAD, 'Threads not available')
+    def test_tcp_pipelining(self) -> None:
+        """Test responses of pipelined requests are matched by ID"""
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen(1)
+        port = server.getsockname()[1]
+
+        _thread.start_new_thread(self._serve, (server, 3))
+
+        host = TCP(slave_ip='127.0.0.1',
+                   slave_port=port,
+                   timeout=5.0,
+                   max_outstanding=4)
+        values = host.read_holding_registers_range(slave_addr=10,
+                                                   starting_addr=0,
+                                                   register_qty=300)
+        host._sock.close()
+
+        self.assertEqual(list(values), list(range(300)))
+
+    @unittest.skipUnless(HAS_THREAD, 'Threads not available')
+    def test_tcp_pipelining_late_response(self) -> None:
+        """Test late responses inside a pipeline are discarded"""
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen(1)
+        port = server.getsockname()[1]
+
+        _thread.start_new_thread(self._serve_late, (server, ))
+
+        host = TCP(slave_ip='127.0.0.1',
+                   slave_port=port,
+                   timeout=0.3,
+                   max_outstanding=4)
+        try:
+            with self.assertRaises(OSError):
+                host.read_holding_registers(slave_addr=10,
+                                            starting_addr=500,
+                                            register_qty=1)
+
+            values = host.read_holding_registers_range(slave_addr=10,
+                                                       starting_addr=0,
+                                                       register_qty=300)
+            self.assertEqual(list(values), list(range(300)))
+
+            # the outstanding requests are discarded on a timeout
+            with self.assertRaises(OSError):
+                host.read_holding_registers_range(slave_addr=10,
+                                                  starting_addr=0,
+                                                  register_qty=300)
+            self.assertEqual(host.read_holding_registers(slave_addr=10,
+                                                         starting_addr=5,
+                                                         register_qty=2),
+                             (5, 6))
+        finally:
+            host._sock.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
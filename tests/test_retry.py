@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the adaptive timeouts and retries of umodbus"""
+
+import socket
+import struct
+import time
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus.common import CommonModbusFunctions
+from umodbus.retry import RetryClient, RttEstimator
+from umodbus.tcp import TCP
+
+try:
+    import _thread
+    HAS_THREAD = True
+except ImportError:
+    HAS_THREAD = False
+
+
+class FakeHost(CommonModbusFunctions):
+    """Host failing a number of transactions before answering"""
+    def __init__(self) -> None:
+        self.requests = 0
+        self.failures = 0
+        self.error = OSError
+        self.timeouts = []
+
+    def set_response_timeout(self, timeout_ms):
+        self.timeouts.append(timeout_ms)
+
+    def _send_receive(self, slave_addr, modbus_pdu, count):
+        self.requests += 1
+
+        if self.failures:
+            self.failures -= 1
+            raise self.error('no data received from slave')
+
+        return struct.pack('>H', 42)
+
+
+class FakeSerialHost(FakeHost):
+    """Host measuring the latency after transmitting the request"""
+    def _send_receive(self, slave_addr, modbus_pdu, count):
+        # transmission of the request, not part of the response time
+        time.sleep(0.05)
+        self._rx_latency = 2000
+
+        return super()._send_receive(slave_addr, modbus_pdu, count)
+
+
+class TestRetry(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+        self._host = FakeHost()
+        self._client = RetryClient(itf=self._host,
+                                   retries=2,
+                                   backoff_ms=2,
+                                   initial_timeout_ms=100,
+                                   min_timeout_ms=10,
+                                   max_timeout_ms=1000)
+
+    def test_estimator(self) -> None:
+        """Test the timeout follows the response time and its variation"""
+        estimator = RttEstimator(initial_timeout_ms=100,
+                                 min_timeout_ms=10,
+                                 max_timeout_ms=1000)
+        self.assertEqual(estimator.timeout(slave_addr=10), 100000)
+
+        estimator.record_response(slave_addr=10, rtt=8000)
+        self.assertEqual(estimator.timeout(slave_addr=10), 8000 + 4 * 4000)
+
+        for _ in range(50):
+            estimator.record_response(slave_addr=10, rtt=3000)
+        # the variation decays, the minimum timeout applies
+        self.assertEqual(estimator.timeout(slave_addr=10), 10000)
+        self.assertTrue(abs(estimator.statistics[10]['srtt'] - 3) < 0.01)
+
+        estimator.record_failure(slave_addr=10)
+        estimator.record_failure(slave_addr=10)
+        self.assertEqual(estimator.timeout(slave_addr=10), 40000)
+
+        for _ in range(10):
+            estimator.record_failure(slave_addr=10)
+        self.assertEqual(estimator.timeout(slave_addr=10), 1000000)
+
+        estimator.record_response(slave_addr=10, rtt=3000)
+        self.assertEqual(estimator.timeout(slave_addr=10), 10000)
+
+        # other devices are independent
+        self.assertEqual(estimator.timeout(slave_addr=11), 100000)
+
+    def test_retry(self) -> None:
+        """Test failed transactions are retried with doubled timeouts"""
+        self._host.failures = 2
+        self.assertEqual(self._client.read_holding_registers(
+            slave_addr=10,
+            starting_addr=0,
+            register_qty=1), (42, ))
+
+        self.assertEqual(self._host.requests, 3)
+        self.assertEqual(self._host.timeouts,
+                         [100, None, 200, None, 400, None])
+
+        statistics = self._client.statistics[10]
+        self.assertEqual(statistics['requests'], 1)
+        self.assertEqual(statistics['retries'], 2)
+        self.assertEqual(statistics['errors'], 2)
+        self.assertEqual(statistics['failures'], 0)
+        self.assertEqual(statistics['samples'], 1)
+        self.assertEqual(statistics['timeout'], 10)
+
+        self._host.failures = 3
+        with self.assertRaises(OSError):
+            self._client.read_holding_registers(slave_addr=10,
+                                                starting_addr=0,
+                                                register_qty=1)
+        self.assertEqual(self._host.requests, 6)
+        self.assertEqual(self._client.statistics[10]['failures'], 1)
+
+        # exception responses of the slave are not retried
+        self._host.error = ValueError
+        self._host.failures = 1
+        with self.assertRaises(ValueError):
+            self._client.read_holding_registers(slave_addr=10,
+                                                starting_addr=0,
+                                                register_qty=1)
+        self.assertEqual(self._host.requests, 7)
+
+    def test_serial_response_time(self) -> None:
+        """Test the response time of serial hosts excludes the transmission"""
+        client = RetryClient(itf=FakeSerialHost(),
+                             initial_timeout_ms=100,
+                             min_timeout_ms=1,
+                             max_timeout_ms=1000)
+        client.read_holding_registers(slave_addr=10,
+                                      starting_addr=0,
+                                      register_qty=1)
+
+        statistics = client.statistics[10]
+        self.assertEqual(statistics['srtt'], 2)
+        self.assertEqual(statistics['timeout'], 2 + 4 * 1)
+
+    def test_backoff(self) -> None:
+        """Test the backoff doubles with jitter up to the maximum"""
+        client = RetryClient(itf=self._host,
+                             backoff_ms=10,
+                             max_backoff_ms=50)
+
+        for _ in range(20):
+            self.assertTrue(5 <= client._backoff(retry=0) <= 10)
+            self.assertTrue(10 <= client._backoff(retry=1) <= 20)
+            self.assertTrue(25 <= client._backoff(retry=5) <= 50)
+
+    def _serve_late(self, server: socket.socket) -> None:
+        """Answer the first request after the second one was sent"""
+        conn, _ = server.accept()
+        headers = []
+
+        for _ in range(2):
+            header = conn.recv(7)
+            conn.recv(struct.unpack_from('>H', header, 4)[0] - 1)
+            headers.append(header)
+
+        for header in headers:
+            trans_id = struct.unpack_from('>H', header)[0]
+            data = struct.pack('>BBH', 3, 2, trans_id + 100)
+            conn.send(struct.pack('>HHHB', trans_id, 0, len(data) + 1,
+                                  header[6]) + data)
+
+        time.sleep(0.1)
+        conn.close()
+        server.close()
+
+    @unittest.skipUnless(HAS_THREAD, 'Threads not available')
+    def test_tcp_late_response(self) -> None:
+        """Test late responses of timed out transactions are discarded"""
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen(1)
+        port = server.getsockname()[1]
+
+        _thread.start_new_thread(self._serve_late, (server, ))
+
+        host = TCP(slave_ip='127.0.0.1', slave_port=port, timeout=5.0)
+        host.set_response_timeout(timeout_ms=50)
+
+        with self.assertRaises(OSError):
+            host.read_holding_registers(slave_addr=10,
+                                        starting_addr=0,
+                                        register_qty=1)
+
+        host.set_response_timeout(timeout_ms=None)
+        self.assertEqual(host.read_holding_registers(slave_addr=10,
+                                                     starting_addr=0,
+                                                     register_qty=1),
+                         (101, ))
+        host._sock.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the Modbus RTU over TCP transport of umodbus"""
+
+import socket
+import time
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus import crc
+from umodbus.rtutcp import ModbusRTUoverTCP, RTUoverTCP
+
+try:
+    import _thread
+    HAS_THREAD = True
+except ImportError:
+    HAS_THREAD = False
+
+
+class TestRtuTcp(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+        self._client = ModbusRTUoverTCP(addr=10)
+        self._client.bind(local_ip='127.0.0.1', local_port=0)
+        self._client.add_hreg(address=93, value=[19, 1234])
+        self._port = self._client._itf._sock.getsockname()[1]
+
+    def tearDown(self) -> None:
+        """Run after every test method"""
+        self._client._itf._sock.close()
+
+    def _serve(self, client: ModbusRTUoverTCP) -> None:
+        """Process requests until the socket is closed"""
+        while True:
+            try:
+                request = client._itf.get_request(
+                    unit_addr_list=client._addr_list,
+                    timeout=50)
+            except OSError:
+                break
+            if request is not None:
+                client.process(request)
+
+    def _connect(self) -> socket.socket:
+        """Connect to the client as raw host"""
+        sock = socket.socket()
+        sock.connect(('127.0.0.1', self._port))
+        sock.settimeout(1.0)
+        return sock
+
+    @unittest.skipUnless(HAS_THREAD, 'Threads not available')
+    def test_read_write(self) -> None:
+        """Test reading and writing registers of a RTU over TCP client"""
+        self.assertTrue(self._client.get_bound_status())
+        _thread.start_new_thread(self._serve, (self._client, ))
+
+        host = RTUoverTCP(slave_ip='127.0.0.1', slave_port=self._port,
+                          timeout=1.0)
+        try:
+            self.assertEqual(host.read_holding_registers(slave_addr=10,
+                                                         starting_addr=93,
+                                                         register_qty=2),
+                             (19, 1234))
+
+            self.assertTrue(host.write_multiple_registers(slave_addr=10,
+                                                          starting_address=93,
+                                                          register_values=[
+                                                              42, 43],
+                                                          signed=False))
+            self.assertEqual(host.read_holding_registers(slave_addr=10,
+                                                         starting_addr=93,
+                                                         register_qty=2),
+                             (42, 43))
+
+            # broadcasts are processed, but not answered
+            self.assertTrue(host.write_single_register(slave_addr=0,
+                                                       register_address=93,
+                                                       register_value=7,
+                                                       signed=False))
+            time.sleep(0.2)
+            self.assertEqual(host.read_holding_registers(slave_addr=10,
+                                                         starting_addr=93,
+                                                         register_qty=2),
+                             (7, 43))
+
+            with self.assertRaises(ValueError):
+                host.read_holding_registers(slave_addr=10,
+                                            starting_addr=500,
+                                            register_qty=1)
+
+            # requests of other units are not answered
+            host.set_response_timeout(timeout_ms=100)
+            with self.assertRaises(OSError):
+                host.read_holding_registers(slave_addr=11,
+                                            starting_addr=93,
+                                            register_qty=1)
+        finally:
+            host._sock.close()
+
+    def test_split_request(self) -> None:
+        """Test framing a request received in several segments"""
+        sock = self._connect()
+        try:
+            # accept the connection
+            self.assertIsNone(self._client._itf.get_request(
+                unit_addr_list=[10], timeout=100))
+
+            request = b'\x0A\x03\x00\x5D\x00\x02'
+            frame = request + crc.calculate(request)
+
+            sock.send(frame[:3])
+            self.assertIsNone(self._client._itf.get_request(
+                unit_addr_list=[10], timeout=0))
+
+            sock.send(frame[3:] + frame[:2])
+            self.assertTrue(self._client.process(
+                self._client._itf.get_request(unit_addr_list=[10],
+                                              timeout=100)))
+
+            response = b'\x0A\x03\x04\x00\x13\x04\xD2'
+            self.assertEqual(sock.recv(64), response + crc.calculate(response))
+
+            # the remainder of the second request completes it
+            sock.send(frame[2:])
+            self.assertTrue(self._client.process(
+                self._client._itf.get_request(unit_addr_list=[10],
+                                              timeout=100)))
+            self.assertEqual(sock.recv(64), response + crc.calculate(response))
+        finally:
+            sock.close()
+
+    def test_invalid_crc(self) -> None:
+        """Test discarding requests with an invalid CRC"""
+        sock = self._connect()
+        try:
+            self.assertIsNone(self._client._itf.get_request(
+                unit_addr_list=[10], timeout=100))
+
+            request = b'\x0A\x03\x00\x5D\x00\x02'
+            sock.send(request + b'\x00\x00')
+            self.assertIsNone(self._client._itf.get_request(
+                unit_addr_list=[10], timeout=100))
+            self.assertEqual(len(self._client._itf._buffer), 0)
+        finally:
+            sock.close()
+
+    @unittest.skipUnless(HAS_THREAD, 'Threads not available')
+    def test_late_response(self) -> None:
+        """Test discarding the late response of a timed out request"""
+        server = socket.socket()
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(('127.0.0.1', 0))
+        server.listen(1)
+
+        def serve() -> None:
+            conn, _ = server.accept()
+            for value in (1, 2):
+                conn.recv(8)
+                if value == 1:
+                    time.sleep(0.3)
+                response = bytes([1, 3, 2, 0, value])
+                conn.send(response + crc.calculate(response))
+            time.sleep(0.5)
+            conn.close()
+
+        _thread.start_new_thread(serve, ())
+
+        host = RTUoverTCP(slave_ip='127.0.0.1',
+                          slave_port=server.getsockname()[1],
+                          timeout=0.1)
+        try:
+            with self.assertRaises(OSError):
+                host.read_holding_registers(slave_addr=1,
+                                            starting_addr=0,
+                                            register_qty=1)
+            time.sleep(0.4)
+
+            host.set_response_timeout(timeout_ms=1000)
+            self.assertEqual(host.read_holding_registers(slave_addr=1,
+                                                         starting_addr=0,
+                                                         register_qty=1),
+                             (2, ))
+        finally:
+            host._sock.close()
+            server.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the polling scheduler of umodbus"""
+
+import time
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus.scheduler import BusScheduler
+
+
+class FakeHost(object):
+    """Host answering register reads of online slaves"""
+    def __init__(self) -> None:
+        self.online = [1, 2]
+        self.requests = []
+
+    def _request(self, slave_addr: int, starting_addr: int, qty: int) -> None:
+        self.requests.append((slave_addr, starting_addr, qty))
+        if slave_addr not in self.online:
+            raise OSError('no data received from slave')
+
+    def read_coils(self, slave_addr, starting_addr, coil_qty):
+        self._request(slave_addr, starting_addr, coil_qty)
+        return [True] * coil_qty
+
+    def read_holding_registers(self, slave_addr, starting_addr, register_qty,
+                               signed=True):
+        self._request(slave_addr, starting_addr, register_qty)
+        if starting_addr > 100:
+            raise ValueError('slave returned exception code: 2')
+        return tuple(range(starting_addr, starting_addr + register_qty))
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+        self._host = FakeHost()
+        self._scheduler = BusScheduler(host=self._host,
+                                       backoff_ms=100,
+                                       max_backoff_ms=400,
+                                       max_failures=2)
+
+    def _add_scans(self, now: int) -> None:
+        """Add scans of two slaves, all due at the given time"""
+        for scan in [
+            self._scheduler.add_scan(1, 'HREGS', 10, 2, interval_ms=10),
+            self._scheduler.add_scan(1, 'COILS', 0, 8, interval_ms=50),
+            self._scheduler.add_scan(2, 'HREGS', 20, 1, interval_ms=20),
+            self._scheduler.add_scan(2, 'COILS', 4, 3, interval_ms=20),
+        ]:
+            scan['due'] = now
+
+    def test_add_scan(self) -> None:
+        """Test adding scans of invalid register types"""
+        with self.assertRaises(KeyError):
+            self._scheduler.add_scan(1, 'FOO', 0, 1, interval_ms=10)
+
+    def test_rates(self) -> None:
+        """Test scans are executed at their intervals"""
+        values = []
+
+        def callback(slave_addr, reg_type, address, new_values):
+            values.append((slave_addr, reg_type, address, new_values))
+
+        self._add_scans(now=1000)
+        self._scheduler.add_scan(2, 'HREGS', 30, 2,
+                                 interval_ms=40,
+                                 callback=callback)['due'] = 1000
+
+        for now in range(1000, 1100, 10):
+            self._scheduler.poll(now=now)
+
+        count = dict()
+        for request in self._host.requests:
+            count[request] = count.get(request, 0) + 1
+
+        self.assertEqual(count[(1, 10, 2)], 10)
+        self.assertEqual(count[(1, 0, 8)], 2)
+        self.assertEqual(count[(2, 20, 1)], 5)
+        self.assertEqual(count[(2, 4, 3)], 5)
+        self.assertEqual(count[(2, 30, 2)], 3)
+        self.assertEqual(values, [(2, 'HREGS', 30, (30, 31))] * 3)
+
+        self.assertEqual(self._scheduler.time_to_next_scan(now=1095), 5)
+
+    def test_exception_response(self) -> None:
+        """Test a slave returning an exception is not considered offline"""
+        scan = self._scheduler.add_scan(1, 'HREGS', 200, 1, interval_ms=10)
+        scan['due'] = 0
+
+        for now in range(0, 50, 10):
+            self._scheduler.poll(now=now)
+
+        self.assertIsInstance(scan['error'], ValueError)
+        self.assertEqual(self._scheduler.slave_state(1), 'ONLINE')
+        self.assertEqual(len(self._host.requests), 5)
+
+        statistics = self._scheduler.statistics['slaves'][1]
+        self.assertEqual(statistics['errors'], 5)
+        self.assertEqual(statistics['timeouts'], 0)
+
+    def test_backoff(self) -> None:
+        """Test offline slaves are only probed with exponential backoff"""
+        self._add_scans(now=0)
+        self._host.online = [1]
+
+        probes = []
+        for now in range(0, 1500, 10):
+            before = len(self._host.requests)
+            self._scheduler.poll(now=now)
+            for request in self._host.requests[before:]:
+                if request[0] == 2:
+                    probes.append(now)
+
+        # offline after two failed scans, afterwards single probes after
+        # 100, 200, 400 and the maximum of 400 ms
+        self.assertEqual(probes, [0, 0, 100, 300, 700, 1100])
+        self.assertEqual(self._scheduler.slave_state(2), 'OFFLINE')
+
+        # the scans of the online slave are not affected
+        self.assertEqual(self._host.requests.count((1, 10, 2)), 150)
+
+        statistics = self._scheduler.statistics['slaves'][2]
+        self.assertEqual(statistics['state'], 'OFFLINE')
+        self.assertEqual(statistics['backoff'], 400)
+        self.assertEqual(statistics['timeouts'], 6)
+
+        # slave is back online on the next probe
+        self._host.online = [1, 2]
+        self._scheduler.poll(now=1520)
+        self.assertEqual(self._scheduler.slave_state(2), 'ONLINE')
+        self.assertEqual(self._scheduler.statistics['slaves'][2]['backoff'], 0)
+
+        self._scheduler.poll(now=1540)
+        self.assertEqual(self._host.requests[-2:], [(2, 20, 1), (2, 4, 3)])
+
+    def test_lateness(self) -> None:
+        """Test the lateness of late scans is reported"""
+        scan = self._scheduler.add_scan(1, 'HREGS', 10, 1, interval_ms=10)
+        scan['due'] = 0
+
+        self._scheduler.poll(now=0)
+        self._scheduler.poll(now=14)
+        self._scheduler.poll(now=20)
+
+        statistics = self._scheduler.statistics['slaves'][1]
+        self.assertEqual(statistics['max_lateness'], 4)
+        self.assertTrue(0 < statistics['lateness'] <= 4)
+        self.assertEqual(statistics['requests'], 3)
+        self.assertTrue(self._scheduler.cycle_time >= 0)
+
+    def test_lateness_of_later_scans(self) -> None:
+        """Test the time of the previous scans is part of the lateness"""
+        def read_coils(slave_addr, starting_addr, coil_qty):
+            time.sleep(0.05)
+            return [True] * coil_qty
+
+        self._host.read_coils = read_coils
+        for slave_addr in [1, 2]:
+            scan = self._scheduler.add_scan(slave_addr, 'COILS', 0, 1,
+                                            interval_ms=100)
+            scan['due'] = 0
+
+        self._scheduler.poll(now=0)
+
+        statistics = self._scheduler.statistics['slaves']
+        self.assertEqual(statistics[1]['max_lateness'], 0)
+        self.assertTrue(statistics[2]['max_lateness'] >= 50)
+        self.assertTrue(self._scheduler.cycle_time >= 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
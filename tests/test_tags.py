@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the tag database of umodbus"""
+
+import struct
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus import codec
+from umodbus import const as Const
+from umodbus import functions
+from umodbus.common import CommonModbusFunctions
+from umodbus.tags import TagDatabase
+
+
+class FakeClient(CommonModbusFunctions):
+    """Client answering with the values of a register image"""
+    def __init__(self, image: dict) -> None:
+        self._image = image
+        self.requests = []
+
+    def _send_receive(self, slave_addr, modbus_pdu, count):
+        function_code, address, quantity = struct.unpack_from('>BHH',
+                                                              modbus_pdu)
+        self.requests.append((function_code, address, quantity))
+        values = [self._image[function_code].get(address + idx, 0)
+                  for idx in range(quantity)]
+
+        return functions.response(function_code=function_code,
+                                  request_register_addr=address,
+                                  request_register_qty=quantity,
+                                  request_data=[],
+                                  value_list=values,
+                                  signed=False)[2:]
+
+
+class TestTags(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+        self._registers = {
+            'COILS': {
+                'EXAMPLE_COIL': {'register': 123, 'len': 1, 'val': 1},
+                'EXAMPLE_COIL_MIXED': {'register': 125, 'len': 2},
+            },
+            'HREGS': {
+                'EXAMPLE_HREG_NEGATIVE': {'register': 92, 'len': 1},
+                'EXAMPLE_HREG': {'register': 93, 'len': 1, 'unit': 'Hz'},
+                'ENERGY': {'register': 100, 'len': 2, 'dtype': 'uint32',
+                           'order': 'CDAB', 'scale': 0.5},
+                'NAME': {'register': 110, 'len': 3, 'dtype': 'string'},
+            },
+            'IREGS': {
+                'TEMPERATURE': {'register': 10, 'len': 2,
+                                'dtype': 'float32', 'order': 'BADC'},
+                'RAW': {'register': 12, 'len': 2, 'scale': 10,
+                        'offset': -5},
+            },
+        }
+
+        hregs = {92: 0xFFE3, 93: 19}
+        hregs.update(enumerate(codec.encode_registers(values=[70000],
+                                                      dtype='uint32',
+                                                      order='CDAB'), 100))
+        hregs.update(enumerate(codec.to_registers(codec.encode_string(
+            text='EVSE', register_qty=3)), 110))
+
+        iregs = dict(enumerate(codec.encode_registers(values=[21.5],
+                                                      dtype='float32',
+                                                      order='BADC'), 10))
+        iregs.update({12: 3, 13: 4})
+
+        self._client = FakeClient(image={
+            Const.READ_COILS: {123: 1, 125: 0, 126: 1},
+            Const.READ_HOLDING_REGISTERS: hregs,
+            Const.READ_INPUT_REGISTER: iregs,
+        })
+
+    def test_scan(self) -> None:
+        """Test all tags are read with merged requests and decoded"""
+        database = TagDatabase(registers=self._registers, slave_addr=10)
+        values = database.scan(client=self._client)
+
+        self.assertEqual(values, {
+            'EXAMPLE_COIL': True,
+            'EXAMPLE_COIL_MIXED': [False, True],
+            'EXAMPLE_HREG_NEGATIVE': -29,
+            'EXAMPLE_HREG': 19,
+            'ENERGY': 35000.0,
+            'NAME': 'EVSE',
+            'TEMPERATURE': 21.5,
+            'RAW': (25, 35),
+        })
+        self.assertEqual(self._client.requests,
+                         [(1, 123, 4), (3, 92, 21), (4, 10, 4)])
+        self.assertEqual(database.tags['EXAMPLE_HREG']['unit'], 'Hz')
+
+        # the compiled plan is reused
+        requests = database.requests
+        database.scan(client=self._client)
+        self.assertIs(database.requests, requests)
+
+    def test_max_gap(self) -> None:
+        """Test tags are not merged over gaps larger than the maximum"""
+        database = TagDatabase(registers=self._registers,
+                               slave_addr=10,
+                               max_gap=5,
+                               signed=False)
+        values = database.scan(client=self._client)
+
+        self.assertEqual(values['EXAMPLE_HREG_NEGATIVE'], 65507)
+        self.assertEqual(self._client.requests,
+                         [(1, 123, 4), (3, 92, 2), (3, 100, 2), (3, 110, 3),
+                          (4, 10, 4)])
+
+    def test_invalid(self) -> None:
+        """Test invalid tag definitions"""
+        with self.assertRaises(ValueError):
+            TagDatabase(registers={'HREGS': {'X': {'register': 0,
+                                                   'len': 3,
+                                                   'dtype': 'float32'}}},
+                        slave_addr=10)
+
+        with self.assertRaises(ValueError):
+            TagDatabase(registers={'HREGS': {'X': {'register': 0,
+                                                   'len': 2,
+                                                   'order': 'ABDC'}}},
+                        slave_addr=10)
+
+        database = TagDatabase(registers={'HREGS': {'X': {'register': 0,
+                                                          'len': 200}}},
+                               slave_addr=10)
+        with self.assertRaises(ValueError):
+            database.compile()
+
+
+if __name__ == '__main__':
+    unittest.main()
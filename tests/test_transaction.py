@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the transaction queue of umodbus"""
+
+import struct
+import time
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus.common import CommonModbusFunctions
+from umodbus.transaction import TransactionQueue, RequestExpired
+from umodbus.transaction import PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+
+try:
+    import _thread
+    HAS_THREAD = True
+except ImportError:
+    HAS_THREAD = False
+
+
+class FakeHost(CommonModbusFunctions):
+    """Host logging the requests, optionally blocked by a gate"""
+    def __init__(self) -> None:
+        self.requests = []
+        self.gate = None
+
+    def _send_receive(self, slave_addr, modbus_pdu, count):
+        function_code, address, quantity = struct.unpack_from('>BHH',
+                                                              modbus_pdu)
+        self.requests.append((slave_addr, function_code, address))
+
+        if self.gate is not None:
+            self.gate.acquire()
+            self.gate.release()
+
+        if function_code in [0x03, 0x04]:
+            return bytes(2 * quantity)
+
+        return modbus_pdu[1:5]
+
+
+class TestTransaction(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+        self._host = FakeHost()
+        self._queue = TransactionQueue(itf=self._host)
+
+    def _wait_for(self, condition) -> None:
+        """Wait until a condition is met or a timeout elapsed"""
+        for _ in range(200):
+            if condition():
+                break
+            time.sleep(0.01)
+
+    def test_pass_through(self) -> None:
+        """Test transactions of an idle queue are sent immediately"""
+        client = self._queue.client(priority=PRIORITY_LOW, deadline_ms=0)
+
+        # writes are never dropped, reads of an idle host are not queued
+        self.assertTrue(client.write_single_register(slave_addr=10,
+                                                     register_address=1,
+                                                     register_value=2))
+        self.assertEqual(client.read_holding_registers(slave_addr=10,
+                                                       starting_addr=0,
+                                                       register_qty=2),
+                         (0, 0))
+        self.assertEqual(self._host.requests, [(10, 6, 1), (10, 3, 0)])
+        self.assertEqual(self._queue.statistics,
+                         {'sent': [0, 0, 2],
+                          'dropped': [0, 0, 0],
+                          'max_wait': self._queue.statistics['max_wait'],
+                          'waiting': 0})
+
+        with self.assertRaises(ValueError):
+            self._queue.client(priority=3)
+
+    @unittest.skipUnless(HAS_THREAD, 'Threads not available')
+    def test_priority(self) -> None:
+        """Test waiting transactions are sent by priority, expired reads are
+        dropped"""
+        self._host.gate = _thread.allocate_lock()
+        self._host.gate.acquire()
+        errors = []
+        done = []
+
+        def read(priority, deadline_ms, address) -> None:
+            client = self._queue.client(priority=priority,
+                                        deadline_ms=deadline_ms)
+            try:
+                client.read_holding_registers(slave_addr=10,
+                                              starting_addr=address,
+                                              register_qty=1)
+            except RequestExpired as e:
+                errors.append((address, e))
+            done.append(address)
+
+        def write(priority, deadline_ms, address) -> None:
+            client = self._queue.client(priority=priority,
+                                        deadline_ms=deadline_ms)
+            client.write_single_register(slave_addr=10,
+                                         register_address=address,
+                                         register_value=1)
+            done.append(address)
+
+        # the first read holds the bus until the gate opens
+        _thread.start_new_thread(read, (PRIORITY_LOW, None, 0))
+        self._wait_for(lambda: len(self._host.requests) == 1)
+
+        waiting = [(read, PRIORITY_LOW, 10, 1),
+                   (write, PRIORITY_LOW, 10, 2),
+                   (read, PRIORITY_NORMAL, None, 3),
+                   (read, PRIORITY_HIGH, None, 4)]
+        for count, (function, priority, deadline_ms, address) in \
+                enumerate(waiting, 1):
+            _thread.start_new_thread(function,
+                                     (priority, deadline_ms, address))
+            self._wait_for(lambda: self._queue.waiting == count)
+
+        time.sleep(0.03)
+        self._host.gate.release()
+        self._wait_for(lambda: len(done) == 5)
+
+        self.assertEqual([address for _, _, address in self._host.requests],
+                         [0, 4, 3, 2])
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0][0], 1)
+
+        statistics = self._queue.statistics
+        self.assertEqual(statistics['sent'], [1, 1, 2])
+        self.assertEqual(statistics['dropped'], [0, 0, 1])
+        self.assertTrue(statistics['max_wait'][PRIORITY_HIGH] >= 30)
+        self.assertEqual(statistics['waiting'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the RTU tty backend of umodbus with a pseudo-terminal"""
+
+import _thread
+import os
+import time
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus import crc
+
+try:
+    import pty
+    from umodbus.serial import ModbusRTU, Serial
+    HAS_PTY = True
+except ImportError:
+    # neither pty nor termios is available on MicroPython
+    HAS_PTY = False
+
+
+class TestTty(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+        # the library uses the pseudo-terminal like a serial device, the
+        # test acts as the other device on the bus on the controlling side
+        if HAS_PTY:
+            self._bus_fd, self._tty_fd = pty.openpty()
+            self._tty_path = os.ttyname(self._tty_fd)
+
+    def _read_frame(self, length: int) -> bytes:
+        """Read a frame of given length from the bus side"""
+        frame = b''
+        while len(frame) < length:
+            frame += os.read(self._bus_fd, length - len(frame))
+        return frame
+
+    @unittest.skipUnless(HAS_PTY, 'Pseudo-terminals not available')
+    def test_client(self) -> None:
+        """Test serving registers as RTU client on a tty"""
+        client = ModbusRTU(addr=10, uart_id=self._tty_path, baudrate=115200)
+        client.add_hreg(address=93, value=[19, 1234])
+
+        request = b'\x0A\x03\x00\x5D\x00\x02'
+        os.write(self._bus_fd, request + crc.calculate(request))
+
+        self.assertTrue(client.process())
+
+        response = self._read_frame(9)
+        self.assertTrue(crc.is_valid(response))
+        self.assertEqual(response[:7], b'\x0A\x03\x04\x00\x13\x04\xD2')
+
+        request = b'\x0A\x06\x00\x5D\x00\x2A'
+        os.write(self._bus_fd, request + crc.calculate(request))
+
+        self.assertTrue(client.process())
+        self.assertEqual(self._read_frame(8), request + crc.calculate(request))
+        self.assertEqual(client.get_hreg(address=93), 42)
+
+        client._itf._uart.deinit()
+
+    @unittest.skipUnless(HAS_PTY, 'Pseudo-terminals not available')
+    def test_host(self) -> None:
+        """Test requesting registers as RTU host on a tty"""
+        host = Serial(uart_id=self._tty_path, baudrate=115200)
+
+        def respond() -> None:
+            request = self._read_frame(8)
+            if request == b'\x0B\x04\x00\x0A\x00\x01' + request[-2:]:
+                response = b'\x0B\x04\x02\xEA\x61'
+                os.write(self._bus_fd, response + crc.calculate(response))
+
+        _thread.start_new_thread(respond, ())
+
+        result = host.read_input_registers(slave_addr=11,
+                                           starting_addr=10,
+                                           register_qty=1,
+                                           signed=False)
+        self.assertEqual(result, (60001,))
+
+        host._uart.deinit()
+
+    @unittest.skipUnless(HAS_PTY, 'Pseudo-terminals not available')
+    def test_calibrated_host(self) -> None:
+        """Test the host timing is calibrated on a tty"""
+        host = Serial(uart_id=self._tty_path, baudrate=115200, calibrate=True)
+
+        def respond() -> None:
+            for _ in range(10):
+                self._read_frame(8)
+                response = b'\x0B\x04\x02\xEA\x61'
+                os.write(self._bus_fd, response + crc.calculate(response))
+
+        _thread.start_new_thread(respond, ())
+
+        for _ in range(10):
+            result = host.read_input_registers(slave_addr=11,
+                                               starting_addr=10,
+                                               register_qty=1,
+                                               signed=False)
+            self.assertEqual(result, (60001,))
+
+        statistics = host.calibration.statistics[11]
+        self.assertTrue(statistics['calibrated'])
+        self.assertTrue(statistics['timeout'] < host._response_timeout)
+
+        host._uart.deinit()
+
+    @unittest.skipUnless(HAS_PTY, 'Pseudo-terminals not available')
+    def test_calibrated_tx_timeout(self) -> None:
+        """Test an unfinished transmission is waited for twice its time"""
+        host = Serial(uart_id=self._tty_path, baudrate=9600, calibrate=True)
+        host._uart.txdone = lambda: False
+
+        start = time.time()
+        host._send(modbus_pdu=b'\x04\x00\x0A\x00\x01', slave_addr=11)
+        duration = time.time() - start
+        self.assertEqual(len(self._read_frame(8)), 8)
+
+        # 2 * 8 characters of 1145 us
+        self.assertTrue(0.018 <= duration < 0.1)
+        self.assertEqual(host.calibration._link(11)['errors'], 1)
+        self.assertEqual(host.calibration._link(11)['tx_samples'], 0)
+
+        host._uart.deinit()
+
+    @unittest.skipUnless(HAS_PTY, 'Pseudo-terminals not available')
+    def test_broadcast_client(self) -> None:
+        """Test broadcasts are processed without response on a tty"""
+        client = ModbusRTU(addr=10, uart_id=self._tty_path, baudrate=115200)
+        client.add_hreg(address=93, value=19)
+
+        request = b'\x00\x06\x00\x5D\x00\x2A'
+        os.write(self._bus_fd, request + crc.calculate(request))
+
+        self.assertTrue(client.process())
+        self.assertEqual(client.get_hreg(address=93), 42)
+
+        # reads can not be broadcast
+        request = b'\x00\x03\x00\x5D\x00\x01'
+        os.write(self._bus_fd, request + crc.calculate(request))
+
+        self.assertFalse(client.process())
+
+        # the next response is the first one on the bus
+        request = b'\x0A\x03\x00\x5D\x00\x01'
+        os.write(self._bus_fd, request + crc.calculate(request))
+
+        self.assertTrue(client.process())
+        response = self._read_frame(7)
+        self.assertEqual(response[:5], b'\x0A\x03\x02\x00\x2A')
+
+        client._itf._uart.deinit()
+
+    @unittest.skipUnless(HAS_PTY, 'Pseudo-terminals not available')
+    def test_broadcast_host(self) -> None:
+        """Test sending broadcasts as RTU host on a tty"""
+        host = Serial(uart_id=self._tty_path,
+                      baudrate=115200,
+                      turnaround_delay=10)
+
+        result = host.write_multiple_registers(slave_addr=0,
+                                               starting_address=93,
+                                               register_values=[1, 2])
+        self.assertTrue(result)
+
+        request = b'\x00\x10\x00\x5D\x00\x02\x04\x00\x01\x00\x02'
+        self.assertEqual(self._read_frame(13), request + crc.calculate(request))
+
+        with self.assertRaises(ValueError):
+            host.read_holding_registers(slave_addr=0,
+                                        starting_addr=93,
+                                        register_qty=1)
+
+        host._uart.deinit()
+
+    def tearDown(self) -> None:
+        """Run after every test method"""
+        if HAS_PTY:
+            os.close(self._bus_fd)
+            os.close(self._tty_fd)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the Modbus UDP transport of umodbus"""
+
+import socket
+import struct
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus.udp import ModbusUDP, UDP
+
+try:
+    import _thread
+    HAS_THREAD = True
+except ImportError:
+    HAS_THREAD = False
+
+
+class LossyServer(object):
+    """Server dropping the first request and answering with a stale datagram"""
+    def __init__(self) -> None:
+        self.requests = 0
+
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind(('127.0.0.1', 0))
+        self.port = self._sock.getsockname()[1]
+
+        _thread.start_new_thread(self._serve, ())
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                req, addr = self._sock.recvfrom(260)
+            except OSError:
+                break
+            self.requests += 1
+
+            if self.requests == 1:
+                # request lost
+                continue
+
+            data = struct.pack('>BBH', 3, 2, self.requests)
+            stale_tid = (struct.unpack_from('>H', req, 0)[0] - 1) & 0xFFFF
+            self._sock.sendto(struct.pack('>HHHB', stale_tid, 0,
+                                          len(data) + 1, req[6]) + data, addr)
+            self._sock.sendto(req[:4] + struct.pack('>HB', len(data) + 1,
+                                                    req[6]) + data, addr)
+
+    def close(self) -> None:
+        self._sock.close()
+
+
+class TestUdp(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+    def _serve(self, client: ModbusUDP) -> None:
+        """Process requests until the socket is closed"""
+        while True:
+            try:
+                request = client._itf.get_request(unit_addr_list=None,
+                                                  timeout=50)
+            except OSError:
+                break
+            if request is not None:
+                client.process(request)
+
+    @unittest.skipUnless(HAS_THREAD, 'Threads not available')
+    def test_read_write(self) -> None:
+        """Test reading and writing registers of a UDP client"""
+        client = ModbusUDP()
+        client.bind(local_ip='127.0.0.1', local_port=0)
+        client.add_hreg(address=93, value=[19, 1234])
+        client.add_coil(address=123, value=[True, False, True])
+        port = client._itf._sock.getsockname()[1]
+        self.assertTrue(client.get_bound_status())
+
+        _thread.start_new_thread(self._serve, (client, ))
+
+        host = UDP(slave_ip='127.0.0.1', slave_port=port, timeout=1.0)
+        try:
+            self.assertEqual(host.read_holding_registers(slave_addr=10,
+                                                         starting_addr=93,
+                                                         register_qty=2),
+                             (19, 1234))
+            self.assertEqual(host.read_coils(slave_addr=10,
+                                             starting_addr=123,
+                                             coil_qty=3),
+                             [True, False, True])
+
+            self.assertTrue(host.write_single_register(slave_addr=10,
+                                                       register_address=93,
+                                                       register_value=42,
+                                                       signed=False))
+            self.assertEqual(client.get_hreg(address=93), 42)
+
+            with self.assertRaises(ValueError):
+                host.read_holding_registers(slave_addr=10,
+                                            starting_addr=500,
+                                            register_qty=1)
+        finally:
+            client._itf._sock.close()
+            host._sock.close()
+
+    @unittest.skipUnless(HAS_THREAD, 'Threads not available')
+    def test_retransmit(self) -> None:
+        """Test sending a lost request again and ignoring stale responses"""
+        server = LossyServer()
+        host = UDP(slave_ip='127.0.0.1', slave_port=server.port,
+                   timeout=0.2, retries=1)
+
+        try:
+            self.assertEqual(host.read_holding_registers(slave_addr=1,
+                                                         starting_addr=0,
+                                                         register_qty=1),
+                             (2, ))
+            self.assertEqual(server.requests, 2)
+
+            # the following request is answered at once
+            self.assertEqual(host.read_holding_registers(slave_addr=1,
+                                                         starting_addr=0,
+                                                         register_qty=1),
+                             (3, ))
+        finally:
+            server.close()
+            host._sock.close()
+
+    def test_no_response(self) -> None:
+        """Test failing after all retries without a response"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('127.0.0.1', 0))
+        host = UDP(slave_ip='127.0.0.1', slave_port=sock.getsockname()[1],
+                   timeout=0.05, retries=2)
+
+        try:
+            with self.assertRaises(OSError):
+                host.read_holding_registers(slave_addr=1,
+                                            starting_addr=0,
+                                            register_qty=1)
+
+            received = 0
+            sock.settimeout(0.1)
+            try:
+                while True:
+                    sock.recvfrom(260)
+                    received += 1
+            except OSError:
+                pass
+            self.assertEqual(received, 3)
+        finally:
+            sock.close()
+            host._sock.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing Modbus TCP over Unix domain sockets of umodbus"""
+
+import os
+import socket
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus.tcp import ModbusTCP, TCP
+
+try:
+    import _thread
+    HAS_THREAD = True
+except ImportError:
+    HAS_THREAD = False
+
+HAS_UNIX = hasattr(socket, 'AF_UNIX')
+
+SOCKET_PATH = '/tmp/umodbus_test.sock'
+
+
+class TestUnix(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+    def tearDown(self) -> None:
+        """Run after every test method"""
+        try:
+            os.remove(SOCKET_PATH)
+        except OSError:
+            pass
+
+    def _serve(self, client: ModbusTCP) -> None:
+        """Process requests until the socket is closed"""
+        while True:
+            try:
+                client.process()
+            except OSError:
+                break
+
+    @unittest.skipUnless(HAS_UNIX and HAS_THREAD,
+                         'Unix domain sockets or threads not available')
+    def test_read_write(self) -> None:
+        """Test reading and writing registers via a Unix domain socket"""
+        client = ModbusTCP()
+        client.bind(local_ip=SOCKET_PATH)
+        client.add_hreg(address=93, value=[19, 1234])
+        self.assertTrue(client.get_bound_status())
+        self.assertEqual(client._itf._sock.family, socket.AF_UNIX)
+
+        _thread.start_new_thread(self._serve, (client, ))
+
+        host = TCP(slave_ip=SOCKET_PATH, timeout=1.0)
+        try:
+            self.assertEqual(host.read_holding_registers(slave_addr=1,
+                                                         starting_addr=93,
+                                                         register_qty=2),
+                             (19, 1234))
+
+            self.assertTrue(host.write_multiple_registers(slave_addr=1,
+                                                          starting_address=93,
+                                                          register_values=[
+                                                              42, 43],
+                                                          signed=False))
+            self.assertEqual(host.read_holding_registers(slave_addr=1,
+                                                         starting_addr=93,
+                                                         register_qty=2),
+                             (42, 43))
+        finally:
+            host._sock.close()
+            client._itf._sock.close()
+
+    @unittest.skipUnless(HAS_UNIX, 'Unix domain sockets not available')
+    def test_stale_socket_file(self) -> None:
+        """Test replacing the socket file of a previous server"""
+        client = ModbusTCP()
+        client.bind(local_ip=SOCKET_PATH)
+        client._itf._sock.close()
+        self.assertTrue(os.path.exists(SOCKET_PATH))
+
+        # bind fails if the socket file is not removed
+        client = ModbusTCP()
+        client.bind(local_ip=SOCKET_PATH)
+        client._itf._sock.close()
+
+    @unittest.skipUnless(HAS_UNIX, 'Unix domain sockets not available')
+    def test_keep_other_files(self) -> None:
+        """Test not removing a regular file at the socket path"""
+        with open(SOCKET_PATH, 'w') as f:
+            f.write('data')
+
+        client = ModbusTCP()
+        with self.assertRaises(OSError):
+            client.bind(local_ip=SOCKET_PATH)
+
+        with open(SOCKET_PATH) as f:
+            self.assertEqual(f.read(), 'data')
+
+
+if __name__ == '__main__':
+    unittest.main()
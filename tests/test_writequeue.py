@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Unittest for testing the write queue of umodbus"""
+
+import struct
+import ulogging as logging
+import mpy_unittest as unittest
+from umodbus import const as Const
+from umodbus import functions
+from umodbus.common import CommonModbusFunctions
+from umodbus.ticks import ticks_add
+from umodbus.writequeue import WriteQueue
+
+
+class FakeHost(CommonModbusFunctions):
+    """Host logging the write requests and their values"""
+    def __init__(self) -> None:
+        self.requests = []
+        self.fail_address = None
+        self.error = OSError
+        self.observe = None
+
+    def _send_receive(self, slave_addr, modbus_pdu, count):
+        function_code, address, quantity = struct.unpack_from('>BHH',
+                                                              modbus_pdu)
+
+        if function_code == Const.WRITE_MULTIPLE_REGISTERS:
+            values = list(struct.unpack_from('>' + 'H' * quantity,
+                                             modbus_pdu, 6))
+        elif function_code == Const.WRITE_MULTIPLE_COILS:
+            values = [int(bit) for bit in
+                      functions.bytes_to_bool(modbus_pdu[6:], quantity)]
+        else:
+            values = [quantity]
+
+        self.requests.append((slave_addr, function_code, address, values))
+
+        if self.observe is not None:
+            self.observe()
+
+        if address == self.fail_address:
+            raise self.error('no response')
+
+        return modbus_pdu[1:5]
+
+
+class TestWriteQueue(unittest.TestCase):
+    def setUp(self) -> None:
+        """Run before every test method"""
+        # set basic config and level for the logger
+        logging.basicConfig(level=logging.INFO)
+
+        # create a logger for this TestSuite
+        self.test_logger = logging.getLogger(__name__)
+
+        # set the test logger level
+        self.test_logger.setLevel(logging.DEBUG)
+
+        # enable/disable the log output of the device logger for the tests
+        # if enabled log data inside this test will be printed
+        self.test_logger.disabled = False
+
+        self._host = FakeHost()
+        self._queue = WriteQueue(itf=self._host, window_ms=20)
+
+    def test_merge_registers(self) -> None:
+        """Test contiguous registers are merged, the last value wins"""
+        first = self._queue.write_single_register(slave_addr=10,
+                                                  register_address=100,
+                                                  register_value=1)
+        self._queue.write_single_register(slave_addr=10,
+                                          register_address=101,
+                                          register_value=-2)
+        second = self._queue.write_multiple_registers(
+            slave_addr=10,
+            starting_address=100,
+            register_values=[3],
+            signed=False)
+        self._queue.write_single_register(slave_addr=10,
+                                          register_address=102,
+                                          register_value=4)
+        self._queue.write_single_register(slave_addr=10,
+                                          register_address=200,
+                                          register_value=5)
+        self._queue.write_single_register(slave_addr=11,
+                                          register_address=101,
+                                          register_value=6)
+
+        self.assertEqual(self._queue.pending, 5)
+        self.assertFalse(first['done'])
+        self.assertTrue(self._queue.flush())
+
+        self.assertEqual(self._host.requests,
+                         [(10, Const.WRITE_MULTIPLE_REGISTERS, 100,
+                           [3, 0xFFFE, 4]),
+                          (10, Const.WRITE_SINGLE_REGISTER, 200, [5]),
+                          (11, Const.WRITE_SINGLE_REGISTER, 101, [6])])
+        self.assertEqual(first, {'done': True, 'result': True, 'error': None})
+        self.assertEqual(second, first)
+        self.assertEqual(self._queue.statistics,
+                         {'writes': 6, 'requests': 3, 'pending': 0})
+
+        with self.assertRaises(ValueError):
+            self._queue.write_single_register(slave_addr=10,
+                                              register_address=100,
+                                              register_value=0x8000)
+
+    def test_merge_coils(self) -> None:
+        """Test contiguous coils are merged within the protocol limit"""
+        self._queue.write_multiple_coils(
+            slave_addr=10,
+            starting_address=0,
+            output_values=[1, 0] * ((Const.MAX_WRITE_BITS + 10) // 2))
+        self._queue.write_single_coil(slave_addr=10,
+                                      output_address=1,
+                                      output_value=0xFF00)
+        self._queue.write_single_coil(slave_addr=10,
+                                      output_address=3000,
+                                      output_value=True)
+        self._queue.flush()
+
+        self.assertEqual(len(self._host.requests), 3)
+        self.assertEqual(self._host.requests[0][:3],
+                         (10, Const.WRITE_MULTIPLE_COILS, 0))
+        self.assertEqual(self._host.requests[0][3][:4], [1, 1, 1, 0])
+        self.assertEqual(len(self._host.requests[0][3]), Const.MAX_WRITE_BITS)
+        self.assertEqual(self._host.requests[1][:3],
+                         (10, Const.WRITE_MULTIPLE_COILS,
+                          Const.MAX_WRITE_BITS))
+        self.assertEqual(len(self._host.requests[1][3]), 10)
+        self.assertEqual(self._host.requests[2],
+                         (10, Const.WRITE_SINGLE_COIL, 3000, [0xFF00]))
+
+        with self.assertRaises(ValueError):
+            self._queue.write_single_coil(slave_addr=10,
+                                          output_address=0,
+                                          output_value=2)
+
+    def test_status(self) -> None:
+        """Test failed requests are reported to the writes they contain"""
+        self._host.fail_address = 3
+        failed = self._queue.write_multiple_registers(slave_addr=10,
+                                                      starting_address=3,
+                                                      register_values=[1, 2])
+        succeeded = self._queue.write_single_register(slave_addr=10,
+                                                      register_address=0,
+                                                      register_value=1)
+        self._queue.write_single_register(slave_addr=10,
+                                          register_address=5,
+                                          register_value=1)
+
+        # registers 3 to 5 are written with one failing request
+        self.assertFalse(self._queue.flush())
+        self.assertTrue(failed['done'])
+        self.assertFalse(failed['result'])
+        self.assertIsInstance(failed['error'], OSError)
+        self.assertEqual(succeeded,
+                         {'done': True, 'result': True, 'error': None})
+
+    def test_split_write(self) -> None:
+        """Test writes split across requests are done after the last one"""
+        status = self._queue.write_multiple_registers(
+            slave_addr=10,
+            starting_address=0,
+            register_values=list(range(Const.MAX_WRITE_REGISTERS + 2)))
+        done = []
+        self._host.observe = lambda: done.append(status['done'])
+
+        self.assertTrue(self._queue.flush())
+        self.assertEqual(len(self._host.requests), 2)
+        self.assertEqual(done, [False, False])
+        self.assertEqual(status,
+                         {'done': True, 'result': True, 'error': None})
+
+    def test_window_on_write(self) -> None:
+        """Test the next write sends the writes once the window elapsed"""
+        first = self._queue.write_single_register(slave_addr=10,
+                                                  register_address=0,
+                                                  register_value=1)
+        self._queue._first_write = ticks_add(self._queue._first_write, -20)
+
+        second = self._queue.write_single_register(slave_addr=10,
+                                                   register_address=1,
+                                                   register_value=2)
+        self.assertTrue(first['done'])
+        self.assertFalse(second['done'])
+        self.assertEqual(self._queue.pending, 1)
+
+    def test_unexpected_error(self) -> None:
+        """Test unsent writes are kept on errors other than OSError"""
+        queue = WriteQueue(itf=self._host, window_ms=1000)
+        first = queue.write_single_register(slave_addr=10,
+                                                  register_address=0,
+                                                  register_value=1)
+        second = queue.write_single_register(slave_addr=10,
+                                                   register_address=5,
+                                                   register_value=2)
+        self._host.fail_address = 0
+        self._host.error = RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            queue.flush()
+        self.assertEqual(queue.pending, 2)
+        self.assertFalse(first['done'])
+        self.assertFalse(second['done'])
+
+        # a newer value buffered meanwhile wins, both writes complete with it
+        third = queue.write_single_register(slave_addr=10,
+                                                  register_address=0,
+                                                  register_value=3)
+        self._host.fail_address = None
+        self.assertTrue(queue.flush())
+        self.assertEqual(queue.pending, 0)
+        for status in [first, second, third]:
+            self.assertEqual(status,
+                             {'done': True, 'result': True, 'error': None})
+        self.assertEqual(self._host.requests[-2:],
+                         [(10, 6, 0, [3]), (10, 6, 5, [2])])
+
+    def test_poll(self) -> None:
+        """Test poll sends the writes once the window elapsed"""
+        self.assertFalse(self._queue.poll())
+
+        status = self._queue.write_single_register(slave_addr=10,
+                                                   register_address=0,
+                                                   register_value=1)
+        start = self._queue._first_write
+
+        self.assertFalse(self._queue.poll(now=start + 19))
+        self.assertFalse(status['done'])
+        self.assertTrue(self._queue.poll(now=start + 20))
+        self.assertTrue(status['done'])
+        self.assertEqual(len(self._host.requests), 1)
+        self.assertFalse(self._queue.poll(now=start + 40))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,2 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
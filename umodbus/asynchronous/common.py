@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Asynchronous common Modbus functions
+
+Same interface as :py:class:`umodbus.common.CommonModbusFunctions` with
+awaitable methods, used by the asynchronous host implementations like
+:py:class:`umodbus.asynchronous.serial.AsyncSerial`
+
+The requests are built and the responses are parsed by the functions of
+:py:class:`umodbus.common.CommonModbusFunctions`, only sending and receiving
+is awaited.
+"""
+
+# custom packages
+from ..common import CommonModbusFunctions
+
+# typing not natively supported on MicroPython
+from ..typing import List, Optional
+
+
+class CommonAsyncModbusFunctions(CommonModbusFunctions):
+    """Common asynchronous Modbus functions"""
+    async def _transact(self,
+                        slave_addr: int,
+                        modbus_pdu: bytes,
+                        count: bool,
+                        parse):
+        """
+        Send a modbus message and parse the response.
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      modbus_pdu:  The modbus Protocol Data Unit
+        :type       modbus_pdu:  bytes
+        :param      count:       The count
+        :type       count:       bool
+        :param      parse:       The parser of the validated response content
+        :type       parse:       Callable[[Optional[bytes]], Any]
+
+        :returns:   The parsed response
+        :rtype:     Any
+        """
+        response = await self._send_receive(slave_addr=slave_addr,
+                                            modbus_pdu=modbus_pdu,
+                                            count=count)
+
+        return parse(response)
+
+    async def _transact_many(self,
+                             slave_addr: int,
+                             modbus_pdus: List[bytes],
+                             count: bool,
+                             parse):
+        """
+        Send several modbus messages and parse the responses.
+
+        :param      slave_addr:   The slave address
+        :type       slave_addr:   int
+        :param      modbus_pdus:  The modbus Protocol Data Units
+        :type       modbus_pdus:  List[bytes]
+        :param      count:        The count
+        :type       count:        bool
+        :param      parse:        The parser of the validated response
+                                  contents of all messages
+        :type       parse:        Callable[[List[bytes]], Any]
+
+        :returns:   The parsed responses
+        :rtype:     Any
+        """
+        responses = await self._send_receive_many(slave_addr=slave_addr,
+                                                  modbus_pdus=modbus_pdus,
+                                                  count=count)
+
+        return parse(responses)
+
+    async def _send_receive_many(self,
+                                 slave_addr: int,
+                                 modbus_pdus: List[bytes],
+                                 count: bool) -> List[Optional[bytes]]:
+        """
+        Send several modbus messages one after another and receive the
+        responses.
+
+        :param      slave_addr:   The slave address
+        :type       slave_addr:   int
+        :param      modbus_pdus:  The modbus Protocol Data Units
+        :type       modbus_pdus:  List[bytes]
+        :param      count:        The count
+        :type       count:        bool
+
+        :returns:   Validated response content of each message
+        :rtype:     List[Optional[bytes]]
+        """
+        responses = []
+
+        for modbus_pdu in modbus_pdus:
+            responses.append(await self._send_receive(slave_addr=slave_addr,
+                                                      modbus_pdu=modbus_pdu,
+                                                      count=count))
+
+        return responses
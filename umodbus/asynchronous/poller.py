@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Asynchronous Modbus host polling engine
+
+Polls the groups with asynchronous hosts inside an asyncio event loop. The
+batches of different devices are polled concurrently, requests to the same
+bus are serialized by the host.
+"""
+
+# system packages
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+# custom packages
+from ..poller import Poller
+from ..ticks import ticks_add, ticks_diff, ticks_ms
+
+# typing not natively supported on MicroPython
+from ..typing import List, Optional
+
+
+class AsyncPoller(Poller):
+    """
+    Poll groups of registers of several devices with asynchronous hosts
+
+    See Poller for the parameters.
+    """
+    async def _poll_batch(self,
+                          batch: List[dict],
+                          now: int,
+                          start: int) -> None:
+        """
+        Poll a batch of groups of one device
+
+        :param      batch:  The groups
+        :type       batch:  List[dict]
+        :param      now:    The time of the poll in ticks_ms
+        :type       now:    int
+        :param      start:  The start of the poll in ticks_ms
+        :type       start:  int
+        """
+        started = ticks_add(now, ticks_diff(ticks_ms(), start))
+        items, requests = self._plan(batch)
+        results = [[None] * length for _, _, length in items]
+        device = self._device(batch[0])
+        error = None
+
+        try:
+            for request in requests:
+                read_function, args = self._read_args(batch, request)
+                self._requests += 1
+                device['requests'] += 1
+                self._scatter(results, request, await read_function(*args))
+        except (OSError, ValueError) as e:
+            error = e
+
+        self._complete(batch, results, error, now, started)
+
+    async def poll(self, now: Optional[int] = None) -> int:
+        """
+        Poll all due groups
+
+        :param      now:  The current time in ticks_ms, default ticks_ms
+        :type       now:  Optional[int]
+
+        :returns:   Number of polled groups
+        :rtype:     int
+        """
+        now = self._now(now)
+        start = ticks_ms()
+
+        batches = self._collect(now)
+        await asyncio.gather(*[self._poll_batch(batch, now, start)
+                               for batch in batches])
+
+        polled = sum(len(batch) for batch in batches)
+        if polled:
+            self._cycle_time = ticks_diff(ticks_ms(), start)
+
+        return polled
+
+    async def run(self, duration_ms: Optional[int] = None) -> None:
+        """
+        Poll the groups, sleeping until the next deadline
+
+        :param      duration_ms:  The run time in milliseconds, default forever
+        :type       duration_ms:  Optional[int]
+        """
+        start = ticks_ms()
+
+        while True:
+            await self.poll()
+
+            wait = self.time_to_next_poll()
+            if duration_ms is not None:
+                remaining = duration_ms - ticks_diff(ticks_ms(), start)
+                if remaining <= 0:
+                    break
+                wait = min(wait, remaining)
+
+            await asyncio.sleep(wait / 1000)
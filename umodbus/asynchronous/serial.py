@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Asynchronous Modbus RTU
+
+Host and client implementations running inside an asyncio event loop. Waiting
+for data and the inter-frame delays are done by the event loop instead of
+sleeping, which allows to run several buses and other tasks in one loop.
+
+On MicroPython the UART is read with an asyncio stream, on CPython tty devices
+are watched by the event loop.
+"""
+
+# system packages
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+# custom packages
+from .common import CommonAsyncModbusFunctions
+from .. import const as Const
+from ..common import Request
+from ..common import ModbusException
+from ..modbus import Modbus
+from ..serial import Pin, Serial
+from ..ticks import ticks_diff, ticks_us
+
+# typing not natively supported on MicroPython
+from ..typing import List, Optional, Union
+
+
+class AsyncModbusRTU(Modbus):
+    """
+    Asynchronous Modbus RTU client class
+
+    :param      addr:        The address of this device on the bus
+    :type       addr:        int
+    :param      baudrate:    The baudrate, default 9600
+    :type       baudrate:    int
+    :param      data_bits:   The data bits, default 8
+    :type       data_bits:   int
+    :param      stop_bits:   The stop bits, default 1
+    :type       stop_bits:   int
+    :param      parity:      The parity, default None
+    :type       parity:      Optional[int]
+    :param      pins:        The pins as list [TX, RX]
+    :type       pins:        List[Union[int, Pin], Union[int, Pin]]
+    :param      ctrl_pin:    The control pin
+    :type       ctrl_pin:    int
+    :param      uart_id:     The ID of the used UART or the path of a tty
+    :type       uart_id:     Union[int, str]
+    """
+    def __init__(self,
+                 addr: int,
+                 baudrate: int = 9600,
+                 data_bits: int = 8,
+                 stop_bits: int = 1,
+                 parity: Optional[int] = None,
+                 pins: List[Union[int, Pin], Union[int, Pin]] = None,
+                 ctrl_pin: int = None,
+                 uart_id: Union[int, str] = 1):
+        super().__init__(
+            # set itf to AsyncSerial object, addr_list to [addr]
+            AsyncSerial(uart_id=uart_id,
+                        baudrate=baudrate,
+                        data_bits=data_bits,
+                        stop_bits=stop_bits,
+                        parity=parity,
+                        pins=pins,
+                        ctrl_pin=ctrl_pin),
+            [addr]
+        )
+
+    async def process(self, timeout: Optional[int] = None) -> bool:
+        """
+        Wait for a request, process it and send the response.
+
+        :param      timeout:  The timeout in microseconds, default wait until
+                              a request is received
+        :type       timeout:  Optional[int]
+
+        :returns:   Result of processing, True on success, False otherwise
+        :rtype:     bool
+        """
+        request = await self._itf.get_request(unit_addr_list=self._addr_list,
+                                              timeout=timeout)
+        if request is None:
+            return False
+
+        # responses are queued by the interface during the processing
+        super().process(request=request)
+        await self._itf._flush()
+
+        return True
+
+    async def serve_forever(self) -> None:
+        """Process requests until the task is cancelled"""
+        while True:
+            await self.process()
+
+
+class AsyncSerial(CommonAsyncModbusFunctions, Serial):
+    """
+    Asynchronous Serial/RTU Modbus
+
+    Takes the same parameters as :py:class:`umodbus.serial.Serial`. Frames
+    passed to ``_send`` are queued and transmitted by awaiting ``_flush``.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # frames waiting for transmission
+        self._tx_frames = []
+
+        # only one transaction at a time on the bus
+        self._lock = asyncio.Lock()
+
+        if callable(getattr(self._uart, 'fileno', None)):
+            # tty device on CPython, watched by the event loop
+            self._reader = None
+        else:
+            self._reader = asyncio.StreamReader(self._uart)
+
+    async def _wait_readable(self) -> None:
+        """Wait until the tty device has data available"""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        loop.add_reader(self._uart.fileno(), event.set)
+
+        try:
+            await event.wait()
+        finally:
+            loop.remove_reader(self._uart.fileno())
+
+    async def _read(self) -> Optional[bytes]:
+        """
+        Wait for data and read it
+
+        :returns:   The read data
+        :rtype:     Optional[bytes]
+        """
+        if self._reader is None:
+            await self._wait_readable()
+            return self._uart.read()
+
+        return await self._reader.read(256)
+
+    async def _read_available(self, timeout: Optional[int]) -> Optional[bytes]:
+        """
+        Read the available data, wait for it at most the given timeout
+
+        :param      timeout:  The timeout in microseconds, None to wait forever
+        :type       timeout:  Optional[int]
+
+        :returns:   The read data, None if the timeout elapsed
+        :rtype:     Optional[bytes]
+        """
+        if self._uart.any():
+            return self._uart.read()
+
+        if timeout is None:
+            return await self._read()
+
+        if timeout <= 0:
+            return None
+
+        try:
+            return await asyncio.wait_for(self._read(), timeout / 1000000)
+        except asyncio.TimeoutError:
+            return None
+
+    async def _wait_us(self, delay: int) -> None:
+        """
+        Wait without blocking the event loop
+
+        Most of the delay is slept, the last millisecond is waited by yielding
+        to the other tasks, as sleeping has a resolution of milliseconds only.
+
+        :param      delay:  The time to wait in microseconds
+        :type       delay:  int
+        """
+        start_us = ticks_us()
+
+        if delay > 1000:
+            await asyncio.sleep((delay - 1000) / 1000000)
+
+        while ticks_diff(ticks_us(), start_us) < delay:
+            await asyncio.sleep(0)
+
+    async def _uart_read(self, timeout: Optional[int] = None) -> bytearray:
+        """
+        Read incoming slave response from UART
+
+        The latency of the response after the end of the last transmission is
+        measured while reading.
+
+        :param      timeout:  The time to wait for the start of the response
+                              in microseconds, default the response timeout
+        :type       timeout:  Optional[int]
+
+        :returns:   Read content
+        :rtype:     bytearray
+        """
+        response = bytearray()
+        self._rx_latency = None
+
+        if timeout is None:
+            timeout = self._response_timeout
+        start_us = ticks_us()
+
+        while True:
+            remaining = timeout - ticks_diff(ticks_us(), start_us)
+            if remaining < 0:
+                break
+
+            data = await self._read_available(remaining)
+            if data is None:
+                continue
+
+            if not len(response):
+                # the response started, allow it to be completed
+                timeout = max(timeout, self._response_timeout)
+                self._rx_latency = (ticks_diff(ticks_us(), self._tx_end) -
+                                    len(data) * self._t1char)
+
+            response.extend(data)
+
+            # variable length function codes may require multiple reads
+            if self._exit_read(response):
+                break
+
+        return response
+
+    async def _uart_read_frame(self,
+                               timeout: Optional[int] = None) -> bytearray:
+        """
+        Read a Modbus frame
+
+        The frame is returned as soon as a complete request has been received,
+        otherwise after the inter-frame delay elapsed without further data.
+
+        :param      timeout:  The timeout in microseconds, None to wait forever
+        :type       timeout:  Optional[int]
+
+        :returns:   Received message
+        :rtype:     bytearray
+        """
+        received_bytes = bytearray()
+        self._rx_crc.reset()
+
+        data = await self._read_available(timeout)
+
+        while data is not None:
+            received_bytes.extend(data)
+            self._rx_crc.update(data)
+
+            # no need to wait for the inter-frame delay if the request is
+            # already complete
+            if self._is_complete_request(received_bytes):
+                break
+
+            data = await self._read_available(self._inter_frame_delay)
+
+        return received_bytes
+
+    def _send(self, modbus_pdu: bytes, slave_addr: int) -> None:
+        """
+        Queue a Modbus frame for transmission by ``_flush``
+
+        :param      modbus_pdu:  The modbus Protocol Data Unit
+        :type       modbus_pdu:  bytes
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        """
+        self._tx_frames.append((self._form_serial_adu(modbus_pdu=modbus_pdu,
+                                                      slave_addr=slave_addr),
+                                slave_addr))
+
+    async def _flush(self) -> None:
+        """
+        Transmit all queued frames via UART
+
+        If a flow control pin has been setup, it will be controlled accordingly.
+        Other tasks keep running while the frames are on the wire.
+        """
+        while len(self._tx_frames):
+            modbus_adu, slave_addr = self._tx_frames.pop(0)
+            nbytes = len(modbus_adu)
+
+            if self._ctrlPin:
+                # wait until the control pin really changed
+                await self._wait_us(self._ctrl_pin_on())
+
+            send_start_time = ticks_us()
+            self._uart.write(modbus_adu)
+
+            if self._calibration is not None:
+                frame_time = self._calibration.tx_time(slave_addr=slave_addr,
+                                                       nbytes=nbytes)
+            else:
+                frame_time = self._t1char * nbytes
+
+            if self._has_uart_txdone:
+                # wait the frame time and poll for the completion of the last
+                # character, never longer than twice the nominal frame time
+                await self._wait_us(frame_time - self._t1char -
+                                    ticks_diff(ticks_us(), send_start_time))
+
+                limit = self._tx_limit(nbytes=nbytes)
+                while (not self._uart.txdone() and
+                       ticks_diff(ticks_us(), send_start_time) < limit):
+                    await asyncio.sleep(0)
+
+                if self._calibration is not None:
+                    if self._uart.txdone():
+                        self._calibration.record_tx(
+                            slave_addr=slave_addr,
+                            nbytes=nbytes,
+                            duration=ticks_diff(ticks_us(), send_start_time))
+                    else:
+                        self._calibration.record_failure(
+                            slave_addr=slave_addr)
+            else:
+                await self._wait_us(frame_time + 100 -
+                                    ticks_diff(ticks_us(), send_start_time))
+
+            if self._ctrlPin:
+                self._ctrlPin.off()
+
+            self._tx_end = ticks_us()
+
+    async def _send_receive(self,
+                            modbus_pdu: bytes,
+                            slave_addr: int,
+                            count: bool) -> Optional[bytes]:
+        """
+        Send a modbus message and receive the reponse.
+
+        :param      modbus_pdu:  The modbus Protocol Data Unit
+        :type       modbus_pdu:  bytes
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      count:       The count
+        :type       count:       bool
+
+        :returns:   Validated response content, None for broadcasts
+        :rtype:     Optional[bytes]
+        """
+        broadcast = self._is_broadcast(modbus_pdu=modbus_pdu,
+                                       slave_addr=slave_addr)
+
+        async with self._lock:
+            # flush the Rx FIFO buffer
+            self._uart.read()
+
+            self._send(modbus_pdu=modbus_pdu, slave_addr=slave_addr)
+            await self._flush()
+
+            if broadcast:
+                # broadcasts are not answered, keep the bus idle while the
+                # slaves process it
+                await asyncio.sleep(self._turnaround_delay / 1000)
+                return None
+
+            timeout = self._response_timeout_override
+            if self._calibration is not None and timeout is None:
+                timeout = self._calibration.response_timeout(
+                    slave_addr=slave_addr)
+
+            response = await self._uart_read(timeout=timeout)
+
+        try:
+            modbus_data = self._validate_resp_hdr(response=response,
+                                                  slave_addr=slave_addr,
+                                                  function_code=modbus_pdu[0],
+                                                  count=count)
+        except OSError:
+            if self._calibration is not None:
+                self._calibration.record_failure(slave_addr=slave_addr)
+            raise
+
+        if self._calibration is not None:
+            self._calibration.record_response(slave_addr=slave_addr,
+                                              latency=self._rx_latency)
+
+        return modbus_data
+
+    async def get_request(self,
+                          unit_addr_list: List[int],
+                          timeout: Optional[int] = None) -> Union[Request, None]:
+        """
+        Wait for a request within the specified timeout
+
+        :param      unit_addr_list:  The unit address list
+        :type       unit_addr_list:  Optional[list]
+        :param      timeout:         The timeout in microseconds, None to wait
+                                     until a request is received
+        :type       timeout:         Optional[int]
+
+        :returns:   A request object or None.
+        :rtype:     Union[Request, None]
+        """
+        req = await self._uart_read_frame(timeout=timeout)
+
+        if len(req) < 8:
+            return None
+
+        if not self._is_addressed(req=req, unit_addr_list=unit_addr_list):
+            return None
+
+        # CRC of the whole frame has been updated while receiving it
+        if not self._rx_crc.is_valid:
+            return None
+
+        try:
+            return Request(interface=self, data=req[:-Const.CRC_LENGTH])
+        except ModbusException as e:
+            self.send_exception_response(
+                slave_addr=req[0],
+                function_code=e.function_code,
+                exception_code=e.exception_code)
+            await self._flush()
+            return None
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Modbus host circuit breaker
+
+Stops sending requests to devices which repeatedly failed to respond. After a
+number of consecutive failures the circuit of a device opens and its requests
+fail immediately instead of waiting for the timeout of the transport, so
+callers are not blocked by a dead device while other devices keep their full
+throughput. Once the reset time elapsed, a single probe request is sent in the
+half-open state, closing the circuit on success and opening it again on
+failure.
+"""
+
+# custom packages
+from .common import CommonModbusFunctions
+from .lock import allocate_lock
+from .ticks import ticks_diff, ticks_ms
+
+# typing not natively supported on MicroPython
+from .typing import Callable, Optional
+
+#: Requests are sent, failures are counted
+STATE_CLOSED = 'closed'
+#: Requests fail immediately until the reset time elapsed
+STATE_OPEN = 'open'
+#: A single probe request is sent to check the device
+STATE_HALF_OPEN = 'half-open'
+
+
+class CircuitOpenError(OSError):
+    """Exception for requests rejected by an open circuit"""
+    pass
+
+
+class CircuitBreaker(CommonModbusFunctions):
+    """
+    Modbus host rejecting requests to failing devices
+
+    All functions of the wrapped host are available. Transactions failing
+    with an OSError, e.g. without a response, count as failure. Exception
+    responses prove the device to be alive and count as success.
+
+    :param      itf:                The Modbus host, e.g. Serial or TCP
+    :type       itf:                CommonModbusFunctions
+    :param      failure_threshold:  Consecutive failures opening the circuit
+    :type       failure_threshold:  int
+    :param      reset_timeout_ms:   Time the circuit stays open until a probe
+                                    request is sent
+    :type       reset_timeout_ms:   int
+    :param      on_state_change:    Callback with slave address, previous and
+                                    new state on every state change
+    :type       on_state_change:    Callable[[int, str, str], None]
+    :param      probe_register:     Holding register read by probe
+    :type       probe_register:     int
+    """
+    def __init__(self,
+                 itf,
+                 failure_threshold: int = 3,
+                 reset_timeout_ms: int = 5000,
+                 on_state_change: Callable[[int, str, str], None] = None,
+                 probe_register: int = 0) -> None:
+        self._itf = itf
+        self._failure_threshold = failure_threshold
+        self._reset_timeout_ms = reset_timeout_ms
+        self._on_state_change = on_state_change
+
+        self._probe_register = probe_register
+
+        self._lock = allocate_lock()
+        self._circuits = dict()
+        self._changes = []
+
+    def _circuit(self, slave_addr: int) -> dict:
+        """
+        Get the circuit of a device, create it if not existing
+
+        Must be called with the lock acquired.
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+
+        :returns:   The circuit
+        :rtype:     dict
+        """
+        circuit = self._circuits.get(slave_addr)
+
+        if circuit is None:
+            circuit = {
+                'state': STATE_CLOSED,
+                'failures': 0,
+                'opened': 0,
+                'probing': False,
+                'requests': 0,
+                'rejected': 0,
+                'trips': 0,
+            }
+            self._circuits[slave_addr] = circuit
+
+        return circuit
+
+    def _set_state(self, slave_addr: int, circuit: dict, state: str) -> None:
+        """
+        Change the state of a circuit
+
+        The change is reported by the next call of _notify. Must be called
+        with the lock acquired.
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      circuit:     The circuit
+        :type       circuit:     dict
+        :param      state:       The new state
+        :type       state:       str
+        """
+        previous = circuit['state']
+        if previous == state:
+            return
+
+        circuit['state'] = state
+        if state == STATE_OPEN:
+            circuit['opened'] = ticks_ms()
+            circuit['trips'] += 1
+
+        self._changes.append((slave_addr, previous, state))
+
+    def _notify(self) -> None:
+        """
+        Report the state changes to the callback
+
+        Called without the lock acquired, so the callback may use the circuit
+        breaker.
+        """
+        self._lock.acquire()
+        changes = self._changes
+        self._changes = []
+        self._lock.release()
+
+        if self._on_state_change is not None:
+            for change in changes:
+                self._on_state_change(*change)
+
+    def state(self, slave_addr: int) -> str:
+        """
+        Get the state of the circuit of a device
+
+        An open circuit whose reset time elapsed is reported as half-open, as
+        its next request is sent as probe.
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+
+        :returns:   STATE_CLOSED, STATE_OPEN or STATE_HALF_OPEN
+        :rtype:     str
+        """
+        self._lock.acquire()
+        try:
+            circuit = self._circuit(slave_addr)
+
+            if (circuit['state'] == STATE_OPEN and
+                    ticks_diff(ticks_ms(), circuit['opened']) >=
+                    self._reset_timeout_ms):
+                return STATE_HALF_OPEN
+
+            return circuit['state']
+        finally:
+            self._lock.release()
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Get the state and counters of the circuits of all devices
+
+        :returns:   Per slave address the state, consecutive failures, sent
+                    and rejected requests and the number of times opened
+        :rtype:     dict
+        """
+        statistics = dict()
+
+        for slave_addr in list(self._circuits.keys()):
+            circuit = self._circuits[slave_addr]
+            statistics[slave_addr] = {
+                'state': self.state(slave_addr),
+                'failures': circuit['failures'],
+                'requests': circuit['requests'],
+                'rejected': circuit['rejected'],
+                'trips': circuit['trips'],
+            }
+
+        return statistics
+
+    def reset(self, slave_addr: Optional[int] = None) -> None:
+        """
+        Close the circuits
+
+        :param      slave_addr:  The slave address, None for all devices
+        :type       slave_addr:  Optional[int]
+        """
+        self._lock.acquire()
+        try:
+            for addr, circuit in self._circuits.items():
+                if slave_addr is None or addr == slave_addr:
+                    circuit['failures'] = 0
+                    circuit['probing'] = False
+                    self._set_state(addr, circuit, STATE_CLOSED)
+        finally:
+            self._lock.release()
+            self._notify()
+
+    def probe(self) -> int:
+        """
+        Send a probe request to all devices whose circuit is due for one
+
+        Intended to be called periodically, so devices recover without
+        requests of the application. The probe reads the probe register.
+
+        :returns:   Number of probed devices
+        :rtype:     int
+        """
+        probed = 0
+
+        for slave_addr in list(self._circuits.keys()):
+            if self.state(slave_addr) != STATE_HALF_OPEN:
+                continue
+
+            try:
+                self.read_holding_registers(slave_addr=slave_addr,
+                                            starting_addr=self._probe_register,
+                                            register_qty=1)
+            except (OSError, ValueError):
+                pass
+            probed += 1
+
+        return probed
+
+    def _admit(self, slave_addr: int) -> None:
+        """
+        Check whether a request may be sent to a device
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+
+        :raises     CircuitOpenError:  The circuit of the device is open
+        """
+        self._lock.acquire()
+        try:
+            circuit = self._circuit(slave_addr)
+
+            if (circuit['state'] == STATE_OPEN and
+                    ticks_diff(ticks_ms(), circuit['opened']) >=
+                    self._reset_timeout_ms):
+                self._set_state(slave_addr, circuit, STATE_HALF_OPEN)
+
+            if circuit['state'] == STATE_HALF_OPEN and not circuit['probing']:
+                # this request is the probe, others are rejected meanwhile
+                circuit['probing'] = True
+            elif circuit['state'] != STATE_CLOSED:
+                circuit['rejected'] += 1
+                raise CircuitOpenError('circuit of slave {} is open'.
+                                       format(slave_addr))
+
+            circuit['requests'] += 1
+        finally:
+            self._lock.release()
+            self._notify()
+
+    def _record(self, slave_addr: int, success: bool) -> None:
+        """
+        Record the result of a request
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      success:     Flag whether the device responded
+        :type       success:     bool
+        """
+        self._lock.acquire()
+        try:
+            circuit = self._circuit(slave_addr)
+            circuit['probing'] = False
+
+            if success:
+                circuit['failures'] = 0
+                self._set_state(slave_addr, circuit, STATE_CLOSED)
+                return
+
+            circuit['failures'] += 1
+
+            # a failed probe opens the circuit again
+            if (circuit['state'] == STATE_HALF_OPEN or
+                    (circuit['state'] == STATE_CLOSED and
+                     circuit['failures'] >= self._failure_threshold)):
+                self._set_state(slave_addr, circuit, STATE_OPEN)
+        finally:
+            self._lock.release()
+            self._notify()
+
+    def _release(self, slave_addr: int) -> None:
+        """
+        Allow the next request to probe a device without recording a result
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        """
+        self._lock.acquire()
+        try:
+            self._circuit(slave_addr)['probing'] = False
+        finally:
+            self._lock.release()
+
+    def _send_receive(self,
+                      slave_addr: int,
+                      modbus_pdu: bytes,
+                      count: bool) -> Optional[bytes]:
+        """
+        Send a modbus message and receive the response if the circuit of the
+        device is not open
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      modbus_pdu:  The modbus Protocol Data Unit
+        :type       modbus_pdu:  bytes
+        :param      count:       The count
+        :type       count:       bool
+
+        :returns:   Validated response content
+        :rtype:     Optional[bytes]
+
+        :raises     CircuitOpenError:  The circuit of the device is open
+        """
+        self._admit(slave_addr)
+        success = None
+
+        try:
+            response = self._itf._send_receive(slave_addr=slave_addr,
+                                               modbus_pdu=modbus_pdu,
+                                               count=count)
+            success = True
+        except OSError:
+            success = False
+            raise
+        except ValueError:
+            # the device answered, e.g. with an exception response
+            success = True
+            raise
+        finally:
+            if success is None:
+                # no result, e.g. interrupted, the next request probes
+                self._release(slave_addr)
+            else:
+                self._record(slave_addr, success=success)
+
+        return response
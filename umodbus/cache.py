@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Modbus host read cache
+
+Wraps a host and serves reads from recently read blocks of registers. A read
+of a range inside a cached block, e.g. registers 10 to 20 of a cached block of
+registers 0 to 50, is answered without a transaction as long as the block is
+not older than its time to live. Concurrent identical reads of several
+threads share one transaction. Writes through the cache invalidate the
+cached blocks they affect, reads in flight while a slave is invalidated are
+not cached.
+"""
+
+# system packages
+import struct
+
+# custom packages
+from . import const as Const
+from . import functions
+from .common import CommonModbusFunctions
+from .lock import allocate_lock
+from .ticks import ticks_diff, ticks_ms
+
+# typing not natively supported on MicroPython
+from .typing import Optional
+
+#: Function code of each register type
+FUNCTION_CODES = {
+    'COILS': Const.READ_COILS,
+    'ISTS': Const.READ_DISCRETE_INPUTS,
+    'HREGS': Const.READ_HOLDING_REGISTERS,
+    'IREGS': Const.READ_INPUT_REGISTER,
+}
+
+#: Read function code of the registers changed by each write function code
+WRITTEN_FUNCTION_CODES = {
+    Const.WRITE_SINGLE_COIL: Const.READ_COILS,
+    Const.WRITE_MULTIPLE_COILS: Const.READ_COILS,
+    Const.WRITE_SINGLE_REGISTER: Const.READ_HOLDING_REGISTERS,
+    Const.WRITE_MULTIPLE_REGISTERS: Const.READ_HOLDING_REGISTERS,
+}
+
+
+class CachingClient(CommonModbusFunctions):
+    """
+    Modbus host serving reads from cached blocks of registers
+
+    All functions of the wrapped host are available, reads are served from
+    the cache if possible.
+
+    :param      itf:          The Modbus host, e.g. Serial or TCP
+    :type       itf:          CommonModbusFunctions
+    :param      ttl_ms:       Default time to live of cached blocks
+    :type       ttl_ms:       int
+    :param      max_entries:  Maximum number of cached blocks
+    :type       max_entries:  int
+    """
+    def __init__(self, itf, ttl_ms: int = 1000, max_entries: int = 64):
+        self._itf = itf
+        self._ttl_ms = ttl_ms
+        self._max_entries = max_entries
+
+        self._rules = []
+        self._entries = []
+        self._in_flight = dict()
+        self._lock = allocate_lock()
+
+        # invalidation generation of all slaves and of each slave
+        self._generation = 0
+        self._generations = dict()
+        self._use_counter = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+
+    def add_ttl_rule(self,
+                     reg_type: str,
+                     address: int,
+                     quantity: int,
+                     ttl_ms: int,
+                     slave_addr: Optional[int] = None) -> None:
+        """
+        Set the time to live of blocks containing a range of registers
+
+        A block gets the smallest time to live of all rules it overlaps, or
+        the default. Registers with a time to live of zero are never cached.
+
+        :param      reg_type:    The register type, COILS, ISTS, HREGS, IREGS
+        :type       reg_type:    str
+        :param      address:     The starting address
+        :type       address:     int
+        :param      quantity:    The amount of registers
+        :type       quantity:    int
+        :param      ttl_ms:      The time to live in milliseconds
+        :type       ttl_ms:      int
+        :param      slave_addr:  The slave address, None for all slaves
+        :type       slave_addr:  Optional[int]
+
+        :raises     KeyError:    Invalid register type
+        """
+        if reg_type not in FUNCTION_CODES:
+            raise KeyError('{} is not a valid register type of {}'.
+                           format(reg_type, list(FUNCTION_CODES.keys())))
+
+        self._rules.append((slave_addr,
+                            FUNCTION_CODES[reg_type],
+                            address,
+                            address + quantity,
+                            ttl_ms))
+
+    def _get_ttl(self,
+                 slave_addr: int,
+                 function_code: int,
+                 start: int,
+                 end: int) -> int:
+        """
+        Get the time to live of a block
+
+        :param      slave_addr:     The slave address
+        :type       slave_addr:     int
+        :param      function_code:  The read function code
+        :type       function_code:  int
+        :param      start:          The first address of the block
+        :type       start:          int
+        :param      end:            The address after the block
+        :type       end:            int
+
+        :returns:   The time to live in milliseconds
+        :rtype:     int
+        """
+        ttl = self._ttl_ms
+
+        for rule_slave, rule_fc, rule_start, rule_end, rule_ttl in self._rules:
+            if ((rule_slave is None or rule_slave == slave_addr) and
+                    rule_fc == function_code and
+                    rule_start < end and start < rule_end):
+                ttl = min(ttl, rule_ttl)
+
+        return ttl
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Get the cache statistics
+
+        :returns:   Number of cached blocks, hits, misses, coalesced reads
+                    and evictions
+        :rtype:     dict
+        """
+        return {
+            'entries': len(self._entries),
+            'hits': self._hits,
+            'misses': self._misses,
+            'coalesced': self._coalesced,
+            'evictions': self._evictions,
+        }
+
+    def invalidate(self, slave_addr: Optional[int] = None) -> None:
+        """
+        Remove cached blocks
+
+        :param      slave_addr:  The slave address, None for all slaves
+        :type       slave_addr:  Optional[int]
+        """
+        self._lock.acquire()
+        try:
+            self._entries = [entry for entry in self._entries
+                             if slave_addr is not None and
+                             entry['slave_addr'] != slave_addr]
+            self._next_generation(slave_addr)
+        finally:
+            self._lock.release()
+
+    def _next_generation(self, slave_addr: Optional[int]) -> None:
+        """
+        Start a new invalidation generation of a slave
+
+        Must be called with the lock acquired.
+
+        :param      slave_addr:  The slave address, None or the broadcast
+                                 address for all slaves
+        :type       slave_addr:  Optional[int]
+        """
+        if slave_addr is None or slave_addr == Const.BROADCAST_ADDR:
+            self._generation += 1
+        else:
+            self._generations[slave_addr] = \
+                self._generations.get(slave_addr, 0) + 1
+
+    def _get_generation(self, slave_addr: int) -> tuple:
+        """
+        Get the invalidation generation of a slave
+
+        Must be called with the lock acquired.
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+
+        :returns:   The generation of all slaves and of the slave
+        :rtype:     tuple
+        """
+        return (self._generation, self._generations.get(slave_addr, 0))
+
+    def _invalidate_range(self,
+                          slave_addr: int,
+                          function_code: int,
+                          start: int,
+                          end: int) -> None:
+        """
+        Remove cached blocks overlapping a range of registers
+
+        A broadcast invalidates the range of all slaves. Must be called with
+        the lock acquired.
+
+        :param      slave_addr:     The slave address
+        :type       slave_addr:     int
+        :param      function_code:  The read function code of the registers
+        :type       function_code:  int
+        :param      start:          The first address of the range
+        :type       start:          int
+        :param      end:            The address after the range
+        :type       end:            int
+        """
+        self._next_generation(slave_addr)
+        self._entries = [
+            entry for entry in self._entries
+            if not ((slave_addr == Const.BROADCAST_ADDR or
+                     entry['slave_addr'] == slave_addr) and
+                    entry['function_code'] == function_code and
+                    entry['start'] < end and start < entry['end'])]
+
+    def _lookup(self,
+                slave_addr: int,
+                function_code: int,
+                start: int,
+                end: int) -> Optional[bytes]:
+        """
+        Get the response data of a range from a fresh cached block
+
+        Must be called with the lock acquired.
+
+        :param      slave_addr:     The slave address
+        :type       slave_addr:     int
+        :param      function_code:  The read function code
+        :type       function_code:  int
+        :param      start:          The first address of the range
+        :type       start:          int
+        :param      end:            The address after the range
+        :type       end:            int
+
+        :returns:   The response data as received from the slave, None if
+                    not cached
+        :rtype:     Optional[bytes]
+        """
+        now = ticks_ms()
+
+        for entry in self._entries:
+            if (entry['slave_addr'] != slave_addr or
+                    entry['function_code'] != function_code or
+                    start < entry['start'] or entry['end'] < end):
+                continue
+
+            if ticks_diff(now, entry['time']) >= entry['ttl']:
+                continue
+
+            self._use_counter += 1
+            entry['used'] = self._use_counter
+
+            offset = start - entry['start']
+            if function_code in [Const.READ_COILS,
+                                 Const.READ_DISCRETE_INPUTS]:
+                return functions.response(
+                    function_code=function_code,
+                    request_register_addr=start,
+                    request_register_qty=end - start,
+                    request_data=[],
+                    value_list=list(entry['data'][offset:
+                                                  offset + end - start]))[2:]
+
+            return entry['data'][2 * offset:2 * (end - entry['start'])]
+
+        return None
+
+    def _store(self,
+               slave_addr: int,
+               function_code: int,
+               start: int,
+               end: int,
+               data: bytes) -> None:
+        """
+        Store the response data of a read as block
+
+        Blocks inside the new block and expired blocks are removed, the least
+        recently used block is evicted if the cache is full. Must be called
+        with the lock acquired.
+
+        :param      slave_addr:     The slave address
+        :type       slave_addr:     int
+        :param      function_code:  The read function code
+        :type       function_code:  int
+        :param      start:          The first address of the block
+        :type       start:          int
+        :param      end:            The address after the block
+        :type       end:            int
+        :param      data:           The response data
+        :type       data:           bytes
+        """
+        ttl = self._get_ttl(slave_addr, function_code, start, end)
+        if ttl <= 0:
+            return
+
+        now = ticks_ms()
+        self._entries = [
+            entry for entry in self._entries
+            if ticks_diff(now, entry['time']) < entry['ttl'] and
+            not (entry['slave_addr'] == slave_addr and
+                 entry['function_code'] == function_code and
+                 start <= entry['start'] and entry['end'] <= end)]
+
+        while len(self._entries) >= self._max_entries:
+            oldest = min(self._entries, key=lambda entry: entry['used'])
+            self._entries.remove(oldest)
+            self._evictions += 1
+
+        if function_code in [Const.READ_COILS, Const.READ_DISCRETE_INPUTS]:
+            # single bits to serve any sub range
+            bits = bytearray(end - start)
+            functions.bytes_to_bool_into(byte_list=data,
+                                         bit_qty=end - start,
+                                         out=bits)
+            data = bits
+
+        self._use_counter += 1
+        self._entries.append({
+            'slave_addr': slave_addr,
+            'function_code': function_code,
+            'start': start,
+            'end': end,
+            'data': data,
+            'time': now,
+            'ttl': ttl,
+            'used': self._use_counter,
+        })
+
+    def _send_receive(self,
+                      slave_addr: int,
+                      modbus_pdu: bytes,
+                      count: bool) -> bytes:
+        """
+        Send a modbus message and receive the response, reads are served from
+        the cache if possible.
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      modbus_pdu:  The modbus Protocol Data Unit
+        :type       modbus_pdu:  bytes
+        :param      count:       The count
+        :type       count:       bool
+
+        :returns:   Validated response content
+        :rtype:     bytes
+        """
+        function_code = modbus_pdu[0]
+
+        if function_code in WRITTEN_FUNCTION_CODES:
+            address, quantity = struct.unpack_from('>HH', modbus_pdu, 1)
+            if function_code in [Const.WRITE_SINGLE_COIL,
+                                 Const.WRITE_SINGLE_REGISTER]:
+                quantity = 1
+
+            try:
+                return self._itf._send_receive(slave_addr=slave_addr,
+                                               modbus_pdu=modbus_pdu,
+                                               count=count)
+            finally:
+                # also a failed write may have changed registers
+                self._lock.acquire()
+                try:
+                    self._invalidate_range(
+                        slave_addr,
+                        WRITTEN_FUNCTION_CODES[function_code],
+                        address,
+                        address + quantity)
+                finally:
+                    self._lock.release()
+
+        if function_code not in FUNCTION_CODES.values():
+            return self._itf._send_receive(slave_addr=slave_addr,
+                                           modbus_pdu=modbus_pdu,
+                                           count=count)
+
+        start, quantity = struct.unpack_from('>HH', modbus_pdu, 1)
+        end = start + quantity
+        key = (slave_addr, function_code, start, end)
+
+        self._lock.acquire()
+        try:
+            data = self._lookup(slave_addr, function_code, start, end)
+            if data is not None:
+                self._hits += 1
+                return data
+
+            flight = self._in_flight.get(key)
+            if flight is None:
+                # this read is sent, identical reads wait for its result
+                flight = {'lock': allocate_lock(),
+                          'data': None,
+                          'error': None,
+                          'generation': self._get_generation(slave_addr)}
+                flight['lock'].acquire()
+                self._in_flight[key] = flight
+                self._misses += 1
+                leader = True
+            else:
+                self._coalesced += 1
+                leader = False
+        finally:
+            self._lock.release()
+
+        if not leader:
+            flight['lock'].acquire()
+            flight['lock'].release()
+
+            if flight['error'] is not None:
+                raise flight['error']
+            return flight['data']
+
+        try:
+            data = self._itf._send_receive(slave_addr=slave_addr,
+                                           modbus_pdu=modbus_pdu,
+                                           count=count)
+            flight['data'] = data
+
+            self._lock.acquire()
+            try:
+                # the response may predate a write finished meanwhile
+                if (flight['generation'] ==
+                        self._get_generation(slave_addr)):
+                    self._store(slave_addr, function_code, start, end, data)
+            finally:
+                self._lock.release()
+
+            return data
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            self._lock.acquire()
+            try:
+                self._in_flight.pop(key, None)
+            finally:
+                self._lock.release()
+            flight['lock'].release()
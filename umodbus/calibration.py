@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Serial link timing calibration
+
+The nominal RTU timing is derived from the baudrate with generous margins.
+The calibration measures the actual write completion times and response
+latencies per slave and the switching time of the control pin of the bus and
+provides the tightest waits which have proven to be safe. The measured peaks
+decay slowly, so the values are re-validated with every transaction. Links
+with repeated failures fall back to the nominal timing until they have been
+measured again.
+"""
+
+# typing not natively supported on MicroPython
+from .typing import Optional
+
+
+class LinkCalibration(object):
+    """
+    Measured timing of the links to the slaves of a serial bus
+
+    :param      t1char:             Nominal time of one character in us
+    :type       t1char:             int
+    :param      inter_frame_delay:  The inter-frame delay in us
+    :type       inter_frame_delay:  int
+    :param      response_timeout:   Conservative response timeout in us
+    :type       response_timeout:   int
+    :param      ctrl_pin_delay:     Conservative control pin delay in us
+    :type       ctrl_pin_delay:     int
+    :param      min_samples:        Measurements until calibrated values are
+                                    used
+    :type       min_samples:        int
+    :param      max_errors:         Failures until falling back to the
+                                    conservative values
+    :type       max_errors:         int
+    :param      margin:             Factor applied to the peak response latency
+    :type       margin:             int
+    """
+    def __init__(self,
+                 t1char: int,
+                 inter_frame_delay: int,
+                 response_timeout: int,
+                 ctrl_pin_delay: int = 200,
+                 min_samples: int = 8,
+                 max_errors: int = 2,
+                 margin: int = 2) -> None:
+        self._t1char = t1char
+        self._inter_frame_delay = inter_frame_delay
+        self._response_timeout = response_timeout
+        self._ctrl_pin_delay = ctrl_pin_delay
+        self._min_samples = min_samples
+        self._max_errors = max_errors
+        self._margin = margin
+
+        self._links = dict()
+
+        # the control pin is shared by all links of the bus
+        self._ctrl_samples = 0
+        self._ctrl_time = 0
+
+    def _link(self, slave_addr: int) -> dict:
+        """
+        Get the measurements of a link, create them if not existing
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+
+        :returns:   The link measurements
+        :rtype:     dict
+        """
+        link = self._links.get(slave_addr)
+
+        if link is None:
+            link = {
+                'tx_samples': 0,
+                'tx_char': 0,
+                'samples': 0,
+                'latency': 0,
+                'errors': 0,
+                'fallbacks': 0,
+            }
+            self._links[slave_addr] = link
+
+        return link
+
+    def tx_time(self, slave_addr: int, nbytes: int) -> int:
+        """
+        Get the expected time to transmit a frame
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      nbytes:      The number of bytes of the frame
+        :type       nbytes:      int
+
+        :returns:   The transmission time in microseconds
+        :rtype:     int
+        """
+        link = self._link(slave_addr)
+
+        if link['tx_samples'] < self._min_samples:
+            return nbytes * self._t1char
+
+        # character time is measured in nanoseconds
+        return (nbytes * link['tx_char']) // 1000
+
+    def response_timeout(self, slave_addr: int) -> int:
+        """
+        Get the time to wait for the first byte of a response
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+
+        :returns:   The timeout in microseconds
+        :rtype:     int
+        """
+        link = self._link(slave_addr)
+
+        if link['samples'] < self._min_samples:
+            return self._response_timeout
+
+        timeout = self._margin * link['latency'] + self._inter_frame_delay
+
+        return min(timeout, self._response_timeout)
+
+    def ctrl_pin_delay(self) -> int:
+        """
+        Get the time to wait after setting the control pin
+
+        :returns:   The delay in microseconds
+        :rtype:     int
+        """
+        if self._ctrl_samples < self._min_samples:
+            return self._ctrl_pin_delay
+
+        return min(self._margin * self._ctrl_time, self._ctrl_pin_delay)
+
+    def record_ctrl_pin(self, duration: int) -> None:
+        """
+        Record the measured switching time of the control pin
+
+        :param      duration:  The time until the pin was set in us
+        :type       duration:  int
+        """
+        # keep the peak, decaying by 1/16 per sample
+        peak = self._ctrl_time
+        self._ctrl_time = max(duration, peak - (peak >> 4))
+        self._ctrl_samples += 1
+
+    def record_tx(self, slave_addr: int, nbytes: int, duration: int) -> None:
+        """
+        Record the measured completion time of a write
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      nbytes:      The number of written bytes
+        :type       nbytes:      int
+        :param      duration:    The time until the write completed in us
+        :type       duration:    int
+        """
+        link = self._link(slave_addr)
+        tx_char = (1000 * duration) // nbytes
+
+        # keep the peak, decaying by 1/16 per sample
+        peak = link['tx_char']
+        link['tx_char'] = max(tx_char, peak - (peak >> 4))
+        link['tx_samples'] += 1
+
+    def record_response(self,
+                        slave_addr: int,
+                        latency: Optional[int]) -> None:
+        """
+        Record a successful transaction
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      latency:     The time from the end of the request to the
+                                 start of the response in us, if measured
+        :type       latency:     Optional[int]
+        """
+        link = self._link(slave_addr)
+
+        if link['errors']:
+            link['errors'] -= 1
+
+        if latency is None:
+            return
+
+        latency = max(0, latency)
+
+        # keep the peak, decaying by 1/16 per sample
+        peak = link['latency']
+        link['latency'] = max(latency, peak - (peak >> 4))
+        link['samples'] += 1
+
+    def record_failure(self, slave_addr: int) -> None:
+        """
+        Record a failed transaction, like a timeout or an invalid response
+
+        Links falling back to the conservative values measure the control pin
+        again as well, a late switch may have cut off the request.
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        """
+        link = self._link(slave_addr)
+        link['errors'] += 1
+
+        if link['errors'] >= self._max_errors:
+            # measure the link again, use the conservative values meanwhile
+            link['tx_samples'] = 0
+            link['tx_char'] = 0
+            link['samples'] = 0
+            link['latency'] = 0
+            link['errors'] = 0
+            link['fallbacks'] += 1
+            self._ctrl_samples = 0
+            self._ctrl_time = 0
+
+    def is_calibrated(self, slave_addr: int) -> bool:
+        """
+        Check whether calibrated values are used for a link
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+
+        :returns:   True if the response timeout is calibrated
+        :rtype:     bool
+        """
+        return self._link(slave_addr)['samples'] >= self._min_samples
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Get the current timing of all links
+
+        :returns:   Per slave the calibration state, the character time, the
+                    peak response latency, the response timeout and the
+                    control pin delay of the bus in us and the number of
+                    fallbacks
+        :rtype:     dict
+        """
+        statistics = dict()
+
+        for slave_addr, link in self._links.items():
+            statistics[slave_addr] = {
+                'calibrated': self.is_calibrated(slave_addr),
+                'tx_char': link['tx_char'] / 1000,
+                'latency': link['latency'],
+                'timeout': self.response_timeout(slave_addr),
+                'ctrl_pin_delay': self.ctrl_pin_delay(),
+                'fallbacks': link['fallbacks'],
+            }
+
+        return statistics
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Codec of values spanning several registers
+
+Decodes and encodes 16, 32 and 64 bit integers, floats and ASCII strings from
+and to the data of consecutive registers. The byte and word order is given as
+the order of the bytes of a 32 bit value A B C D, with A being the most
+significant byte:
+
+- ABCD, big endian, as defined by the Modbus specification
+- CDAB, big endian with swapped words, little endian word order
+- BADC, big endian with swapped bytes of each register
+- DCBA, little endian
+
+All values of a block are converted with a single struct call. The orders
+with swapped bytes require one copy of the data to swap the bytes of each
+register.
+"""
+
+# system packages
+import struct
+
+# typing not natively supported on MicroPython
+from .typing import List, Tuple, Union
+
+#: struct format character and number of registers of each data type
+DTYPES = {
+    'int16': ('h', 1),
+    'uint16': ('H', 1),
+    'int32': ('i', 2),
+    'uint32': ('I', 2),
+    'float32': ('f', 2),
+    'int64': ('q', 4),
+    'uint64': ('Q', 4),
+    'float64': ('d', 4),
+}
+
+#: Data type of ASCII strings, two characters per register
+STRING = 'string'
+
+#: struct byte order and whether the bytes of each register are swapped
+ORDERS = {
+    'ABCD': ('>', False),
+    'CDAB': ('<', True),
+    'BADC': ('>', True),
+    'DCBA': ('<', False),
+}
+
+
+def _get_order(order: str) -> Tuple[str, bool]:
+    """
+    Get the struct byte order and register byte swapping of an order
+
+    :param      order:  The byte and word order, e.g. ABCD
+    :type       order:  str
+
+    :returns:   The struct byte order and whether to swap register bytes
+    :rtype:     Tuple[str, bool]
+
+    :raises     ValueError:  Invalid order
+    """
+    if order not in ORDERS:
+        raise ValueError('{} is not a valid order of {}'.
+                         format(order, list(ORDERS.keys())))
+
+    return ORDERS[order]
+
+
+def _get_dtype(dtype: str) -> Tuple[str, int]:
+    """
+    Get the struct format character and number of registers of a data type
+
+    :param      dtype:  The data type, e.g. float32
+    :type       dtype:  str
+
+    :returns:   The format character and number of registers
+    :rtype:     Tuple[str, int]
+
+    :raises     ValueError:  Invalid data type
+    """
+    if dtype not in DTYPES:
+        raise ValueError('{} is not a valid data type of {}'.
+                         format(dtype, list(DTYPES.keys())))
+
+    return DTYPES[dtype]
+
+
+def swap_bytes(data: bytes) -> bytearray:
+    """
+    Swap the two bytes of each register
+
+    :param      data:  The register data
+    :type       data:  bytes
+
+    :returns:   The register data with swapped bytes
+    :rtype:     bytearray
+    """
+    swapped = bytearray(len(data))
+
+    for idx in range(0, len(data) - 1, 2):
+        swapped[idx] = data[idx + 1]
+        swapped[idx + 1] = data[idx]
+
+    return swapped
+
+
+def register_count(dtype: str, count: int = 1) -> int:
+    """
+    Get the number of registers used by values of a data type
+
+    :param      dtype:  The data type, e.g. float32
+    :type       dtype:  str
+    :param      count:  The number of values
+    :type       count:  int
+
+    :returns:   The number of registers
+    :rtype:     int
+    """
+    return _get_dtype(dtype)[1] * count
+
+
+def decode(data: bytes,
+           dtype: str,
+           order: str = 'ABCD') -> Tuple[Union[int, float], ...]:
+    """
+    Decode the data of consecutive registers into values
+
+    :param      data:   The register data as received, big endian registers
+    :type       data:   bytes
+    :param      dtype:  The data type, e.g. float32
+    :type       dtype:  str
+    :param      order:  The byte and word order, e.g. ABCD
+    :type       order:  str
+
+    :returns:   The values
+    :rtype:     Tuple[Union[int, float], ...]
+
+    :raises     ValueError:  Data is not a multiple of the data type size
+    """
+    fmt, registers = _get_dtype(dtype)
+    byteorder, swap = _get_order(order)
+
+    count, remainder = divmod(len(data), 2 * registers)
+    if remainder:
+        raise ValueError('{} bytes are no multiple of {}'.
+                         format(len(data), dtype))
+
+    if swap:
+        data = swap_bytes(data)
+
+    return struct.unpack(byteorder + fmt * count, data)
+
+
+def encode(values: List[Union[int, float]],
+           dtype: str,
+           order: str = 'ABCD') -> bytes:
+    """
+    Encode values into the data of consecutive registers
+
+    :param      values:  The values
+    :type       values:  List[Union[int, float]]
+    :param      dtype:   The data type, e.g. float32
+    :type       dtype:   str
+    :param      order:   The byte and word order, e.g. ABCD
+    :type       order:   str
+
+    :returns:   The register data to be sent, big endian registers
+    :rtype:     bytes
+    """
+    fmt, _ = _get_dtype(dtype)
+    byteorder, swap = _get_order(order)
+
+    data = struct.pack(byteorder + fmt * len(values), *values)
+
+    if swap:
+        return bytes(swap_bytes(data))
+
+    return data
+
+
+def to_registers(data: bytes) -> List[int]:
+    """
+    Convert register data into unsigned register values
+
+    :param      data:  The register data, big endian registers
+    :type       data:  bytes
+
+    :returns:   The register values
+    :rtype:     List[int]
+    """
+    return list(struct.unpack('>' + 'H' * (len(data) // 2), data))
+
+
+def from_registers(registers: List[int]) -> bytes:
+    """
+    Convert register values into register data
+
+    :param      registers:  The signed or unsigned register values
+    :type       registers:  List[int]
+
+    :returns:   The register data, big endian registers
+    :rtype:     bytes
+    """
+    return struct.pack('>' + 'H' * len(registers),
+                       *[register & 0xFFFF for register in registers])
+
+
+def decode_registers(registers: List[int],
+                     dtype: str,
+                     order: str = 'ABCD') -> Tuple[Union[int, float], ...]:
+    """
+    Decode register values into values of a data type
+
+    :param      registers:  The signed or unsigned register values
+    :type       registers:  List[int]
+    :param      dtype:      The data type, e.g. float32
+    :type       dtype:      str
+    :param      order:      The byte and word order, e.g. ABCD
+    :type       order:      str
+
+    :returns:   The values
+    :rtype:     Tuple[Union[int, float], ...]
+    """
+    return decode(data=from_registers(registers), dtype=dtype, order=order)
+
+
+def encode_registers(values: List[Union[int, float]],
+                     dtype: str,
+                     order: str = 'ABCD') -> List[int]:
+    """
+    Encode values of a data type into unsigned register values
+
+    The register values can be written with signed=False.
+
+    :param      values:  The values
+    :type       values:  List[Union[int, float]]
+    :param      dtype:   The data type, e.g. float32
+    :type       dtype:   str
+    :param      order:   The byte and word order, e.g. ABCD
+    :type       order:   str
+
+    :returns:   The register values
+    :rtype:     List[int]
+    """
+    return to_registers(encode(values=values, dtype=dtype, order=order))
+
+
+def decode_string(data: bytes, order: str = 'ABCD') -> str:
+    """
+    Decode the data of consecutive registers into an ASCII string
+
+    Two characters are stored in each register, the first one in the high
+    byte. The orders BADC and DCBA store the first one in the low byte. The
+    string ends at the first NUL character, trailing spaces are removed.
+
+    :param      data:   The register data as received, big endian registers
+    :type       data:   bytes
+    :param      order:  The byte and word order, e.g. ABCD
+    :type       order:  str
+
+    :returns:   The string
+    :rtype:     str
+    """
+    _get_order(order)
+
+    if order in ['BADC', 'DCBA']:
+        data = swap_bytes(data)
+
+    end = bytes(data).find(b'\x00')
+    if end >= 0:
+        data = data[:end]
+
+    return bytes(data).decode().rstrip(' ')
+
+
+def encode_string(text: str, register_qty: int, order: str = 'ABCD') -> bytes:
+    """
+    Encode an ASCII string into the data of consecutive registers
+
+    The string is padded with NUL characters to the number of registers.
+
+    :param      text:          The string
+    :type       text:          str
+    :param      register_qty:  The number of registers
+    :type       register_qty:  int
+    :param      order:         The byte and word order, e.g. ABCD
+    :type       order:         str
+
+    :returns:   The register data to be sent, big endian registers
+    :rtype:     bytes
+
+    :raises     ValueError:  The string exceeds the registers
+    """
+    _get_order(order)
+
+    data = text.encode()
+    if len(data) > 2 * register_qty:
+        raise ValueError('{} characters exceed {} registers'.
+                         format(len(data), register_qty))
+
+    data = data + bytes(2 * register_qty - len(data))
+
+    if order in ['BADC', 'DCBA']:
+        return bytes(swap_bytes(data))
+
+    return data
+
+
+def decode_data(data: bytes,
+                dtype: str,
+                order: str = 'ABCD'
+                ) -> Union[str, Tuple[Union[int, float], ...]]:
+    """
+    Decode the data of consecutive registers into values or a string
+
+    :param      data:   The register data as received, big endian registers
+    :type       data:   bytes
+    :param      dtype:  The data type, e.g. float32, or string
+    :type       dtype:  str
+    :param      order:  The byte and word order, e.g. ABCD
+    :type       order:  str
+
+    :returns:   The values or the string
+    :rtype:     Union[str, Tuple[Union[int, float], ...]]
+    """
+    if dtype == STRING:
+        return decode_string(data=data, order=order)
+
+    return decode(data=data, dtype=dtype, order=order)
@@ -9,14 +9,16 @@
 #
 
 # system packages
+from array import array
 import struct
 
 # custom packages
+from . import codec
 from . import const as Const
 from . import functions
 
 # typing not natively supported on MicroPython
-from .typing import List, Optional, Tuple, Union
+from .typing import List, Optional, Union
 
 
 class Request(object):
@@ -109,10 +111,380 @@ class ModbusException(Exception):
 
 
 class CommonModbusFunctions(object):
-    """Common Modbus functions"""
+    """
+    Common Modbus functions
+
+    The functions build the request PDUs and pass them together with a parser
+    of the responses to _transact or _transact_many. Hosts send the requests
+    with _send_receive, asynchronous hosts override both with coroutines, so
+    the same functions return awaitables there.
+    """
     def __init__(self):
         pass
 
+    def _transact(self,
+                  slave_addr: int,
+                  modbus_pdu: bytes,
+                  count: bool,
+                  parse):
+        """
+        Send a modbus message and parse the response.
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      modbus_pdu:  The modbus Protocol Data Unit
+        :type       modbus_pdu:  bytes
+        :param      count:       The count
+        :type       count:       bool
+        :param      parse:       The parser of the validated response content
+        :type       parse:       Callable[[Optional[bytes]], Any]
+
+        :returns:   The parsed response
+        :rtype:     Any
+        """
+        return parse(self._send_receive(slave_addr=slave_addr,
+                                        modbus_pdu=modbus_pdu,
+                                        count=count))
+
+    def _transact_many(self,
+                       slave_addr: int,
+                       modbus_pdus: List[bytes],
+                       count: bool,
+                       parse):
+        """
+        Send several modbus messages and parse the responses.
+
+        :param      slave_addr:   The slave address
+        :type       slave_addr:   int
+        :param      modbus_pdus:  The modbus Protocol Data Units
+        :type       modbus_pdus:  List[bytes]
+        :param      count:        The count
+        :type       count:        bool
+        :param      parse:        The parser of the validated response
+                                  contents of all messages
+        :type       parse:        Callable[[List[bytes]], Any]
+
+        :returns:   The parsed responses
+        :rtype:     Any
+        """
+        return parse(self._send_receive_many(slave_addr=slave_addr,
+                                             modbus_pdus=modbus_pdus,
+                                             count=count))
+
+    def _send_receive_many(self,
+                           slave_addr: int,
+                           modbus_pdus: List[bytes],
+                           count: bool) -> List[bytes]:
+        """
+        Send several modbus messages and receive the responses.
+
+        The messages are sent one after another. Transports supporting
+        pipelining send further messages before the responses are received.
+
+        :param      slave_addr:   The slave address
+        :type       slave_addr:   int
+        :param      modbus_pdus:  The modbus Protocol Data Units
+        :type       modbus_pdus:  List[bytes]
+        :param      count:        The count
+        :type       count:        bool
+
+        :returns:   Validated response content of each message
+        :rtype:     List[bytes]
+        """
+        return [self._send_receive(slave_addr=slave_addr,
+                                   modbus_pdu=modbus_pdu,
+                                   count=count)
+                for modbus_pdu in modbus_pdus]
+
+    def _read_bits_range(self,
+                         function,
+                         slave_addr: int,
+                         starting_addr: int,
+                         bit_qty: int) -> array:
+        """
+        Read any amount of coils or discrete inputs
+
+        :param      function:       The function creating the request PDU
+        :type       function:       Callable[[int, int], bytes]
+        :param      slave_addr:     The slave address
+        :type       slave_addr:     int
+        :param      starting_addr:  The starting address
+        :type       starting_addr:  int
+        :param      bit_qty:        The amount of bits to read
+        :type       bit_qty:        int
+
+        :returns:   State of the bits, 0 or 1
+        :rtype:     array
+        """
+        ranges = functions.split_range(starting_address=starting_addr,
+                                       quantity=bit_qty,
+                                       max_quantity=Const.MAX_READ_BITS)
+        modbus_pdus = [function(starting_address=address, quantity=quantity)
+                       for address, quantity in ranges]
+
+        def parse(responses: List[bytes]) -> array:
+            result = array('B', bytearray(bit_qty))
+            offset = 0
+            for (_, quantity), response in zip(ranges, responses):
+                offset += functions.bytes_to_bool_into(byte_list=response,
+                                                       bit_qty=quantity,
+                                                       out=result,
+                                                       offset=offset)
+
+            return result
+
+        return self._transact_many(slave_addr=slave_addr,
+                                   modbus_pdus=modbus_pdus,
+                                   count=True,
+                                   parse=parse)
+
+    def _read_registers_range(self,
+                              function,
+                              slave_addr: int,
+                              starting_addr: int,
+                              register_qty: int,
+                              signed: bool) -> array:
+        """
+        Read any amount of holding or input registers
+
+        :param      function:       The function creating the request PDU
+        :type       function:       Callable[[int, int], bytes]
+        :param      slave_addr:     The slave address
+        :type       slave_addr:     int
+        :param      starting_addr:  The starting address
+        :type       starting_addr:  int
+        :param      register_qty:   The amount of registers to read
+        :type       register_qty:   int
+        :param      signed:         Indicates if signed
+        :type       signed:         bool
+
+        :returns:   The register values
+        :rtype:     array
+        """
+        ranges = functions.split_range(starting_address=starting_addr,
+                                       quantity=register_qty,
+                                       max_quantity=Const.MAX_READ_REGISTERS)
+        modbus_pdus = [function(starting_address=address, quantity=quantity)
+                       for address, quantity in ranges]
+
+        def parse(responses: List[bytes]) -> array:
+            result = array('h' if signed else 'H', [0] * register_qty)
+            offset = 0
+            for response in responses:
+                offset += functions.to_short_into(byte_array=response,
+                                                  out=result,
+                                                  offset=offset,
+                                                  signed=signed)
+
+            return result
+
+        return self._transact_many(slave_addr=slave_addr,
+                                   modbus_pdus=modbus_pdus,
+                                   count=True,
+                                   parse=parse)
+
+    def read_coils_range(self,
+                         slave_addr: int,
+                         starting_addr: int,
+                         coil_qty: int) -> array:
+        """
+        Read any amount of coils (COILS) with as many requests as required.
+
+        :param      slave_addr:     The slave address
+        :type       slave_addr:     int
+        :param      starting_addr:  The coil starting address
+        :type       starting_addr:  int
+        :param      coil_qty:       The amount of coils to read
+        :type       coil_qty:       int
+
+        :returns:   State of read coils, 0 or 1
+        :rtype:     array
+        """
+        return self._read_bits_range(function=functions.read_coils,
+                                     slave_addr=slave_addr,
+                                     starting_addr=starting_addr,
+                                     bit_qty=coil_qty)
+
+    def read_discrete_inputs_range(self,
+                                   slave_addr: int,
+                                   starting_addr: int,
+                                   input_qty: int) -> array:
+        """
+        Read any amount of discrete inputs (ISTS) with as many requests as
+        required.
+
+        :param      slave_addr:     The slave address
+        :type       slave_addr:     int
+        :param      starting_addr:  The discrete input starting address
+        :type       starting_addr:  int
+        :param      input_qty:      The amount of discrete inputs to read
+        :type       input_qty:      int
+
+        :returns:   State of read discrete inputs, 0 or 1
+        :rtype:     array
+        """
+        return self._read_bits_range(function=functions.read_discrete_inputs,
+                                     slave_addr=slave_addr,
+                                     starting_addr=starting_addr,
+                                     bit_qty=input_qty)
+
+    def read_holding_registers_range(self,
+                                     slave_addr: int,
+                                     starting_addr: int,
+                                     register_qty: int,
+                                     signed: bool = True) -> array:
+        """
+        Read any amount of holding registers (HREGS) with as many requests as
+        required.
+
+        :param      slave_addr:     The slave address
+        :type       slave_addr:     int
+        :param      starting_addr:  The holding register starting address
+        :type       starting_addr:  int
+        :param      register_qty:   The amount of holding registers to read
+        :type       register_qty:   int
+        :param      signed:         Indicates if signed
+        :type       signed:         bool
+
+        :returns:   Values of read holding registers, array of type h or H
+        :rtype:     array
+        """
+        return self._read_registers_range(
+            function=functions.read_holding_registers,
+            slave_addr=slave_addr,
+            starting_addr=starting_addr,
+            register_qty=register_qty,
+            signed=signed)
+
+    def read_input_registers_range(self,
+                                   slave_addr: int,
+                                   starting_addr: int,
+                                   register_qty: int,
+                                   signed: bool = True) -> array:
+        """
+        Read any amount of input registers (IREGS) with as many requests as
+        required.
+
+        :param      slave_addr:     The slave address
+        :type       slave_addr:     int
+        :param      starting_addr:  The input register starting address
+        :type       starting_addr:  int
+        :param      register_qty:   The amount of input registers to read
+        :type       register_qty:   int
+        :param      signed:         Indicates if signed
+        :type       signed:         bool
+
+        :returns:   Values of read input registers, array of type h or H
+        :rtype:     array
+        """
+        return self._read_registers_range(
+            function=functions.read_input_registers,
+            slave_addr=slave_addr,
+            starting_addr=starting_addr,
+            register_qty=register_qty,
+            signed=signed)
+
+    def write_multiple_coils_range(
+            self,
+            slave_addr: int,
+            starting_address: int,
+            output_values: List[Union[int, bool]]) -> bool:
+        """
+        Update any amount of coils with as many requests as required.
+
+        :param      slave_addr:        The slave address
+        :type       slave_addr:        int
+        :param      starting_address:  The address of the first coil
+        :type       starting_address:  int
+        :param      output_values:     The output values
+        :type       output_values:     List[Union[int, bool]]
+
+        :returns:   Result of operation, True if all requests succeeded
+        :rtype:     bool
+        """
+        ranges = functions.split_range(starting_address=starting_address,
+                                       quantity=len(output_values),
+                                       max_quantity=Const.MAX_WRITE_BITS)
+        modbus_pdus = [
+            functions.write_multiple_coils(
+                starting_address=address,
+                value_list=output_values[address - starting_address:
+                                         address - starting_address + qty])
+            for address, qty in ranges]
+
+        def parse(responses: List[Optional[bytes]]) -> bool:
+            for (address, qty), response in zip(ranges, responses):
+                if response is None:
+                    # broadcasts are not answered by the slaves
+                    if slave_addr != Const.BROADCAST_ADDR:
+                        return False
+                elif not functions.validate_resp_data(
+                        data=response,
+                        function_code=Const.WRITE_MULTIPLE_COILS,
+                        address=address,
+                        quantity=qty):
+                    return False
+
+            return True
+
+        return self._transact_many(slave_addr=slave_addr,
+                                   modbus_pdus=modbus_pdus,
+                                   count=False,
+                                   parse=parse)
+
+    def write_multiple_registers_range(self,
+                                       slave_addr: int,
+                                       starting_address: int,
+                                       register_values: List[int],
+                                       signed: bool = True) -> bool:
+        """
+        Update any amount of registers with as many requests as required.
+
+        :param      slave_addr:        The slave address
+        :type       slave_addr:        int
+        :param      starting_address:  The starting address
+        :type       starting_address:  int
+        :param      register_values:   The register values
+        :type       register_values:   List[int]
+        :param      signed:            Indicates if signed
+        :type       signed:            bool
+
+        :returns:   Result of operation, True if all requests succeeded
+        :rtype:     bool
+        """
+        ranges = functions.split_range(starting_address=starting_address,
+                                       quantity=len(register_values),
+                                       max_quantity=Const.MAX_WRITE_REGISTERS)
+        modbus_pdus = [
+            functions.write_multiple_registers(
+                starting_address=address,
+                register_values=register_values[address - starting_address:
+                                                address - starting_address +
+                                                qty],
+                signed=signed)
+            for address, qty in ranges]
+
+        def parse(responses: List[Optional[bytes]]) -> bool:
+            for (address, qty), response in zip(ranges, responses):
+                if response is None:
+                    # broadcasts are not answered by the slaves
+                    if slave_addr != Const.BROADCAST_ADDR:
+                        return False
+                elif not functions.validate_resp_data(
+                        data=response,
+                        function_code=Const.WRITE_MULTIPLE_REGISTERS,
+                        address=address,
+                        quantity=qty,
+                        signed=signed):
+                    return False
+
+            return True
+
+        return self._transact_many(slave_addr=slave_addr,
+                                   modbus_pdus=modbus_pdus,
+                                   count=False,
+                                   parse=parse)
+
     def read_coils(self,
                    slave_addr: int,
                    starting_addr: int,
@@ -133,14 +505,16 @@ class CommonModbusFunctions(object):
         modbus_pdu = functions.read_coils(starting_address=starting_addr,
                                           quantity=coil_qty)
 
-        response = self._send_receive(slave_addr=slave_addr,
-                                      modbus_pdu=modbus_pdu,
-                                      count=True)
+        def parse(response: Optional[bytes]) -> List[bool]:
+            status_pdu = functions.bytes_to_bool(byte_list=response,
+                                                 bit_qty=coil_qty)
 
-        status_pdu = functions.bytes_to_bool(byte_list=response,
-                                             bit_qty=coil_qty)
+            return status_pdu
 
-        return status_pdu
+        return self._transact(slave_addr=slave_addr,
+                              modbus_pdu=modbus_pdu,
+                              count=True,
+                              parse=parse)
 
     def read_discrete_inputs(self,
                              slave_addr: int,
@@ -163,20 +537,24 @@ class CommonModbusFunctions(object):
             starting_address=starting_addr,
             quantity=input_qty)
 
-        response = self._send_receive(slave_addr=slave_addr,
-                                      modbus_pdu=modbus_pdu,
-                                      count=True)
+        def parse(response: Optional[bytes]) -> List[bool]:
+            status_pdu = functions.bytes_to_bool(byte_list=response,
+                                                 bit_qty=input_qty)
 
-        status_pdu = functions.bytes_to_bool(byte_list=response,
-                                             bit_qty=input_qty)
+            return status_pdu
 
-        return status_pdu
+        return self._transact(slave_addr=slave_addr,
+                              modbus_pdu=modbus_pdu,
+                              count=True,
+                              parse=parse)
 
     def read_holding_registers(self,
                                slave_addr: int,
                                starting_addr: int,
                                register_qty: int,
-                               signed: bool = True) -> Tuple[int, ...]:
+                               signed: bool = True,
+                               dtype: Optional[str] = None,
+                               order: str = 'ABCD') -> Union[tuple, str]:
         """
         Read holding registers (HREGS).
 
@@ -188,27 +566,43 @@ class CommonModbusFunctions(object):
         :type       register_qty:   int
         :param      signed:         Indicates if signed
         :type       signed:         bool
-
-        :returns:   State of read holding register as tuple
-        :rtype:     Tuple[int, ...]
+        :param      dtype:          The data type of the values, e.g. float32
+                                    or string, see umodbus.codec
+        :type       dtype:          Optional[str]
+        :param      order:          The byte and word order of the values
+        :type       order:          str
+
+        :returns:   State of read holding register as tuple, or
+                    the decoded values or string if a data type is given
+        :rtype:     Union[Tuple[Union[int, float], ...], str]
         """
         modbus_pdu = functions.read_holding_registers(
             starting_address=starting_addr,
             quantity=register_qty)
 
-        response = self._send_receive(slave_addr=slave_addr,
-                                      modbus_pdu=modbus_pdu,
-                                      count=True)
+        def parse(response: Optional[bytes]) -> Union[tuple, str]:
+            if dtype is not None:
+                return codec.decode_data(data=response,
+                                         dtype=dtype,
+                                         order=order)
+
+            register_value = functions.to_short(byte_array=response,
+                                                signed=signed)
 
-        register_value = functions.to_short(byte_array=response, signed=signed)
+            return register_value
 
-        return register_value
+        return self._transact(slave_addr=slave_addr,
+                              modbus_pdu=modbus_pdu,
+                              count=True,
+                              parse=parse)
 
     def read_input_registers(self,
                              slave_addr: int,
                              starting_addr: int,
                              register_qty: int,
-                             signed: bool = True) -> Tuple[int, ...]:
+                             signed: bool = True,
+                             dtype: Optional[str] = None,
+                             order: str = 'ABCD') -> Union[tuple, str]:
         """
         Read input registers (IREGS).
 
@@ -220,21 +614,209 @@ class CommonModbusFunctions(object):
         :type       register_qty:   int
         :param      signed:         Indicates if signed
         :type       signed:         bool
-
-        :returns:   State of read input register as tuple
-        :rtype:     Tuple[int, ...]
+        :param      dtype:          The data type of the values, e.g. float32
+                                    or string, see umodbus.codec
+        :type       dtype:          Optional[str]
+        :param      order:          The byte and word order of the values
+        :type       order:          str
+
+        :returns:   State of read input register as tuple, or
+                    the decoded values or string if a data type is given
+        :rtype:     Union[Tuple[Union[int, float], ...], str]
         """
         modbus_pdu = functions.read_input_registers(
             starting_address=starting_addr,
             quantity=register_qty)
 
-        response = self._send_receive(slave_addr=slave_addr,
-                                      modbus_pdu=modbus_pdu,
-                                      count=True)
+        def parse(response: Optional[bytes]) -> Union[tuple, str]:
+            if dtype is not None:
+                return codec.decode_data(data=response,
+                                         dtype=dtype,
+                                         order=order)
 
-        register_value = functions.to_short(byte_array=response, signed=signed)
+            register_value = functions.to_short(byte_array=response,
+                                                signed=signed)
 
-        return register_value
+            return register_value
+
+        return self._transact(slave_addr=slave_addr,
+                              modbus_pdu=modbus_pdu,
+                              count=True,
+                              parse=parse)
+
+    def read_coils_into(self,
+                        slave_addr: int,
+                        starting_addr: int,
+                        coil_qty: int,
+                        out,
+                        offset: int = 0) -> int:
+        """
+        Read coils (COILS) into a buffer.
+
+        The states are stored as 0 or 1, e.g. into an array or bytearray.
+
+        :param      slave_addr:     The slave address
+        :type       slave_addr:     int
+        :param      starting_addr:  The coil starting address
+        :type       starting_addr:  int
+        :param      coil_qty:       The amount of coils to read
+        :type       coil_qty:       int
+        :param      out:            The writable buffer
+        :type       out:            Union[array, bytearray]
+        :param      offset:         The index of the first value in the buffer
+        :type       offset:         int
+
+        :returns:   Number of values stored
+        :rtype:     int
+        """
+        modbus_pdu = functions.read_coils(
+            starting_address=starting_addr,
+            quantity=coil_qty)
+
+        def parse(response: Optional[bytes]) -> int:
+            return functions.bytes_to_bool_into(byte_list=response,
+                                                bit_qty=coil_qty,
+                                                out=out,
+                                                offset=offset)
+
+        return self._transact(slave_addr=slave_addr,
+                              modbus_pdu=modbus_pdu,
+                              count=True,
+                              parse=parse)
+
+    def read_discrete_inputs_into(self,
+                                  slave_addr: int,
+                                  starting_addr: int,
+                                  input_qty: int,
+                                  out,
+                                  offset: int = 0) -> int:
+        """
+        Read discrete inputs (ISTS) into a buffer.
+
+        The states are stored as 0 or 1, e.g. into an array or bytearray.
+
+        :param      slave_addr:     The slave address
+        :type       slave_addr:     int
+        :param      starting_addr:  The discrete input starting address
+        :type       starting_addr:  int
+        :param      input_qty:      The amount of discrete inputs to read
+        :type       input_qty:      int
+        :param      out:            The writable buffer
+        :type       out:            Union[array, bytearray]
+        :param      offset:         The index of the first value in the buffer
+        :type       offset:         int
+
+        :returns:   Number of values stored
+        :rtype:     int
+        """
+        modbus_pdu = functions.read_discrete_inputs(
+            starting_address=starting_addr,
+            quantity=input_qty)
+
+        def parse(response: Optional[bytes]) -> int:
+            return functions.bytes_to_bool_into(byte_list=response,
+                                                bit_qty=input_qty,
+                                                out=out,
+                                                offset=offset)
+
+        return self._transact(slave_addr=slave_addr,
+                              modbus_pdu=modbus_pdu,
+                              count=True,
+                              parse=parse)
+
+    def read_holding_registers_into(self,
+                                    slave_addr: int,
+                                    starting_addr: int,
+                                    register_qty: int,
+                                    out,
+                                    offset: int = 0,
+                                    signed: bool = True,
+                                    byteswap: bool = False) -> int:
+        """
+        Read holding registers (HREGS) into a buffer.
+
+        See functions.to_short_into for the supported buffers.
+
+        :param      slave_addr:     The slave address
+        :type       slave_addr:     int
+        :param      starting_addr:  The holding register starting address
+        :type       starting_addr:  int
+        :param      register_qty:   The amount of holding registers to read
+        :type       register_qty:   int
+        :param      out:            The writable buffer
+        :type       out:            Union[array, bytearray, memoryview]
+        :param      offset:         The index of the first value in the buffer
+        :type       offset:         int
+        :param      signed:         Indicates if signed
+        :type       signed:         bool
+        :param      byteswap:       Copy and swap bytes instead of converting
+        :type       byteswap:       bool
+
+        :returns:   Number of values stored
+        :rtype:     int
+        """
+        modbus_pdu = functions.read_holding_registers(
+            starting_address=starting_addr,
+            quantity=register_qty)
+
+        def parse(response: Optional[bytes]) -> int:
+            return functions.to_short_into(byte_array=response,
+                                           out=out,
+                                           offset=offset,
+                                           signed=signed,
+                                           byteswap=byteswap)
+
+        return self._transact(slave_addr=slave_addr,
+                              modbus_pdu=modbus_pdu,
+                              count=True,
+                              parse=parse)
+
+    def read_input_registers_into(self,
+                                  slave_addr: int,
+                                  starting_addr: int,
+                                  register_qty: int,
+                                  out,
+                                  offset: int = 0,
+                                  signed: bool = True,
+                                  byteswap: bool = False) -> int:
+        """
+        Read input registers (IREGS) into a buffer.
+
+        See functions.to_short_into for the supported buffers.
+
+        :param      slave_addr:     The slave address
+        :type       slave_addr:     int
+        :param      starting_addr:  The input register starting address
+        :type       starting_addr:  int
+        :param      register_qty:   The amount of input registers to read
+        :type       register_qty:   int
+        :param      out:            The writable buffer
+        :type       out:            Union[array, bytearray, memoryview]
+        :param      offset:         The index of the first value in the buffer
+        :type       offset:         int
+        :param      signed:         Indicates if signed
+        :type       signed:         bool
+        :param      byteswap:       Copy and swap bytes instead of converting
+        :type       byteswap:       bool
+
+        :returns:   Number of values stored
+        :rtype:     int
+        """
+        modbus_pdu = functions.read_input_registers(
+            starting_address=starting_addr,
+            quantity=register_qty)
+
+        def parse(response: Optional[bytes]) -> int:
+            return functions.to_short_into(byte_array=response,
+                                           out=out,
+                                           offset=offset,
+                                           signed=signed,
+                                           byteswap=byteswap)
+
+        return self._transact(slave_addr=slave_addr,
+                              modbus_pdu=modbus_pdu,
+                              count=True,
+                              parse=parse)
 
     def write_single_coil(self,
                           slave_addr: int,
@@ -256,21 +838,24 @@ class CommonModbusFunctions(object):
         modbus_pdu = functions.write_single_coil(output_address=output_address,
                                                  output_value=output_value)
 
-        response = self._send_receive(slave_addr=slave_addr,
-                                      modbus_pdu=modbus_pdu,
-                                      count=False)
+        def parse(response: Optional[bytes]) -> bool:
+            if response is None:
+                # broadcasts are not answered by the slaves
+                return slave_addr == Const.BROADCAST_ADDR
 
-        if response is None:
-            return False
+            operation_status = functions.validate_resp_data(
+                data=response,
+                function_code=Const.WRITE_SINGLE_COIL,
+                address=output_address,
+                value=output_value,
+                signed=False)
 
-        operation_status = functions.validate_resp_data(
-            data=response,
-            function_code=Const.WRITE_SINGLE_COIL,
-            address=output_address,
-            value=output_value,
-            signed=False)
+            return operation_status
 
-        return operation_status
+        return self._transact(slave_addr=slave_addr,
+                              modbus_pdu=modbus_pdu,
+                              count=False,
+                              parse=parse)
 
     def write_single_register(self,
                               slave_addr: int,
@@ -297,21 +882,24 @@ class CommonModbusFunctions(object):
             register_value=register_value,
             signed=signed)
 
-        response = self._send_receive(slave_addr=slave_addr,
-                                      modbus_pdu=modbus_pdu,
-                                      count=False)
+        def parse(response: Optional[bytes]) -> bool:
+            if response is None:
+                # broadcasts are not answered by the slaves
+                return slave_addr == Const.BROADCAST_ADDR
 
-        if response is None:
-            return False
+            operation_status = functions.validate_resp_data(
+                data=response,
+                function_code=Const.WRITE_SINGLE_REGISTER,
+                address=register_address,
+                value=register_value,
+                signed=signed)
 
-        operation_status = functions.validate_resp_data(
-            data=response,
-            function_code=Const.WRITE_SINGLE_REGISTER,
-            address=register_address,
-            value=register_value,
-            signed=signed)
+            return operation_status
 
-        return operation_status
+        return self._transact(slave_addr=slave_addr,
+                              modbus_pdu=modbus_pdu,
+                              count=False,
+                              parse=parse)
 
     def write_multiple_coils(self,
                              slave_addr: int,
@@ -334,20 +922,23 @@ class CommonModbusFunctions(object):
             starting_address=starting_address,
             value_list=output_values)
 
-        response = self._send_receive(slave_addr=slave_addr,
-                                      modbus_pdu=modbus_pdu,
-                                      count=False)
+        def parse(response: Optional[bytes]) -> bool:
+            if response is None:
+                # broadcasts are not answered by the slaves
+                return slave_addr == Const.BROADCAST_ADDR
 
-        if response is None:
-            return False
+            operation_status = functions.validate_resp_data(
+                data=response,
+                function_code=Const.WRITE_MULTIPLE_COILS,
+                address=starting_address,
+                quantity=len(output_values))
 
-        operation_status = functions.validate_resp_data(
-            data=response,
-            function_code=Const.WRITE_MULTIPLE_COILS,
-            address=starting_address,
-            quantity=len(output_values))
+            return operation_status
 
-        return operation_status
+        return self._transact(slave_addr=slave_addr,
+                              modbus_pdu=modbus_pdu,
+                              count=False,
+                              parse=parse)
 
     def write_multiple_registers(self,
                                  slave_addr: int,
@@ -374,19 +965,22 @@ class CommonModbusFunctions(object):
             register_values=register_values,
             signed=signed)
 
-        response = self._send_receive(slave_addr=slave_addr,
-                                      modbus_pdu=modbus_pdu,
-                                      count=False)
-
-        if response is None:
-            return False
-
-        operation_status = functions.validate_resp_data(
-            data=response,
-            function_code=Const.WRITE_MULTIPLE_REGISTERS,
-            address=starting_address,
-            quantity=len(register_values),
-            signed=signed
-        )
-
-        return operation_status
+        def parse(response: Optional[bytes]) -> bool:
+            if response is None:
+                # broadcasts are not answered by the slaves
+                return slave_addr == Const.BROADCAST_ADDR
+
+            operation_status = functions.validate_resp_data(
+                data=response,
+                function_code=Const.WRITE_MULTIPLE_REGISTERS,
+                address=starting_address,
+                quantity=len(register_values),
+                signed=signed
+            )
+
+            return operation_status
+
+        return self._transact(slave_addr=slave_addr,
+                              modbus_pdu=modbus_pdu,
+                              count=False,
+                              parse=parse)
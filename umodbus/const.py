@@ -104,6 +104,38 @@ FIXED_RESP_LEN = const(0x08)
 #: Modbus Application Protocol High Data Response length
 MBAP_HDR_LENGTH = const(0x07)
 
+# Protocol limits
+#: Maximum number of coils or discrete inputs of a read request
+MAX_READ_BITS = const(0x07D0)
+#: Maximum number of registers of a read request
+MAX_READ_REGISTERS = const(0x007D)
+#: Maximum number of coils of a write request
+MAX_WRITE_BITS = const(0x07B0)
+#: Maximum number of registers of a write request
+MAX_WRITE_REGISTERS = const(0x007B)
+
+# Serial line constants
+#: Broadcast address, requests are processed by all slaves without response
+BROADCAST_ADDR = const(0x00)
+#: Time in milliseconds given to the slaves to process a broadcast
+BROADCAST_TURNAROUND_DELAY = const(100)
+#: Function codes allowed for broadcasts
+BROADCAST_FUNCTION_CODES = (
+    WRITE_SINGLE_COIL,
+    WRITE_SINGLE_REGISTER,
+    WRITE_MULTIPLE_COILS,
+    WRITE_MULTIPLE_REGISTERS
+)
+
+# Host functions
+#: Read function of the host for each register type
+READ_FUNCTIONS = {
+    'COILS': 'read_coils',
+    'ISTS': 'read_discrete_inputs',
+    'HREGS': 'read_holding_registers',
+    'IREGS': 'read_input_registers',
+}
+
 #: CRC16 lookup table
 CRC16_TABLE = (
     0x0000, 0xC0C1, 0xC181, 0x0140, 0xC301, 0x03C0, 0x0280, 0xC241, 0xC601,
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Modbus CRC16 calculation
+
+Provides a bulk calculation of the CRC16 of a complete frame as well as the
+incremental :py:class:`umodbus.crc.CRC16` which is fed with the bytes as soon
+as they are received, so the CRC is known by the time the frame is complete.
+
+On MicroPython ports with native code emitters a viper implementation of
+:py:mod:`umodbus.crc_native` is used, otherwise two bytes are processed at
+once by a pure Python two table lookup.
+"""
+
+# system packages
+import struct
+
+# custom packages
+from . import const as Const
+
+# typing not natively supported on MicroPython
+from .typing import Optional
+
+#: Initial value of the Modbus CRC16
+CRC16_INIT = 0xFFFF
+
+try:
+    # the viper code emitter is not available on all ports and on CPython
+    from .crc_native import crc16_update as _crc16_update_native
+except (ImportError, AttributeError, NameError, SyntaxError):
+    _crc16_update_native = None
+
+_TABLE_LOW = Const.CRC16_TABLE
+# table for the second byte of a byte pair, the CRC table is linear regarding
+# XOR, which allows to combine two single byte steps into one lookup each
+_TABLE_HIGH = tuple((_TABLE_LOW[i] >> 8) ^ _TABLE_LOW[_TABLE_LOW[i] & 0xFF]
+                    for i in range(256))
+
+
+def _crc16_update_python(crc: int, data: bytes, start: int, end: int) -> int:
+    """
+    Update the CRC16 by processing two bytes per lookup
+
+    :param      crc:    The current CRC value
+    :type       crc:    int
+    :param      data:   The data
+    :type       data:   bytes
+    :param      start:  The index of the first byte to process
+    :type       start:  int
+    :param      end:    The index after the last byte to process
+    :type       end:    int
+
+    :returns:   The updated CRC value
+    :rtype:     int
+    """
+    table_low = _TABLE_LOW
+    table_high = _TABLE_HIGH
+
+    if (end - start) & 1:
+        crc = (crc >> 8) ^ table_low[(crc ^ data[start]) & 0xFF]
+        start += 1
+
+    for idx in range(start, end, 2):
+        crc ^= data[idx] | (data[idx + 1] << 8)
+        crc = table_high[crc & 0xFF] ^ table_low[crc >> 8]
+
+    return crc
+
+
+if _crc16_update_native is not None:
+    _crc16_update = _crc16_update_native
+else:
+    _crc16_update = _crc16_update_python
+
+
+def crc16(data: bytes, start: int = 0, end: Optional[int] = None) -> int:
+    """
+    Calculate the CRC16 of data
+
+    :param      data:   The data
+    :type       data:   bytes
+    :param      start:  The index of the first byte to use
+    :type       start:  int
+    :param      end:    The index after the last byte to use, default all
+    :type       end:    Optional[int]
+
+    :returns:   The CRC16 value
+    :rtype:     int
+    """
+    if end is None:
+        end = len(data)
+
+    return _crc16_update(CRC16_INIT, data, start, end)
+
+
+def calculate(data: bytes) -> bytes:
+    """
+    Calculate the CRC16 of data as it is appended to a Modbus frame
+
+    :param      data:  The data
+    :type       data:  bytes
+
+    :returns:   The CRC16 in little endian byte order
+    :rtype:     bytes
+    """
+    return struct.pack('<H', crc16(data))
+
+
+def is_valid(frame: bytes, length: Optional[int] = None) -> bool:
+    """
+    Check the CRC16 appended to a frame
+
+    :param      frame:   The frame including the CRC16
+    :type       frame:   bytes
+    :param      length:  The length of the frame, default all data
+    :type       length:  Optional[int]
+
+    :returns:   True if the CRC16 matches the frame content
+    :rtype:     bool
+    """
+    if length is None:
+        length = len(frame)
+
+    if length < Const.CRC_LENGTH:
+        return False
+
+    # the CRC over the data and its appended CRC is always zero
+    return crc16(frame, 0, length) == 0
+
+
+class CRC16(object):
+    """Incrementally calculated Modbus CRC16"""
+    def __init__(self) -> None:
+        self._crc = CRC16_INIT
+
+    def reset(self) -> None:
+        """Reset the CRC to the initial value to start a new frame"""
+        self._crc = CRC16_INIT
+
+    def update(self,
+               data: bytes,
+               start: int = 0,
+               end: Optional[int] = None) -> int:
+        """
+        Feed data into the CRC
+
+        :param      data:   The data
+        :type       data:   bytes
+        :param      start:  The index of the first byte to use
+        :type       start:  int
+        :param      end:    The index after the last byte to use, default all
+        :type       end:    Optional[int]
+
+        :returns:   The updated CRC value
+        :rtype:     int
+        """
+        if end is None:
+            end = len(data)
+
+        self._crc = _crc16_update(self._crc, data, start, end)
+
+        return self._crc
+
+    @property
+    def value(self) -> int:
+        """
+        Get the current CRC value
+
+        :returns:   The CRC value
+        :rtype:     int
+        """
+        return self._crc
+
+    @property
+    def is_valid(self) -> bool:
+        """
+        Get the validation status of a frame fed including its CRC
+
+        :returns:   True if the fed data ends with a matching CRC16
+        :rtype:     bool
+        """
+        return self._crc == 0
+
+    def digest(self) -> bytes:
+        """
+        Get the CRC as it is appended to a Modbus frame
+
+        :returns:   The CRC16 in little endian byte order
+        :rtype:     bytes
+        """
+        return struct.pack('<H', self._crc)
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Native Modbus CRC16 calculation
+
+Compiled by the MicroPython viper code emitter. Importing this module fails
+on CPython and on ports without native code emitters, in that case
+:py:mod:`umodbus.crc` uses its pure Python implementation.
+"""
+
+# system packages
+from array import array
+import micropython
+
+# custom packages
+from . import const as Const
+
+_TABLE = array('H', Const.CRC16_TABLE)
+
+
+@micropython.viper
+def crc16_update(crc: int, data, start: int, end: int) -> int:
+    # update the CRC16 with the bytes of data between start and end
+    buf = ptr8(data)        # noqa: F821
+    table = ptr16(_TABLE)   # noqa: F821
+
+    while start < end:
+        crc = (crc >> 8) ^ table[(crc ^ buf[start]) & 0xFF]
+        start += 1
+
+    return crc
@@ -10,12 +10,13 @@
 
 # system packages
 import struct
+import sys
 
 # custom packages
 from . import const as Const
 
 # typing not natively supported on MicroPython
-from .typing import List, Optional, Union
+from .typing import List, Optional, Tuple, Union
 
 
 def read_coils(starting_address: int, quantity: int) -> bytes:
@@ -368,6 +369,112 @@ def exception_response(function_code: int, exception_code: int) -> bytes:
     return struct.pack('>BB', Const.ERROR_BIAS + function_code, exception_code)
 
 
+def get_request_pdu_length(data: bytes, offset: int = 0) -> Optional[int]:
+    """
+    Get the expected length of a request Protocol Data Unit.
+
+    The length is derived from the function code and, for the variable length
+    write requests, from the byte count field. If not enough bytes are
+    available to determine the final length, the amount of bytes required for
+    the next evaluation is returned instead.
+
+    :param      data:    The received data
+    :type       data:    bytes
+    :param      offset:  The position of the function code inside data
+    :type       offset:  int
+
+    :returns:   Expected PDU length, None for unsupported function codes
+    :rtype:     Optional[int]
+    """
+    available = len(data) - offset
+
+    if available < 1:
+        return 1
+
+    function_code = data[offset]
+
+    if Const.READ_COILS <= function_code <= Const.WRITE_SINGLE_REGISTER:
+        # function code, address and quantity or value
+        return 5
+    elif function_code in [Const.WRITE_MULTIPLE_COILS,
+                           Const.WRITE_MULTIPLE_REGISTERS]:
+        # function code, address, quantity and byte count
+        if available < 6:
+            return 6
+
+        return 6 + data[offset + 5]
+
+    return None
+
+
+def get_response_pdu_length(data: bytes, offset: int = 0) -> Optional[int]:
+    """
+    Get the expected length of a response Protocol Data Unit.
+
+    The length is derived from the function code and, for the read responses,
+    from the byte count field. If not enough bytes are available to determine
+    the final length, the amount of bytes required for the next evaluation is
+    returned instead.
+
+    :param      data:    The received data
+    :type       data:    bytes
+    :param      offset:  The position of the function code inside data
+    :type       offset:  int
+
+    :returns:   Expected PDU length, None for unsupported function codes
+    :rtype:     Optional[int]
+    """
+    available = len(data) - offset
+
+    if available < 1:
+        return 1
+
+    function_code = data[offset]
+
+    if function_code >= Const.ERROR_BIAS:
+        # function code and exception code
+        return 2
+    elif Const.READ_COILS <= function_code <= Const.READ_INPUT_REGISTER:
+        # function code, byte count and data
+        if available < 2:
+            return 2
+
+        return 2 + data[offset + 1]
+    elif function_code in [Const.WRITE_SINGLE_COIL,
+                           Const.WRITE_SINGLE_REGISTER,
+                           Const.WRITE_MULTIPLE_COILS,
+                           Const.WRITE_MULTIPLE_REGISTERS]:
+        # function code, address and quantity or value
+        return 5
+
+    return None
+
+
+def split_range(starting_address: int,
+                quantity: int,
+                max_quantity: int) -> List[Tuple[int, int]]:
+    """
+    Split a range of registers into ranges of a maximum quantity
+
+    :param      starting_address:  The starting address
+    :type       starting_address:  int
+    :param      quantity:          The amount of registers
+    :type       quantity:          int
+    :param      max_quantity:      The maximum amount of registers per range
+    :type       max_quantity:      int
+
+    :returns:   Starting address and quantity of each range
+    :rtype:     List[Tuple[int, int]]
+    """
+    ranges = []
+
+    for offset in range(0, quantity, max_quantity):
+        ranges.append((starting_address + offset,
+                       min(max_quantity, quantity - offset)))
+
+    return ranges
+
+
 def bytes_to_bool(byte_list: bytes, bit_qty: Optional[int] = 1) -> List[bool]:
     """
     Convert bytes to list of boolean values
@@ -398,6 +505,116 @@ def bytes_to_bool(byte_list: bytes, bit_qty: Optional[int] = 1) -> List[bool]:
     return bool_list
 
 
+def bytes_to_bool_into(byte_list: bytes,
+                       bit_qty: int,
+                       out,
+                       offset: int = 0) -> int:
+    """
+    Convert bytes to boolean values stored in a buffer
+
+    The bits are stored as 0 or 1 in the same order as by bytes_to_bool,
+    without allocating any objects.
+
+    :param      byte_list:  The byte list
+    :type       byte_list:  bytes
+    :param      bit_qty:    Amount of bits received
+    :type       bit_qty:    int
+    :param      out:        The writable buffer, e.g. an array or bytearray
+    :type       out:        array
+    :param      offset:     The index of the first value in the buffer
+    :type       offset:     int
+
+    :returns:   Number of values stored
+    :rtype:     int
+    """
+    for idx in range(bit_qty):
+        # the last byte contains only the remaining bits
+        byte_bits = min(8, bit_qty - (idx & ~7))
+        out[offset + idx] = \
+            (byte_list[idx >> 3] >> (byte_bits - 1 - (idx & 7))) & 1
+
+    return bit_qty
+
+
+def _byte_view(buf) -> memoryview:
+    """
+    Get a writable view on the bytes of a buffer with 16 bit items
+
+    :param      buf:  The buffer, e.g. an array of type h or H
+    :type       buf:  array
+
+    :returns:   The bytes of the buffer
+    :rtype:     memoryview
+    """
+    view = memoryview(buf)
+
+    if hasattr(view, 'cast'):
+        return view.cast('B')
+
+    # MicroPython provides no cast, address the memory of the buffer
+    import uctypes
+    return uctypes.bytearray_at(uctypes.addressof(buf), 2 * len(buf))
+
+
+def to_short_into(byte_array: bytes,
+                  out,
+                  offset: int = 0,
+                  signed: bool = True,
+                  byteswap: bool = False) -> int:
+    """
+    Convert bytes to integer values stored in a buffer
+
+    Buffers of bytes, like a bytearray, receive the register data as it is
+    transmitted, two bytes per register in big endian order, starting at
+    twice the offset. Other buffers, like an array or a numpy array, receive
+    one value per register. With byteswap the register data is copied to
+    the memory of a buffer with 16 bit items and swapped in place to the byte
+    order of the host without format strings or a tuple of the values, so
+    the signedness is defined by the type of the buffer.
+
+    :param      byte_array:  The byte array
+    :type       byte_array:  bytes
+    :param      out:         The writable buffer
+    :type       out:         Union[array, bytearray, memoryview]
+    :param      offset:      The index of the first register in the buffer
+    :type       offset:      int
+    :param      signed:      Indicates if signed
+    :type       signed:      bool
+    :param      byteswap:    Copy and swap bytes instead of converting values
+    :type       byteswap:    bool
+
+    :returns:   Number of registers stored
+    :rtype:     int
+    """
+    quantity = len(byte_array) >> 1
+
+    if isinstance(out, bytearray) or getattr(out, 'itemsize', None) == 1:
+        out[2 * offset:2 * (offset + quantity)] = byte_array
+        return quantity
+
+    if byteswap:
+        start = 2 * offset
+        end = start + 2 * quantity
+        view = _byte_view(out)
+        view[start:end] = byte_array
+
+        if sys.byteorder == 'little':
+            for idx in range(start, end, 2):
+                view[idx], view[idx + 1] = view[idx + 1], view[idx]
+
+        return quantity
+
+    for idx in range(quantity):
+        value = (byte_array[2 * idx] << 8) | byte_array[2 * idx + 1]
+
+        if signed and value & 0x8000:
+            value -= 0x10000
+
+        out[offset + idx] = value
+
+    return quantity
+
+
 def to_short(byte_array: bytes, signed: bool = True) -> bytes:
     """
     Convert bytes to tuple of integer values
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Modbus TCP hedged reads
+
+Reads registers from redundant servers exposing identical register maps, like
+PLC pairs or duplicated gateways. A read is sent to the primary server. If it
+has not answered within the usual response time, given by a percentile of the
+recent response times, the read is also sent to the secondary server and the
+first valid response is used. Only slow reads are duplicated, so the load
+stays nearly the same while the latency of the slowest reads drops. Writes
+are sent to the primary server only.
+"""
+
+# system packages
+import select
+import struct
+
+# custom packages
+from .common import CommonModbusFunctions
+from .ticks import ticks_diff, ticks_ms, ticks_us
+from .transaction import READ_FUNCTION_CODES
+
+# typing not natively supported on MicroPython
+from .typing import Optional
+
+
+class HedgedClient(CommonModbusFunctions):
+    """
+    Modbus TCP host reading from the first responding redundant server
+
+    The response time percentile is taken from the latest valid responses,
+    each measured from sending the request to its server. Until enough
+    responses are measured, the initial delay is used. Reads wait for the
+    responses as long as the timeout of the primary host, without a deadline
+    if it is blocking.
+
+    :param      endpoints:     The hosts of the equivalent servers, primary
+                               first
+    :type       endpoints:     List[TCP]
+    :param      delay_ms:      Initial delay until a read is hedged
+    :type       delay_ms:      int
+    :param      percentile:    Percentile of the response times used as delay
+    :type       percentile:    int
+    :param      min_delay_ms:  Minimum delay
+    :type       min_delay_ms:  int
+    :param      max_delay_ms:  Maximum delay
+    :type       max_delay_ms:  int
+    :param      samples:       Number of response times kept
+    :type       samples:       int
+
+    :raises     ValueError:    Less than two endpoints given
+    """
+    def __init__(self,
+                 endpoints: list,
+                 delay_ms: int = 50,
+                 percentile: int = 95,
+                 min_delay_ms: int = 1,
+                 max_delay_ms: int = 1000,
+                 samples: int = 64) -> None:
+        if len(endpoints) < 2:
+            raise ValueError('at least two endpoints required')
+
+        self._endpoints = endpoints
+        self._delay_ms = delay_ms
+        self._percentile = percentile
+        self._min_delay_ms = min_delay_ms
+        self._max_delay_ms = max_delay_ms
+
+        # ring buffer of the latest response times in microseconds
+        self._rtts = [0] * samples
+        self._rtt_count = 0
+
+        self._requests = 0
+        self._hedged = 0
+        self._secondary_wins = 0
+
+    @property
+    def delay(self) -> int:
+        """
+        Get the delay until a read is hedged
+
+        :returns:   The delay in milliseconds
+        :rtype:     int
+        """
+        count = min(self._rtt_count, len(self._rtts))
+
+        if count < 8:
+            return self._delay_ms
+
+        rtts = sorted(self._rtts[:count])
+        index = min(count - 1, (count * self._percentile) // 100)
+        delay = (rtts[index] + 999) // 1000
+
+        return max(self._min_delay_ms, min(delay, self._max_delay_ms))
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Get the number of reads, hedged reads and reads answered first by the
+        secondary server
+
+        :returns:   The counters and the current delay in milliseconds
+        :rtype:     dict
+        """
+        return {
+            'requests': self._requests,
+            'hedged': self._hedged,
+            'secondary_wins': self._secondary_wins,
+            'delay': self.delay,
+        }
+
+    def _record_rtt(self, rtt: int) -> None:
+        """
+        Record the response time of a valid response
+
+        :param      rtt:  The response time in microseconds
+        :type       rtt:  int
+        """
+        self._rtts[self._rtt_count % len(self._rtts)] = rtt
+        self._rtt_count += 1
+
+    def _send(self,
+              pending: dict,
+              poller,
+              index: int,
+              slave_addr: int,
+              modbus_pdu: bytes) -> None:
+        """
+        Send a request to an endpoint and poll for its response
+
+        :param      pending:     The outstanding requests per socket
+        :type       pending:     dict
+        :param      poller:      The poll object of the sockets
+        :type       poller:      poll
+        :param      index:       The index of the endpoint
+        :type       index:       int
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      modbus_pdu:  The modbus Protocol Data Unit
+        :type       modbus_pdu:  bytes
+        """
+        endpoint = self._endpoints[index]
+        mbap_hdr, trans_id = endpoint._create_mbap_hdr(slave_addr=slave_addr,
+                                                       modbus_pdu=modbus_pdu)
+        endpoint._sock.send(mbap_hdr + modbus_pdu)
+
+        entry = (index, trans_id, ticks_us())
+        pending[endpoint._sock] = entry
+        # CPython reports the file descriptor, MicroPython the socket
+        if hasattr(endpoint._sock, 'fileno'):
+            pending[endpoint._sock.fileno()] = entry
+        poller.register(endpoint._sock, select.POLLIN)
+
+    def _receive(self,
+                 pending: dict,
+                 poller,
+                 sock,
+                 slave_addr: int,
+                 function_code: int,
+                 count: bool) -> Optional[bytes]:
+        """
+        Receive and validate a response of an endpoint
+
+        :param      pending:        The outstanding requests per socket
+        :type       pending:        dict
+        :param      poller:         The poll object of the sockets
+        :type       poller:         poll
+        :param      sock:           The socket or its file descriptor
+        :type       sock:           Union[socket, int]
+        :param      slave_addr:     The slave address
+        :type       slave_addr:     int
+        :param      function_code:  The function code of the request
+        :type       function_code:  int
+        :param      count:          The count
+        :type       count:          bool
+
+        :returns:   The validated response content, None for late responses
+                    of earlier transactions
+        :rtype:     Optional[bytes]
+
+        :raises     OSError:     The connection failed
+        :raises     ValueError:  The response is invalid
+        """
+        index, trans_id, start = pending[sock]
+        endpoint = self._endpoints[index]
+
+        try:
+            response = endpoint._recv_response()
+            rec_tid = struct.unpack_from('>H', response, 0)[0]
+
+            if rec_tid != trans_id and rec_tid in endpoint._stale_trans_ids:
+                endpoint._stale_trans_ids.remove(rec_tid)
+                return None
+
+            data = endpoint._validate_resp_hdr(response=response,
+                                               trans_id=trans_id,
+                                               slave_addr=slave_addr,
+                                               function_code=function_code,
+                                               count=count)
+        except (OSError, ValueError):
+            self._forget(pending=pending, poller=poller, index=index)
+            raise
+
+        self._record_rtt(rtt=ticks_diff(ticks_us(), start))
+        self._forget(pending=pending, poller=poller, index=index)
+
+        return data
+
+    def _forget(self, pending: dict, poller, index: int) -> None:
+        """
+        Stop waiting for the response of an endpoint
+
+        :param      pending:  The outstanding requests per socket
+        :type       pending:  dict
+        :param      poller:   The poll object of the sockets
+        :type       poller:   poll
+        :param      index:    The index of the endpoint
+        :type       index:    int
+        """
+        sock = self._endpoints[index]._sock
+        poller.unregister(sock)
+        pending.pop(sock, None)
+        if hasattr(sock, 'fileno'):
+            pending.pop(sock.fileno(), None)
+
+    def _send_receive(self,
+                      slave_addr: int,
+                      modbus_pdu: bytes,
+                      count: bool) -> bytes:
+        """
+        Send a modbus message and receive the response, reads are hedged
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      modbus_pdu:  The modbus Protocol Data Unit
+        :type       modbus_pdu:  bytes
+        :param      count:       The count
+        :type       count:       bool
+
+        :returns:   Validated response content of the first valid response
+        :rtype:     bytes
+
+        :raises     OSError:     No server responded in time
+        :raises     ValueError:  All responses are invalid
+        """
+        primary = self._endpoints[0]
+
+        if modbus_pdu[0] not in READ_FUNCTION_CODES:
+            return primary._send_receive(slave_addr=slave_addr,
+                                         modbus_pdu=modbus_pdu,
+                                         count=count)
+
+        self._requests += 1
+        pending = dict()
+        poller = select.poll()
+        error = None
+        hedged = False
+        delay = self.delay
+        timeout = None
+        if primary._timeout is not None:
+            timeout = int(primary._timeout * 1000)
+        start = ticks_ms()
+
+        try:
+            self._send(pending, poller, 0, slave_addr, modbus_pdu)
+        except OSError as e:
+            error = e
+
+        while True:
+            elapsed = ticks_diff(ticks_ms(), start)
+
+            if not hedged and (elapsed >= delay or not len(pending)):
+                hedged = True
+                self._hedged += 1
+                try:
+                    self._send(pending, poller, 1, slave_addr, modbus_pdu)
+                except OSError as e:
+                    error = e
+
+            if not len(pending):
+                # all requests failed
+                raise error
+
+            if timeout is not None and elapsed >= timeout:
+                break
+
+            # a blocking primary waits without a deadline, -1 for poll
+            wait = -1 if timeout is None else timeout - elapsed
+            if not hedged and (wait < 0 or delay - elapsed < wait):
+                wait = delay - elapsed
+
+            for event in poller.poll(wait):
+                sock = event[0]
+                if sock not in pending:
+                    continue
+
+                index = pending[sock][0]
+                try:
+                    data = self._receive(pending, poller, sock, slave_addr,
+                                         modbus_pdu[0], count)
+                except (OSError, ValueError) as e:
+                    error = e
+                    continue
+
+                if data is None:
+                    # late response of an earlier transaction, keep waiting
+                    continue
+
+                if index:
+                    self._secondary_wins += 1
+
+                self._cancel(pending)
+                return data
+
+        self._cancel(pending)
+        raise OSError('no response of any server')
+
+    def _cancel(self, pending: dict) -> None:
+        """
+        Discard the responses of the outstanding requests once received
+
+        :param      pending:  The outstanding requests per socket
+        :type       pending:  dict
+        """
+        for index, trans_id, _ in set(pending.values()):
+            self._endpoints[index]._discard_response(trans_id=trans_id)
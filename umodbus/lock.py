@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Fallback of the locks of the _thread module.
+
+Ports built without threads do not provide the _thread module. As there is no
+concurrent access on these ports, a lock doing nothing is used instead.
+"""
+
+try:
+    import _thread
+except ImportError:
+    # single threaded ports
+    _thread = None
+
+
+class NoLock(object):
+    """Lock replacement on ports without threads"""
+    def acquire(self) -> bool:
+        return True
+
+    def release(self) -> None:
+        pass
+
+
+def allocate_lock():
+    """
+    Get a new lock
+
+    :returns:   The lock
+    :rtype:     lock
+    """
+    if _thread is None:
+        return NoLock()
+
+    return _thread.allocate_lock()
@@ -12,13 +12,11 @@ This class is inherited by the Modbus client implementations
 :py:class:`umodbus.serial.ModbusRTU` and :py:class:`umodbus.tcp.ModbusTCP`
 """
 
-# system packages
-import time
-
 # custom packages
 from . import functions
 from . import const as Const
 from .common import Request
+from .ticks import ticks_ms
 
 # typing not natively supported on MicroPython
 from .typing import Callable, dict_keys, List, Optional, Union
@@ -51,18 +49,23 @@ class Modbus(object):
         for reg_type in self._changeable_register_types:
             self._changed_registers[reg_type] = dict()
 
-    def process(self) -> bool:
+    def process(self, request: Optional[Request] = None) -> bool:
         """
         Process the Modbus requests.
 
+        :param      request:  The request to process, default get a request
+                              from the interface
+        :type       request:  Optional[Request]
+
         :returns:   Result of processing, True on success, False otherwise
         :rtype:     bool
         """
         reg_type = None
         req_type = None
 
-        request = self._itf.get_request(unit_addr_list=self._addr_list,
-                                        timeout=0)
+        if request is None:
+            request = self._itf.get_request(unit_addr_list=self._addr_list,
+                                            timeout=0)
         if request is None:
             return False
 
@@ -780,10 +783,10 @@ class Modbus(object):
         if reg_type in self._changeable_register_types:
             if isinstance(value, (list, tuple)):
                 for idx, val in enumerate(value):
-                    content = {'val': val, 'time': time.ticks_ms()}
+                    content = {'val': val, 'time': ticks_ms()}
                     self._changed_registers[reg_type][address + idx] = content
             else:
-                content = {'val': value, 'time': time.ticks_ms()}
+                content = {'val': value, 'time': ticks_ms()}
                 self._changed_registers[reg_type][address] = content
         else:
             raise KeyError('{} can not be changed externally'.format(reg_type))
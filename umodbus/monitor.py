@@ -0,0 +1,562 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Modbus RTU bus monitor
+
+Passively listens on a serial bus without ever transmitting. The received
+bytes are split into frames by the inter-frame delay and, for frames following
+each other without a gap, by the expected frame length and a valid CRC.
+Requests are paired with their responses and decoded into records with
+timestamps in microseconds.
+
+The received bytes are read into a preallocated chunk buffer and copied into
+a preallocated ring buffer, so only the frames and records themselves are
+allocated.
+"""
+
+# system packages
+import struct
+
+# custom packages
+from . import const as Const
+from . import functions
+from .common import Request
+from .common import ModbusException
+from .serial import Pin, Serial
+from .ticks import ticks_diff, ticks_ms, ticks_us
+
+# typing not natively supported on MicroPython
+from .typing import Callable, List, Optional, Union
+
+
+class SerialMonitor(Serial):
+    """
+    Passive Serial/RTU Modbus bus monitor
+
+    Records are dictionaries with the following keys
+
+    - ``timestamp`` start of the frame in microseconds, ``ticks_us`` based
+    - ``type`` REQUEST, RESPONSE, EXCEPTION, UNKNOWN or INVALID (wrong CRC)
+    - ``slave_addr`` and ``function`` of the frame
+    - ``address``, ``quantity`` and ``values`` decoded from the frame
+    - ``error`` the exception code of exception responses or invalid requests
+    - ``request`` the request record a response belongs to
+    - ``latency`` time from the end of the request to the response in us
+    - ``frame`` the complete frame including the CRC
+
+    :param      uart_id:      The ID of the used UART or the path of a tty
+    :type       uart_id:      Union[int, str]
+    :param      baudrate:     The baudrate, default 9600
+    :type       baudrate:     int
+    :param      data_bits:    The data bits, default 8
+    :type       data_bits:    int
+    :param      stop_bits:    The stop bits, default 1
+    :type       stop_bits:    int
+    :param      parity:       The parity, default None
+    :type       parity:       Optional[int]
+    :param      pins:         The pins as list [TX, RX]
+    :type       pins:         List[Union[int, Pin], Union[int, Pin]]
+    :param      ctrl_pin:     The control pin, kept in receive mode
+    :type       ctrl_pin:     int
+    :param      buffer_size:  The ring buffer size, a power of two
+    :type       buffer_size:  int
+
+    :raises     ValueError:   The buffer size is not a power of two
+    """
+    def __init__(self,
+                 uart_id: Union[int, str] = 1,
+                 baudrate: int = 9600,
+                 data_bits: int = 8,
+                 stop_bits: int = 1,
+                 parity: Optional[int] = None,
+                 pins: List[Union[int, Pin], Union[int, Pin]] = None,
+                 ctrl_pin: int = None,
+                 buffer_size: int = 1024):
+        if buffer_size < 512 or buffer_size & (buffer_size - 1):
+            raise ValueError('buffer size has to be a power of two of at '
+                             'least 512 bytes')
+
+        super().__init__(uart_id=uart_id,
+                         baudrate=baudrate,
+                         data_bits=data_bits,
+                         stop_bits=stop_bits,
+                         parity=parity,
+                         pins=pins,
+                         ctrl_pin=ctrl_pin)
+
+        if self._ctrlPin:
+            self._ctrlPin.off()
+
+        self._ring = bytearray(buffer_size)
+        self._ring_view = memoryview(self._ring)
+        self._mask = buffer_size - 1
+
+        # bytes of one read, copied into the ring buffer
+        self._chunk = bytearray(64)
+
+        # running indices of the current frame start and the next write,
+        # wrapped into the ring buffer by the mask
+        self._start = 0
+        self._end = 0
+
+        # time of the last read and the index after the read bytes
+        self._read_time = 0
+        self._read_end = 0
+
+        # estimated start time of the current frame
+        self._frame_time = 0
+
+        # first bytes of the current frame to predict its length
+        self._header = bytearray(7)
+
+        self._records = []
+        self._pending_request = None
+
+        self._frame_count = 0
+        self._invalid_count = 0
+        self._overrun_count = 0
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Get the monitor statistics
+
+        :returns:   Number of frames, invalid frames and buffer overruns
+        :rtype:     dict
+        """
+        return {
+            'frames': self._frame_count,
+            'invalid': self._invalid_count,
+            'overruns': self._overrun_count,
+        }
+
+    def _send(self, modbus_pdu: bytes, slave_addr: int) -> None:
+        """
+        Refuse to send anything on the monitored bus
+
+        :param      modbus_pdu:  The modbus Protocol Data Unit
+        :type       modbus_pdu:  bytes
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+
+        :raises     OSError:     Always, the monitor never transmits
+        """
+        raise OSError('bus monitor never transmits')
+
+    def _time_of(self, index: int) -> int:
+        """
+        Estimate the reception time of a byte
+
+        :param      index:  The running index of the byte
+        :type       index:  int
+
+        :returns:   The time in microseconds
+        :rtype:     int
+        """
+        return self._read_time - (self._read_end - index) * self._t1char
+
+    def _fill(self, timeout: int) -> bool:
+        """
+        Read the available bytes into the ring buffer
+
+        :param      timeout:  The time to wait for data in microseconds
+        :type       timeout:  int
+
+        :returns:   True if data has been read, False otherwise
+        :rtype:     bool
+        """
+        if not self._wait_for_data(timeout):
+            return False
+
+        size = len(self._ring)
+        if self._end - self._start >= size:
+            # the current frame can not be complete anymore, drop it
+            self._overrun_count += 1
+            self._start = self._end
+
+        nbytes = min(len(self._chunk), size - (self._end - self._start))
+        nread = self._uart.readinto(self._chunk, nbytes)
+        if not nread:
+            return False
+
+        self._read_time = ticks_us()
+        self._read_end = self._end + nread
+
+        if self._start == self._end:
+            self._frame_time = self._time_of(self._start)
+
+        ring = self._ring
+        chunk = self._chunk
+        mask = self._mask
+        end = self._end
+        for idx in range(nread):
+            ring[(end + idx) & mask] = chunk[idx]
+
+        self._end += nread
+
+        return True
+
+    def _is_valid_frame(self, length: int) -> bool:
+        """
+        Check the CRC of a frame at the start of the buffered bytes
+
+        :param      length:  The frame length
+        :type       length:  int
+
+        :returns:   True if the CRC is valid, False otherwise
+        :rtype:     bool
+        """
+        size = len(self._ring)
+        position = self._start & self._mask
+        stop = position + length
+
+        self._rx_crc.reset()
+        if stop <= size:
+            self._rx_crc.update(self._ring, position, stop)
+        else:
+            self._rx_crc.update(self._ring, position, size)
+            self._rx_crc.update(self._ring, 0, stop - size)
+
+        return self._rx_crc.is_valid
+
+    def _expects_response(self, slave_addr: int, function_code: int) -> bool:
+        """
+        Check whether a frame may be the response to the pending request
+
+        :param      slave_addr:     The slave address
+        :type       slave_addr:     int
+        :param      function_code:  The function code
+        :type       function_code:  int
+
+        :returns:   True if the frame matches the pending request
+        :rtype:     bool
+        """
+        request = self._pending_request
+
+        return (request is not None and
+                request['slave_addr'] == slave_addr and
+                request['function'] == function_code & ~Const.ERROR_BIAS)
+
+    def _complete_frame_length(self) -> Optional[int]:
+        """
+        Get the length of a complete frame at the start of the buffered bytes
+
+        :returns:   The frame length, None if no complete frame is buffered
+        :rtype:     Optional[int]
+        """
+        available = self._end - self._start
+        if available < 5:
+            return None
+
+        # bytes of the header beyond the available ones are outdated, a
+        # length derived from them is longer than the available bytes
+        header = self._header
+        for idx in range(len(header)):
+            header[idx] = self._ring[(self._start + idx) & self._mask]
+
+        request_length = functions.get_request_pdu_length(data=header,
+                                                          offset=1)
+        response_length = functions.get_response_pdu_length(data=header,
+                                                            offset=1)
+
+        if self._expects_response(slave_addr=header[0],
+                                  function_code=header[1]):
+            length = self._valid_length(pdu_length=response_length,
+                                        available=available)
+            if length is None:
+                length = self._valid_length(pdu_length=request_length,
+                                            available=available)
+        else:
+            length = self._valid_length(pdu_length=request_length,
+                                        available=available)
+            if length is None:
+                length = self._valid_length(pdu_length=response_length,
+                                            available=available)
+
+        return length
+
+    def _valid_length(self,
+                      pdu_length: Optional[int],
+                      available: int) -> Optional[int]:
+        """
+        Check a frame of the given PDU length at the start of the buffer
+
+        :param      pdu_length:  The expected PDU length
+        :type       pdu_length:  Optional[int]
+        :param      available:   The number of buffered bytes
+        :type       available:   int
+
+        :returns:   The frame length if a valid frame is buffered, else None
+        :rtype:     Optional[int]
+        """
+        if pdu_length is None:
+            return None
+
+        length = 1 + pdu_length + Const.CRC_LENGTH
+        if length <= available and self._is_valid_frame(length=length):
+            return length
+
+        return None
+
+    def _emit(self, length: int, valid: bool) -> None:
+        """
+        Decode a frame at the start of the buffered bytes into a record
+
+        :param      length:  The frame length
+        :type       length:  int
+        :param      valid:   Flag whether the CRC of the frame is valid
+        :type       valid:   bool
+        """
+        position = self._start & self._mask
+        stop = position + length
+        if stop <= len(self._ring):
+            frame = bytes(self._ring_view[position:stop])
+        else:
+            frame = (bytes(self._ring_view[position:]) +
+                     bytes(self._ring_view[:stop - len(self._ring)]))
+
+        self._records.append(self._decode(frame=frame,
+                                          timestamp=self._frame_time,
+                                          valid=valid))
+        self._frame_count += 1
+
+        self._start += length
+        self._frame_time = self._time_of(self._start)
+
+    def _decode(self, frame: bytes, timestamp: int, valid: bool) -> dict:
+        """
+        Decode a frame
+
+        :param      frame:      The frame
+        :type       frame:      bytes
+        :param      timestamp:  The start of the frame in microseconds
+        :type       timestamp:  int
+        :param      valid:      Flag whether the CRC of the frame is valid
+        :type       valid:      bool
+
+        :returns:   The record of the frame
+        :rtype:     dict
+        """
+        record = {
+            'timestamp': timestamp,
+            'type': 'INVALID',
+            'slave_addr': frame[0],
+            'function': frame[1] if len(frame) > 1 else None,
+            'address': None,
+            'quantity': None,
+            'values': None,
+            'error': None,
+            'request': None,
+            'latency': None,
+            'frame': frame,
+        }
+
+        if not valid or len(frame) < 5:
+            self._invalid_count += 1
+            return record
+
+        function_code = frame[1]
+        pdu_length = len(frame) - 1 - Const.CRC_LENGTH
+
+        response_length = functions.get_response_pdu_length(data=frame,
+                                                            offset=1)
+        request_length = functions.get_request_pdu_length(data=frame,
+                                                          offset=1)
+
+        if (pdu_length == response_length and
+                self._expects_response(slave_addr=frame[0],
+                                       function_code=function_code)):
+            self._decode_response(record=record,
+                                  frame=frame,
+                                  request=self._pending_request)
+            self._pair(record=record)
+        elif pdu_length == request_length:
+            record['type'] = 'REQUEST'
+            self._decode_request(record=record, frame=frame)
+
+            # broadcasts are not answered
+            if frame[0] == Const.BROADCAST_ADDR:
+                self._pending_request = None
+            else:
+                self._pending_request = record
+        elif pdu_length == response_length:
+            # response to a request which has not been monitored
+            self._decode_response(record=record, frame=frame, request=None)
+        else:
+            record['type'] = 'UNKNOWN'
+
+        return record
+
+    def _pair(self, record: dict) -> None:
+        """
+        Pair a response record with the pending request
+
+        :param      record:  The response record
+        :type       record:  dict
+        """
+        request = self._pending_request
+        self._pending_request = None
+
+        record['request'] = request
+        request_end = (request['timestamp'] +
+                       len(request['frame']) * self._t1char)
+        record['latency'] = ticks_diff(record['timestamp'], request_end)
+
+    def _decode_request(self, record: dict, frame: bytes) -> None:
+        """
+        Decode the content of a request
+
+        :param      record:  The record
+        :type       record:  dict
+        :param      frame:   The frame
+        :type       frame:   bytes
+        """
+        try:
+            request = Request(interface=self,
+                              data=frame[:-Const.CRC_LENGTH])
+        except ModbusException as e:
+            record['error'] = e.exception_code
+            return
+
+        record['address'] = request.register_addr
+        record['quantity'] = request.quantity
+
+        if request.function == Const.WRITE_SINGLE_COIL:
+            record['values'] = [request.data[0] == 0xFF]
+        elif request.function == Const.WRITE_MULTIPLE_COILS:
+            record['values'] = functions.bytes_to_bool(
+                byte_list=request.data,
+                bit_qty=request.quantity)
+        elif request.function in [Const.WRITE_SINGLE_REGISTER,
+                                  Const.WRITE_MULTIPLE_REGISTERS]:
+            record['values'] = functions.to_short(byte_array=request.data,
+                                                  signed=False)
+
+    def _decode_response(self,
+                         record: dict,
+                         frame: bytes,
+                         request: Optional[dict]) -> None:
+        """
+        Decode the content of a response or exception response
+
+        :param      record:   The record
+        :type       record:   dict
+        :param      frame:    The frame
+        :type       frame:    bytes
+        :param      request:  The record of the request, if monitored
+        :type       request:  Optional[dict]
+        """
+        function_code = frame[1]
+        data = frame[3:-Const.CRC_LENGTH]
+
+        record['type'] = 'RESPONSE'
+
+        if function_code >= Const.ERROR_BIAS:
+            record['type'] = 'EXCEPTION'
+            record['error'] = frame[2]
+        elif function_code in [Const.READ_COILS, Const.READ_DISCRETE_INPUTS]:
+            if request is not None and request['quantity'] is not None:
+                bit_qty = request['quantity']
+            else:
+                bit_qty = 8 * len(data)
+            record['values'] = functions.bytes_to_bool(byte_list=data,
+                                                       bit_qty=bit_qty)
+        elif function_code in [Const.READ_HOLDING_REGISTERS,
+                               Const.READ_INPUT_REGISTER]:
+            record['values'] = functions.to_short(byte_array=data,
+                                                  signed=False)
+        elif function_code in [Const.WRITE_SINGLE_COIL,
+                               Const.WRITE_SINGLE_REGISTER]:
+            address, value = struct.unpack_from('>HH', frame, 2)
+            record['address'] = address
+            if function_code == Const.WRITE_SINGLE_COIL:
+                record['values'] = [value == 0xFF00]
+            else:
+                record['values'] = (value, )
+        else:
+            record['address'], record['quantity'] = \
+                struct.unpack_from('>HH', frame, 2)
+
+        if request is not None and record['address'] is None:
+            record['address'] = request['address']
+            record['quantity'] = request['quantity']
+
+    def read_record(self, timeout: Optional[int] = None) -> Optional[dict]:
+        """
+        Get the next record of the bus traffic
+
+        :param      timeout:  The timeout in microseconds, None to wait until
+                              a frame has been received
+        :type       timeout:  Optional[int]
+
+        :returns:   The record, None if no frame has been received in time
+        :rtype:     Optional[dict]
+        """
+        start_us = ticks_us()
+
+        while not len(self._records):
+            if self._end != self._start:
+                # a frame is ended by the inter-frame delay after its last
+                # byte
+                wait = (self._inter_frame_delay -
+                        ticks_diff(ticks_us(), self._read_time))
+                if wait <= 0:
+                    length = self._end - self._start
+                    self._emit(length=length,
+                               valid=self._is_valid_frame(length=length))
+                    continue
+            elif timeout is None:
+                wait = 1000000
+            else:
+                wait = timeout - ticks_diff(ticks_us(), start_us)
+                if wait <= 0:
+                    return None
+
+            if self._fill(timeout=wait):
+                length = self._complete_frame_length()
+                while length is not None:
+                    self._emit(length=length, valid=True)
+                    length = self._complete_frame_length()
+            elif self._end != self._start:
+                length = self._end - self._start
+                self._emit(length=length,
+                           valid=self._is_valid_frame(length=length))
+
+        return self._records.pop(0)
+
+    def records(self):
+        """
+        Generate records of the bus traffic
+
+        :returns:   Generator of records
+        :rtype:     Generator[dict]
+        """
+        while True:
+            yield self.read_record()
+
+    def run(self,
+            callback: Callable[[dict], None],
+            duration_ms: Optional[int] = None) -> None:
+        """
+        Monitor the bus and pass each record to the callback
+
+        :param      callback:     The callback called with each record
+        :type       callback:     Callable[[dict], None]
+        :param      duration_ms:  The run time in milliseconds, default forever
+        :type       duration_ms:  Optional[int]
+        """
+        start = ticks_ms()
+
+        while True:
+            if duration_ms is None:
+                timeout = None
+            else:
+                remaining = duration_ms - ticks_diff(ticks_ms(), start)
+                if remaining <= 0:
+                    break
+                timeout = remaining * 1000
+
+            record = self.read_record(timeout=timeout)
+            if record is not None:
+                callback(record)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Modbus host read planner
+
+Combines reads of scattered registers into as few requests as possible. Items
+close to each other are read with one request, if reading the registers in
+between is faster than an additional round trip. The read values are
+scattered back to the items afterwards.
+"""
+
+# custom packages
+from . import const as Const
+from .ticks import ticks_diff, ticks_us
+
+# typing not natively supported on MicroPython
+from .typing import List, Tuple, Union
+
+#: Maximum quantity of a read request for each register type
+MAX_READ_QUANTITY = {
+    'COILS': Const.MAX_READ_BITS,
+    'ISTS': Const.MAX_READ_BITS,
+    'HREGS': Const.MAX_READ_REGISTERS,
+    'IREGS': Const.MAX_READ_REGISTERS,
+}
+
+
+class ReadPlanner(object):
+    """
+    Plan and execute combined reads of scattered registers
+
+    The cost of a request is the round trip time without the transferred
+    register data. It is initially estimated and measured with every read
+    afterwards. The cost of reading over a gap is the transfer time of the
+    gap registers, derived from the character time of serial hosts. Hosts
+    without serial link, like TCP, have no transfer time by default, so gaps
+    are always read as long as the request does not exceed the maximum
+    quantity. Give a byte time for links or devices where the amount of data
+    matters, e.g. gateways to a serial bus. Reading over gaps can be limited,
+    e.g. for devices with unmapped addresses.
+
+    :param      host:       The Modbus host, e.g. Serial or TCP
+    :type       host:       CommonModbusFunctions
+    :param      rtt:        The initial round trip time of a request in us,
+                            default estimated from the character time
+    :type       rtt:        int
+    :param      max_gap:    Maximum number of unused registers read between
+                            items, None for no limit
+    :type       max_gap:    int
+    :param      byte_time:  The transfer time of one byte in us, default the
+                            character time of serial hosts, zero otherwise
+    :type       byte_time:  int
+    """
+    def __init__(self,
+                 host,
+                 rtt: int = None,
+                 max_gap: int = None,
+                 byte_time: int = None) -> None:
+        self._host = host
+        self._max_gap = max_gap
+
+        # transfer time of one byte, zero for hosts without serial link
+        t1char = getattr(host, '_t1char', 0)
+        if byte_time is None:
+            byte_time = t1char
+        self._byte_time = byte_time
+
+        if rtt is None:
+            # request and response frame overhead with an inter-frame delay
+            # each, or a typical network round trip
+            if t1char:
+                rtt = 13 * t1char + 2 * host._inter_frame_delay
+            else:
+                rtt = 5000
+        self._rtt = rtt
+
+    @property
+    def rtt(self) -> int:
+        """
+        Get the current round trip time of a request without data
+
+        :returns:   The round trip time in microseconds
+        :rtype:     int
+        """
+        return self._rtt
+
+    def _data_time(self, reg_type: str, quantity: int) -> int:
+        """
+        Get the transmission time of register data
+
+        :param      reg_type:  The register type
+        :type       reg_type:  str
+        :param      quantity:  The amount of registers
+        :type       quantity:  int
+
+        :returns:   The time in microseconds
+        :rtype:     int
+        """
+        if reg_type in ['COILS', 'ISTS']:
+            return ((quantity + 7) // 8) * self._byte_time
+
+        return 2 * quantity * self._byte_time
+
+    def _is_gap_cheaper(self, reg_type: str, gap: int) -> bool:
+        """
+        Check whether reading over a gap is cheaper than another request
+
+        :param      reg_type:  The register type
+        :type       reg_type:  str
+        :param      gap:       The number of registers in the gap
+        :type       gap:       int
+
+        :returns:   True if the gap should be read, False otherwise
+        :rtype:     bool
+        """
+        if self._max_gap is not None and gap > self._max_gap:
+            return False
+
+        return self._data_time(reg_type=reg_type, quantity=gap) < self._rtt
+
+    def plan(self, items: List[Tuple[str, int, int]]) -> List[dict]:
+        """
+        Plan the requests to read all items
+
+        Each request contains the register type, address and quantity and the
+        pieces of the items it covers as tuple of item index, offset inside
+        the item, offset inside the request and the amount of registers.
+        Items exceeding the maximum quantity of a request are split.
+
+        :param      items:  The register type, address and length of items
+        :type       items:  List[Tuple[str, int, int]]
+
+        :returns:   The requests
+        :rtype:     List[dict]
+
+        :raises     KeyError:  Invalid register type
+        """
+        for item_type, _, _ in items:
+            if item_type not in Const.READ_FUNCTIONS:
+                raise KeyError('{} is not a valid register type of {}'.
+                               format(item_type,
+                                      list(Const.READ_FUNCTIONS.keys())))
+
+        requests = []
+
+        for reg_type in Const.READ_FUNCTIONS:
+            limit = MAX_READ_QUANTITY[reg_type]
+            request = None
+
+            pieces = sorted((address, -length, index)
+                            for index, (item_type, address, length)
+                            in enumerate(items) if item_type == reg_type)
+
+            for address, length, index in pieces:
+                length = -length
+                item_offset = 0
+
+                while item_offset < length:
+                    piece_addr = address + item_offset
+                    piece_qty = min(length - item_offset, limit)
+
+                    if request is not None:
+                        end = request['address'] + request['quantity']
+                        new_end = max(end, piece_addr + piece_qty)
+
+                        if ((new_end - request['address'] <= limit) and
+                            (piece_addr <= end or
+                             self._is_gap_cheaper(reg_type=reg_type,
+                                                  gap=piece_addr - end))):
+                            request['quantity'] = new_end - request['address']
+                            request['pieces'].append(
+                                (index,
+                                 item_offset,
+                                 piece_addr - request['address'],
+                                 piece_qty))
+                            item_offset += piece_qty
+                            continue
+
+                    request = {
+                        'reg_type': reg_type,
+                        'address': piece_addr,
+                        'quantity': piece_qty,
+                        'pieces': [(index, item_offset, 0, piece_qty)],
+                    }
+                    requests.append(request)
+                    item_offset += piece_qty
+
+        return requests
+
+    def _record_rtt(self, request: dict, duration: int) -> None:
+        """
+        Update the round trip time with the duration of a request
+
+        :param      request:   The request
+        :type       request:   dict
+        :param      duration:  The duration of the request in us
+        :type       duration:  int
+        """
+        rtt = duration - self._data_time(reg_type=request['reg_type'],
+                                         quantity=request['quantity'])
+
+        # exponential moving average with a weight of 1/8
+        self._rtt += (max(0, rtt) - self._rtt) // 8
+
+    def read(self,
+             slave_addr: int,
+             items: List[Tuple[str, int, int]],
+             signed: bool = True) -> List[Union[List[bool], Tuple[int, ...]]]:
+        """
+        Read all items with as few requests as possible
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      items:       The register type, address and length of
+                                 the items
+        :type       items:       List[Tuple[str, int, int]]
+        :param      signed:      Indicates if signed, registers only
+        :type       signed:      bool
+
+        :returns:   The values of each item, in the order of the items
+        :rtype:     List[Union[List[bool], Tuple[int, ...]]]
+        """
+        results = [[None] * length for _, _, length in items]
+
+        for request in self.plan(items=items):
+            reg_type = request['reg_type']
+            read_function = getattr(self._host,
+                                    Const.READ_FUNCTIONS[reg_type])
+
+            start = ticks_us()
+            if reg_type in ['HREGS', 'IREGS']:
+                values = read_function(slave_addr,
+                                       request['address'],
+                                       request['quantity'],
+                                       signed)
+            else:
+                values = read_function(slave_addr,
+                                       request['address'],
+                                       request['quantity'])
+            self._record_rtt(request=request,
+                             duration=ticks_diff(ticks_us(), start))
+
+            for index, item_offset, offset, quantity in request['pieces']:
+                results[index][item_offset:item_offset + quantity] = \
+                    values[offset:offset + quantity]
+
+        for index, (reg_type, _, _) in enumerate(items):
+            if reg_type in ['HREGS', 'IREGS']:
+                results[index] = tuple(results[index])
+
+        return results
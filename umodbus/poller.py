@@ -0,0 +1,554 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Modbus host polling engine
+
+Polls groups of registers of many devices, each group with its own period.
+The groups are kept in a queue ordered by their deadline, so only due groups
+are visited. Groups of the same device coming due together are read with
+shared requests planned by the read planner. Late polls are recorded as
+lateness, polls missed completely as overruns. The health of the devices and
+the backoff of offline devices are handled like by the bus scheduler.
+"""
+
+# system packages
+try:
+    import heapq
+except ImportError:
+    import uheapq as heapq
+
+# custom packages
+from .const import READ_FUNCTIONS
+from .planner import ReadPlanner
+from .scheduler import BusScheduler
+from .ticks import ticks_add, ticks_diff, ticks_ms
+
+# typing not natively supported on MicroPython
+from .typing import Callable, List, Optional, Tuple, Union
+
+
+class Poller(BusScheduler):
+    """
+    Poll groups of registers of several devices at individual periods
+
+    Devices not responding are considered offline and are only probed with
+    the backoff of the :py:class:`umodbus.scheduler.BusScheduler`.
+
+    :param      host:             The default Modbus host of the groups,
+                                  e.g. Serial or TCP
+    :type       host:             CommonModbusFunctions
+    :param      max_gap:          Maximum number of unused registers read
+                                  between items, None for no limit
+    :type       max_gap:          Optional[int]
+    :param      merge_window_ms:  Groups of a device due within this time are
+                                  polled together with due groups
+    :type       merge_window_ms:  int
+    :param      plan_cache_size:  Maximum number of cached request plans
+    :type       plan_cache_size:  int
+    :param      backoff_ms:       Initial time before an offline device is
+                                  probed
+    :type       backoff_ms:       int
+    :param      max_backoff_ms:   Maximum time between probes of a device
+    :type       max_backoff_ms:   int
+    :param      max_failures:     Consecutive failures until a device is
+                                  offline
+    :type       max_failures:     int
+    """
+    def __init__(self,
+                 host=None,
+                 max_gap: Optional[int] = None,
+                 merge_window_ms: int = 0,
+                 plan_cache_size: int = 64,
+                 backoff_ms: int = 1000,
+                 max_backoff_ms: int = 60000,
+                 max_failures: int = 2) -> None:
+        super().__init__(host=host,
+                         backoff_ms=backoff_ms,
+                         max_backoff_ms=max_backoff_ms,
+                         max_failures=max_failures)
+        self._max_gap = max_gap
+        self._merge_window_ms = merge_window_ms
+        self._plan_cache_size = plan_cache_size
+
+        self._groups = []
+        self._queue = []
+        self._sequence = 0
+        self._planners = dict()
+        self._plans = dict()
+
+        # monotonic time of the engine ordering the queue, not wrapping
+        # around like the ticks
+        self._last_ticks = ticks_ms()
+        self._time = 0
+
+        self._requests = 0
+
+    def _now(self, now: Optional[int] = None) -> int:
+        """
+        Advance the engine time
+
+        :param      now:  The current time in ticks_ms, default ticks_ms
+        :type       now:  Optional[int]
+
+        :returns:   The latest time in ticks_ms
+        :rtype:     int
+        """
+        if now is None:
+            now = ticks_ms()
+
+        elapsed = ticks_diff(now, self._last_ticks)
+        if elapsed > 0:
+            self._time += elapsed
+            self._last_ticks = now
+
+        return self._last_ticks
+
+    def _schedule(self, group: dict) -> None:
+        """
+        Put a group into the deadline queue
+
+        :param      group:  The group
+        :type       group:  dict
+        """
+        key = self._time + ticks_diff(group['deadline'], self._last_ticks)
+
+        # the sequence keeps the order of groups with the same deadline
+        heapq.heappush(self._queue, (key, self._sequence, group['id']))
+        self._sequence += 1
+
+    def _device(self, group: dict) -> dict:
+        """
+        Get the health of the device of a group
+
+        :param      group:  The group
+        :type       group:  dict
+
+        :returns:   The device health
+        :rtype:     dict
+        """
+        return self._slaves[(id(group['host']), group['slave_addr'])]
+
+    def add_group(self,
+                  slave_addr: int,
+                  items: List[Tuple[str, int, int]],
+                  period_ms: int,
+                  callback: Callable[[int, list], None] = None,
+                  signed: bool = True,
+                  host=None) -> dict:
+        """
+        Add a group of registers polled at the same period
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      items:       The register type, address and length of
+                                 the items
+        :type       items:       List[Tuple[str, int, int]]
+        :param      period_ms:   The poll period in milliseconds
+        :type       period_ms:   int
+        :param      callback:    Callback with slave address and the values
+                                 of the items
+        :type       callback:    Callable[[int, list], None]
+        :param      signed:      Indicates if signed, registers only
+        :type       signed:      bool
+        :param      host:        The Modbus host, default host of the engine
+        :type       host:        CommonModbusFunctions
+
+        :returns:   The group, containing the latest values and error
+        :rtype:     dict
+
+        :raises     KeyError:    Invalid register type
+        :raises     ValueError:  No host given
+        """
+        for reg_type, _, _ in items:
+            if reg_type not in READ_FUNCTIONS:
+                raise KeyError('{} is not a valid register type of {}'.
+                               format(reg_type, list(READ_FUNCTIONS.keys())))
+
+        if host is None:
+            host = self._host
+        if host is None:
+            raise ValueError('no host given for the group')
+
+        group = {
+            'id': len(self._groups),
+            'host': host,
+            'slave_addr': slave_addr,
+            'items': items,
+            'period': period_ms,
+            'callback': callback,
+            'signed': signed,
+            'deadline': self._now(),
+            'values': None,
+            'error': None,
+            'polls': 0,
+            'errors': 0,
+            'overruns': 0,
+            'lateness': 0,
+            'max_lateness': 0,
+        }
+        self._groups.append(group)
+        self._schedule(group)
+
+        key = (id(host), slave_addr)
+        if key not in self._slaves:
+            self._slaves[key] = self._new_slave()
+
+        return group
+
+    def add_scan(self,
+                 slave_addr: int,
+                 reg_type: str,
+                 address: int,
+                 quantity: int,
+                 interval_ms: int,
+                 callback: Callable[[int, str, int, Union[List[bool],
+                                                          List[int]]],
+                                    None] = None,
+                 signed: bool = True) -> dict:
+        """
+        Add a group of one item, see BusScheduler.add_scan
+
+        :param      slave_addr:   The slave address
+        :type       slave_addr:   int
+        :param      reg_type:     The register type, COILS, ISTS, HREGS, IREGS
+        :type       reg_type:     str
+        :param      address:      The starting address
+        :type       address:     int
+        :param      quantity:     The amount of registers
+        :type       quantity:     int
+        :param      interval_ms:  The scan interval in milliseconds
+        :type       interval_ms:  int
+        :param      callback:     Callback with slave address, register type,
+                                  address and the read values
+        :type       callback:     Callable[[int, str, int, Union[List[bool],
+                                            List[int]]], None]
+        :param      signed:       Indicates if signed, registers only
+        :type       signed:       bool
+
+        :returns:   The group, containing the latest values and error
+        :rtype:     dict
+
+        :raises     KeyError:     Invalid register type
+        """
+        def group_callback(slave_addr: int, values: list) -> None:
+            callback(slave_addr, reg_type, address, values[0])
+
+        return self.add_group(slave_addr=slave_addr,
+                              items=[(reg_type, address, quantity)],
+                              period_ms=interval_ms,
+                              callback=(None if callback is None
+                                        else group_callback),
+                              signed=signed)
+
+    def slave_state(self, slave_addr: int, host=None) -> str:
+        """
+        Get the health state of a device
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      host:        The Modbus host, default host of the engine
+        :type       host:        CommonModbusFunctions
+
+        :returns:   ONLINE or OFFLINE
+        :rtype:     str
+        """
+        if host is None:
+            host = self._host
+
+        return self._slaves[(id(host), slave_addr)]['state']
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Get the engine and group statistics
+
+        The lateness is the delay of a poll after its deadline in milliseconds,
+        smoothed over the last polls. Overruns are deadlines missed
+        completely because the previous poll of the group was too late.
+
+        :returns:   Cycle time, number of requests and per group counters
+                    and health of the device
+        :rtype:     dict
+        """
+        groups = dict()
+        for group in self._groups:
+            groups[group['id']] = {
+                'slave_addr': group['slave_addr'],
+                'period': group['period'],
+                'polls': group['polls'],
+                'errors': group['errors'],
+                'overruns': group['overruns'],
+                'lateness': group['lateness'] / 8,
+                'max_lateness': group['max_lateness'],
+                'device': self._slave_statistics(self._device(group)),
+            }
+
+        return {
+            'cycle_time': self._cycle_time,
+            'requests': self._requests,
+            'groups': groups,
+        }
+
+    def _collect(self, now: int) -> List[List[dict]]:
+        """
+        Take the due groups from the queue and batch them per device
+
+        Groups of a batched device due within the merge window are taken as
+        well. The groups of offline devices are postponed until the device is
+        probed.
+
+        :param      now:  The current time in ticks_ms
+        :type       now:  int
+
+        :returns:   The batches of groups read together
+        :rtype:     List[List[dict]]
+        """
+        batches = dict()
+
+        while len(self._queue) and self._queue[0][0] <= self._time:
+            group = self._groups[heapq.heappop(self._queue)[2]]
+            key = (id(group['host']), group['slave_addr'], group['signed'])
+
+            if key not in batches:
+                device = self._device(group)
+                if not self._is_probe_due(slave=device, now=now):
+                    group['deadline'] = device['next_probe']
+                    self._schedule(group)
+                    continue
+
+            batches.setdefault(key, []).append(group)
+
+        if self._merge_window_ms and len(batches):
+            postponed = []
+            window = self._time + self._merge_window_ms
+
+            while len(self._queue) and self._queue[0][0] <= window:
+                entry = heapq.heappop(self._queue)
+                group = self._groups[entry[2]]
+                key = (id(group['host']),
+                       group['slave_addr'],
+                       group['signed'])
+
+                if key in batches:
+                    batches[key].append(group)
+                else:
+                    postponed.append(entry)
+
+            for entry in postponed:
+                heapq.heappush(self._queue, entry)
+
+        # same order of the groups for the same combination, see _plan
+        for batch in batches.values():
+            batch.sort(key=lambda group: group['id'])
+
+        return list(batches.values())
+
+    def _plan(self, batch: List[dict]) -> Tuple[list, List[dict]]:
+        """
+        Get the items and the requests of a batch
+
+        Plans are cached per combination of groups.
+
+        :param      batch:  The groups
+        :type       batch:  List[dict]
+
+        :returns:   The items of all groups and the requests
+        :rtype:     Tuple[list, List[dict]]
+        """
+        items = []
+        for group in batch:
+            items.extend(group['items'])
+
+        key = tuple(group['id'] for group in batch)
+        requests = self._plans.get(key)
+
+        if requests is None:
+            host = batch[0]['host']
+            planner = self._planners.get(id(host))
+
+            if planner is None:
+                planner = ReadPlanner(host=host, max_gap=self._max_gap)
+                self._planners[id(host)] = planner
+
+            if len(self._plans) >= self._plan_cache_size:
+                self._plans.clear()
+
+            requests = planner.plan(items=items)
+            self._plans[key] = requests
+
+        return items, requests
+
+    def _read_args(self, batch: List[dict], request: dict) -> tuple:
+        """
+        Get the read function and its arguments of a request
+
+        :param      batch:    The groups
+        :type       batch:    List[dict]
+        :param      request:  The request
+        :type       request:  dict
+
+        :returns:   The read function and its arguments
+        :rtype:     tuple
+        """
+        group = batch[0]
+        read_function = getattr(group['host'],
+                                READ_FUNCTIONS[request['reg_type']])
+
+        if request['reg_type'] in ['HREGS', 'IREGS']:
+            return read_function, (group['slave_addr'],
+                                   request['address'],
+                                   request['quantity'],
+                                   group['signed'])
+
+        return read_function, (group['slave_addr'],
+                               request['address'],
+                               request['quantity'])
+
+    def _scatter(self, results: list, request: dict, values: list) -> None:
+        """
+        Scatter the values of a request to the items
+
+        :param      results:  The values of each item
+        :type       results:  list
+        :param      request:  The request
+        :type       request:  dict
+        :param      values:   The read values
+        :type       values:   list
+        """
+        for index, item_offset, offset, quantity in request['pieces']:
+            results[index][item_offset:item_offset + quantity] = \
+                values[offset:offset + quantity]
+
+    def _complete(self,
+                  batch: List[dict],
+                  results: Optional[list],
+                  error: Optional[Exception],
+                  now: int,
+                  started: int) -> None:
+        """
+        Update the groups of a batch and schedule their next poll
+
+        :param      batch:    The groups
+        :type       batch:    List[dict]
+        :param      results:  The values of each item, None on error
+        :type       results:  Optional[list]
+        :param      error:    The error of the batch
+        :type       error:    Optional[Exception]
+        :param      now:      The time of the poll in ticks_ms
+        :type       now:      int
+        :param      started:  The start time of the batch in ticks_ms
+        :type       started:  int
+        """
+        device = self._device(batch[0])
+        self._record_result(slave=device, error=error, now=now)
+        index = 0
+
+        for group in batch:
+            lateness = max(0, ticks_diff(started, group['deadline']))
+            self._record_lateness(stats=group, lateness=lateness)
+            self._record_lateness(stats=device, lateness=lateness)
+            group['polls'] += 1
+            group['error'] = error
+
+            count = len(group['items'])
+            if error is None:
+                group['values'] = results[index:index + count]
+            else:
+                group['errors'] += 1
+            index += count
+
+            # keep the phase of the deadlines, skip missed ones
+            group['deadline'] = ticks_add(group['deadline'], group['period'])
+            missed = ticks_diff(now, group['deadline'])
+            if missed >= 0:
+                missed = missed // group['period'] + 1
+                group['overruns'] += missed
+                group['deadline'] = ticks_add(group['deadline'],
+                                              missed * group['period'])
+
+            self._schedule(group)
+
+            if error is None and group['callback'] is not None:
+                group['callback'](group['slave_addr'], group['values'])
+
+    def _poll_batch(self, batch: List[dict], now: int, start: int) -> None:
+        """
+        Poll a batch of groups of one device
+
+        :param      batch:  The groups
+        :type       batch:  List[dict]
+        :param      now:    The time of the poll in ticks_ms
+        :type       now:    int
+        :param      start:  The start of the poll in ticks_ms
+        :type       start:  int
+        """
+        # the batches before delayed this one by the time they took
+        started = ticks_add(now, ticks_diff(ticks_ms(), start))
+        items, requests = self._plan(batch)
+        results = [[None] * length for _, _, length in items]
+        device = self._device(batch[0])
+        error = None
+
+        try:
+            for request in requests:
+                read_function, args = self._read_args(batch, request)
+                self._requests += 1
+                device['requests'] += 1
+                self._scatter(results, request, read_function(*args))
+        except (OSError, ValueError) as e:
+            error = e
+
+        self._complete(batch, results, error, now, started)
+
+    def poll(self, now: Optional[int] = None) -> int:
+        """
+        Poll all due groups
+
+        :param      now:  The current time in ticks_ms, default ticks_ms
+        :type       now:  Optional[int]
+
+        :returns:   Number of polled groups
+        :rtype:     int
+        """
+        now = self._now(now)
+        start = ticks_ms()
+        polled = 0
+
+        for batch in self._collect(now):
+            self._poll_batch(batch, now, start)
+            polled += len(batch)
+
+        if polled:
+            self._cycle_time = ticks_diff(ticks_ms(), start)
+
+        return polled
+
+    def time_to_next_scan(self, now: Optional[int] = None) -> int:
+        """
+        Get the time until the next group is due
+
+        :param      now:  The current time in ticks_ms, default ticks_ms
+        :type       now:  Optional[int]
+
+        :returns:   The time in milliseconds, zero if a group is due already
+        :rtype:     int
+        """
+        self._now(now)
+
+        if not len(self._queue):
+            return 0
+
+        return max(0, self._queue[0][0] - self._time)
+
+    def time_to_next_poll(self, now: Optional[int] = None) -> int:
+        """
+        Get the time until the next group is due
+
+        :param      now:  The current time in ticks_ms, default ticks_ms
+        :type       now:  Optional[int]
+
+        :returns:   The time in milliseconds, zero if a group is due already
+        :rtype:     int
+        """
+        return self.time_to_next_scan(now=now)
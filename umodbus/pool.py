@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Modbus TCP connection pool
+
+Shares the connections to many Modbus TCP servers between the clients of an
+application. Connections are kept per host and port, opened on the first
+request and limited per server. An idle connection is checked before it is
+handed out, connections failing a request are closed. Reconnects to a server
+whose connection failed are delayed by an exponential backoff, connections
+idle for too long are closed.
+"""
+
+# system packages
+import select
+
+# custom packages
+from .common import CommonModbusFunctions
+from .lock import allocate_lock
+from .tcp import TCP
+from .ticks import ticks_add, ticks_diff, ticks_ms
+
+# typing not natively supported on MicroPython
+from .typing import Optional, Tuple
+
+
+class ConnectionPool(object):
+    """
+    Pool of connections to Modbus TCP servers
+
+    Clients of a server are created with client. A request waits for a
+    connection if the maximum number of connections to its server is in use.
+
+    :param      max_connections:  Maximum number of connections per server
+    :type       max_connections:  int
+    :param      timeout:          Socket timeout of the connections in seconds
+    :type       timeout:          float
+    :param      idle_timeout_ms:  Time until an unused connection is closed
+    :type       idle_timeout_ms:  int
+    :param      backoff_ms:       Time until a failed server is connected
+                                  again, doubled for every further failure
+    :type       backoff_ms:       int
+    :param      max_backoff_ms:   Maximum reconnect backoff
+    :type       max_backoff_ms:   int
+    """
+    def __init__(self,
+                 max_connections: int = 1,
+                 timeout: float = 5.0,
+                 idle_timeout_ms: int = 60000,
+                 backoff_ms: int = 100,
+                 max_backoff_ms: int = 30000) -> None:
+        self._max_connections = max_connections
+        self._timeout = timeout
+        self._idle_timeout_ms = idle_timeout_ms
+        self._backoff_ms = backoff_ms
+        self._max_backoff_ms = max_backoff_ms
+
+        self._lock = allocate_lock()
+        self._servers = dict()
+
+    def client(self, slave_ip: str, slave_port: int = 502) -> 'PooledClient':
+        """
+        Get a client of a server, not connecting before its first request
+
+        :param      slave_ip:    IP of the server
+        :type       slave_ip:    str
+        :param      slave_port:  Port of the server
+        :type       slave_port:  int
+
+        :returns:   The client
+        :rtype:     PooledClient
+        """
+        return PooledClient(pool=self, address=(slave_ip, slave_port))
+
+    def _server(self, address: Tuple[str, int]) -> dict:
+        """
+        Get the connections of a server, create them if not existing
+
+        Must be called with the lock acquired.
+
+        :param      address:  The host and port of the server
+        :type       address:  Tuple[str, int]
+
+        :returns:   The connections and counters of the server
+        :rtype:     dict
+        """
+        server = self._servers.get(address)
+
+        if server is None:
+            server = {
+                'idle': [],
+                'open': 0,
+                'waiting': [],
+                'failures': 0,
+                'retry_at': None,
+                'connects': 0,
+                'closed': 0,
+                'evicted': 0,
+            }
+            self._servers[address] = server
+
+        return server
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Get the connections and counters of all servers
+
+        :returns:   Per host and port the open and idle connections, waiting
+                    requests, connects, consecutive connect failures and
+                    connections closed after failures or evicted when idle
+        :rtype:     dict
+        """
+        statistics = dict()
+
+        self._lock.acquire()
+        try:
+            for address, server in self._servers.items():
+                statistics[address] = {
+                    'open': server['open'],
+                    'idle': len(server['idle']),
+                    'waiting': len(server['waiting']),
+                    'connects': server['connects'],
+                    'failures': server['failures'],
+                    'closed': server['closed'],
+                    'evicted': server['evicted'],
+                }
+        finally:
+            self._lock.release()
+
+        return statistics
+
+    def _is_healthy(self, connection: TCP) -> bool:
+        """
+        Check an idle connection
+
+        An idle connection must not be readable, data or the end of the
+        stream are only received if the server closed the connection or sent
+        something unexpected.
+
+        :param      connection:  The connection
+        :type       connection:  TCP
+
+        :returns:   True if the connection can be used
+        :rtype:     bool
+        """
+        poller = select.poll()
+        poller.register(connection._sock, select.POLLIN)
+
+        try:
+            return not len(poller.poll(0))
+        finally:
+            poller.unregister(connection._sock)
+
+    def _close(self, connection: TCP) -> None:
+        """
+        Close a connection
+
+        :param      connection:  The connection
+        :type       connection:  TCP
+        """
+        try:
+            connection._sock.close()
+        except OSError:
+            pass
+
+    def _connect(self, address: Tuple[str, int]) -> TCP:
+        """
+        Open a new connection to a server
+
+        :param      address:  The host and port of the server
+        :type       address:  Tuple[str, int]
+
+        :returns:   The connection
+        :rtype:     TCP
+
+        :raises     OSError:  The connection failed
+        """
+        try:
+            connection = TCP(slave_ip=address[0],
+                             slave_port=address[1],
+                             timeout=self._timeout)
+        except OSError:
+            self._lock.acquire()
+            try:
+                server = self._server(address)
+                server['open'] -= 1
+                server['failures'] += 1
+                backoff = min(self._backoff_ms << (server['failures'] - 1),
+                              self._max_backoff_ms)
+                server['retry_at'] = ticks_add(ticks_ms(), backoff)
+                self._hand_over(server, None)
+            finally:
+                self._lock.release()
+            raise
+
+        self._lock.acquire()
+        try:
+            server = self._server(address)
+            server['failures'] = 0
+            server['retry_at'] = None
+            server['connects'] += 1
+        finally:
+            self._lock.release()
+
+        return connection
+
+    def _acquire(self, address: Tuple[str, int]) -> TCP:
+        """
+        Get a connection to a server for exclusive use
+
+        :param      address:  The host and port of the server
+        :type       address:  Tuple[str, int]
+
+        :returns:   The connection
+        :rtype:     TCP
+
+        :raises     OSError:  The server can not be connected
+        """
+        while True:
+            self._lock.acquire()
+            try:
+                server = self._server(address)
+                self._evict(server, ticks_ms())
+
+                while len(server['idle']):
+                    connection = server['idle'].pop()[0]
+                    if self._is_healthy(connection):
+                        return connection
+
+                    server['open'] -= 1
+                    server['closed'] += 1
+                    self._close(connection)
+
+                if (server['retry_at'] is not None and
+                        ticks_diff(server['retry_at'], ticks_ms()) > 0):
+                    raise OSError('reconnect to {}:{} delayed'.
+                                  format(address[0], address[1]))
+
+                if server['open'] < self._max_connections:
+                    server['open'] += 1
+                    break
+
+                # wait until a connection is released
+                waiter = {'lock': allocate_lock(), 'connection': None}
+                waiter['lock'].acquire()
+                server['waiting'].append(waiter)
+            finally:
+                self._lock.release()
+
+            waiter['lock'].acquire()
+            if waiter['connection'] is not None:
+                return waiter['connection']
+
+        return self._connect(address)
+
+    def _hand_over(self, server: dict, connection: Optional[TCP]) -> bool:
+        """
+        Hand a released connection or a free slot over to a waiting request
+
+        Must be called with the lock acquired.
+
+        :param      server:      The connections of the server
+        :type       server:      dict
+        :param      connection:  The connection, None for a free slot
+        :type       connection:  Optional[TCP]
+
+        :returns:   True if a waiting request was woken up
+        :rtype:     bool
+        """
+        if not len(server['waiting']):
+            return False
+
+        waiter = server['waiting'].pop(0)
+        waiter['connection'] = connection
+        waiter['lock'].release()
+
+        return True
+
+    def _release(self,
+                 address: Tuple[str, int],
+                 connection: TCP,
+                 healthy: bool) -> None:
+        """
+        Return a connection to the pool
+
+        :param      address:     The host and port of the server
+        :type       address:     Tuple[str, int]
+        :param      connection:  The connection
+        :type       connection:  TCP
+        :param      healthy:     False to close the connection
+        :type       healthy:     bool
+        """
+        self._lock.acquire()
+        try:
+            server = self._server(address)
+
+            if not healthy:
+                server['open'] -= 1
+                server['closed'] += 1
+                self._close(connection)
+                self._hand_over(server, None)
+            elif not self._hand_over(server, connection):
+                server['idle'].append((connection, ticks_ms()))
+        finally:
+            self._lock.release()
+
+    def evict_idle(self) -> int:
+        """
+        Close the connections idle for longer than the idle timeout
+
+        :returns:   The number of closed connections
+        :rtype:     int
+        """
+        now = ticks_ms()
+        evicted = 0
+
+        self._lock.acquire()
+        try:
+            for server in self._servers.values():
+                evicted += self._evict(server, now)
+        finally:
+            self._lock.release()
+
+        return evicted
+
+    def _evict(self, server: dict, now: int) -> int:
+        """
+        Close the connections of a server idle for too long
+
+        Must be called with the lock acquired.
+
+        :param      server:  The connections of the server
+        :type       server:  dict
+        :param      now:     The current time in milliseconds
+        :type       now:     int
+
+        :returns:   The number of closed connections
+        :rtype:     int
+        """
+        evicted = 0
+
+        # released connections are appended, the oldest come first
+        while (len(server['idle']) and
+               ticks_diff(now, server['idle'][0][1]) >=
+               self._idle_timeout_ms):
+            self._close(server['idle'].pop(0)[0])
+            server['open'] -= 1
+            server['evicted'] += 1
+            evicted += 1
+
+        return evicted
+
+    def close(self) -> None:
+        """Close all idle connections"""
+        self._lock.acquire()
+        try:
+            for server in self._servers.values():
+                for connection, _ in server['idle']:
+                    self._close(connection)
+                    server['open'] -= 1
+                server['idle'] = []
+        finally:
+            self._lock.release()
+
+
+class PooledClient(CommonModbusFunctions):
+    """
+    Modbus TCP host using the connections of a pool
+
+    Provides the functions of TCP. Created by ConnectionPool.client.
+
+    :param      pool:     The connection pool
+    :type       pool:     ConnectionPool
+    :param      address:  The host and port of the server
+    :type       address:  Tuple[str, int]
+    """
+    def __init__(self, pool: ConnectionPool, address: Tuple[str, int]):
+        self._pool = pool
+        self._address = address
+        self._response_timeout = None
+
+    def set_response_timeout(self, timeout_ms: Optional[int]) -> None:
+        """
+        Set the time to wait for the responses of the next transactions
+
+        :param      timeout_ms:  The timeout in milliseconds, None for the
+                                 socket timeout of the pool
+        :type       timeout_ms:  Optional[int]
+        """
+        self._response_timeout = timeout_ms
+
+    def _send_receive(self,
+                      slave_addr: int,
+                      modbus_pdu: bytes,
+                      count: bool) -> bytes:
+        """
+        Send a modbus message and receive the response on a pooled
+        connection
+
+        Connections failing with an OSError are closed.
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      modbus_pdu:  The modbus Protocol Data Unit
+        :type       modbus_pdu:  bytes
+        :param      count:       The count
+        :type       count:       bool
+
+        :returns:   Validated response content
+        :rtype:     bytes
+
+        :raises     OSError:  The server can not be connected or the request
+                              failed
+        """
+        connection = self._pool._acquire(self._address)
+        healthy = False
+
+        try:
+            connection.set_response_timeout(timeout_ms=self._response_timeout)
+            response = connection._send_receive(slave_addr=slave_addr,
+                                                modbus_pdu=modbus_pdu,
+                                                count=count)
+            healthy = True
+        except ValueError:
+            # invalid or exception response, the connection is still usable
+            healthy = True
+            raise
+        finally:
+            self._pool._release(self._address, connection, healthy)
+
+        return response
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Modbus host adaptive timeouts and retries
+
+Measures the response time of each device and derives the time waited for
+its responses from the smoothed response time and its variation, like the
+retransmission timeout of TCP. Healthy devices thereby get short timeouts, a
+lost frame costs a few milliseconds instead of the worst case constant of the
+transport. Failed transactions are retried after an exponential backoff with
+random jitter.
+"""
+
+# system packages
+import random
+
+# custom packages
+from . import const as Const
+from .common import CommonModbusFunctions
+from .ticks import sleep_ms, ticks_diff, ticks_us
+
+# typing not natively supported on MicroPython
+from .typing import Optional
+
+
+class RttEstimator(object):
+    """
+    Smoothed response time and variation per device
+
+    The values are kept in microseconds. The timeout of a device is the
+    smoothed response time plus four times its variation, limited to the
+    minimum and maximum timeout. Each failure doubles the timeout of a device
+    until its next response.
+
+    :param      initial_timeout_ms:  Timeout of devices not yet measured
+    :type       initial_timeout_ms:  int
+    :param      min_timeout_ms:      Minimum timeout
+    :type       min_timeout_ms:      int
+    :param      max_timeout_ms:      Maximum timeout
+    :type       max_timeout_ms:      int
+    """
+    def __init__(self,
+                 initial_timeout_ms: int = 1000,
+                 min_timeout_ms: int = 10,
+                 max_timeout_ms: int = 5000) -> None:
+        self._initial_timeout = initial_timeout_ms * 1000
+        self._min_timeout = min_timeout_ms * 1000
+        self._max_timeout = max_timeout_ms * 1000
+
+        self._devices = dict()
+
+    def _device(self, slave_addr: int) -> dict:
+        """
+        Get the measurements of a device, create them if not existing
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+
+        :returns:   The device measurements
+        :rtype:     dict
+        """
+        device = self._devices.get(slave_addr)
+
+        if device is None:
+            device = {
+                'samples': 0,
+                'srtt': 0,
+                'rttvar': 0,
+                'backoff': 0,
+                'requests': 0,
+                'retries': 0,
+                'errors': 0,
+                'failures': 0,
+            }
+            self._devices[slave_addr] = device
+
+        return device
+
+    def timeout(self, slave_addr: int) -> int:
+        """
+        Get the time to wait for a response of a device
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+
+        :returns:   The timeout in microseconds
+        :rtype:     int
+        """
+        device = self._device(slave_addr)
+
+        if device['samples']:
+            timeout = device['srtt'] + 4 * device['rttvar']
+            timeout = max(self._min_timeout, timeout)
+        else:
+            timeout = self._initial_timeout
+
+        return min(timeout << device['backoff'], self._max_timeout)
+
+    def record_response(self, slave_addr: int, rtt: int) -> None:
+        """
+        Record the response time of a successful transaction
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      rtt:         The response time in microseconds
+        :type       rtt:         int
+        """
+        device = self._device(slave_addr)
+        device['backoff'] = 0
+
+        if not device['samples']:
+            device['srtt'] = rtt
+            device['rttvar'] = rtt // 2
+        else:
+            # weights of 1/4 for the variation and 1/8 for the mean
+            error = rtt - device['srtt']
+            device['rttvar'] += (abs(error) - device['rttvar']) >> 2
+            device['srtt'] += error >> 3
+
+        device['samples'] += 1
+
+    def record_failure(self, slave_addr: int) -> None:
+        """
+        Record a transaction without a valid response
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        """
+        device = self._device(slave_addr)
+        device['errors'] += 1
+
+        if self.timeout(slave_addr) < self._max_timeout:
+            device['backoff'] += 1
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Get the statistics of all devices
+
+        :returns:   Per slave address the smoothed response time, variation
+                    and timeout in milliseconds and the counters
+        :rtype:     dict
+        """
+        statistics = dict()
+
+        for slave_addr, device in self._devices.items():
+            statistics[slave_addr] = {
+                'srtt': device['srtt'] / 1000,
+                'rttvar': device['rttvar'] / 1000,
+                'timeout': self.timeout(slave_addr) / 1000,
+                'samples': device['samples'],
+                'requests': device['requests'],
+                'retries': device['retries'],
+                'errors': device['errors'],
+                'failures': device['failures'],
+            }
+
+        return statistics
+
+
+class RetryClient(CommonModbusFunctions):
+    """
+    Modbus host with adaptive timeouts and retries
+
+    All functions of the wrapped host are available. The host has to provide
+    set_response_timeout, like Serial and TCP. Transactions failing with an
+    OSError, e.g. without a response or with an invalid CRC, are retried.
+    Exception responses of the slave are not retried.
+
+    :param      itf:                 The Modbus host, e.g. Serial or TCP
+    :type       itf:                 CommonModbusFunctions
+    :param      retries:             Number of retries of failed transactions
+    :type       retries:             int
+    :param      backoff_ms:          Backoff before the first retry, doubled
+                                     for each further retry
+    :type       backoff_ms:          int
+    :param      max_backoff_ms:      Maximum backoff
+    :type       max_backoff_ms:      int
+    :param      initial_timeout_ms:  Timeout of devices not yet measured
+    :type       initial_timeout_ms:  int
+    :param      min_timeout_ms:      Minimum timeout
+    :type       min_timeout_ms:      int
+    :param      max_timeout_ms:      Maximum timeout
+    :type       max_timeout_ms:      int
+    """
+    def __init__(self,
+                 itf,
+                 retries: int = 2,
+                 backoff_ms: int = 10,
+                 max_backoff_ms: int = 500,
+                 initial_timeout_ms: int = 1000,
+                 min_timeout_ms: int = 10,
+                 max_timeout_ms: int = 5000) -> None:
+        self._itf = itf
+        self._retries = retries
+        self._backoff_ms = backoff_ms
+        self._max_backoff_ms = max_backoff_ms
+        self._estimator = RttEstimator(initial_timeout_ms=initial_timeout_ms,
+                                       min_timeout_ms=min_timeout_ms,
+                                       max_timeout_ms=max_timeout_ms)
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Get the statistics of all devices
+
+        :returns:   Per slave address the smoothed response time, variation
+                    and timeout in milliseconds and the counters
+        :rtype:     dict
+        """
+        return self._estimator.statistics
+
+    def _backoff(self, retry: int) -> int:
+        """
+        Get the time to wait before a retry
+
+        Half of the exponential backoff is waited in any case, the other half
+        is random to spread the retries of several hosts.
+
+        :param      retry:  The number of the retry, starting at 0
+        :type       retry:  int
+
+        :returns:   The time in milliseconds
+        :rtype:     int
+        """
+        backoff = min(self._backoff_ms << retry, self._max_backoff_ms)
+        half = backoff // 2
+
+        return half + random.getrandbits(16) % (backoff - half + 1)
+
+    def _response_time(self, start: int) -> int:
+        """
+        Get the response time of the last transaction
+
+        Serial hosts wait for the response once the request has been
+        transmitted, their response time is the latency of the response after
+        the end of the transmission. Other hosts wait since the start of the
+        transaction.
+
+        :param      start:  The start of the transaction in ticks_us
+        :type       start:  int
+
+        :returns:   The response time in microseconds
+        :rtype:     int
+        """
+        latency = getattr(self._itf, '_rx_latency', None)
+        if latency is not None:
+            return max(0, latency)
+
+        return ticks_diff(ticks_us(), start)
+
+    def _send_receive(self,
+                      slave_addr: int,
+                      modbus_pdu: bytes,
+                      count: bool) -> Optional[bytes]:
+        """
+        Send a modbus message and receive the response, retry on failures
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      modbus_pdu:  The modbus Protocol Data Unit
+        :type       modbus_pdu:  bytes
+        :param      count:       The count
+        :type       count:       bool
+
+        :returns:   Validated response content
+        :rtype:     Optional[bytes]
+        """
+        device = self._estimator._device(slave_addr)
+        device['requests'] += 1
+        retry = 0
+
+        while True:
+            timeout = self._estimator.timeout(slave_addr)
+            # round up to not wait shorter than estimated
+            self._itf.set_response_timeout(timeout_ms=(timeout + 999) // 1000)
+            start = ticks_us()
+
+            try:
+                response = self._itf._send_receive(slave_addr=slave_addr,
+                                                   modbus_pdu=modbus_pdu,
+                                                   count=count)
+            except OSError:
+                self._estimator.record_failure(slave_addr)
+
+                if retry >= self._retries:
+                    device['failures'] += 1
+                    raise
+            else:
+                # broadcasts are not answered, only the turnaround is waited
+                if slave_addr != Const.BROADCAST_ADDR:
+                    self._estimator.record_response(
+                        slave_addr=slave_addr,
+                        rtt=self._response_time(start))
+                return response
+            finally:
+                self._itf.set_response_timeout(timeout_ms=None)
+
+            sleep_ms(self._backoff(retry))
+            device['retries'] += 1
+            retry += 1
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Modbus RTU over TCP transport
+
+Sends Modbus RTU frames, slave address, PDU and CRC, over a TCP connection,
+as forwarded by serial device servers to their RS-485 lines. A byte stream
+has no inter-character timing, so the end of a frame is found by the length
+predicted from its function code and byte count instead of the inter-frame
+delay.
+"""
+
+# custom packages
+from . import const as Const
+from . import crc
+from . import functions
+from .common import Request, CommonModbusFunctions
+from .common import ModbusException
+from .modbus import Modbus
+from .tcp import TCPServer, _create_socket
+from .ticks import ticks_diff, ticks_ms
+
+# typing not natively supported on MicroPython
+from .typing import Callable, List, Optional, Union
+
+#: Maximum size of a Modbus RTU frame
+MAX_FRAME_SIZE = 256
+
+
+def _frame_length(data: bytes,
+                  get_pdu_length: Callable[[bytes, int], Optional[int]]
+                  ) -> Optional[int]:
+    """
+    Get the expected length of the RTU frame at the start of data
+
+    If not enough bytes are available to determine the final length, the
+    amount of bytes required for the next evaluation is returned instead.
+
+    :param      data:            The received data
+    :type       data:            bytes
+    :param      get_pdu_length:  The PDU length function of requests or
+                                 responses
+    :type       get_pdu_length:  Callable[[bytes, int], Optional[int]]
+
+    :returns:   Expected frame length, None for unsupported function codes
+    :rtype:     Optional[int]
+    """
+    pdu_length = get_pdu_length(data, 1)
+
+    if pdu_length is None:
+        return None
+
+    if len(data) < 1 + pdu_length:
+        # the final PDU length is not yet known
+        return 1 + pdu_length
+
+    return 1 + pdu_length + Const.CRC_LENGTH
+
+
+def _form_adu(modbus_pdu: bytes, slave_addr: int) -> bytearray:
+    """
+    Create a Modbus RTU Application Data Unit
+
+    :param      modbus_pdu:  The modbus Protocol Data Unit
+    :type       modbus_pdu:  bytes
+    :param      slave_addr:  The slave address
+    :type       slave_addr:  int
+
+    :returns:   The Modbus PDU with slave address and checksum
+    :rtype:     bytearray
+    """
+    modbus_adu = bytearray()
+    modbus_adu.append(slave_addr)
+    modbus_adu.extend(modbus_pdu)
+    modbus_adu.extend(crc.calculate(modbus_adu))
+
+    return modbus_adu
+
+
+class ModbusRTUoverTCP(Modbus):
+    """
+    Modbus RTU over TCP client class
+
+    :param      addr:  The address of this device
+    :type       addr:  int
+    """
+    def __init__(self, addr: int):
+        super().__init__(
+            # set itf to RTUoverTCPServer object, addr_list to [addr]
+            RTUoverTCPServer(),
+            [addr]
+        )
+
+    def bind(self,
+             local_ip: str,
+             local_port: int = 502,
+             max_connections: int = 10) -> None:
+        """
+        Bind IP and port for incoming requests
+
+        :param      local_ip:         IP of this device listening for requests
+        :type       local_ip:         str
+        :param      local_port:       Port of this device
+        :type       local_port:       int
+        :param      max_connections:  Number of maximum connections
+        :type       max_connections:  int
+        """
+        self._itf.bind(local_ip, local_port, max_connections)
+
+    def get_bound_status(self) -> bool:
+        """
+        Get the IP and port binding status.
+
+        :returns:   The bound status, True if already bound, False otherwise.
+        :rtype:     bool
+        """
+        try:
+            return self._itf.get_is_bound()
+        except Exception:
+            return False
+
+
+class RTUoverTCP(CommonModbusFunctions):
+    """
+    Modbus RTU host connected to a serial device server
+
+    A path, containing a slash, connects to a Unix domain socket instead.
+
+    :param      slave_ip:    IP of the serial device server or path of a Unix
+                             domain socket
+    :type       slave_ip:    str
+    :param      slave_port:  Port of the serial device server
+    :type       slave_port:  int
+    :param      timeout:     Socket timeout in seconds
+    :type       timeout:     float
+    """
+    def __init__(self,
+                 slave_ip: str,
+                 slave_port: int = 502,
+                 timeout: float = 5.0):
+        self._sock, address = _create_socket(slave_ip, slave_port)
+        self._timeout = timeout
+        self._response_timeout = timeout
+
+        self._sock.connect(address)
+
+        self._sock.settimeout(timeout)
+
+    def set_response_timeout(self, timeout_ms: Optional[int]) -> None:
+        """
+        Set the time to wait for the responses of the next transactions
+
+        :param      timeout_ms:  The timeout in milliseconds, None for the
+                                 socket timeout given on creation
+        :type       timeout_ms:  Optional[int]
+        """
+        if timeout_ms is None:
+            self._response_timeout = self._timeout
+        else:
+            self._response_timeout = timeout_ms / 1000
+
+        self._sock.settimeout(self._response_timeout)
+
+    def _flush(self) -> None:
+        """
+        Discard received data, like late responses of timed out requests
+
+        RTU frames carry no transaction ID, so a late response could not be
+        told apart from the response of the next request.
+        """
+        self._sock.settimeout(0)
+
+        try:
+            while self._sock.recv(MAX_FRAME_SIZE):
+                pass
+        except OSError:
+            # no more data available
+            pass
+        finally:
+            self._sock.settimeout(self._response_timeout)
+
+    def _recv_exactly(self, nbytes: int) -> bytes:
+        """
+        Receive an exact amount of bytes
+
+        :param      nbytes:  The amount of bytes
+        :type       nbytes:  int
+
+        :returns:   The received bytes
+        :rtype:     bytes
+
+        :raises     OSError:  The connection has been closed
+        """
+        data = b''
+
+        while len(data) < nbytes:
+            chunk = self._sock.recv(nbytes - len(data))
+            if not chunk:
+                raise OSError('connection closed by slave')
+            data += chunk
+
+        return data
+
+    def _recv_response(self) -> bytearray:
+        """
+        Receive a complete response based on its predicted length
+
+        :returns:   The response including slave address and CRC
+        :rtype:     bytearray
+
+        :raises     OSError:  No complete response received in time
+        """
+        response = bytearray()
+        length = 1
+
+        while len(response) < length:
+            response.extend(self._recv_exactly(length - len(response)))
+            length = _frame_length(response, functions.get_response_pdu_length)
+
+            if length is None:
+                raise OSError('unsupported function code in response')
+
+        return response
+
+    def _send_receive(self,
+                      slave_addr: int,
+                      modbus_pdu: bytes,
+                      count: bool) -> Optional[bytes]:
+        """
+        Send a modbus message and receive the reponse.
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      modbus_pdu:  The modbus Protocol Data Unit
+        :type       modbus_pdu:  bytes
+        :param      count:       The count
+        :type       count:       bool
+
+        :returns:   Validated response content, None for broadcasts
+        :rtype:     Optional[bytes]
+
+        :raises     ValueError:  Broadcast of a function other than a write
+        """
+        broadcast = slave_addr == Const.BROADCAST_ADDR
+        if broadcast and modbus_pdu[0] not in Const.BROADCAST_FUNCTION_CODES:
+            raise ValueError('broadcast is only supported for write functions')
+
+        self._flush()
+        self._sock.send(_form_adu(modbus_pdu=modbus_pdu,
+                                  slave_addr=slave_addr))
+
+        if broadcast:
+            # broadcasts are not answered
+            return None
+
+        return self._validate_resp_hdr(response=self._recv_response(),
+                                       slave_addr=slave_addr,
+                                       function_code=modbus_pdu[0],
+                                       count=count)
+
+    def _validate_resp_hdr(self,
+                           response: bytearray,
+                           slave_addr: int,
+                           function_code: int,
+                           count: bool) -> bytes:
+        """
+        Validate the response header.
+
+        :param      response:       The response
+        :type       response:       bytearray
+        :param      slave_addr:     The slave address
+        :type       slave_addr:     int
+        :param      function_code:  The function code
+        :type       function_code:  int
+        :param      count:          The count
+        :type       count:          bool
+
+        :returns:   Modbus response content
+        :rtype:     bytes
+        """
+        if not crc.is_valid(response):
+            raise OSError('invalid response CRC')
+
+        if (response[0] != slave_addr):
+            raise ValueError('wrong slave address')
+
+        if (response[1] == (function_code + Const.ERROR_BIAS)):
+            raise ValueError('slave returned exception code: {:d}'.
+                             format(response[2]))
+
+        hdr_length = (Const.RESPONSE_HDR_LENGTH + 1) if count else \
+            Const.RESPONSE_HDR_LENGTH
+
+        return response[hdr_length:len(response) - Const.CRC_LENGTH]
+
+
+class RTUoverTCPServer(TCPServer):
+    """Modbus RTU over TCP host class"""
+    def __init__(self):
+        super().__init__()
+        self._buffer = bytearray()
+
+    def _send(self, modbus_pdu: bytes, slave_addr: int) -> None:
+        """
+        Send Modbus frame to the connected host
+
+        Broadcasts are processed without response.
+
+        :param      modbus_pdu:  The Modbus Protocol Data Unit
+        :type       modbus_pdu:  bytes
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        """
+        if slave_addr == Const.BROADCAST_ADDR:
+            return
+
+        self._client_sock.send(_form_adu(modbus_pdu=modbus_pdu,
+                                         slave_addr=slave_addr))
+
+    def _receive(self, timeout: Optional[int]) -> None:
+        """
+        Accept a new connection or receive data of the current one
+
+        A new connection replaces the current one.
+
+        :param      timeout:  The time to wait in milliseconds, None to block
+        :type       timeout:  Optional[int]
+        """
+        sock = self._sock if self._client_sock is None else self._client_sock
+        sock.settimeout(None if timeout is None else timeout / 1000)
+
+        if self._client_sock is None:
+            try:
+                self._client_sock, _ = self._sock.accept()
+            except OSError:
+                # no connection within the timeout
+                return
+            self._buffer = bytearray()
+            return
+
+        try:
+            data = self._client_sock.recv(MAX_FRAME_SIZE)
+        except OSError:
+            # no data within the timeout
+            return
+
+        if not data:
+            # connection closed by the host
+            self._client_sock.close()
+            self._client_sock = None
+            self._buffer = bytearray()
+            return
+
+        self._buffer.extend(data)
+
+    def _next_frame(self) -> Optional[bytearray]:
+        """
+        Take the next complete frame from the received data
+
+        Frames of unsupported function codes end with the received data if
+        their CRC is valid. Data which can not be framed is discarded.
+
+        :returns:   The frame including slave address and CRC, None if not
+                    yet completely received
+        :rtype:     Optional[bytearray]
+        """
+        length = _frame_length(self._buffer, functions.get_request_pdu_length)
+
+        if length is None:
+            if crc.is_valid(self._buffer):
+                length = len(self._buffer)
+            elif len(self._buffer) >= MAX_FRAME_SIZE:
+                self._buffer = bytearray()
+                return None
+
+        if length is None or len(self._buffer) < length:
+            return None
+
+        frame = self._buffer[:length]
+        self._buffer = self._buffer[length:]
+
+        if not crc.is_valid(frame):
+            # the frame boundaries are lost, start over with the next data
+            self._buffer = bytearray()
+            return None
+
+        return frame
+
+    def _is_addressed(self,
+                      req: bytearray,
+                      unit_addr_list: Optional[List[int]]) -> bool:
+        """
+        Check whether a request is addressed to one of the units
+
+        :param      req:             The request
+        :type       req:             bytearray
+        :param      unit_addr_list:  The unit address list
+        :type       unit_addr_list:  Optional[List[int]]
+
+        :returns:   True if addressed to a unit or a valid broadcast
+        :rtype:     bool
+        """
+        if req[0] == Const.BROADCAST_ADDR:
+            return req[1] in Const.BROADCAST_FUNCTION_CODES
+
+        return unit_addr_list is None or req[0] in unit_addr_list
+
+    def get_request(self,
+                    unit_addr_list: Optional[List[int]] = None,
+                    timeout: Optional[int] = None) -> Union[Request, None]:
+        """
+        Check for request within the specified timeout
+
+        Broadcasts of write functions are accepted, the responses to them are
+        suppressed.
+
+        :param      unit_addr_list:  The unit address list
+        :type       unit_addr_list:  Optional[List[int]]
+        :param      timeout:         The timeout in milliseconds, None to
+                                     wait for a request
+        :type       timeout:         Optional[int]
+
+        :returns:   A request object or None.
+        :rtype:     Union[Request, None]
+
+        :raises     Exception:       If no socket is configured and bound
+        """
+        if self._sock is None:
+            raise Exception('Modbus RTU over TCP server not bound')
+
+        start_ms = ticks_ms()
+        received = False
+
+        while True:
+            req = self._next_frame()
+
+            if req is not None:
+                break
+
+            remaining = None
+            if timeout is not None:
+                remaining = max(0, timeout - ticks_diff(ticks_ms(), start_ms))
+                if received and not remaining:
+                    return None
+
+            self._receive(timeout=remaining)
+            received = True
+
+        if len(req) < Const.CRC_LENGTH + 2:
+            return None
+
+        if not self._is_addressed(req=req, unit_addr_list=unit_addr_list):
+            return None
+
+        req_no_crc = req[:-Const.CRC_LENGTH]
+
+        try:
+            return Request(interface=self, data=req_no_crc)
+        except ModbusException as e:
+            self.send_exception_response(
+                slave_addr=req[0],
+                function_code=e.function_code,
+                exception_code=e.exception_code)
+            return None
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Modbus host polling scheduler
+
+Polls the registers of several slaves on one bus, each scan at its own
+interval. Slaves not responding are considered offline after a number of
+consecutive communication failures and are only probed with an exponentially
+increasing backoff time, so the bus time is used for responsive devices.
+"""
+
+# custom packages
+from .const import READ_FUNCTIONS
+from .ticks import sleep_ms, ticks_add, ticks_diff, ticks_ms
+
+# typing not natively supported on MicroPython
+from .typing import Callable, List, Optional, Union
+
+
+class BusScheduler(object):
+    """
+    Poll several slaves on one bus at configurable rates
+
+    :param      host:            The Modbus host, e.g. Serial or TCP
+    :type       host:            CommonModbusFunctions
+    :param      backoff_ms:      Initial time before an offline slave is probed
+    :type       backoff_ms:      int
+    :param      max_backoff_ms:  Maximum time between probes of a slave
+    :type       max_backoff_ms:  int
+    :param      max_failures:    Consecutive failures until a slave is offline
+    :type       max_failures:    int
+    """
+    def __init__(self,
+                 host,
+                 backoff_ms: int = 1000,
+                 max_backoff_ms: int = 60000,
+                 max_failures: int = 2) -> None:
+        self._host = host
+        self._backoff_ms = backoff_ms
+        self._max_backoff_ms = max_backoff_ms
+        self._max_failures = max_failures
+
+        self._scans = []
+        self._slaves = dict()
+        self._cycle_time = 0
+
+    def add_scan(self,
+                 slave_addr: int,
+                 reg_type: str,
+                 address: int,
+                 quantity: int,
+                 interval_ms: int,
+                 callback: Callable[[int, str, int, Union[List[bool],
+                                                          List[int]]],
+                                    None] = None,
+                 signed: bool = True) -> dict:
+        """
+        Add a scan of registers to the scan list of a slave
+
+        :param      slave_addr:   The slave address
+        :type       slave_addr:   int
+        :param      reg_type:     The register type, COILS, ISTS, HREGS, IREGS
+        :type       reg_type:     str
+        :param      address:      The starting address
+        :type       address:     int
+        :param      quantity:     The amount of registers
+        :type       quantity:     int
+        :param      interval_ms:  The scan interval in milliseconds
+        :type       interval_ms:  int
+        :param      callback:     Callback with slave address, register type,
+                                  address and the read values
+        :type       callback:     Callable[[int, str, int, Union[List[bool],
+                                            List[int]]], None]
+        :param      signed:       Indicates if signed, registers only
+        :type       signed:       bool
+
+        :returns:   The scan, containing the latest values and error
+        :rtype:     dict
+
+        :raises     KeyError:     Invalid register type
+        """
+        if reg_type not in READ_FUNCTIONS:
+            raise KeyError('{} is not a valid register type of {}'.
+                           format(reg_type, list(READ_FUNCTIONS.keys())))
+
+        scan = {
+            'slave_addr': slave_addr,
+            'reg_type': reg_type,
+            'address': address,
+            'quantity': quantity,
+            'interval': interval_ms,
+            'signed': signed,
+            'callback': callback,
+            'due': ticks_ms(),
+            'values': None,
+            'error': None,
+        }
+        self._scans.append(scan)
+
+        if slave_addr not in self._slaves:
+            self._slaves[slave_addr] = self._new_slave()
+
+        return scan
+
+    def _new_slave(self) -> dict:
+        """
+        Create the health of a slave
+
+        :returns:   The health of an online slave
+        :rtype:     dict
+        """
+        return {
+            'state': 'ONLINE',
+            'failures': 0,
+            'backoff': 0,
+            'next_probe': 0,
+            'requests': 0,
+            'errors': 0,
+            'timeouts': 0,
+            'lateness': 0,
+            'max_lateness': 0,
+        }
+
+    def slave_state(self, slave_addr: int) -> str:
+        """
+        Get the health state of a slave
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+
+        :returns:   ONLINE or OFFLINE
+        :rtype:     str
+        """
+        return self._slaves[slave_addr]['state']
+
+    @property
+    def cycle_time(self) -> int:
+        """
+        Get the duration of the last poll which executed scans
+
+        :returns:   The cycle time in milliseconds
+        :rtype:     int
+        """
+        return self._cycle_time
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Get the bus and slave statistics
+
+        The lateness is the average delay of a scan start after its due time,
+        smoothed over the last scans.
+
+        :returns:   Cycle time and per slave state, counters and lateness in ms
+        :rtype:     dict
+        """
+        slaves = dict()
+        for slave_addr, slave in self._slaves.items():
+            slaves[slave_addr] = self._slave_statistics(slave)
+
+        return {'cycle_time': self._cycle_time, 'slaves': slaves}
+
+    def _slave_statistics(self, slave: dict) -> dict:
+        """
+        Get the statistics of a slave
+
+        :param      slave:  The slave health
+        :type       slave:  dict
+
+        :returns:   State, counters and lateness in ms of the slave
+        :rtype:     dict
+        """
+        return {
+            'state': slave['state'],
+            'requests': slave['requests'],
+            'errors': slave['errors'],
+            'timeouts': slave['timeouts'],
+            'backoff': slave['backoff'],
+            'lateness': slave['lateness'] / 8,
+            'max_lateness': slave['max_lateness'],
+        }
+
+    def _record_lateness(self, stats: dict, lateness: int) -> None:
+        """
+        Record the delay of a read after its due time
+
+        :param      stats:     The statistics with lateness and maximum lateness
+        :type       stats:     dict
+        :param      lateness:  The delay in milliseconds
+        :type       lateness:  int
+        """
+        # integer exponential moving average with a weight of 1/8
+        stats['lateness'] += lateness - (stats['lateness'] >> 3)
+        stats['max_lateness'] = max(stats['max_lateness'], lateness)
+
+    def _record_result(self,
+                       slave: dict,
+                       error: Optional[Exception],
+                       now: int) -> None:
+        """
+        Update the health of a slave with the result of a read
+
+        :param      slave:  The slave health
+        :type       slave:  dict
+        :param      error:  The error of the read, None on success
+        :type       error:  Optional[Exception]
+        :param      now:    The current time in milliseconds
+        :type       now:    int
+        """
+        if error is None:
+            slave['failures'] = 0
+            slave['state'] = 'ONLINE'
+            slave['backoff'] = 0
+        elif isinstance(error, OSError):
+            # no or invalid response, the slave is probably not reachable
+            slave['errors'] += 1
+            slave['timeouts'] += 1
+            slave['failures'] += 1
+
+            if slave['failures'] >= self._max_failures:
+                if slave['state'] == 'OFFLINE':
+                    slave['backoff'] = min(2 * slave['backoff'],
+                                           self._max_backoff_ms)
+                else:
+                    slave['state'] = 'OFFLINE'
+                    slave['backoff'] = self._backoff_ms
+                slave['next_probe'] = ticks_add(now, slave['backoff'])
+        else:
+            # the slave is alive, but returned an exception
+            slave['errors'] += 1
+            slave['failures'] = 0
+            slave['state'] = 'ONLINE'
+
+    def _is_probe_due(self, slave: dict, now: int) -> bool:
+        """
+        Check whether a slave may be read
+
+        Offline slaves are only probed after their backoff time elapsed, the
+        probe time is moved, so only one read probes the slave.
+
+        :param      slave:  The slave health
+        :type       slave:  dict
+        :param      now:    The current time in milliseconds
+        :type       now:    int
+
+        :returns:   True if the slave may be read, False otherwise
+        :rtype:     bool
+        """
+        if slave['state'] == 'OFFLINE':
+            if ticks_diff(now, slave['next_probe']) < 0:
+                return False
+
+            slave['next_probe'] = ticks_add(now, slave['backoff'])
+
+        return True
+
+    def _read(self, scan: dict) -> Union[List[bool], List[int]]:
+        """
+        Read the registers of a scan
+
+        :param      scan:  The scan
+        :type       scan:  dict
+
+        :returns:   The read values
+        :rtype:     Union[List[bool], List[int]]
+        """
+        read_function = getattr(self._host, READ_FUNCTIONS[scan['reg_type']])
+
+        if scan['reg_type'] in ['HREGS', 'IREGS']:
+            return read_function(scan['slave_addr'],
+                                 scan['address'],
+                                 scan['quantity'],
+                                 scan['signed'])
+
+        return read_function(scan['slave_addr'],
+                             scan['address'],
+                             scan['quantity'])
+
+    def _execute(self,
+                 scan: dict,
+                 slave: dict,
+                 now: int,
+                 started: int) -> None:
+        """
+        Execute a scan and update the health of the slave
+
+        :param      scan:     The scan
+        :type       scan:     dict
+        :param      slave:    The slave health
+        :type       slave:    dict
+        :param      now:      The time of the poll in milliseconds
+        :type       now:      int
+        :param      started:  The start time of this scan in milliseconds,
+                              later than the poll time by the scans before
+        :type       started:  int
+        """
+        self._record_lateness(stats=slave,
+                              lateness=max(0, ticks_diff(started,
+                                                         scan['due'])))
+        slave['requests'] += 1
+        error = None
+
+        try:
+            scan['values'] = self._read(scan)
+        except (OSError, ValueError) as e:
+            error = e
+
+        scan['error'] = error
+        self._record_result(slave=slave, error=error, now=now)
+
+        if error is None and scan['callback'] is not None:
+            scan['callback'](scan['slave_addr'],
+                             scan['reg_type'],
+                             scan['address'],
+                             scan['values'])
+
+        scan['due'] = ticks_add(scan['due'], scan['interval'])
+        if ticks_diff(scan['due'], now) <= 0:
+            # do not catch up on missed scans
+            scan['due'] = ticks_add(now, scan['interval'])
+
+    def poll(self, now: Optional[int] = None) -> int:
+        """
+        Execute all due scans
+
+        Offline slaves are only probed with one scan after their backoff time
+        elapsed, their other scans are postponed.
+
+        :param      now:  The current time in milliseconds, default ticks_ms
+        :type       now:  Optional[int]
+
+        :returns:   Number of executed scans
+        :rtype:     int
+        """
+        if now is None:
+            now = ticks_ms()
+
+        start = ticks_ms()
+        executed = 0
+
+        for scan in self._scans:
+            if ticks_diff(now, scan['due']) < 0:
+                continue
+
+            slave = self._slaves[scan['slave_addr']]
+
+            if not self._is_probe_due(slave=slave, now=now):
+                scan['due'] = slave['next_probe']
+                continue
+
+            # the scans before delayed this one by the time they took
+            started = ticks_add(now, ticks_diff(ticks_ms(), start))
+            self._execute(scan=scan, slave=slave, now=now, started=started)
+            executed += 1
+
+        if executed:
+            self._cycle_time = ticks_diff(ticks_ms(), start)
+
+        return executed
+
+    def time_to_next_scan(self, now: Optional[int] = None) -> int:
+        """
+        Get the time until the next scan is due
+
+        :param      now:  The current time in milliseconds, default ticks_ms
+        :type       now:  Optional[int]
+
+        :returns:   The time in milliseconds, zero if a scan is due already
+        :rtype:     int
+        """
+        if now is None:
+            now = ticks_ms()
+
+        remaining = None
+        for scan in self._scans:
+            diff = ticks_diff(scan['due'], now)
+            if remaining is None or diff < remaining:
+                remaining = diff
+
+        if remaining is None:
+            return 0
+
+        return max(0, remaining)
+
+    def run(self, duration_ms: Optional[int] = None) -> None:
+        """
+        Poll the scans, sleeping until the next scan is due
+
+        :param      duration_ms:  The run time in milliseconds, default forever
+        :type       duration_ms:  Optional[int]
+        """
+        start = ticks_ms()
+
+        while True:
+            self.poll()
+
+            wait = self.time_to_next_scan()
+            if duration_ms is not None:
+                remaining = duration_ms - ticks_diff(ticks_ms(), start)
+                if remaining <= 0:
+                    break
+                wait = min(wait, remaining)
+
+            sleep_ms(wait)
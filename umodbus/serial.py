@@ -9,14 +9,21 @@
 #
 
 # system packages
-from machine import UART
-from machine import Pin
-import struct
-import time
+try:
+    from machine import UART
+    from machine import Pin
+except ImportError:
+    # not available on CPython, only tty devices can be used there
+    UART = None
+    Pin = None
+import select
 
 # custom packages
 from . import const as Const
+from . import crc
+from .calibration import LinkCalibration
 from . import functions
+from .ticks import sleep_ms, sleep_us, ticks_diff, ticks_us
 from .common import Request, CommonModbusFunctions
 from .common import ModbusException
 from .modbus import Modbus
@@ -43,8 +50,8 @@ class ModbusRTU(Modbus):
     :type       pins:        List[Union[int, Pin], Union[int, Pin]]
     :param      ctrl_pin:    The control pin
     :type       ctrl_pin:    int
-    :param      uart_id:     The ID of the used UART
-    :type       uart_id:     int
+    :param      uart_id:     The ID of the used UART or the path of a tty
+    :type       uart_id:     Union[int, str]
     """
     def __init__(self,
                  addr: int,
@@ -54,7 +61,7 @@ class ModbusRTU(Modbus):
                  parity: Optional[int] = None,
                  pins: List[Union[int, Pin], Union[int, Pin]] = None,
                  ctrl_pin: int = None,
-                 uart_id: int = 1):
+                 uart_id: Union[int, str] = 1):
         super().__init__(
             # set itf to Serial object, addr_list to [addr]
             Serial(uart_id=uart_id,
@@ -70,18 +77,23 @@ class ModbusRTU(Modbus):
 
 class Serial(CommonModbusFunctions):
     def __init__(self,
-                 uart_id: int = 1,
+                 uart_id: Union[int, str] = 1,
                  baudrate: int = 9600,
                  data_bits: int = 8,
                  stop_bits: int = 1,
                  parity=None,
                  pins: List[Union[int, Pin], Union[int, Pin]] = None,
-                 ctrl_pin: int = None):
+                 ctrl_pin: int = None,
+                 turnaround_delay: int = Const.BROADCAST_TURNAROUND_DELAY,
+                 calibrate: bool = False):
         """
         Setup Serial/RTU Modbus
 
-        :param      uart_id:     The ID of the used UART
-        :type       uart_id:     int
+        A tty device like /dev/ttyUSB0 is used instead of a MicroPython UART
+        if its path is given as uart_id. The pins are not used in that case.
+
+        :param      uart_id:     The ID of the used UART or the path of a tty
+        :type       uart_id:     Union[int, str]
         :param      baudrate:    The baudrate, default 9600
         :type       baudrate:    int
         :param      data_bits:   The data bits, default 8
@@ -94,25 +106,51 @@ class Serial(CommonModbusFunctions):
         :type       pins:        List[Union[int, Pin], Union[int, Pin]]
         :param      ctrl_pin:    The control pin
         :type       ctrl_pin:    int
+        :param      turnaround_delay:  The time in milliseconds to wait after
+                                       a broadcast
+        :type       turnaround_delay:  int
+        :param      calibrate:   Flag to measure and tighten the timing
+        :type       calibrate:   bool
+
+        :raises     ValueError:  A control pin is given for a tty device
         """
+        if isinstance(uart_id, str):
+            if ctrl_pin is not None:
+                raise ValueError('Control pin not supported for tty devices, '
+                                 'use the RS485 mode of the tty driver')
+
+            # only import on demand as termios is not available on MicroPython
+            from .tty import TTY
+
+            self._uart = TTY(uart_id,
+                             baudrate=baudrate,
+                             bits=data_bits,
+                             parity=parity,
+                             stop=stop_bits)
+        else:
+            self._uart = UART(uart_id,
+                              baudrate=baudrate,
+                              bits=data_bits,
+                              parity=parity,
+                              stop=stop_bits,
+                              # timeout_chars=2,  # WiPy only
+                              # pins=pins         # WiPy only
+                              tx=pins[0],
+                              rx=pins[1]
+                              )
+
         # UART flush function is introduced in Micropython v1.20.0
-        self._has_uart_flush = callable(getattr(UART, "flush", None))
-        self._uart = UART(uart_id,
-                          baudrate=baudrate,
-                          bits=data_bits,
-                          parity=parity,
-                          stop=stop_bits,
-                          # timeout_chars=2,  # WiPy only
-                          # pins=pins         # WiPy only
-                          tx=pins[0],
-                          rx=pins[1]
-                          )
+        self._has_uart_flush = callable(getattr(self._uart, "flush", None))
+        self._has_uart_txdone = callable(getattr(self._uart, "txdone", None))
 
         if ctrl_pin is not None:
             self._ctrlPin = Pin(ctrl_pin, mode=Pin.OUT)
         else:
             self._ctrlPin = None
 
+        # time for the control pin to switch the transceiver in microseconds
+        self._ctrl_pin_delay = 200
+
         # timing of 1 character in microseconds (us)
         self._t1char = (1000000 * (data_bits + stop_bits + 2)) // baudrate
 
@@ -124,6 +162,67 @@ class Serial(CommonModbusFunctions):
         else:
             self._inter_frame_delay = 1750
 
+        # time given to the slaves to process a broadcast before the next
+        # request is sent
+        self._turnaround_delay = turnaround_delay
+
+        # time waited for a response, same as the former 119 inter-frame delay
+        # iterations
+        self._response_timeout = 119 * self._inter_frame_delay
+
+        # response timeout set by set_response_timeout, overrides the
+        # calibrated and the nominal timeout
+        self._response_timeout_override = None
+
+        # end of the last transmission and latency of the last response
+        self._tx_end = 0
+        self._rx_latency = None
+
+        if calibrate:
+            self._calibration = LinkCalibration(
+                t1char=self._t1char,
+                inter_frame_delay=self._inter_frame_delay,
+                response_timeout=self._response_timeout,
+                ctrl_pin_delay=self._ctrl_pin_delay)
+        else:
+            self._calibration = None
+
+        # CRC of the currently received frame, updated on every read
+        self._rx_crc = crc.CRC16()
+
+        # block on the UART instead of spinning while waiting for data.
+        # Objects not supporting the stream poll protocol, like the UART fake,
+        # fall back to sleeping
+        try:
+            self._poller = select.poll()
+            self._poller.register(self._uart, select.POLLIN)
+        except Exception:
+            self._poller = None
+
+    @property
+    def calibration(self) -> Optional[LinkCalibration]:
+        """
+        Get the timing calibration of the links
+
+        :returns:   The calibration, None if not enabled
+        :rtype:     Optional[LinkCalibration]
+        """
+        return self._calibration
+
+    def set_response_timeout(self, timeout_ms: Optional[int]) -> None:
+        """
+        Set the time to wait for the responses of the next transactions
+
+        :param      timeout_ms:  The time to wait for the start of a response
+                                 in milliseconds, None for the calibrated or
+                                 nominal timeout
+        :type       timeout_ms:  Optional[int]
+        """
+        if timeout_ms is None:
+            self._response_timeout_override = None
+        else:
+            self._response_timeout_override = timeout_ms * 1000
+
     def _calculate_crc16(self, data: bytearray) -> bytes:
         """
         Calculates the CRC16.
@@ -134,12 +233,7 @@ class Serial(CommonModbusFunctions):
         :returns:   The crc 16.
         :rtype:     bytes
         """
-        crc = 0xFFFF
-
-        for char in data:
-            crc = (crc >> 8) ^ Const.CRC16_TABLE[((crc) ^ char) & 0xFF]
-
-        return struct.pack('<H', crc)
+        return crc.calculate(data)
 
     def _exit_read(self, response: bytearray) -> bool:
         """
@@ -165,36 +259,111 @@ class Serial(CommonModbusFunctions):
 
         return True
 
-    def _uart_read(self) -> bytearray:
+    def _wait_for_data(self, timeout: int) -> bool:
+        """
+        Wait until data is available on the UART without busy looping
+
+        :param      timeout:  The maximum time to wait in microseconds
+        :type       timeout:  int
+
+        :returns:   True if data is available, False otherwise
+        :rtype:     bool
+        """
+        if self._uart.any():
+            return True
+
+        if timeout <= 0:
+            return False
+
+        if self._poller is not None and timeout >= 1000:
+            # poll has a resolution of milliseconds only, the remaining time
+            # is waited by the next call
+            self._poller.poll(timeout // 1000)
+        else:
+            # wait at most one character time to keep the reaction time low
+            sleep_us(min(timeout, self._t1char))
+
+        return bool(self._uart.any())
+
+    def _uart_read(self, timeout: Optional[int] = None) -> bytearray:
         """
         Read incoming slave response from UART
 
+        The latency of the response after the end of the last transmission is
+        measured while reading.
+
+        :param      timeout:  The time to wait for the start of the response
+                              in microseconds, default the response timeout
+        :type       timeout:  Optional[int]
+
         :returns:   Read content
         :rtype:     bytearray
         """
         response = bytearray()
+        self._rx_latency = None
+
+        if timeout is None:
+            timeout = self._response_timeout
+        start_us = ticks_us()
 
-        # TODO: use some kind of hint or user-configurable delay
-        #       to determine this loop counter
-        for x in range(1, 120):
-            if self._uart.any():
+        while True:
+            remaining = timeout - ticks_diff(ticks_us(), start_us)
+            if remaining < 0:
+                break
+
+            if self._wait_for_data(remaining):
                 # WiPy only
-                # response.extend(self._uart.readall())
-                response.extend(self._uart.read())
+                # r = self._uart.readall()
+                r = self._uart.read()
+
+                if r is not None:
+                    if not len(response):
+                        # the response started, allow it to be completed
+                        timeout = max(timeout, self._response_timeout)
+                        self._rx_latency = (
+                            ticks_diff(ticks_us(), self._tx_end) -
+                            len(r) * self._t1char)
+
+                    response.extend(r)
 
                 # variable length function codes may require multiple reads
                 if self._exit_read(response):
                     break
 
-            # wait for the maximum time between two frames
-            time.sleep_us(self._inter_frame_delay)
-
         return response
 
+    def _is_complete_request(self, frame: bytearray) -> bool:
+        """
+        Check whether a frame is a complete and valid request
+
+        The expected frame length is derived from the function code. Frames of
+        unsupported function codes are never considered complete, the end of
+        those is detected by the inter-frame delay.
+
+        :param      frame:   The received frame
+        :type       frame:   bytearray
+
+        :returns:   True if the frame has the predicted length and a valid CRC
+        :rtype:     bool
+        """
+        pdu_length = functions.get_request_pdu_length(data=frame, offset=1)
+
+        if pdu_length is None:
+            return False
+
+        if len(frame) != 1 + pdu_length + Const.CRC_LENGTH:
+            return False
+
+        # CRC has been calculated already while receiving the frame
+        return self._rx_crc.is_valid
+
     def _uart_read_frame(self, timeout: Optional[int] = None) -> bytearray:
         """
         Read a Modbus frame
 
+        The frame is returned as soon as a complete request has been received,
+        otherwise after the inter-frame delay elapsed without further data.
+
         :param      timeout:  The timeout
         :type       timeout:  Optional[int]
 
@@ -202,23 +371,35 @@ class Serial(CommonModbusFunctions):
         :rtype:     bytearray
         """
         received_bytes = bytearray()
+        self._rx_crc.reset()
 
         # set default timeout to at twice the inter-frame delay
         if timeout == 0 or timeout is None:
             timeout = 2 * self._inter_frame_delay  # in microseconds
 
-        start_us = time.ticks_us()
+        start_us = ticks_us()
 
         # stay inside this while loop at least for the timeout time
-        while (time.ticks_diff(time.ticks_us(), start_us) <= timeout):
-            # check amount of available characters
-            if self._uart.any():
+        while True:
+            remaining = timeout - ticks_diff(ticks_us(), start_us)
+            if remaining < 0:
+                break
+
+            # block until characters are available or the timeout elapsed
+            if self._wait_for_data(remaining):
                 # remember this time in microseconds
-                last_byte_ts = time.ticks_us()
+                last_byte_ts = ticks_us()
 
                 # do not stop reading and appending the result to the buffer
                 # until the time between two frames elapsed
-                while time.ticks_diff(time.ticks_us(), last_byte_ts) <= self._inter_frame_delay:
+                while True:
+                    silence = ticks_diff(ticks_us(), last_byte_ts)
+                    if silence > self._inter_frame_delay:
+                        break
+
+                    if not self._wait_for_data(self._inter_frame_delay - silence):
+                        continue
+
                     # WiPy only
                     # r = self._uart.readall()
                     r = self._uart.read()
@@ -228,9 +409,15 @@ class Serial(CommonModbusFunctions):
                     if r is not None:
                         # append the new read stuff to the buffer
                         received_bytes.extend(r)
+                        self._rx_crc.update(r)
 
                         # update the timestamp of the last byte being read
-                        last_byte_ts = time.ticks_us()
+                        last_byte_ts = ticks_us()
+
+                        # no need to wait for the inter-frame delay if the
+                        # request is already complete
+                        if self._is_complete_request(received_bytes):
+                            return received_bytes
 
             # if something has been read before the overall timeout is reached
             if len(received_bytes) > 0:
@@ -239,16 +426,17 @@ class Serial(CommonModbusFunctions):
         # return the result in case the overall timeout has been reached
         return received_bytes
 
-    def _send(self, modbus_pdu: bytes, slave_addr: int) -> None:
+    def _form_serial_adu(self, modbus_pdu: bytes, slave_addr: int) -> bytearray:
         """
-        Send Modbus frame via UART
-
-        If a flow control pin has been setup, it will be controlled accordingly
+        Create a Modbus Application Data Unit
 
         :param      modbus_pdu:  The modbus Protocol Data Unit
         :type       modbus_pdu:  bytes
         :param      slave_addr:  The slave address
         :type       slave_addr:  int
+
+        :returns:   The Modbus PDU with slave address and checksum
+        :rtype:     bytearray
         """
         # modbus_adu: Modbus Application Data Unit
         # consists of the Modbus PDU, with slave address prepended and checksum appended
@@ -257,11 +445,28 @@ class Serial(CommonModbusFunctions):
         modbus_adu.extend(modbus_pdu)
         modbus_adu.extend(self._calculate_crc16(modbus_adu))
 
+        return modbus_adu
+
+    def _send(self, modbus_pdu: bytes, slave_addr: int) -> None:
+        """
+        Send Modbus frame via UART
+
+        If a flow control pin has been setup, it will be controlled accordingly
+
+        :param      modbus_pdu:  The modbus Protocol Data Unit
+        :type       modbus_pdu:  bytes
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        """
+        modbus_adu = self._form_serial_adu(modbus_pdu=modbus_pdu,
+                                           slave_addr=slave_addr)
+
         if self._ctrlPin:
-            self._ctrlPin.on()
             # wait until the control pin really changed
             # 85-95us (ESP32 @ 160/240MHz)
-            time.sleep_us(200)
+            delay = self._ctrl_pin_on()
+            if delay > 0:
+                sleep_us(delay)
 
         # the timing of this part is critical:
         # - if we disable output too early,
@@ -270,29 +475,134 @@ class Serial(CommonModbusFunctions):
         #   the incoming response will lose some data at the beginning
         # easiest to just wait for the bytes to be sent out on the wire
 
-        send_start_time = time.ticks_us()
+        send_start_time = ticks_us()
         # 360-400us @ 9600-115200 baud (measured) (ESP32 @ 160/240MHz)
         self._uart.write(modbus_adu)
-        send_finish_time = time.ticks_us()
+        send_finish_time = ticks_us()
 
-        if self._has_uart_flush:
+        if self._calibration is not None and self._has_uart_txdone:
+            self._wait_tx_done(slave_addr=slave_addr,
+                               nbytes=len(modbus_adu),
+                               send_start_time=send_start_time)
+        elif self._has_uart_flush:
             self._uart.flush()
-            time.sleep_us(self._t1char)
+            sleep_us(self._t1char)
         else:
             sleep_time_us = (
                 self._t1char * len(modbus_adu) -    # total frame time in us
-                time.ticks_diff(send_finish_time, send_start_time) +
+                ticks_diff(send_finish_time, send_start_time) +
                 100     # only required at baudrates above 57600, but hey 100us
             )
-            time.sleep_us(sleep_time_us)
+            sleep_us(sleep_time_us)
 
         if self._ctrlPin:
             self._ctrlPin.off()
 
+        self._tx_end = ticks_us()
+
+    def _ctrl_pin_on(self) -> int:
+        """
+        Set the control pin to switch the transceiver to transmit
+
+        With the calibration the time until the pin reads back as set is
+        measured, the calibrated delay is used afterwards.
+
+        :returns:   The remaining time to wait for the switch in microseconds
+        :rtype:     int
+        """
+        start = ticks_us()
+        self._ctrlPin.on()
+
+        if self._calibration is None:
+            return self._ctrl_pin_delay
+
+        delay = self._calibration.ctrl_pin_delay()
+
+        while (not self._ctrlPin.value() and
+               ticks_diff(ticks_us(), start) < self._ctrl_pin_delay):
+            pass
+
+        elapsed = ticks_diff(ticks_us(), start)
+        if self._ctrlPin.value():
+            self._calibration.record_ctrl_pin(duration=elapsed)
+
+        return delay - elapsed
+
+    def _tx_limit(self, nbytes: int) -> int:
+        """
+        Get the longest time a transmission is waited for
+
+        :param      nbytes:  The number of bytes of the frame
+        :type       nbytes:  int
+
+        :returns:   Twice the nominal frame time in microseconds
+        :rtype:     int
+        """
+        return 2 * nbytes * self._t1char
+
+    def _wait_tx_done(self,
+                      slave_addr: int,
+                      nbytes: int,
+                      send_start_time: int) -> None:
+        """
+        Wait until a frame has been transmitted and measure the duration
+
+        The frame time of the link is waited and the UART is polled for the
+        completion of the last character afterwards. A frame not completed
+        within twice the nominal frame time counts as failure of the link.
+
+        :param      slave_addr:       The slave address
+        :type       slave_addr:       int
+        :param      nbytes:           The number of bytes of the frame
+        :type       nbytes:           int
+        :param      send_start_time:  The time the write started in us
+        :type       send_start_time:  int
+        """
+        expected = self._calibration.tx_time(slave_addr=slave_addr,
+                                             nbytes=nbytes)
+        elapsed = ticks_diff(ticks_us(), send_start_time)
+        if expected - self._t1char > elapsed:
+            sleep_us(expected - self._t1char - elapsed)
+
+        limit = self._tx_limit(nbytes=nbytes)
+        while (not self._uart.txdone() and
+               ticks_diff(ticks_us(), send_start_time) < limit):
+            sleep_us(self._t1char)
+
+        if self._uart.txdone():
+            self._calibration.record_tx(
+                slave_addr=slave_addr,
+                nbytes=nbytes,
+                duration=ticks_diff(ticks_us(), send_start_time))
+        else:
+            self._calibration.record_failure(slave_addr=slave_addr)
+
+    def _is_broadcast(self, modbus_pdu: bytes, slave_addr: int) -> bool:
+        """
+        Check whether a request is a broadcast
+
+        :param      modbus_pdu:  The modbus Protocol Data Unit
+        :type       modbus_pdu:  bytes
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+
+        :returns:   True if sent to the broadcast address, False otherwise
+        :rtype:     bool
+
+        :raises     ValueError:  Broadcast of a function other than a write
+        """
+        if slave_addr != Const.BROADCAST_ADDR:
+            return False
+
+        if modbus_pdu[0] not in Const.BROADCAST_FUNCTION_CODES:
+            raise ValueError('broadcast is only supported for write functions')
+
+        return True
+
     def _send_receive(self,
                       modbus_pdu: bytes,
                       slave_addr: int,
-                      count: bool) -> bytes:
+                      count: bool) -> Optional[bytes]:
         """
         Send a modbus message and receive the reponse.
 
@@ -303,18 +613,48 @@ class Serial(CommonModbusFunctions):
         :param      count:       The count
         :type       count:       bool
 
-        :returns:   Validated response content
-        :rtype:     bytes
+        :returns:   Validated response content, None for broadcasts
+        :rtype:     Optional[bytes]
         """
+        broadcast = self._is_broadcast(modbus_pdu=modbus_pdu,
+                                       slave_addr=slave_addr)
+
         # flush the Rx FIFO buffer
         self._uart.read()
 
         self._send(modbus_pdu=modbus_pdu, slave_addr=slave_addr)
 
-        return self._validate_resp_hdr(response=self._uart_read(),
-                                       slave_addr=slave_addr,
-                                       function_code=modbus_pdu[0],
-                                       count=count)
+        if broadcast:
+            # broadcasts are not answered, let the slaves process it
+            sleep_ms(self._turnaround_delay)
+            return None
+
+        if self._calibration is None:
+            return self._validate_resp_hdr(
+                response=self._uart_read(
+                    timeout=self._response_timeout_override),
+                slave_addr=slave_addr,
+                function_code=modbus_pdu[0],
+                count=count)
+
+        timeout = self._calibration.response_timeout(slave_addr=slave_addr)
+        if self._response_timeout_override is not None:
+            timeout = self._response_timeout_override
+
+        try:
+            response = self._validate_resp_hdr(
+                response=self._uart_read(timeout=timeout),
+                slave_addr=slave_addr,
+                function_code=modbus_pdu[0],
+                count=count)
+        except OSError:
+            self._calibration.record_failure(slave_addr=slave_addr)
+            raise
+
+        self._calibration.record_response(slave_addr=slave_addr,
+                                          latency=self._rx_latency)
+
+        return response
 
     def _validate_resp_hdr(self,
                            response: bytearray,
@@ -339,13 +679,7 @@ class Serial(CommonModbusFunctions):
         if len(response) == 0:
             raise OSError('no data received from slave')
 
-        resp_crc = response[-Const.CRC_LENGTH:]
-        expected_crc = self._calculate_crc16(
-            response[0:len(response) - Const.CRC_LENGTH]
-        )
-
-        if ((resp_crc[0] is not expected_crc[0]) or
-                (resp_crc[1] is not expected_crc[1])):
+        if not crc.is_valid(response):
             raise OSError('invalid response CRC')
 
         if (response[0] != slave_addr):
@@ -394,6 +728,11 @@ class Serial(CommonModbusFunctions):
             value_list=values,
             signed=signed
         )
+
+        # broadcasts are processed without response
+        if slave_addr == Const.BROADCAST_ADDR:
+            return
+
         self._send(modbus_pdu=modbus_pdu, slave_addr=slave_addr)
 
     def send_exception_response(self,
@@ -410,17 +749,41 @@ class Serial(CommonModbusFunctions):
         :param      exception_code:  The exception code
         :type       exception_code:  int
         """
+        # broadcasts are processed without response
+        if slave_addr == Const.BROADCAST_ADDR:
+            return
+
         modbus_pdu = functions.exception_response(
             function_code=function_code,
             exception_code=exception_code)
         self._send(modbus_pdu=modbus_pdu, slave_addr=slave_addr)
 
+    def _is_addressed(self, req: bytearray, unit_addr_list: List[int]) -> bool:
+        """
+        Check whether a request is addressed to one of the units
+
+        :param      req:             The request
+        :type       req:             bytearray
+        :param      unit_addr_list:  The unit address list
+        :type       unit_addr_list:  List[int]
+
+        :returns:   True if addressed to a unit or a valid broadcast
+        :rtype:     bool
+        """
+        if req[0] == Const.BROADCAST_ADDR:
+            return req[1] in Const.BROADCAST_FUNCTION_CODES
+
+        return req[0] in unit_addr_list
+
     def get_request(self,
                     unit_addr_list: List[int],
                     timeout: Optional[int] = None) -> Union[Request, None]:
         """
         Check for request within the specified timeout
 
+        Broadcasts of write functions are accepted, the responses to them are
+        suppressed.
+
         :param      unit_addr_list:  The unit address list
         :type       unit_addr_list:  Optional[list]
         :param      timeout:         The timeout
@@ -434,16 +797,15 @@ class Serial(CommonModbusFunctions):
         if len(req) < 8:
             return None
 
-        if req[0] not in unit_addr_list:
+        if not self._is_addressed(req=req, unit_addr_list=unit_addr_list):
             return None
 
-        req_crc = req[-Const.CRC_LENGTH:]
-        req_no_crc = req[:-Const.CRC_LENGTH]
-        expected_crc = self._calculate_crc16(req_no_crc)
-
-        if (req_crc[0] != expected_crc[0]) or (req_crc[1] != expected_crc[1]):
+        # CRC of the whole frame has been updated while receiving it
+        if not self._rx_crc.is_valid:
             return None
 
+        req_no_crc = req[:-Const.CRC_LENGTH]
+
         try:
             request = Request(interface=self, data=req_no_crc)
         except ModbusException as e:
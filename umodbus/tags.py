@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Modbus host tag database
+
+Compiles register definitions, as used by Modbus.setup_registers, into a scan
+plan reading all tags of a device with as few requests as possible. Besides
+the keys of the register definitions, tags of registers may define the data
+type and order of their values as used by the codec and a linear scaling.
+"""
+
+# system packages
+import struct
+
+# custom packages
+from . import codec
+from .const import READ_FUNCTIONS
+from .planner import ReadPlanner
+
+# typing not natively supported on MicroPython
+from .typing import List, Optional
+
+
+class TagDatabase(object):
+    """
+    Tags of a device, read together in a single scan
+
+    Each tag is defined by a register definition with the keys register and
+    len and optionally description, range and unit. Tags of registers may
+    further define:
+
+    - dtype, the data type of the values, see umodbus.codec, default int16
+      or uint16 depending on signed
+    - order, the byte and word order of the values, default ABCD
+    - scale and offset, applied to the read values as value * scale + offset
+
+    :param      registers:   The register definitions per register type
+    :type       registers:   dict
+    :param      slave_addr:  The slave address
+    :type       slave_addr:  int
+    :param      max_gap:     Maximum number of unused registers read between
+                             tags, None for no limit
+    :type       max_gap:     Optional[int]
+    :param      signed:      Indicates if registers without a data type are
+                             signed
+    :type       signed:      bool
+
+    :raises     ValueError:  Invalid data type, order or length of a tag
+    """
+    def __init__(self,
+                 registers: dict,
+                 slave_addr: int,
+                 max_gap: Optional[int] = None,
+                 signed: bool = True) -> None:
+        self._slave_addr = slave_addr
+        self._max_gap = max_gap
+        self._tags = []
+        self._requests = None
+
+        for reg_type in READ_FUNCTIONS:
+            for name, definition in registers.get(reg_type, {}).items():
+                self._tags.append(self._create_tag(name=name,
+                                                   reg_type=reg_type,
+                                                   definition=definition,
+                                                   signed=signed))
+
+    def _create_tag(self,
+                    name: str,
+                    reg_type: str,
+                    definition: dict,
+                    signed: bool) -> dict:
+        """
+        Create a tag from its register definition
+
+        :param      name:        The name of the tag
+        :type       name:        str
+        :param      reg_type:    The register type
+        :type       reg_type:    str
+        :param      definition:  The register definition
+        :type       definition:  dict
+        :param      signed:      Indicates if registers without a data type
+                                 are signed
+        :type       signed:      bool
+
+        :returns:   The tag
+        :rtype:     dict
+
+        :raises     ValueError:  Invalid data type, order or length
+        """
+        tag = {
+            'name': name,
+            'reg_type': reg_type,
+            'address': definition['register'],
+            'length': definition.get('len', 1),
+            'dtype': None,
+            'order': definition.get('order', 'ABCD'),
+            'scale': definition.get('scale', 1),
+            'offset': definition.get('offset', 0),
+            'description': definition.get('description', ''),
+            'range': definition.get('range', ''),
+            'unit': definition.get('unit', ''),
+        }
+
+        if reg_type in ['COILS', 'ISTS']:
+            return tag
+
+        tag['dtype'] = definition.get('dtype', 'int16' if signed else 'uint16')
+
+        if tag['order'] not in codec.ORDERS:
+            raise ValueError('{} is not a valid order of {}'.
+                             format(tag['order'], list(codec.ORDERS.keys())))
+
+        if tag['dtype'] != codec.STRING:
+            registers = codec.register_count(dtype=tag['dtype'])
+
+            if tag['length'] % registers:
+                raise ValueError('{} registers of {} are no multiple of {}'.
+                                 format(tag['length'], name, tag['dtype']))
+
+        return tag
+
+    @property
+    def tags(self) -> dict:
+        """
+        Get the description, range and unit of all tags
+
+        :returns:   The description, range and unit per tag name
+        :rtype:     dict
+        """
+        return {tag['name']: {'description': tag['description'],
+                              'range': tag['range'],
+                              'unit': tag['unit']} for tag in self._tags}
+
+    @property
+    def requests(self) -> Optional[List[dict]]:
+        """
+        Get the requests of the scan plan
+
+        :returns:   The requests, None if not yet compiled
+        :rtype:     Optional[List[dict]]
+        """
+        return self._requests
+
+    def compile(self, host=None) -> List[dict]:
+        """
+        Compile the tags into a scan plan
+
+        The tags are merged into requests by the read planner. The host is
+        only used to estimate the cost of reading over gaps, without a host
+        all gaps up to the maximum gap are read. Each request gets a
+        preallocated buffer for the read data and a decoder for each tag,
+        given as tag index, struct format, offset in the buffer and whether
+        the register bytes are swapped.
+
+        :param      host:  The Modbus host, e.g. Serial or TCP
+        :type       host:  CommonModbusFunctions
+
+        :returns:   The requests
+        :rtype:     List[dict]
+
+        :raises     ValueError:  A tag exceeds the maximum request size
+        """
+        planner = ReadPlanner(host=host, max_gap=self._max_gap)
+        requests = planner.plan(items=[(tag['reg_type'],
+                                        tag['address'],
+                                        tag['length'])
+                                       for tag in self._tags])
+
+        for request in requests:
+            is_bit = request['reg_type'] in ['COILS', 'ISTS']
+            request['buffer'] = bytearray(request['quantity'] *
+                                          (1 if is_bit else 2))
+            request['decoders'] = []
+
+            for index, item_offset, offset, quantity in request['pieces']:
+                tag = self._tags[index]
+
+                if item_offset or quantity != tag['length']:
+                    raise ValueError('{} exceeds the maximum request size'.
+                                     format(tag['name']))
+
+                if is_bit:
+                    decoder = (index, None, offset, False)
+                elif tag['dtype'] == codec.STRING:
+                    decoder = (index, None, 2 * offset, False)
+                else:
+                    fmt, registers = codec.DTYPES[tag['dtype']]
+                    byteorder, swap = codec.ORDERS[tag['order']]
+                    fmt = byteorder + fmt * (quantity // registers)
+                    decoder = (index, fmt, 2 * offset, swap)
+
+                request['decoders'].append(decoder)
+
+        self._requests = requests
+
+        return requests
+
+    def _decode(self, tag: dict, buffer: bytearray, decoder: tuple):
+        """
+        Decode the value of a tag from the read data of a request
+
+        :param      tag:      The tag
+        :type       tag:      dict
+        :param      buffer:   The read data of the request
+        :type       buffer:   bytearray
+        :param      decoder:  The decoder of the tag
+        :type       decoder:  tuple
+
+        :returns:   The value, a tuple of values for tags with several values
+        :rtype:     Union[bool, int, float, str, list, tuple]
+        """
+        _, fmt, offset, swap = decoder
+        length = tag['length']
+
+        if tag['dtype'] is None:
+            if length == 1:
+                return bool(buffer[offset])
+            return [bool(x) for x in buffer[offset:offset + length]]
+
+        if fmt is None:
+            return codec.decode_string(data=buffer[offset:offset + 2 * length],
+                                       order=tag['order'])
+
+        if swap:
+            values = struct.unpack(fmt, codec.swap_bytes(
+                buffer[offset:offset + 2 * length]))
+        else:
+            values = struct.unpack_from(fmt, buffer, offset)
+
+        if tag['scale'] != 1 or tag['offset'] != 0:
+            values = tuple(value * tag['scale'] + tag['offset']
+                           for value in values)
+
+        if len(values) == 1:
+            return values[0]
+
+        return values
+
+    def scan(self, client) -> dict:
+        """
+        Read all tags
+
+        The scan plan is compiled with the client on the first scan, if not
+        compiled before.
+
+        :param      client:  The Modbus host, e.g. Serial or TCP
+        :type       client:  CommonModbusFunctions
+
+        :returns:   The values per tag name
+        :rtype:     dict
+        """
+        if self._requests is None:
+            self.compile(host=client)
+
+        values = dict()
+
+        for request in self._requests:
+            read_function = getattr(client,
+                                    READ_FUNCTIONS[request['reg_type']] +
+                                    '_into')
+            read_function(self._slave_addr,
+                          request['address'],
+                          request['quantity'],
+                          request['buffer'])
+
+            for decoder in request['decoders']:
+                tag = self._tags[decoder[0]]
+                values[tag['name']] = self._decode(tag=tag,
+                                                   buffer=request['buffer'],
+                                                   decoder=decoder)
+
+        return values
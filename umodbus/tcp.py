@@ -10,9 +10,9 @@
 
 # system packages
 # import random
+import os
 import struct
 import socket
-import time
 
 # custom packages
 from . import functions
@@ -20,9 +20,54 @@ from . import const as Const
 from .common import Request, CommonModbusFunctions
 from .common import ModbusException
 from .modbus import Modbus
+from .ticks import ticks_diff, ticks_ms
 
 # typing not natively supported on MicroPython
-from .typing import Optional, Tuple, Union
+from .typing import List, Optional, Tuple, Union
+
+#: File type bits of a socket in the mode reported by os.stat
+S_IFSOCK = 0o140000
+
+
+def _is_unix_path(address: str) -> bool:
+    """
+    Check whether an address is the path of a Unix domain socket
+
+    IP addresses and host names never contain a slash.
+
+    :param      address:  The IP, host name or path
+    :type       address:  str
+
+    :returns:   True for a path, False otherwise
+    :rtype:     bool
+    """
+    return '/' in address
+
+
+def _create_socket(address: str,
+                   port: int) -> Tuple[socket.socket, Union[tuple, str]]:
+    """
+    Create a stream socket for an IP address or a Unix domain socket path
+
+    :param      address:  The IP, host name or path of a Unix domain socket
+    :type       address:  str
+    :param      port:     The port, ignored for Unix domain sockets
+    :type       port:     int
+
+    :returns:   The socket and the address to connect or bind it to
+    :rtype:     Tuple[socket.socket, Union[tuple, str]]
+
+    :raises     OSError:  Unix domain sockets are not supported
+    """
+    if not _is_unix_path(address):
+        # print(socket.getaddrinfo(address, port))
+        # [(2, 1, 0, '192.168.178.47', ('192.168.178.47', 502))]
+        return socket.socket(), socket.getaddrinfo(address, port)[0][-1]
+
+    if not hasattr(socket, 'AF_UNIX'):
+        raise OSError('Unix domain sockets not supported')
+
+    return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM), address
 
 
 class ModbusTCP(Modbus):
@@ -41,7 +86,11 @@ class ModbusTCP(Modbus):
         """
         Bind IP and port for incomming requests
 
+        A path, containing a slash, binds to a Unix domain socket instead,
+        its port is ignored.
+
         :param      local_ip:         IP of this device listening for requests
+                                      or path of a Unix domain socket
         :type       local_ip:         str
         :param      local_port:       Port of this device
         :type       local_port:       int
@@ -67,26 +116,64 @@ class TCP(CommonModbusFunctions):
     """
     TCP class handling socket connections and parsing the Modbus data
 
-    :param      slave_ip:    IP of this device listening for requests
+    A path, containing a slash, connects to a Unix domain socket instead, the
+    messages are framed the same way.
+
+    :param      slave_ip:    IP of this device listening for requests or path
+                             of a Unix domain socket
     :type       slave_ip:    str
     :param      slave_port:  Port of this device
     :type       slave_port:  int
     :param      timeout:     Socket timeout in seconds
     :type       timeout:     float
+    :param      max_outstanding:  Maximum number of requests sent before
+                                  their responses are received, used by the
+                                  range functions if the device supports it
+    :type       max_outstanding:  int
     """
     def __init__(self,
                  slave_ip: str,
                  slave_port: int = 502,
-                 timeout: float = 5.0):
-        self._sock = socket.socket()
+                 timeout: float = 5.0,
+                 max_outstanding: int = 1):
+        self._sock, address = _create_socket(slave_ip, slave_port)
         self.trans_id_ctr = 0
+        self._max_outstanding = max_outstanding
+        self._timeout = timeout
 
-        # print(socket.getaddrinfo(slave_ip, slave_port))
-        # [(2, 1, 0, '192.168.178.47', ('192.168.178.47', 502))]
-        self._sock.connect(socket.getaddrinfo(slave_ip, slave_port)[0][-1])
+        # IDs of timed out transactions, their late responses are discarded
+        self._stale_trans_ids = []
+
+        self._sock.connect(address)
 
         self._sock.settimeout(timeout)
 
+    def set_response_timeout(self, timeout_ms: Optional[int]) -> None:
+        """
+        Set the time to wait for the responses of the next transactions
+
+        :param      timeout_ms:  The timeout in milliseconds, None for the
+                                 socket timeout given on creation
+        :type       timeout_ms:  Optional[int]
+        """
+        if timeout_ms is None:
+            self._sock.settimeout(self._timeout)
+        else:
+            self._sock.settimeout(timeout_ms / 1000)
+
+    def _discard_response(self, trans_id: int) -> None:
+        """
+        Discard the response of a transaction once it is received
+
+        Only the latest transactions, at least the maximum number of
+        outstanding requests, are remembered.
+
+        :param      trans_id:  The transaction ID
+        :type       trans_id:  int
+        """
+        keep = max(8, self._max_outstanding) - 1
+        self._stale_trans_ids = self._stale_trans_ids[-keep:] + [trans_id]
+
     def _create_mbap_hdr(self,
                          slave_addr: int,
                          modbus_pdu: bytes) -> Tuple[bytes, int]:
@@ -107,7 +194,7 @@ class TCP(CommonModbusFunctions):
         # trans_id = random.getrandbits(24) & 0xFFFF
         # use incrementing counter as it's faster
         trans_id = self.trans_id_ctr
-        self.trans_id_ctr += 1
+        self.trans_id_ctr = (self.trans_id_ctr + 1) & 0xFFFF
 
         mbap_hdr = struct.pack(
             '>HHHB', trans_id, 0, len(modbus_pdu) + 1, slave_addr)
@@ -179,7 +266,19 @@ class TCP(CommonModbusFunctions):
                                                    modbus_pdu=modbus_pdu)
         self._sock.send(mbap_hdr + modbus_pdu)
 
-        response = self._sock.recv(256)
+        try:
+            response = self._recv_response()
+            rec_tid = struct.unpack_from('>H', response, 0)[0]
+
+            while rec_tid in self._stale_trans_ids:
+                # late response of a timed out transaction
+                self._stale_trans_ids.remove(rec_tid)
+                response = self._recv_response()
+                rec_tid = struct.unpack_from('>H', response, 0)[0]
+        except OSError:
+            self._discard_response(trans_id=trans_id)
+            raise
+
         modbus_data = self._validate_resp_hdr(response=response,
                                               trans_id=trans_id,
                                               slave_addr=slave_addr,
@@ -188,6 +287,123 @@ class TCP(CommonModbusFunctions):
 
         return modbus_data
 
+    def _recv_exactly(self, nbytes: int) -> bytes:
+        """
+        Receive an exact amount of bytes
+
+        :param      nbytes:  The amount of bytes
+        :type       nbytes:  int
+
+        :returns:   The received bytes
+        :rtype:     bytes
+
+        :raises     OSError:  The connection has been closed
+        """
+        data = b''
+
+        while len(data) < nbytes:
+            chunk = self._sock.recv(nbytes - len(data))
+            if not chunk:
+                raise OSError('connection closed by slave')
+            data += chunk
+
+        return data
+
+    def _recv_response(self) -> bytes:
+        """
+        Receive a complete response based on the length of its MBAP header
+
+        :returns:   The response including the MBAP header
+        :rtype:     bytes
+        """
+        # transaction ID, protocol ID and length of the following bytes
+        header = self._recv_exactly(6)
+        length = struct.unpack_from('>H', header, 4)[0]
+
+        return header + self._recv_exactly(length)
+
+    def _send_receive_many(self,
+                           slave_addr: int,
+                           modbus_pdus: List[bytes],
+                           count: bool) -> List[bytes]:
+        """
+        Send several modbus messages and receive the responses.
+
+        Up to the maximum number of outstanding requests are sent before the
+        responses are received. Responses are assigned to the requests by
+        their transaction ID, so the device may answer in any order.
+
+        :param      slave_addr:   The slave identifier
+        :type       slave_addr:   int
+        :param      modbus_pdus:  The modbus PDUs
+        :type       modbus_pdus:  List[bytes]
+        :param      count:        The count
+        :type       count:        bool
+
+        :returns:   Modbus data of each message
+        :rtype:     List[bytes]
+        """
+        if self._max_outstanding < 2:
+            return super()._send_receive_many(slave_addr=slave_addr,
+                                              modbus_pdus=modbus_pdus,
+                                              count=count)
+
+        responses = [None] * len(modbus_pdus)
+        pending = dict()
+        next_index = 0
+        error = None
+
+        while next_index < len(modbus_pdus) or len(pending):
+            while (next_index < len(modbus_pdus) and
+                   len(pending) < self._max_outstanding):
+                modbus_pdu = modbus_pdus[next_index]
+                mbap_hdr, trans_id = self._create_mbap_hdr(
+                    slave_addr=slave_addr,
+                    modbus_pdu=modbus_pdu)
+                self._sock.send(mbap_hdr + modbus_pdu)
+                pending[trans_id] = next_index
+                next_index += 1
+
+            try:
+                response = self._recv_response()
+                trans_id = struct.unpack_from('>H', response, 0)[0]
+
+                while trans_id in self._stale_trans_ids:
+                    # late response of a timed out transaction
+                    self._stale_trans_ids.remove(trans_id)
+                    response = self._recv_response()
+                    trans_id = struct.unpack_from('>H', response, 0)[0]
+            except OSError:
+                for pending_id in pending:
+                    self._discard_response(trans_id=pending_id)
+                raise
+
+            index = pending.pop(trans_id, None)
+
+            if index is None:
+                # the outstanding responses may still be received
+                for pending_id in pending:
+                    self._discard_response(trans_id=pending_id)
+                raise ValueError('wrong transaction ID')
+
+            try:
+                responses[index] = self._validate_resp_hdr(
+                    response=response,
+                    trans_id=trans_id,
+                    slave_addr=slave_addr,
+                    function_code=modbus_pdus[index][0],
+                    count=count)
+            except ValueError as e:
+                # receive the outstanding responses, but send no more
+                if error is None:
+                    error = e
+                next_index = len(modbus_pdus)
+
+        if error is not None:
+            raise error
+
+        return responses
+
 
 class TCPServer(object):
     """Modbus TCP host class"""
@@ -222,7 +438,11 @@ class TCPServer(object):
         """
         Bind IP and port for incomming requests
 
+        A path, containing a slash, binds to a Unix domain socket instead,
+        its port is ignored.
+
         :param      local_ip:         IP of this device listening for requests
+                                      or path of a Unix domain socket
         :type       local_ip:         str
         :param      local_port:       Port of this device
         :type       local_port:       int
@@ -235,16 +455,33 @@ class TCPServer(object):
         if self._sock:
             self._sock.close()
 
-        self._sock = socket.socket()
+        self._sock, address = _create_socket(local_ip, local_port)
 
-        # print(socket.getaddrinfo(local_ip, local_port))
-        # [(2, 1, 0, '192.168.178.47', ('192.168.178.47', 502))]
-        self._sock.bind(socket.getaddrinfo(local_ip, local_port)[0][-1])
+        if _is_unix_path(local_ip):
+            self._remove_socket_file(path=local_ip)
+
+        self._sock.bind(address)
 
         self._sock.listen(max_connections)
 
         self._is_bound = True
 
+    def _remove_socket_file(self, path: str) -> None:
+        """
+        Remove the socket file left by a previous server
+
+        Binding to an existing path fails. Other files are kept.
+
+        :param      path:  The path of the Unix domain socket
+        :type       path:  str
+        """
+        try:
+            if os.stat(path)[0] & 0o170000 == S_IFSOCK:
+                os.remove(path)
+        except OSError:
+            # the path does not exist
+            pass
+
     def _send(self, modbus_pdu: bytes, slave_addr: int) -> None:
         """
         Send Modbus Protocol Data Unit to slave
@@ -399,7 +636,7 @@ class TCPServer(object):
             raise Exception('Modbus TCP server not bound')
 
         if timeout > 0:
-            start_ms = time.ticks_ms()
+            start_ms = ticks_ms()
             elapsed = 0
             while True:
                 if self._client_sock is None:
@@ -409,7 +646,7 @@ class TCPServer(object):
                 req = self._accept_request(accept_timeout, unit_addr_list)
                 if req:
                     return req
-                elapsed = time.ticks_diff(start_ms, time.ticks_ms())
+                elapsed = ticks_diff(ticks_ms(), start_ms)
                 if elapsed > timeout:
                     return None
         else:
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Fallbacks of the MicroPython specific time functions.
+
+MicroPython provides ticks and microsecond sleep functions in its time module
+which are not available on CPython. On CPython they are based on the monotonic
+clock, which does not wrap around.
+
+https://docs.micropython.org/en/latest/library/time.html
+"""
+
+# system packages
+import time
+
+try:
+    ticks_us = time.ticks_us
+    ticks_ms = time.ticks_ms
+    ticks_add = time.ticks_add
+    ticks_diff = time.ticks_diff
+    sleep_us = time.sleep_us
+    sleep_ms = time.sleep_ms
+except AttributeError:
+    def ticks_us() -> int:
+        """
+        Get a microsecond counter with an arbitrary reference point
+
+        :returns:   The counter value in microseconds
+        :rtype:     int
+        """
+        return time.monotonic_ns() // 1000
+
+    def ticks_ms() -> int:
+        """
+        Get a millisecond counter with an arbitrary reference point
+
+        :returns:   The counter value in milliseconds
+        :rtype:     int
+        """
+        return time.monotonic_ns() // 1000000
+
+    def ticks_add(ticks: int, delta: int) -> int:
+        """
+        Offset a ticks value by a given number
+
+        :param      ticks:  The ticks value
+        :type       ticks:  int
+        :param      delta:  The offset, positive or negative
+        :type       delta:  int
+
+        :returns:   The offset ticks value
+        :rtype:     int
+        """
+        return ticks + delta
+
+    def ticks_diff(ticks1: int, ticks2: int) -> int:
+        """
+        Measure the difference between two ticks values
+
+        :param      ticks1:  The later ticks value
+        :type       ticks1:  int
+        :param      ticks2:  The earlier ticks value
+        :type       ticks2:  int
+
+        :returns:   The signed difference ticks1 - ticks2
+        :rtype:     int
+        """
+        return ticks1 - ticks2
+
+    def sleep_us(us: int) -> None:
+        """
+        Delay for given number of microseconds
+
+        :param      us:   The delay in microseconds
+        :type       us:   int
+        """
+        if us > 0:
+            time.sleep(us / 1000000)
+
+    def sleep_ms(ms: int) -> None:
+        """
+        Delay for given number of milliseconds
+
+        :param      ms:   The delay in milliseconds
+        :type       ms:   int
+        """
+        if ms > 0:
+            time.sleep(ms / 1000)
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Modbus host transaction queue
+
+Arbitrates the access of several threads to a single host, e.g. a Serial
+master of a half-duplex RS485 bus. Waiting transactions are granted the bus in
+the order of their priority class, transactions of the same class in the
+order of their submission. Reads with an expired deadline are dropped instead
+of sent, so a backlog of background reads does not delay later transactions.
+"""
+
+# system packages
+try:
+    import heapq
+except ImportError:
+    import uheapq as heapq
+
+# custom packages
+from . import const as Const
+from .common import CommonModbusFunctions
+from .lock import allocate_lock
+from .ticks import ticks_add, ticks_diff, ticks_ms
+
+# typing not natively supported on MicroPython
+from .typing import Optional
+
+#: Priority of foreground operator actions, e.g. alarm acknowledgements
+PRIORITY_HIGH = 0
+#: Default priority
+PRIORITY_NORMAL = 1
+#: Priority of background reads, e.g. bulk scans
+PRIORITY_LOW = 2
+
+#: Function codes of reads dropped after their deadline
+READ_FUNCTION_CODES = (
+    Const.READ_COILS,
+    Const.READ_DISCRETE_INPUTS,
+    Const.READ_HOLDING_REGISTERS,
+    Const.READ_INPUT_REGISTER,
+)
+
+
+class RequestExpired(OSError):
+    """Exception for reads dropped after their deadline"""
+    pass
+
+
+class TransactionQueue(object):
+    """
+    Priority queue granting the transactions of several threads the host
+
+    The transactions are executed by the submitting threads, the queue only
+    decides which of them is next. Clients of a priority class and deadline
+    are created with client.
+
+    :param      itf:  The Modbus host, e.g. Serial
+    :type       itf:  CommonModbusFunctions
+    """
+    def __init__(self, itf) -> None:
+        self._itf = itf
+
+        self._lock = allocate_lock()
+        self._busy = False
+        self._waiting = []
+        self._sequence = 0
+
+        self._sent = [0, 0, 0]
+        self._dropped = [0, 0, 0]
+        self._max_wait = [0, 0, 0]
+
+    def client(self,
+               priority: int = PRIORITY_NORMAL,
+               deadline_ms: Optional[int] = None) -> 'PriorityClient':
+        """
+        Get a client submitting its transactions with a priority
+
+        :param      priority:     The priority class, PRIORITY_HIGH,
+                                  PRIORITY_NORMAL or PRIORITY_LOW
+        :type       priority:     int
+        :param      deadline_ms:  Time after the submission until reads are
+                                  dropped, None to never drop them
+        :type       deadline_ms:  Optional[int]
+
+        :returns:   The client
+        :rtype:     PriorityClient
+
+        :raises     ValueError:   Invalid priority class
+        """
+        if priority not in (PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW):
+            raise ValueError('{} is not a valid priority class'.
+                             format(priority))
+
+        return PriorityClient(queue=self,
+                              priority=priority,
+                              deadline_ms=deadline_ms)
+
+    @property
+    def waiting(self) -> int:
+        """
+        Get the number of transactions waiting for the host
+
+        :returns:   The number of waiting transactions
+        :rtype:     int
+        """
+        return len(self._waiting)
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Get the queue statistics per priority class
+
+        :returns:   Sent and dropped transactions and the maximum wait time
+                    in milliseconds, each as list indexed by priority class
+        :rtype:     dict
+        """
+        return {
+            'sent': list(self._sent),
+            'dropped': list(self._dropped),
+            'max_wait': list(self._max_wait),
+            'waiting': self.waiting,
+        }
+
+    def _expired(self, transaction: dict, now: int) -> bool:
+        """
+        Check whether a transaction is a read after its deadline
+
+        :param      transaction:  The transaction
+        :type       transaction:  dict
+        :param      now:          The current time in milliseconds
+        :type       now:          int
+
+        :returns:   True if the transaction has to be dropped
+        :rtype:     bool
+        """
+        return (transaction['deadline'] is not None and
+                transaction['function_code'] in READ_FUNCTION_CODES and
+                ticks_diff(now, transaction['deadline']) >= 0)
+
+    def _release(self) -> None:
+        """
+        Grant the host to the next waiting transaction
+
+        Expired reads are woken up to be dropped. Must be called with the
+        lock acquired.
+        """
+        now = ticks_ms()
+
+        while len(self._waiting):
+            transaction = heapq.heappop(self._waiting)[2]
+
+            if self._expired(transaction=transaction, now=now):
+                transaction['expired'] = True
+                self._dropped[transaction['priority']] += 1
+                transaction['lock'].release()
+                continue
+
+            # the host stays busy, handed over to the waiting thread
+            transaction['lock'].release()
+            return
+
+        self._busy = False
+
+    def submit(self,
+               slave_addr: int,
+               modbus_pdu: bytes,
+               count: bool,
+               priority: int = PRIORITY_NORMAL,
+               deadline_ms: Optional[int] = None) -> Optional[bytes]:
+        """
+        Send a modbus message and receive the response once granted the host
+
+        :param      slave_addr:   The slave address
+        :type       slave_addr:   int
+        :param      modbus_pdu:   The modbus Protocol Data Unit
+        :type       modbus_pdu:   bytes
+        :param      count:        The count
+        :type       count:        bool
+        :param      priority:     The priority class
+        :type       priority:     int
+        :param      deadline_ms:  Time until a read is dropped, None to never
+                                  drop it
+        :type       deadline_ms:  Optional[int]
+
+        :returns:   Validated response content
+        :rtype:     Optional[bytes]
+
+        :raises     RequestExpired:  The read was dropped after its deadline
+        """
+        start = ticks_ms()
+        transaction = {
+            'priority': priority,
+            'function_code': modbus_pdu[0],
+            'deadline': None,
+            'expired': False,
+            'lock': None,
+        }
+        if deadline_ms is not None:
+            transaction['deadline'] = ticks_add(start, deadline_ms)
+
+        self._lock.acquire()
+        try:
+            if self._busy:
+                transaction['lock'] = allocate_lock()
+                transaction['lock'].acquire()
+                heapq.heappush(self._waiting,
+                               (priority, self._sequence, transaction))
+                self._sequence += 1
+            else:
+                self._busy = True
+        finally:
+            self._lock.release()
+
+        if transaction['lock'] is not None:
+            # released when granted the host or dropped
+            transaction['lock'].acquire()
+
+        if transaction['expired']:
+            raise RequestExpired('read dropped after its deadline')
+
+        # only the thread granted the host updates these counters
+        self._max_wait[priority] = max(self._max_wait[priority],
+                                       ticks_diff(ticks_ms(), start))
+        self._sent[priority] += 1
+
+        try:
+            return self._itf._send_receive(slave_addr=slave_addr,
+                                           modbus_pdu=modbus_pdu,
+                                           count=count)
+        finally:
+            self._lock.acquire()
+            try:
+                self._release()
+            finally:
+                self._lock.release()
+
+
+class PriorityClient(CommonModbusFunctions):
+    """
+    Modbus host submitting its transactions to a transaction queue
+
+    All functions of the host are available. Created by
+    TransactionQueue.client.
+
+    :param      queue:        The transaction queue
+    :type       queue:        TransactionQueue
+    :param      priority:     The priority class
+    :type       priority:     int
+    :param      deadline_ms:  Time until reads are dropped, None to never
+                              drop them
+    :type       deadline_ms:  Optional[int]
+    """
+    def __init__(self,
+                 queue: TransactionQueue,
+                 priority: int,
+                 deadline_ms: Optional[int]) -> None:
+        self._queue = queue
+        self._priority = priority
+        self._deadline_ms = deadline_ms
+
+    def _send_receive(self,
+                      slave_addr: int,
+                      modbus_pdu: bytes,
+                      count: bool) -> Optional[bytes]:
+        """
+        Send a modbus message and receive the response through the queue
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      modbus_pdu:  The modbus Protocol Data Unit
+        :type       modbus_pdu:  bytes
+        :param      count:       The count
+        :type       count:       bool
+
+        :returns:   Validated response content
+        :rtype:     Optional[bytes]
+
+        :raises     RequestExpired:  The read was dropped after its deadline
+        """
+        return self._queue.submit(slave_addr=slave_addr,
+                                  modbus_pdu=modbus_pdu,
+                                  count=count,
+                                  priority=self._priority,
+                                  deadline_ms=self._deadline_ms)
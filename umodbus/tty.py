@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Serial tty device access on Linux
+
+Provides the subset of the MicroPython UART interface used by
+:py:class:`umodbus.serial.Serial` on top of a tty file descriptor, which is
+configured by termios in raw, non-blocking mode. This allows to use
+:py:class:`umodbus.serial.ModbusRTU` and :py:class:`umodbus.serial.Serial`
+with USB-RS485 adapters or onboard UARTs of Linux gateways on CPython.
+
+See https://docs.micropython.org/en/latest/library/machine.UART.html
+"""
+
+# system packages
+import errno
+import fcntl
+import os
+import select
+import struct
+import termios
+
+# typing not natively supported on MicroPython
+from .typing import Optional, Union
+
+#: Parity value for even parity, same as on MicroPython
+PARITY_EVEN = 0
+#: Parity value for odd parity, same as on MicroPython
+PARITY_ODD = 1
+
+
+class TTY(object):
+    """
+    UART compatible serial tty device
+
+    :param      device:    The path of the tty device, e.g. /dev/ttyUSB0
+    :type       device:    str
+    :param      baudrate:  The baudrate, default 9600
+    :type       baudrate:  int
+    :param      bits:      The data bits, default 8
+    :type       bits:      int
+    :param      parity:    The parity, None, 0 (even) or 1 (odd)
+    :type       parity:    Optional[int]
+    :param      stop:      The stop bits, default 1
+    :type       stop:      int
+    """
+    def __init__(self,
+                 device: str,
+                 baudrate: int = 9600,
+                 bits: int = 8,
+                 parity: Optional[int] = None,
+                 stop: int = 1) -> None:
+        self._fd = os.open(device, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+
+        try:
+            self.init(baudrate=baudrate, bits=bits, parity=parity, stop=stop)
+        except Exception as e:
+            os.close(self._fd)
+            self._fd = None
+            raise e
+
+        self._write_poller = select.poll()
+        self._write_poller.register(self._fd, select.POLLOUT)
+
+    def init(self,
+             baudrate: int = 9600,
+             bits: int = 8,
+             parity: Optional[int] = None,
+             stop: int = 1) -> None:
+        """
+        Configure the tty device in raw mode
+
+        :param      baudrate:  The baudrate
+        :type       baudrate:  int
+        :param      bits:      The data bits
+        :type       bits:      int
+        :param      parity:    The parity, None, 0 (even) or 1 (odd)
+        :type       parity:    Optional[int]
+        :param      stop:      The stop bits
+        :type       stop:      int
+
+        :raises     ValueError:  Unsupported baudrate, data or stop bits
+        """
+        speed = getattr(termios, 'B{}'.format(baudrate), None)
+        if speed is None:
+            raise ValueError('Unsupported baudrate {}'.format(baudrate))
+
+        sizes = {5: termios.CS5, 6: termios.CS6, 7: termios.CS7, 8: termios.CS8}
+        if bits not in sizes:
+            raise ValueError('Unsupported number of data bits {}'.format(bits))
+
+        if stop not in [1, 2]:
+            raise ValueError('Unsupported number of stop bits {}'.format(stop))
+
+        attrs = termios.tcgetattr(self._fd)
+
+        # raw mode, no input or output processing, no echo, no flow control
+        iflag = 0
+        if parity is not None:
+            iflag |= termios.INPCK
+
+        cflag = termios.CREAD | termios.CLOCAL | sizes[bits]
+        if stop == 2:
+            cflag |= termios.CSTOPB
+        if parity is not None:
+            cflag |= termios.PARENB
+            if parity == PARITY_ODD:
+                cflag |= termios.PARODD
+
+        cc = attrs[6]
+        # read returns immediately with the available data
+        cc[termios.VMIN] = 0
+        cc[termios.VTIME] = 0
+
+        termios.tcsetattr(self._fd,
+                          termios.TCSANOW,
+                          [iflag, 0, cflag, 0, speed, speed, cc])
+        termios.tcflush(self._fd, termios.TCIOFLUSH)
+
+    def deinit(self) -> None:
+        """Close the tty device"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def fileno(self) -> int:
+        """
+        Get the file descriptor of the tty device, used by select.poll
+
+        :returns:   The file descriptor
+        :rtype:     int
+        """
+        return self._fd
+
+    def any(self) -> int:
+        """
+        Get the number of bytes available for reading
+
+        :returns:   The number of available bytes
+        :rtype:     int
+        """
+        buf = fcntl.ioctl(self._fd, termios.FIONREAD, b'\x00\x00\x00\x00')
+
+        return struct.unpack('I', buf)[0]
+
+    def read(self, nbytes: Optional[int] = None) -> Union[None, bytes]:
+        """
+        Read the available bytes without blocking
+
+        :param      nbytes:  The maximum number of bytes, default all available
+        :type       nbytes:  Optional[int]
+
+        :returns:   The read bytes, None if no data is available
+        :rtype:     Union[None, bytes]
+        """
+        if nbytes is None:
+            nbytes = max(self.any(), 1)
+
+        try:
+            data = os.read(self._fd, nbytes)
+        except BlockingIOError:
+            return None
+
+        if len(data) == 0:
+            return None
+
+        return data
+
+    def readinto(self,
+                 buf: bytearray,
+                 nbytes: Optional[int] = None) -> Union[None, int]:
+        """
+        Read the available bytes into a buffer without blocking
+
+        :param      buf:     The buffer
+        :type       buf:     bytearray
+        :param      nbytes:  The maximum number of bytes, default buffer size
+        :type       nbytes:  Optional[int]
+
+        :returns:   The number of read bytes, None if no data is available
+        :rtype:     Union[None, int]
+        """
+        if nbytes is None:
+            nbytes = len(buf)
+
+        try:
+            nread = os.readv(self._fd, [memoryview(buf)[:nbytes]])
+        except BlockingIOError:
+            return None
+
+        if nread == 0:
+            return None
+
+        return nread
+
+    def write(self, buf: bytes) -> int:
+        """
+        Write all bytes to the tty device
+
+        :param      buf:  The data
+        :type       buf:  bytes
+
+        :returns:   The number of written bytes
+        :rtype:     int
+        """
+        view = memoryview(buf)
+        written = 0
+
+        while written < len(view):
+            try:
+                written += os.write(self._fd, view[written:])
+            except OSError as e:
+                if e.errno != errno.EAGAIN:
+                    raise e
+                # wait until the kernel buffer has space again
+                self._write_poller.poll()
+
+        return written
+
+    def flush(self) -> None:
+        """Wait until all data has been transmitted"""
+        termios.tcdrain(self._fd)
+
+    def txdone(self) -> bool:
+        """
+        Check whether all data has been transmitted
+
+        :returns:   True if no data is pending for transmission
+        :rtype:     bool
+        """
+        buf = fcntl.ioctl(self._fd, termios.TIOCOUTQ, b'\x00\x00\x00\x00')
+
+        return struct.unpack('I', buf)[0] == 0
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Modbus UDP transport
+
+Sends the same MBAP framed messages as Modbus TCP, each as single datagram.
+No connection has to be managed and a lost request does not block the
+following ones. Responses are matched to their request by the transaction ID,
+requests without a response are sent again. A single server socket answers
+the requests of any number of hosts.
+"""
+
+# system packages
+import socket
+import struct
+
+# custom packages
+from . import const as Const
+from .common import Request
+from .common import ModbusException
+from .modbus import Modbus
+from .tcp import TCP, TCPServer
+
+# typing not natively supported on MicroPython
+from .typing import Optional, Union
+
+#: Maximum size of a Modbus UDP datagram, MBAP header and PDU
+MAX_DATAGRAM_SIZE = 260
+
+
+class ModbusUDP(Modbus):
+    """Modbus UDP client class"""
+    def __init__(self):
+        super().__init__(
+            # set itf to UDPServer object, addr_list to None
+            UDPServer(),
+            None
+        )
+
+    def bind(self, local_ip: str, local_port: int = 502) -> None:
+        """
+        Bind IP and port for incoming requests
+
+        :param      local_ip:    IP of this device listening for requests
+        :type       local_ip:    str
+        :param      local_port:  Port of this device
+        :type       local_port:  int
+        """
+        self._itf.bind(local_ip, local_port)
+
+    def get_bound_status(self) -> bool:
+        """
+        Get the IP and port binding status.
+
+        :returns:   The bound status, True if already bound, False otherwise.
+        :rtype:     bool
+        """
+        try:
+            return self._itf.get_is_bound()
+        except Exception:
+            return False
+
+
+class UDP(TCP):
+    """
+    UDP class sending Modbus requests as datagrams
+
+    :param      slave_ip:    IP of the device answering the requests
+    :type       slave_ip:    str
+    :param      slave_port:  Port of the device
+    :type       slave_port:  int
+    :param      timeout:     Time to wait for a response in seconds
+    :type       timeout:     float
+    :param      retries:     Number of times a request without a response is
+                             sent again
+    :type       retries:     int
+    """
+    def __init__(self,
+                 slave_ip: str,
+                 slave_port: int = 502,
+                 timeout: float = 1.0,
+                 retries: int = 2):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.trans_id_ctr = 0
+        self._max_outstanding = 1
+        self._timeout = timeout
+        self._retries = retries
+        self._stale_trans_ids = []
+
+        # only datagrams of the device are received
+        self._sock.connect(socket.getaddrinfo(slave_ip, slave_port)[0][-1])
+
+        self._sock.settimeout(timeout)
+
+    def _recv_response(self) -> bytes:
+        """
+        Receive a response, each datagram contains a complete response
+
+        :returns:   The response including the MBAP header
+        :rtype:     bytes
+
+        :raises     OSError:  No response received within the timeout
+        """
+        return self._sock.recv(MAX_DATAGRAM_SIZE)
+
+    def _send_receive(self,
+                      slave_addr: int,
+                      modbus_pdu: bytes,
+                      count: bool) -> bytes:
+        """
+        Send a modbus message and receive the reponse.
+
+        The request is sent again with the same transaction ID if no response
+        is received in time. Datagrams of other transactions, like late or
+        duplicated responses, are ignored.
+
+        :param      slave_addr:  The slave identifier
+        :type       slave_addr:  int
+        :param      modbus_pdu:  The modbus PDU
+        :type       modbus_pdu:  bytes
+        :param      count:       The count
+        :type       count:       bool
+
+        :returns:   Modbus data
+        :rtype:     bytes
+
+        :raises     OSError:     No response received after all retries
+        """
+        mbap_hdr, trans_id = self._create_mbap_hdr(slave_addr=slave_addr,
+                                                   modbus_pdu=modbus_pdu)
+        adu = mbap_hdr + modbus_pdu
+
+        for _ in range(self._retries + 1):
+            self._sock.send(adu)
+
+            try:
+                while True:
+                    response = self._recv_response()
+
+                    if (len(response) >= Const.MBAP_HDR_LENGTH + 1 and
+                            struct.unpack_from('>H', response, 0)[0] ==
+                            trans_id):
+                        break
+            except OSError:
+                # no response in time, send the request again
+                continue
+
+            return self._validate_resp_hdr(response=response,
+                                           trans_id=trans_id,
+                                           slave_addr=slave_addr,
+                                           function_code=modbus_pdu[0],
+                                           count=count)
+
+        raise OSError('no response received from slave')
+
+
+class UDPServer(TCPServer):
+    """Modbus UDP host class"""
+    def __init__(self):
+        super().__init__()
+        self._client_addr = None
+
+    def bind(self, local_ip: str, local_port: int = 502) -> None:
+        """
+        Bind IP and port for incoming requests
+
+        :param      local_ip:    IP of this device listening for requests
+        :type       local_ip:    str
+        :param      local_port:  Port of this device
+        :type       local_port:  int
+        """
+        if self._sock:
+            self._sock.close()
+
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind(socket.getaddrinfo(local_ip, local_port)[0][-1])
+
+        self._is_bound = True
+
+    def _send(self, modbus_pdu: bytes, slave_addr: int) -> None:
+        """
+        Send Modbus Protocol Data Unit to the host of the last request
+
+        :param      modbus_pdu:  The Modbus Protocol Data Unit
+        :type       modbus_pdu:  bytes
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        """
+        mbap_hdr = struct.pack('>HHHB',
+                               self._req_tid,
+                               0,
+                               len(modbus_pdu) + 1,
+                               slave_addr)
+        self._sock.sendto(mbap_hdr + modbus_pdu, self._client_addr)
+
+    def get_request(self,
+                    unit_addr_list: Optional[list] = None,
+                    timeout: int = None) -> Union[Request, None]:
+        """
+        Check for request within the specified timeout
+
+        :param      unit_addr_list:  The unit address list
+        :type       unit_addr_list:  Optional[list]
+        :param      timeout:         The timeout in milliseconds, None to
+                                     wait for a request
+        :type       timeout:         int
+
+        :returns:   A request object or None.
+        :rtype:     Union[Request, None]
+
+        :raises     Exception:       If no socket is configured and bound
+        """
+        if self._sock is None:
+            raise Exception('Modbus UDP server not bound')
+
+        self._sock.settimeout(None if timeout is None else timeout / 1000)
+
+        try:
+            req, client_addr = self._sock.recvfrom(MAX_DATAGRAM_SIZE)
+        except OSError:
+            # no request within the timeout
+            return None
+
+        if len(req) < Const.MBAP_HDR_LENGTH + 1:
+            return None
+
+        req_tid, req_pid, req_len = struct.unpack_from('>HHH', req, 0)
+        if req_pid != 0:
+            return None
+
+        req_uid_and_pdu = req[Const.MBAP_HDR_LENGTH - 1:
+                              Const.MBAP_HDR_LENGTH + req_len - 1]
+
+        if ((unit_addr_list is not None) and
+                (req_uid_and_pdu[0] not in unit_addr_list)):
+            return None
+
+        self._req_tid = req_tid
+        self._client_addr = client_addr
+
+        try:
+            return Request(self, req_uid_and_pdu)
+        except ModbusException as e:
+            self.send_exception_response(req_uid_and_pdu[0],
+                                         e.function_code,
+                                         e.exception_code)
+            return None
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Modbus host write queue
+
+Buffers writes of coils and holding registers and sends them together. Writes
+to contiguous addresses of a slave are merged into write multiple coils or
+registers requests, repeated writes to the same address only send the last
+value. The buffered writes are sent on an explicit flush or once the oldest
+one waited for the configured window. The window is checked by poll and by
+the next write, there is no timer sending the writes in the background.
+"""
+
+# custom packages
+from . import const as Const
+from . import functions
+from .ticks import ticks_diff, ticks_ms
+
+# typing not natively supported on MicroPython
+from .typing import List, Optional, Union
+
+
+class WriteQueue(object):
+    """
+    Write-behind queue merging buffered writes into combined requests
+
+    The write functions return a status of the write, which is updated when
+    the write is sent. It contains the keys done, result and error.
+
+    Call poll regularly to send the writes once the window elapsed, otherwise
+    they are only sent by the next write after the window or by flush.
+
+    :param      itf:        The Modbus host, e.g. Serial or TCP
+    :type       itf:        CommonModbusFunctions
+    :param      window_ms:  Time a write is buffered until the queue is sent
+                            by poll or the next write
+    :type       window_ms:  int
+    """
+    def __init__(self, itf, window_ms: int = 20) -> None:
+        self._itf = itf
+        self._window_ms = window_ms
+
+        # per slave and register type the value and status list per address
+        self._pending = dict()
+        self._first_write = None
+
+        self._writes = 0
+        self._requests = 0
+
+    def _queue(self,
+               slave_addr: int,
+               reg_type: str,
+               starting_address: int,
+               values: List[int]) -> dict:
+        """
+        Buffer values of consecutive addresses
+
+        The buffered writes are sent first if the window elapsed.
+
+        :param      slave_addr:        The slave address
+        :type       slave_addr:        int
+        :param      reg_type:          The register type, COILS or HREGS
+        :type       reg_type:          str
+        :param      starting_address:  The address of the first value
+        :type       starting_address:  int
+        :param      values:            The values
+        :type       values:            List[int]
+
+        :returns:   The status of the write
+        :rtype:     dict
+        """
+        self.poll()
+
+        status = {'done': False, 'result': None, 'error': None}
+        table = self._pending.setdefault((slave_addr, reg_type), dict())
+
+        for offset, value in enumerate(values):
+            address = starting_address + offset
+            statuses = table[address][1] if address in table else []
+
+            # the last value wins, earlier writes complete with it
+            statuses.append(status)
+            table[address] = (value, statuses)
+
+        if self._first_write is None:
+            self._first_write = ticks_ms()
+        self._writes += 1
+
+        return status
+
+    @property
+    def pending(self) -> int:
+        """
+        Get the number of buffered addresses
+
+        :returns:   The number of addresses waiting to be written
+        :rtype:     int
+        """
+        return sum(len(table) for table in self._pending.values())
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Get the number of queued writes and sent requests
+
+        :returns:   The number of writes, requests and pending addresses
+        :rtype:     dict
+        """
+        return {
+            'writes': self._writes,
+            'requests': self._requests,
+            'pending': self.pending,
+        }
+
+    def write_single_coil(self,
+                          slave_addr: int,
+                          output_address: int,
+                          output_value: Union[int, bool]) -> dict:
+        """
+        Buffer the update of a single coil
+
+        :param      slave_addr:      The slave address
+        :type       slave_addr:      int
+        :param      output_address:  The output address
+        :type       output_address:  int
+        :param      output_value:    The output value
+        :type       output_value:    Union[int, bool]
+
+        :returns:   The status of the write
+        :rtype:     dict
+
+        :raises     ValueError:      Illegal coil value
+        """
+        if output_value not in [0x0000, 0xFF00, False, True, 0, 1]:
+            raise ValueError('Illegal coil value')
+
+        return self._queue(slave_addr=slave_addr,
+                           reg_type='COILS',
+                           starting_address=output_address,
+                           values=[1 if output_value else 0])
+
+    def write_single_register(self,
+                              slave_addr: int,
+                              register_address: int,
+                              register_value: int,
+                              signed: bool = True) -> dict:
+        """
+        Buffer the update of a single holding register
+
+        :param      slave_addr:        The slave address
+        :type       slave_addr:        int
+        :param      register_address:  The address of the holding register
+        :type       register_address:  int
+        :param      register_value:    The new register value
+        :type       register_value:    int
+        :param      signed:            Indicates if signed
+        :type       signed:            bool
+
+        :returns:   The status of the write
+        :rtype:     dict
+        """
+        return self.write_multiple_registers(
+            slave_addr=slave_addr,
+            starting_address=register_address,
+            register_values=[register_value],
+            signed=signed)
+
+    def write_multiple_coils(self,
+                             slave_addr: int,
+                             starting_address: int,
+                             output_values: List[Union[int, bool]]) -> dict:
+        """
+        Buffer the update of multiple coils
+
+        :param      slave_addr:        The slave address
+        :type       slave_addr:        int
+        :param      starting_address:  The address of the first coil
+        :type       starting_address:  int
+        :param      output_values:     The output values
+        :type       output_values:     List[Union[int, bool]]
+
+        :returns:   The status of the write
+        :rtype:     dict
+        """
+        return self._queue(slave_addr=slave_addr,
+                           reg_type='COILS',
+                           starting_address=starting_address,
+                           values=[1 if value else 0
+                                   for value in output_values])
+
+    def write_multiple_registers(self,
+                                 slave_addr: int,
+                                 starting_address: int,
+                                 register_values: List[int],
+                                 signed: bool = True) -> dict:
+        """
+        Buffer the update of multiple holding registers
+
+        :param      slave_addr:        The slave address
+        :type       slave_addr:        int
+        :param      starting_address:  The address of the first register
+        :type       starting_address:  int
+        :param      register_values:   The register values
+        :type       register_values:   List[int]
+        :param      signed:            Indicates if signed
+        :type       signed:            bool
+
+        :returns:   The status of the write
+        :rtype:     dict
+
+        :raises     ValueError:        Value out of range of a register
+        """
+        for value in register_values:
+            if not ((-0x8000 if signed else 0) <= value <=
+                    (0x7FFF if signed else 0xFFFF)):
+                raise ValueError('{} is out of range of a register'.
+                                 format(value))
+
+        # stored unsigned, so signed and unsigned writes can be merged
+        return self._queue(slave_addr=slave_addr,
+                           reg_type='HREGS',
+                           starting_address=starting_address,
+                           values=[value & 0xFFFF
+                                   for value in register_values])
+
+    def _send(self,
+              slave_addr: int,
+              reg_type: str,
+              starting_address: int,
+              values: List[int]) -> bool:
+        """
+        Send the values of consecutive addresses with one request
+
+        :param      slave_addr:        The slave address
+        :type       slave_addr:        int
+        :param      reg_type:          The register type, COILS or HREGS
+        :type       reg_type:          str
+        :param      starting_address:  The address of the first value
+        :type       starting_address:  int
+        :param      values:            The values
+        :type       values:            List[int]
+
+        :returns:   Result of the request
+        :rtype:     bool
+        """
+        self._requests += 1
+
+        if reg_type == 'COILS':
+            if len(values) == 1:
+                return self._itf.write_single_coil(
+                    slave_addr=slave_addr,
+                    output_address=starting_address,
+                    output_value=values[0])
+
+            return self._itf.write_multiple_coils(
+                slave_addr=slave_addr,
+                starting_address=starting_address,
+                output_values=values)
+
+        if len(values) == 1:
+            return self._itf.write_single_register(
+                slave_addr=slave_addr,
+                register_address=starting_address,
+                register_value=values[0],
+                signed=False)
+
+        return self._itf.write_multiple_registers(
+            slave_addr=slave_addr,
+            starting_address=starting_address,
+            register_values=values,
+            signed=False)
+
+    def flush(self) -> bool:
+        """
+        Send all buffered writes
+
+        Contiguous addresses are merged into requests within the protocol
+        limits. The status of each write is updated with the result of the
+        request containing it, writes split across several requests are done
+        once all of them have been sent and fail if any of them fails. On
+        other errors than OSError and ValueError the unsent writes are kept
+        in the queue and the error is raised.
+
+        :returns:   True if all requests succeeded
+        :rtype:     bool
+        """
+        pending = self._pending
+        first_write = self._first_write
+        self._pending = dict()
+        self._first_write = None
+        success = True
+
+        # number of addresses of each write still to be sent
+        remaining = dict()
+        for table in pending.values():
+            for _, statuses in table.values():
+                for status in statuses:
+                    remaining[id(status)] = remaining.get(id(status), 0) + 1
+
+        try:
+            for (slave_addr, reg_type), table in pending.items():
+                max_quantity = Const.MAX_WRITE_BITS if reg_type == 'COILS' \
+                    else Const.MAX_WRITE_REGISTERS
+                addresses = sorted(table.keys())
+                run_start = 0
+
+                for idx in range(1, len(addresses) + 1):
+                    if (idx < len(addresses) and
+                            addresses[idx] == addresses[idx - 1] + 1):
+                        continue
+
+                    run = addresses[run_start:idx]
+                    run_start = idx
+
+                    for address, quantity in functions.split_range(
+                            starting_address=run[0],
+                            quantity=len(run),
+                            max_quantity=max_quantity):
+                        values = [table[address + offset][0]
+                                  for offset in range(quantity)]
+                        result = False
+                        error = None
+
+                        try:
+                            result = self._send(slave_addr=slave_addr,
+                                                reg_type=reg_type,
+                                                starting_address=address,
+                                                values=values)
+                        except (OSError, ValueError) as e:
+                            error = e
+
+                        success = success and result
+
+                        for offset in range(quantity):
+                            for status in table[address + offset][1]:
+                                self._complete(status=status,
+                                               remaining=remaining,
+                                               result=result,
+                                               error=error)
+                            del table[address + offset]
+        finally:
+            # writes not sent due to an unexpected error are kept
+            self._requeue(pending=pending, first_write=first_write)
+
+        return success
+
+    def _requeue(self, pending: dict, first_write: Optional[int]) -> None:
+        """
+        Put the unsent addresses of an interrupted flush back into the queue
+
+        :param      pending:      The remaining addresses of the flush
+        :type       pending:      dict
+        :param      first_write:  The time of the oldest write of the flush
+        :type       first_write:  Optional[int]
+        """
+        for key, table in pending.items():
+            if not len(table):
+                continue
+
+            queued = self._pending.setdefault(key, dict())
+            for address, (value, statuses) in table.items():
+                if address in queued:
+                    # a newer value has been buffered meanwhile
+                    queued[address][1][:0] = statuses
+                else:
+                    queued[address] = (value, statuses)
+
+            if self._first_write is None:
+                self._first_write = first_write
+
+    def _complete(self,
+                  status: dict,
+                  remaining: dict,
+                  result: bool,
+                  error: Optional[Exception]) -> None:
+        """
+        Update the status of a write with the result of a request writing
+        one of its addresses
+
+        :param      status:     The status of the write
+        :type       status:     dict
+        :param      remaining:  The number of unsent addresses of each write
+        :type       remaining:  dict
+        :param      result:     The result of the request
+        :type       result:     bool
+        :param      error:      The error of the request
+        :type       error:      Optional[Exception]
+        """
+        # a failed part of a write spanning several requests persists
+        if status['result'] is None:
+            status['result'] = result
+        else:
+            status['result'] = status['result'] and result
+        if status['error'] is None:
+            status['error'] = error
+
+        remaining[id(status)] -= 1
+        if not remaining[id(status)]:
+            status['done'] = True
+
+    def poll(self, now: Optional[int] = None) -> bool:
+        """
+        Send the buffered writes once the oldest one waited for the window
+
+        :param      now:  The current time in milliseconds, default ticks_ms
+        :type       now:  Optional[int]
+
+        :returns:   True if the writes have been sent
+        :rtype:     bool
+        """
+        if self._first_write is None:
+            return False
+
+        if now is None:
+            now = ticks_ms()
+
+        if ticks_diff(now, self._first_write) < self._window_ms:
+            return False
+
+        self.flush()
+
+        return True